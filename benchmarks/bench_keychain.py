@@ -0,0 +1,80 @@
+"""
+Benchmark keychain backends: the OS keyring vs the encrypted vault file.
+
+Usage:
+    python benchmarks/bench_keychain.py [--keys N] [--backend keyring|file|all]
+
+Keys are written under a throwaway service name and removed afterwards. The
+keyring backend is skipped when no usable keyring service is available.
+"""
+
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "src"))
+
+import keyring  # noqa: E402
+import keyring.errors  # noqa: E402
+
+from backpack.vault import FileVault  # noqa: E402
+
+SERVICE = "backpack-bench"
+
+
+def _timed(label, count, func):
+    start = time.perf_counter()
+    func()
+    elapsed = time.perf_counter() - start
+    print(f"  {label:<8} {elapsed * 1000:9.1f} ms total  {elapsed / count * 1e6:9.1f} us/op")
+
+
+def bench(name, backend, count):
+    names = [f"BENCH_KEY_{i}" for i in range(count)]
+    print(f"{name} ({count} keys)")
+
+    def write():
+        for key in names:
+            backend.set_password(SERVICE, key, f"value-{key}")
+
+    def read():
+        for key in names:
+            backend.get_password(SERVICE, key)
+
+    def delete():
+        for key in names:
+            backend.delete_password(SERVICE, key)
+
+    _timed("set", count, write)
+    _timed("get", count, read)
+    _timed("delete", count, delete)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--keys", type=int, default=100)
+    parser.add_argument("--backend", choices=["keyring", "file", "all"], default="all")
+    args = parser.parse_args()
+
+    if args.backend in ("file", "all"):
+        with tempfile.TemporaryDirectory() as tmp:
+            vault = FileVault(os.path.join(tmp, "vault.bin"), "bench-master-key")
+            start = time.perf_counter()
+            vault.set_password(SERVICE, "warmup", "x")
+            print(f"file vault key derivation + first write: {(time.perf_counter() - start) * 1000:.1f} ms")
+            bench("file", vault, args.keys)
+
+    if args.backend in ("keyring", "all"):
+        try:
+            keyring.set_password(SERVICE, "warmup", "x")
+            keyring.delete_password(SERVICE, "warmup")
+        except keyring.errors.KeyringError as e:
+            print(f"keyring: skipped ({e})")
+            return
+        bench(f"keyring [{type(keyring.get_keyring()).__name__}]", keyring, args.keys)
+
+
+if __name__ == "__main__":
+    main()
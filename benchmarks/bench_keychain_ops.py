@@ -0,0 +1,134 @@
+"""
+Benchmark the backpack.keychain API on the in-memory keyring backend.
+
+Usage:
+    python benchmarks/bench_keychain_ops.py [--sizes 10,1000,10000] [--latency SECONDS] [--check]
+
+Measures store_key, register_key, get_key (cold and cached) and list_keys for
+each vault size. Each size runs with a throwaway BACKPACK_HOME as the working
+directory, and keychain._audit is replaced with a logger that drops events, so
+no audit key is derived and no agent_audit.log is written. Only keychain,
+registry and cache costs are measured.
+
+With --check the script exits non-zero if the per-key cost of an operation
+grows more than --max-growth times between the smallest and largest size,
+which catches registry or cache changes that make per-key work O(n).
+"""
+
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "src"))
+
+from backpack import keychain  # noqa: E402
+from backpack.memory_keyring import MemoryKeyring  # noqa: E402
+
+REPEATS = 3
+LIST_CALLS = 5
+
+
+class _NullAuditLogger:
+    def log_event(self, event_type, details):
+        pass
+
+
+def _best(func, repeats=REPEATS):
+    """Return the fastest of several runs of func(), in seconds."""
+    best = float("inf")
+    for _ in range(repeats):
+        start = time.perf_counter()
+        func()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def run_size(count, latency):
+    """Return {operation: seconds per key} for a vault of `count` keys."""
+    names = [f"BENCH_KEY_{i}" for i in range(count)]
+    hot = names[: min(count, keychain.DEFAULT_CACHE_SIZE)]
+    backend = MemoryKeyring(latency=latency)
+    results = {}
+
+    cwd = os.getcwd()
+    with tempfile.TemporaryDirectory() as home:
+        os.environ[keychain.HOME_ENV] = home
+        os.chdir(home)
+        keychain.set_backend(backend)
+
+        def store():
+            for name in names:
+                keychain.store_key(name, f"value-{name}")
+
+        def register():
+            for name in names:
+                keychain.register_key(name)
+
+        def get_cold():
+            keychain.invalidate_cache()
+            for name in names:
+                keychain.get_key(name)
+
+        def get_cached():
+            for name in hot:
+                keychain.get_key(name)
+
+        def list_all():
+            for _ in range(LIST_CALLS):
+                assert len(keychain.list_keys()) == count
+
+        results["store_key"] = _best(store) / count
+        results["register_key"] = _best(register) / count
+        results["get_key (cold)"] = _best(get_cold) / count
+        keychain.invalidate_cache()
+        get_cached()
+        results["get_key (cached)"] = _best(get_cached) / len(hot)
+        results["list_keys (per key)"] = _best(list_all) / (LIST_CALLS * count)
+        os.chdir(cwd)
+
+    keychain.set_backend(None)
+    keychain.invalidate_cache()
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--sizes", default="10,1000,10000", help="Comma-separated vault sizes")
+    parser.add_argument("--latency", type=float, default=0.0, help="Simulated keyring latency per call (seconds)")
+    parser.add_argument("--check", action="store_true", help="Fail on super-linear per-key cost growth")
+    parser.add_argument("--max-growth", type=float, default=20.0,
+                        help="Allowed per-key cost ratio between the largest and smallest size")
+    args = parser.parse_args()
+
+    sizes = sorted(int(size) for size in args.sizes.split(","))
+    null_logger = _NullAuditLogger()
+    audit = keychain._audit
+    keychain._audit = lambda: null_logger
+    try:
+        table = {size: run_size(size, args.latency) for size in sizes}
+    finally:
+        keychain._audit = audit
+    operations = list(table[sizes[0]])
+
+    header = f"{'operation':<22}" + "".join(f"{f'{size} keys':>14}" for size in sizes)
+    print(header)
+    print("-" * len(header))
+    for op in operations:
+        print(f"{op:<22}" + "".join(f"{table[size][op] * 1e6:>11.2f} us" for size in sizes))
+
+    if args.check and len(sizes) > 1:
+        failures = []
+        for op in operations:
+            growth = table[sizes[-1]][op] / max(table[sizes[0]][op], 1e-9)
+            if growth > args.max_growth:
+                failures.append(f"{op}: per-key cost grew {growth:.1f}x from {sizes[0]} to {sizes[-1]} keys")
+        if failures:
+            print("\n" + "\n".join(failures))
+            sys.exit(1)
+        print(f"\nOK: per-key cost within {args.max_growth:g}x across sizes")
+
+
+if __name__ == "__main__":
+    main()
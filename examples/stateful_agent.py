@@ -2,24 +2,22 @@
 Stateful Agent Example
 An agent that remembers information between runs using Backpack's encrypted memory.
 """
-from backpack.agent_lock import AgentLock
+from backpack import runtime
+from backpack.runtime import memory
 
 
 def main():
     print("🧠 Stateful Agent Starting...")
     
-    # Initialize AgentLock to access memory
-    # Note: In a future version, memory might be injected/exposed more easily.
-    # For now, we use the SDK to read/write memory.
-    lock = AgentLock("agent.lock")
-    agent_data = lock.read()
+    # Under 'backpack run' the decrypted memory arrives over the runtime
+    # channel, so no second key derivation is needed. Run directly, this
+    # falls back to decrypting agent.lock.
+    state = runtime.load()
     
-    if not agent_data:
+    if not state:
         print("❌ No agent.lock found. Run via 'backpack run' or ensure agent.lock exists.")
         return
 
-    memory = agent_data.get("memory", {})
-    
     # Read existing state
     run_count = memory.get("run_count", 0)
     last_message = memory.get("last_message", "None")
@@ -34,12 +32,13 @@ def main():
     
     print(f"\nUpdating memory -> Run Count: {new_count}")
     
-    memory["run_count"] = new_count
-    memory["last_message"] = new_message
+    memory.set("run_count", new_count)
+    memory.set("last_message", new_message)
     
-    # Save encrypted memory
+    # Under 'backpack run' the changes go back to the parent, which saves
+    # them to agent.lock; run directly, commit() encrypts them itself
     try:
-        lock.update_memory(memory)
+        memory.commit()
         print("✅ Memory saved successfully (Encrypted).")
     except Exception as e:
         print(f"❌ Failed to save memory: {e}")
@@ -9,12 +9,14 @@ __version__ = "0.1.3"
 
 # Export exceptions for easy importing
 from .exceptions import (  # noqa: F401
+    AgentDaemonError,
     AgentLockCorruptedError,
     AgentLockError,
     AgentLockNotFoundError,
     AgentLockReadError,
     AgentLockWriteError,
     BackpackError,
+    BundleError,
     CryptoError,
     DecryptionError,
     EncryptionError,
@@ -27,6 +29,8 @@ from .exceptions import (  # noqa: F401
     KeychainStorageError,
     KeyDerivationError,
     KeyNotFoundError,
+    LauncherError,
+    RuntimeChannelError,
     ScriptExecutionError,
     ValidationError,
 )
@@ -52,5 +56,9 @@ __all__ = [
     "InvalidKeyNameError",
     "InvalidPasswordError",
     "ScriptExecutionError",
+    "AgentDaemonError",
+    "LauncherError",
+    "RuntimeChannelError",
+    "BundleError",
 ]
 
@@ -0,0 +1,152 @@
+"""
+Client for the local credential agent daemon (`backpack agentd`).
+
+When BACKPACK_AGENT_SOCK points at a running daemon, backpack.keychain and
+AgentLock send key lookups and layer decryption to it instead of querying the
+keyring and deriving keys in every process. Callers fall back to local
+operation when the daemon cannot be reached.
+
+The protocol is one JSON object per line in each direction:
+
+    {"op": "get_keys", "names": ["OPENAI_API_KEY"]}
+    {"ok": true, "result": {"OPENAI_API_KEY": "..."}}
+
+    {"op": "decrypt", "items": [{"data": "...", "salt": "..."}]}
+    {"ok": true, "result": ["..."]}
+
+Errors are returned as {"ok": false, "error": "<code>", "message": "..."}.
+"""
+
+import json
+import logging
+import os
+import socket
+import struct
+import threading
+from typing import Any, Dict, Iterable, List, Optional
+
+from .exceptions import AgentDaemonError, DecryptionError
+
+logger = logging.getLogger(__name__)
+
+SOCKET_ENV = "BACKPACK_AGENT_SOCK"
+TIMEOUT_ENV = "BACKPACK_AGENT_TIMEOUT"
+DEFAULT_TIMEOUT = 5.0
+
+# Largest response accepted from the daemon.
+MAX_MESSAGE_SIZE = 16 * 1024 * 1024
+
+# Set on the daemon's own request threads so it never calls itself.
+_daemon_thread = threading.local()
+
+
+def mark_daemon_thread() -> None:
+    """Make agent_socket() return None on the calling thread."""
+    _daemon_thread.active = True
+
+
+def agent_socket() -> Optional[str]:
+    """Return the daemon socket path from BACKPACK_AGENT_SOCK, or None if unset."""
+    if getattr(_daemon_thread, "active", False):
+        return None
+    return os.environ.get(SOCKET_ENV) or None
+
+
+def _timeout() -> float:
+    try:
+        return float(os.environ.get(TIMEOUT_ENV, DEFAULT_TIMEOUT))
+    except ValueError:
+        return DEFAULT_TIMEOUT
+
+
+def peer_uid(sock: socket.socket) -> Optional[int]:
+    """Return the uid of the process on the other end of a Unix socket, if the OS tells us."""
+    if not hasattr(socket, "SO_PEERCRED"):
+        return None
+    creds = sock.getsockopt(socket.SOL_SOCKET, socket.SO_PEERCRED, struct.calcsize("3i"))
+    _, uid, _ = struct.unpack("3i", creds)
+    return uid
+
+
+def read_message(sock: socket.socket, buffer: bytearray) -> Optional[Dict[str, Any]]:
+    """
+    Read one newline-terminated JSON message from a socket.
+
+    Args:
+        sock: Connected socket
+        buffer: Bytes received but not yet consumed (updated in place)
+
+    Returns:
+        The decoded message, or None if the peer closed the connection
+
+    Raises:
+        ValueError: If the message is too large or not a JSON object
+    """
+    while b"\n" not in buffer:
+        if len(buffer) > MAX_MESSAGE_SIZE:
+            raise ValueError("Message too large")
+        chunk = sock.recv(65536)
+        if not chunk:
+            return None
+        buffer.extend(chunk)
+    end = buffer.index(b"\n")
+    line = bytes(buffer[:end])
+    del buffer[: end + 1]
+    message = json.loads(line)
+    if not isinstance(message, dict):
+        raise ValueError("Message must be a JSON object")
+    return message
+
+
+def request(op: str, socket_path: Optional[str] = None, **params: Any) -> Any:
+    """
+    Send one request to the agent daemon and return its result.
+
+    Args:
+        op: Operation name ("ping", "get_keys", "decrypt", "invalidate", "lock")
+        socket_path: Daemon socket (default: BACKPACK_AGENT_SOCK)
+        **params: Operation parameters
+
+    Returns:
+        The "result" field of the daemon's response
+
+    Raises:
+        AgentDaemonError: If the daemon is not configured, unreachable or fails
+        DecryptionError: If the daemon could not decrypt the data it was sent
+    """
+    path = socket_path or agent_socket()
+    if not path:
+        raise AgentDaemonError("Credential agent not configured", f"{SOCKET_ENV} is not set")
+
+    payload = dict(params, op=op)
+    try:
+        with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as sock:
+            sock.settimeout(_timeout())
+            sock.connect(path)
+            sock.sendall(json.dumps(payload).encode() + b"\n")
+            response = read_message(sock, bytearray())
+    except (OSError, ValueError) as e:
+        raise AgentDaemonError("Credential agent unavailable", str(e)) from e
+
+    if response is None:
+        raise AgentDaemonError("Credential agent closed the connection")
+    if not response.get("ok"):
+        if response.get("error") == "decryption_failed":
+            raise DecryptionError("Decryption failed - invalid token", response.get("message"))
+        raise AgentDaemonError("Credential agent request failed", response.get("message"))
+    return response.get("result")
+
+
+def get_keys(key_names: Iterable[str]) -> Dict[str, Optional[str]]:
+    """Look up keys through the daemon."""
+    return dict(request("get_keys", names=list(key_names)))
+
+
+def decrypt(items: List[Dict[str, str]]) -> List[str]:
+    """Decrypt encrypt_data() payloads with the daemon's master key."""
+    return list(request("decrypt", items=items))
+
+
+def invalidate(key_names: Optional[Iterable[str]] = None) -> None:
+    """Drop the daemon's cached values for some keys, or all of them if key_names is None."""
+    request("invalidate", names=None if key_names is None else list(key_names))
@@ -8,14 +8,23 @@ Logging in this module focuses on file paths and operation outcomes only.
 No decrypted contents are ever logged.
 """
 
+import base64
+import contextlib
+import hashlib
+import hmac
 import json
 import logging
 import os
-from typing import Dict, Any, Optional
-
-from .audit import AuditLogger
-from .crypto import encrypt_data, decrypt_data, DecryptionError, EncryptionError
+import tempfile
+import threading
+import time
+from typing import Dict, Any, Iterable, Iterator, List, Optional
+
+from . import agent_client
+from .audit import AuditLogger, get_audit_logger
+from .crypto import encrypt_data, decrypt_data, DecryptionError, DerivedKeyCache, EncryptionError
 from .exceptions import (
+    AgentDaemonError,
     AgentLockNotFoundError,
     AgentLockReadError,
     AgentLockWriteError,
@@ -23,8 +32,33 @@ from .exceptions import (
     ValidationError,
 )
 
+try:
+    import fcntl
+except ImportError:  # pragma: no cover - Windows
+    fcntl = None  # type: ignore
+
 logger = logging.getLogger(__name__)
 
+# Plaintext metadata header written next to the encrypted layers
+METADATA_FORMAT = 1
+LAYERS = ("credentials", "personality", "memory")
+
+
+def _metadata_mac(key: bytes, metadata: Dict[str, Any], layers: Dict[str, Any]) -> str:
+    """HMAC over the metadata (minus its mac) and the layers, keyed from a layer key."""
+    mac_key = hmac.new(key, b"backpack agent.lock metadata", hashlib.sha256).digest()
+    body = json.dumps(
+        {"metadata": {k: v for k, v in metadata.items() if k != "mac"}, "layers": layers},
+        sort_keys=True,
+        separators=(",", ":"),
+    )
+    return hmac.new(mac_key, body.encode(), hashlib.sha256).hexdigest()
+
+
+def is_placeholder(value: Any) -> bool:
+    """Return True if a credentials-layer value is empty or a 'placeholder_' stand-in."""
+    return not value or str(value).startswith("placeholder_")
+
 
 class AgentLock:
     """
@@ -38,17 +72,31 @@ class AgentLock:
     All data is encrypted using a master key (from AGENT_MASTER_KEY env var).
     """
 
-    def __init__(self, file_path: str = "agent.lock", master_key: str = None):
+    def __init__(self, file_path: str = "agent.lock", master_key: str = None,
+                 key_cache: Optional[DerivedKeyCache] = None):
         """
         Initialize an AgentLock instance.
 
         Args:
             file_path: Path to the agent.lock file (default: "agent.lock")
             master_key: Optional master key to use (overrides env var)
+            key_cache: Optional derived-key cache shared with other locks read in the same batch
         """
         self.file_path = file_path
         self.master_key = master_key or os.environ.get("AGENT_MASTER_KEY", "default-key")
-        self.audit_logger = AuditLogger()
+        # Only locks using the ambient master key are decrypted by the credential agent
+        self._use_agent = master_key is None
+        # A layer of the last read the daemon decrypted, until the local key is shown to open it
+        self._agent_layer: Optional[Dict[str, str]] = None
+        self.key_cache = key_cache
+        self._thread_lock = threading.RLock()
+        self._lock_depth = 0
+        self._lock_fd: Optional[int] = None
+
+    @property
+    def audit_logger(self) -> AuditLogger:
+        """The audit logger for the current directory and master key, looked up on each use."""
+        return get_audit_logger()
 
     def create(self, credentials: Dict[str, str], personality: Dict[str, str], memory: Dict[str, Any] = None) -> None:
         """
@@ -62,7 +110,9 @@ class AgentLock:
         Raises:
             ValidationError: If input data is invalid
             EncryptionError: If encryption fails
-            AgentLockWriteError: If writing the file fails
+            AgentLockWriteError: If writing the file fails, or if the last read was
+                decrypted by the credential agent and this lock's master key cannot
+                decrypt the file
         """
         if memory is None:
             memory = {}
@@ -77,28 +127,26 @@ class AgentLock:
         if not isinstance(memory, dict):
             raise ValidationError("Memory must be a dictionary", f"Got type: {type(memory).__name__}")
 
+        self._confirm_local_key()
+
+        # Keeps the credentials layer's key for the metadata MAC
+        key_cache = DerivedKeyCache(max_size=len(LAYERS))
         try:
-            data = {
-                "version": "1.0",
-                "layers": {
-                    "credentials": encrypt_data(json.dumps(credentials), self.master_key),
-                    "personality": encrypt_data(json.dumps(personality), self.master_key),
-                    "memory": encrypt_data(json.dumps(memory), self.master_key),
-                },
+            layers = {
+                "credentials": encrypt_data(json.dumps(credentials), self.master_key, key_cache),
+                "personality": encrypt_data(json.dumps(personality), self.master_key, key_cache),
+                "memory": encrypt_data(json.dumps(memory), self.master_key, key_cache),
             }
         except (EncryptionError, ValidationError) as e:
             raise AgentLockWriteError(self.file_path, f"Failed to encrypt data: {str(e)}") from e
 
         try:
-            # Ensure directory exists
-            directory = os.path.dirname(self.file_path)
-            if directory and not os.path.exists(directory):
-                os.makedirs(directory, exist_ok=True)
-
-            with open(self.file_path, "w") as f:
-                json.dump(data, f, indent=2)
+            with self._locked():
+                self._write(credentials, personality, memory, layers, key_cache)
             logger.info("Created agent.lock file", extra={"path": self.file_path})
             self.audit_logger.log_event("lock_created", {"path": self.file_path})
+        except AgentLockWriteError:
+            raise
         except PermissionError as e:
             raise AgentLockWriteError(self.file_path, f"Permission denied: {str(e)}") from e
         except OSError as e:
@@ -106,6 +154,77 @@ class AgentLock:
         except Exception as e:
             raise AgentLockWriteError(self.file_path, f"Unexpected error: {str(e)}") from e
 
+    def _write(self, credentials: Dict[str, str], personality: Dict[str, str], memory: Dict[str, Any],
+               layers: Dict[str, Dict[str, str]], key_cache: DerivedKeyCache) -> None:
+        """Replace the file with the encrypted layers. Called with the file lock held."""
+        metadata: Dict[str, Any] = {
+            "format": METADATA_FORMAT,
+            "cipher": "fernet",
+            "kdf": "pbkdf2-sha256",
+            "codec": "json",
+            "generation": self._generation() + 1,
+            "updated_at": time.time(),
+            "layers": {
+                "credentials": {"size": len(layers["credentials"]["data"]), "items": len(credentials)},
+                "personality": {"size": len(layers["personality"]["data"]), "items": len(personality)},
+                "memory": {"size": len(layers["memory"]["data"]), "items": len(memory)},
+            },
+        }
+        cred_key = key_cache.cached(self.master_key, base64.b64decode(layers["credentials"]["salt"]))
+        metadata["mac"] = _metadata_mac(cred_key, metadata, layers)  # type: ignore[arg-type]
+        data = {"version": "1.0", "metadata": metadata, "layers": layers}
+
+        try:
+            mode = os.stat(self.file_path).st_mode & 0o777
+        except FileNotFoundError:
+            mode = 0o644
+        # Readers never see a partly written file: write a sibling, then rename it over
+        fd, tmp_path = tempfile.mkstemp(prefix=".agent-lock-", dir=os.path.dirname(self.file_path) or ".")
+        os.close(fd)
+        try:
+            with open(tmp_path, "w") as f:
+                json.dump(data, f, indent=2)
+                f.flush()
+                os.fsync(f.fileno())
+            os.chmod(tmp_path, mode)
+            os.replace(tmp_path, self.file_path)
+        except BaseException:
+            with contextlib.suppress(OSError):
+                os.remove(tmp_path)
+            raise
+
+    @contextlib.contextmanager
+    def _locked(self) -> Iterator[None]:
+        """
+        Hold an exclusive lock on the "<file>.lock" sidecar.
+
+        Other processes and other AgentLock objects wait for it, so a
+        read-modify-write cannot lose another writer's update. Re-entrant
+        within one AgentLock object.
+        """
+        with self._thread_lock:
+            if self._lock_depth == 0:
+                try:
+                    directory = os.path.dirname(self.file_path)
+                    if directory and not os.path.exists(directory):
+                        os.makedirs(directory, exist_ok=True)
+                    lock_fd = os.open(self.file_path + ".lock", os.O_RDWR | os.O_CREAT, 0o600)
+                except OSError as e:
+                    raise AgentLockWriteError(self.file_path, f"Cannot lock: {str(e)}") from e
+                if fcntl is not None:
+                    fcntl.flock(lock_fd, fcntl.LOCK_EX)
+                self._lock_fd = lock_fd
+            self._lock_depth += 1
+            try:
+                yield
+            finally:
+                self._lock_depth -= 1
+                if self._lock_depth == 0:
+                    lock_fd, self._lock_fd = self._lock_fd, None
+                    if fcntl is not None:
+                        fcntl.flock(lock_fd, fcntl.LOCK_UN)
+                    os.close(lock_fd)
+
     def read(self) -> Optional[Dict[str, Dict[str, Any]]]:
         """
         Read and decrypt the agent.lock file.
@@ -148,7 +267,7 @@ class AgentLock:
             logger.warning("agent.lock missing 'layers' section", extra={"path": self.file_path})
             return None
 
-        required_layers = ["credentials", "personality", "memory"]
+        required_layers = list(LAYERS)
         for layer in required_layers:
             if layer not in data["layers"]:
                 logger.warning(
@@ -157,12 +276,11 @@ class AgentLock:
                 )
                 return None
 
+        key_cache = self.key_cache or DerivedKeyCache(max_size=len(required_layers))
         try:
-            result = {
-                "credentials": json.loads(decrypt_data(data["layers"]["credentials"], self.master_key)),
-                "personality": json.loads(decrypt_data(data["layers"]["personality"], self.master_key)),
-                "memory": json.loads(decrypt_data(data["layers"]["memory"], self.master_key)),
-            }
+            plaintexts = self._decrypt_layers([data["layers"][layer] for layer in required_layers], key_cache)
+            result = {layer: json.loads(text) for layer, text in zip(required_layers, plaintexts)}
+            self._verify_metadata(data, key_cache)
             logger.debug("Successfully read agent.lock file", extra={"path": self.file_path})
             self.audit_logger.log_event("lock_read", {"path": self.file_path})
             return result
@@ -176,6 +294,103 @@ class AgentLock:
             logger.error("Unexpected error reading agent.lock file", extra={"path": self.file_path, "error": str(e)})
             return None
 
+    def read_metadata(self) -> Optional[Dict[str, Any]]:
+        """
+        Return the plaintext metadata header without deriving any key.
+
+        The header carries the format version, cipher, KDF, codec, generation,
+        update time (Unix seconds) and per-layer ciphertext size and item
+        count. It is not verified here; read() checks its MAC.
+
+        Returns:
+            The metadata, or None if the file is missing, unreadable or was
+            written before headers existed
+        """
+        try:
+            with open(self.file_path, "r") as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            return None
+        metadata = data.get("metadata") if isinstance(data, dict) else None
+        if not isinstance(metadata, dict) or not isinstance(metadata.get("layers"), dict):
+            return None
+        return metadata
+
+    def _generation(self) -> int:
+        try:
+            metadata = self.read_metadata()
+        except Exception:
+            metadata = None  # the write that follows reports the problem
+        generation = metadata.get("generation") if metadata else None
+        return generation if isinstance(generation, int) else 0
+
+    def _verify_metadata(self, data: Dict[str, Any], key_cache: DerivedKeyCache) -> bool:
+        """
+        Check the metadata MAC with the credentials layer key derived by read().
+
+        A mismatch means the header was edited or does not belong to these
+        layers. The layers themselves are authenticated by Fernet, so this
+        only logs a warning.
+        """
+        metadata = data.get("metadata")
+        if not isinstance(metadata, dict):
+            return False
+        try:
+            key = key_cache.cached(self.master_key, base64.b64decode(data["layers"]["credentials"]["salt"]))
+        except (KeyError, TypeError, ValueError):
+            key = None
+        if key is None:
+            return False  # decrypted by the credential agent; no local key to check with
+        if hmac.compare_digest(str(metadata.get("mac", "")), _metadata_mac(key, metadata, data["layers"])):
+            return True
+        logger.warning("agent.lock metadata does not match its layers", extra={"path": self.file_path})
+        return False
+
+    def _decrypt_layers(self, layers: List[Dict[str, str]], key_cache: Optional[DerivedKeyCache] = None) -> List[str]:
+        """
+        Decrypt encrypted layers, through the credential agent daemon if one is configured.
+
+        The daemon holds keys already derived for each layer's salt, so the
+        key derivation is skipped. Falls back to local decryption when the
+        daemon is unreachable or cannot decrypt the layers with its key.
+        """
+        if self._use_agent and agent_client.agent_socket():
+            try:
+                plaintexts = agent_client.decrypt(layers)
+                self._agent_layer = layers[0]
+                return plaintexts
+            except (AgentDaemonError, DecryptionError) as e:
+                logger.debug(
+                    "Credential agent could not decrypt agent.lock; decrypting locally",
+                    extra={"path": self.file_path, "error": str(e)},
+                )
+        plaintexts = [decrypt_data(layer, self.master_key, key_cache or self.key_cache) for layer in layers]
+        self._agent_layer = None
+        return plaintexts
+
+    def _confirm_local_key(self) -> None:
+        """
+        Check the local master key opens a lock the credential agent decrypted.
+
+        The daemon decrypts with its own key, but writes encrypt with
+        self.master_key. Writing without this check would silently move the
+        lock to another key (e.g. "default-key" when AGENT_MASTER_KEY is unset).
+
+        Raises:
+            AgentLockWriteError: If the local master key cannot decrypt the lock
+        """
+        if self._agent_layer is None:
+            return
+        try:
+            decrypt_data(self._agent_layer, self.master_key, self.key_cache)
+        except DecryptionError as e:
+            raise AgentLockWriteError(
+                self.file_path,
+                "Lock was decrypted by the credential agent and the local master key cannot decrypt it; "
+                "set AGENT_MASTER_KEY to the agent's key to write it",
+            ) from e
+        self._agent_layer = None
+
     def update_memory(self, memory: Dict[str, Any]) -> None:
         """
         Update the memory layer of the agent.lock file.
@@ -194,18 +409,61 @@ class AgentLock:
         if not isinstance(memory, dict):
             raise ValidationError("Memory must be a dictionary", f"Got type: {type(memory).__name__}")
 
-        agent_data = self.read()
-        if agent_data is None:
-            raise AgentLockNotFoundError(self.file_path)
+        with self._locked():
+            agent_data = self.read()
+            if agent_data is None:
+                raise AgentLockNotFoundError(self.file_path)
+
+            try:
+                agent_data["memory"] = memory
+                self.create(agent_data["credentials"], agent_data["personality"], memory)
+                self.audit_logger.log_event("lock_memory_updated", {"path": self.file_path})
+            except (ValidationError, EncryptionError, AgentLockWriteError):
+                raise
+            except Exception as e:
+                raise AgentLockWriteError(self.file_path, f"Failed to update memory: {str(e)}") from e
+
+    def merge_memory(self, updates: Dict[str, Any], removed: Iterable[str] = ()) -> Dict[str, Any]:
+        """
+        Apply changes to the memory layer as it is on disk now.
 
-        try:
-            agent_data["memory"] = memory
-            self.create(agent_data["credentials"], agent_data["personality"], memory)
-            self.audit_logger.log_event("lock_memory_updated", {"path": self.file_path})
-        except (ValidationError, EncryptionError, AgentLockWriteError):
-            raise
-        except Exception as e:
-            raise AgentLockWriteError(self.file_path, f"Failed to update memory: {str(e)}") from e
+        Unlike update_memory(), keys that another writer saved since this
+        process read the lock are kept unless they are changed here. The
+        file lock is held from the read to the write, so writers in other
+        processes cannot lose each other's changes.
+
+        Args:
+            updates: Keys to set
+            removed: Keys to delete
+
+        Returns:
+            The memory that was written
+
+        Raises:
+            AgentLockNotFoundError: If agent.lock file doesn't exist
+            ValidationError: If updates is not a dictionary
+            AgentLockWriteError: If writing the updated file fails
+        """
+        if not isinstance(updates, dict):
+            raise ValidationError("Memory updates must be a dictionary", f"Got type: {type(updates).__name__}")
+
+        with self._locked():
+            agent_data = self.read()
+            if agent_data is None:
+                raise AgentLockNotFoundError(self.file_path)
+
+            memory = agent_data["memory"]
+            for key in removed:
+                memory.pop(key, None)
+            memory.update(updates)
+            try:
+                self.create(agent_data["credentials"], agent_data["personality"], memory)
+                self.audit_logger.log_event("lock_memory_updated", {"path": self.file_path})
+            except (ValidationError, EncryptionError, AgentLockWriteError):
+                raise
+            except Exception as e:
+                raise AgentLockWriteError(self.file_path, f"Failed to update memory: {str(e)}") from e
+            return memory
 
     def update_personality(self, personality: Dict[str, str]) -> None:
         """
@@ -225,18 +483,19 @@ class AgentLock:
         if not isinstance(personality, dict):
             raise ValidationError("Personality must be a dictionary", f"Got type: {type(personality).__name__}")
 
-        agent_data = self.read()
-        if agent_data is None:
-            raise AgentLockNotFoundError(self.file_path)
-
-        try:
-            agent_data["personality"] = personality
-            self.create(agent_data["credentials"], personality, agent_data["memory"])
-            self.audit_logger.log_event("lock_personality_updated", {"path": self.file_path})
-        except (ValidationError, EncryptionError, AgentLockWriteError):
-            raise
-        except Exception as e:
-            raise AgentLockWriteError(self.file_path, f"Failed to update personality: {str(e)}") from e
+        with self._locked():
+            agent_data = self.read()
+            if agent_data is None:
+                raise AgentLockNotFoundError(self.file_path)
+
+            try:
+                agent_data["personality"] = personality
+                self.create(agent_data["credentials"], personality, agent_data["memory"])
+                self.audit_logger.log_event("lock_personality_updated", {"path": self.file_path})
+            except (ValidationError, EncryptionError, AgentLockWriteError):
+                raise
+            except Exception as e:
+                raise AgentLockWriteError(self.file_path, f"Failed to update personality: {str(e)}") from e
 
     def get_required_keys(self) -> list:
         """
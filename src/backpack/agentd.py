@@ -0,0 +1,258 @@
+"""
+Local credential agent daemon (`backpack agentd`).
+
+Like ssh-agent, the daemon keeps credentials unlocked in memory so that
+short-lived `backpack run` processes do not each query the keyring and run
+the key derivation function. It listens on a Unix socket that only the owning
+user can connect to and serves these operations:
+
+- get_keys: keychain lookups, answered from the keychain's in-memory cache
+- decrypt: decryption of agent.lock layers under the daemon's master key,
+  reusing keys already derived for a layer's salt
+- invalidate: drop cached values of keys a client stored or deleted
+- lock: drop derived keys and every cached value
+
+The daemon exits, dropping everything it holds, after BACKPACK_AGENT_IDLE_TIMEOUT
+seconds without requests. Clients live in backpack.agent_client.
+
+Logging in this module NEVER records secret values or decrypted contents.
+"""
+
+import base64
+import json
+import logging
+import os
+import socket
+import socketserver
+import stat
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Optional
+
+from cryptography.fernet import Fernet, InvalidToken
+
+from . import agent_client, keychain
+from .agent_client import SOCKET_ENV, peer_uid, read_message
+from .crypto import derive_key
+from .exceptions import AgentDaemonError, BackpackError
+
+logger = logging.getLogger(__name__)
+
+IDLE_TIMEOUT_ENV = "BACKPACK_AGENT_IDLE_TIMEOUT"
+DEFAULT_IDLE_TIMEOUT = 900.0
+DEFAULT_SOCKET_PATH = os.path.join("~", ".backpack", "agent.sock")
+
+# Derived keys kept for recently used salts.
+MAX_DERIVED_KEYS = 256
+
+# Seconds a connected client may stay silent before it is disconnected.
+CONNECTION_TIMEOUT = 30.0
+
+
+def default_socket_path() -> str:
+    """Return the socket path from BACKPACK_AGENT_SOCK, or ~/.backpack/agent.sock."""
+    return os.path.expanduser(os.environ.get(SOCKET_ENV) or DEFAULT_SOCKET_PATH)
+
+
+class _Server(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+    daemon_threads = True
+
+
+class _Handler(socketserver.BaseRequestHandler):
+    """Serve requests from one client connection until it disconnects."""
+
+    def handle(self) -> None:
+        agent: "AgentDaemon" = self.server.agent  # type: ignore[attr-defined]
+        sock: socket.socket = self.request
+
+        uid = peer_uid(sock)
+        if uid is not None and uid != os.getuid():
+            logger.warning("Rejected credential agent connection from another user", extra={"uid": uid})
+            return
+
+        sock.settimeout(CONNECTION_TIMEOUT)
+        agent_client.mark_daemon_thread()
+        buffer = bytearray()
+        while True:
+            try:
+                message = read_message(sock, buffer)
+            except (OSError, ValueError) as e:
+                if isinstance(e, ValueError):
+                    self._send({"ok": False, "error": "invalid_request", "message": str(e)})
+                return
+            if message is None:
+                return
+            if not self._send(agent.dispatch(message)):
+                return
+
+    def _send(self, response: Dict[str, Any]) -> bool:
+        try:
+            self.request.sendall(json.dumps(response).encode() + b"\n")
+            return True
+        except OSError:
+            return False
+
+
+class AgentDaemon:
+    """
+    Credential agent serving key lookups and lock decryption over a Unix socket.
+    """
+
+    def __init__(
+        self,
+        socket_path: Optional[str] = None,
+        master_key: Optional[str] = None,
+        idle_timeout: Optional[float] = None,
+    ):
+        """
+        Initialize the daemon.
+
+        Args:
+            socket_path: Socket to listen on (default: BACKPACK_AGENT_SOCK or ~/.backpack/agent.sock)
+            master_key: Master key for decrypt requests (default: AGENT_MASTER_KEY)
+            idle_timeout: Seconds without requests before the daemon exits
+                (default: BACKPACK_AGENT_IDLE_TIMEOUT or 900; 0 disables)
+        """
+        self.socket_path = os.path.abspath(socket_path or default_socket_path())
+        self.master_key = master_key or os.environ.get("AGENT_MASTER_KEY", "default-key")
+        if idle_timeout is None:
+            try:
+                idle_timeout = float(os.environ.get(IDLE_TIMEOUT_ENV, DEFAULT_IDLE_TIMEOUT))
+            except ValueError:
+                idle_timeout = DEFAULT_IDLE_TIMEOUT
+        self.idle_timeout = idle_timeout
+        self._derived: "OrderedDict[bytes, Fernet]" = OrderedDict()
+        self._derived_lock = threading.Lock()
+        self._last_activity = time.monotonic()
+        self._server: Optional[_Server] = None
+        self._stopped = threading.Event()
+
+    def bind(self) -> None:
+        """
+        Create the listening socket, readable and writable by the owner only.
+
+        Raises:
+            AgentDaemonError: If another daemon is already listening on the socket
+        """
+        directory = os.path.dirname(self.socket_path)
+        os.makedirs(directory, mode=0o700, exist_ok=True)
+
+        if os.path.exists(self.socket_path):
+            if not stat.S_ISSOCK(os.lstat(self.socket_path).st_mode):
+                raise AgentDaemonError("Cannot create agent socket", f"{self.socket_path} exists and is not a socket")
+            try:
+                agent_client.request("ping", socket_path=self.socket_path)
+            except AgentDaemonError:
+                os.remove(self.socket_path)  # stale socket from a daemon that died
+            else:
+                raise AgentDaemonError("Credential agent already running", self.socket_path)
+
+        old_umask = os.umask(0o177)
+        try:
+            self._server = _Server(self.socket_path, _Handler)
+        finally:
+            os.umask(old_umask)
+        os.chmod(self.socket_path, 0o600)
+        self._server.agent = self  # type: ignore[attr-defined]
+        logger.info("Credential agent listening", extra={"path": self.socket_path})
+
+    def serve_forever(self) -> None:
+        """Serve requests until shutdown() is called or the idle timeout expires."""
+        if self._server is None:
+            self.bind()
+        assert self._server is not None
+
+        self._last_activity = time.monotonic()
+        if self.idle_timeout > 0:
+            threading.Thread(target=self._watch_idle, name="backpack-agentd-idle", daemon=True).start()
+        try:
+            self._server.serve_forever(poll_interval=0.2)
+        finally:
+            self._stopped.set()
+            self._server.server_close()
+            self._forget()
+            try:
+                os.remove(self.socket_path)
+            except FileNotFoundError:
+                pass
+            logger.info("Credential agent stopped", extra={"path": self.socket_path})
+
+    def shutdown(self) -> None:
+        """Stop serve_forever() from another thread."""
+        if self._server is not None and not self._stopped.is_set():
+            self._server.shutdown()
+
+    def _watch_idle(self) -> None:
+        while not self._stopped.wait(min(1.0, self.idle_timeout)):
+            if time.monotonic() - self._last_activity >= self.idle_timeout:
+                logger.info("Credential agent idle timeout reached")
+                self.shutdown()
+                return
+
+    def _forget(self) -> None:
+        """Drop derived keys and cached key values."""
+        with self._derived_lock:
+            self._derived.clear()
+        keychain.invalidate_cache()
+
+    def dispatch(self, message: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        Handle one request.
+
+        Args:
+            message: Decoded request with an "op" field
+
+        Returns:
+            The response to send back to the client
+        """
+        self._last_activity = time.monotonic()
+        op = message.get("op")
+        try:
+            if op == "ping":
+                return {"ok": True, "result": "pong"}
+            if op == "get_keys":
+                names = message.get("names")
+                if not isinstance(names, list):
+                    return {"ok": False, "error": "invalid_request", "message": "'names' must be a list"}
+                return {"ok": True, "result": keychain.get_keys(names)}
+            if op == "decrypt":
+                items = message.get("items")
+                if not isinstance(items, list):
+                    return {"ok": False, "error": "invalid_request", "message": "'items' must be a list"}
+                return {"ok": True, "result": [self._decrypt(item) for item in items]}
+            if op == "invalidate":
+                names = message.get("names")
+                if names is not None and not isinstance(names, list):
+                    return {"ok": False, "error": "invalid_request", "message": "'names' must be a list"}
+                for name in names if names is not None else [None]:
+                    keychain.invalidate_cache(name)
+                return {"ok": True, "result": None}
+            if op == "lock":
+                self._forget()
+                return {"ok": True, "result": None}
+            return {"ok": False, "error": "unknown_op", "message": f"Unknown operation: {op}"}
+        except InvalidToken:
+            return {"ok": False, "error": "decryption_failed", "message": "Invalid token"}
+        except (BackpackError, KeyError, TypeError, ValueError) as e:
+            return {"ok": False, "error": "request_failed", "message": str(e)}
+
+    def _fernet(self, salt: bytes) -> Fernet:
+        """Return the Fernet for a salt, deriving the key only on first use."""
+        with self._derived_lock:
+            fernet = self._derived.get(salt)
+            if fernet is not None:
+                self._derived.move_to_end(salt)
+                return fernet
+        key, _ = derive_key(self.master_key, salt)
+        fernet = Fernet(key)
+        with self._derived_lock:
+            self._derived[salt] = fernet
+            while len(self._derived) > MAX_DERIVED_KEYS:
+                self._derived.popitem(last=False)
+        return fernet
+
+    def _decrypt(self, item: Dict[str, str]) -> str:
+        """Decrypt one encrypt_data() payload."""
+        salt = base64.b64decode(item["salt"])
+        return self._fernet(salt).decrypt(base64.b64decode(item["data"])).decode("utf-8")
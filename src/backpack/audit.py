@@ -3,41 +3,313 @@ Encrypted audit logging for agent activity.
 
 This module provides the AuditLogger class for creating an encrypted, tamper-evident
 log of sensitive operations like key injection and lock file access.
+
+Every line carries a sequence number and the SHA-256 of the line before it, so
+deleting, reordering or editing lines breaks the chain. Periodic checkpoint
+lines sign the chain head with an HMAC keyed from the master key, which lets
+verify() resume from the last checkpoint it has already checked.
 """
 
+import atexit
+import hashlib
+import hmac
 import json
 import logging
 import os
+import threading
 import time
-from typing import Any, Dict, List, Optional
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Any, Dict, FrozenSet, Iterable, Iterator, List, Optional, Tuple, cast
+
+try:
+    import fcntl
+except ImportError:  # pragma: no cover - Windows
+    fcntl = None  # type: ignore
 
-from .crypto import DecryptionError, decrypt_data, encrypt_data
+from .crypto import DecryptionError, decrypt_data, derive_key, encrypt_data
+from .exceptions import ValidationError
 
 logger = logging.getLogger(__name__)
 
+# Worker count used by read_logs() when none is given. 1 keeps reads in-process;
+# 0 means "one worker per CPU".
+DEFAULT_READ_WORKERS_ENV = "BACKPACK_AUDIT_WORKERS"
+
+# Comma-separated event types to aggregate, and seconds between summary records.
+AGGREGATE_EVENTS_ENV = "BACKPACK_AUDIT_AGGREGATE"
+FLUSH_INTERVAL_ENV = "BACKPACK_AUDIT_FLUSH_INTERVAL"
+DEFAULT_FLUSH_INTERVAL = 60.0
+
+# Security events are always logged one entry each, even if asked to aggregate them
+NEVER_AGGREGATE = frozenset({
+    "store_key",
+    "store_keys",
+    "delete_key",
+    "export_keys",
+    "lock_created",
+    "lock_memory_updated",
+    "lock_personality_updated",
+})
+
+# Number of entries between signed checkpoint lines.
+DEFAULT_CHECKPOINT_INTERVAL = 100
+
+# "prev" value of the first line in a log
+GENESIS_HASH = "0" * 64
+
+# Fixed salt for the checkpoint signing key; it only separates this key from the
+# per-entry encryption keys, which all use random salts.
+_CHAIN_SALT = b"backpack-audit-chain-v1"
+
+
+def _line_hash(line: bytes) -> str:
+    """Return the chain hash of a raw log line (without its trailing newline)."""
+    return hashlib.sha256(line.rstrip(b"\r\n")).hexdigest()
+
+
+def _read_last_line(fd: int, size: int) -> bytes:
+    """
+    Return the last line of a file opened for reading as a raw descriptor.
+
+    Reads backwards from `size` in blocks, so the cost does not depend on the
+    size of the log. Returns b"" for an empty file.
+    """
+    if size == 0:
+        return b""
+
+    block = 4096
+    pos = size
+    buf = b""
+    while pos > 0:
+        step = min(block, pos)
+        pos -= step
+        os.lseek(fd, pos, os.SEEK_SET)
+        buf = os.read(fd, step) + buf
+        # Ignore the terminating newline of the last line itself
+        idx = buf.rfind(b"\n", 0, len(buf) - 1)
+        if idx != -1:
+            return buf[idx + 1 :]
+    return buf
+
+
+def _split_line_ranges(file_path: str, parts: int) -> List[Tuple[int, int]]:
+    """
+    Split a file into at most `parts` byte ranges that start and end on line boundaries.
+
+    Args:
+        file_path: Path to the file to split
+        parts: Desired number of ranges
+
+    Returns:
+        List of (start, end) byte offsets covering the whole file, in file order.
+    """
+    size = os.path.getsize(file_path)
+    if size == 0:
+        return []
+    parts = max(1, min(parts, size))
+
+    boundaries = [0]
+    with open(file_path, "rb") as f:
+        for i in range(1, parts):
+            target = size * i // parts
+            if target <= boundaries[-1]:
+                continue
+            # Move to the start of the next full line after the target offset
+            f.seek(target - 1)
+            f.readline()
+            offset = f.tell()
+            if boundaries[-1] < offset < size:
+                boundaries.append(offset)
+    boundaries.append(size)
+
+    return list(zip(boundaries[:-1], boundaries[1:]))
+
+
+def _iter_range(
+    f: Any, start: int, end: Optional[int], master_key: str, complete_only: bool = False
+) -> Iterator[Tuple[int, Dict[str, Any]]]:
+    """
+    Decrypt entries from an open binary log file, one line at a time.
+
+    Args:
+        f: Log file opened in binary mode
+        start: Offset of the first byte to read (start of a line)
+        end: Offset to stop at (end of a line), or None to read to EOF
+        master_key: Key used to decrypt the entries
+        complete_only: Stop at a trailing line without a newline (a write in progress)
+
+    Yields:
+        Tuples of (offset just past the entry's line, decrypted entry) in file order.
+        Checkpoint lines and undecryptable lines are skipped.
+    """
+    f.seek(start)
+    offset = start
+    while end is None or offset < end:
+        raw = f.readline()
+        if not raw or (complete_only and not raw.endswith(b"\n")):
+            break
+        line_offset = offset
+        offset += len(raw)
+
+        line = raw.strip()
+        if not line:
+            continue
+
+        try:
+            encrypted_dict = json.loads(line)
+            if isinstance(encrypted_dict, dict) and encrypted_dict.get("type") == "checkpoint":
+                continue
+            decrypted_json = decrypt_data(encrypted_dict, master_key)
+            yield offset, json.loads(decrypted_json)
+        except (json.JSONDecodeError, UnicodeDecodeError, DecryptionError, ValidationError) as e:
+            logger.warning(f"Failed to decrypt audit log entry at byte {line_offset}: {e}")
+            # We continue reading other lines
+            continue
+
+
+def _decrypt_range(file_path: str, start: int, end: int, master_key: str) -> List[Dict[str, Any]]:
+    """
+    Decrypt the audit entries stored between two line-aligned byte offsets.
+
+    This is a module-level function so it can be shipped to worker processes.
+
+    Args:
+        file_path: Path to the audit log file
+        start: Offset of the first byte of the range (start of a line)
+        end: Offset just past the last byte of the range (end of a line)
+        master_key: Key used to decrypt the entries
+
+    Returns:
+        List of decrypted entries in file order. Undecryptable lines are skipped.
+    """
+    with open(file_path, "rb") as f:
+        return [entry for _, entry in _iter_range(f, start, end, master_key)]
+
 
 class AuditLogger:
     """
     Manages an encrypted append-only audit log.
     
     Each log entry is individually encrypted and signed (via authenticated encryption in crypto.py)
-    to ensure integrity and confidentiality.
+    to ensure integrity and confidentiality. Entries are hash-chained and the chain
+    head is periodically signed by a checkpoint line to make the log tamper-evident.
     """
 
-    def __init__(self, file_path: str = "agent_audit.log"):
+    def __init__(
+        self,
+        file_path: str = "agent_audit.log",
+        checkpoint_interval: int = DEFAULT_CHECKPOINT_INTERVAL,
+        aggregate_events: Optional[Iterable[str]] = None,
+        flush_interval: Optional[float] = None,
+    ):
         """
         Initialize an AuditLogger instance.
 
         Args:
             file_path: Path to the audit log file (default: "agent_audit.log")
+            checkpoint_interval: Number of entries between signed checkpoint lines
+            aggregate_events: Event types to count in memory and log as periodic
+                summaries instead of one entry each (default: the comma-separated
+                BACKPACK_AUDIT_AGGREGATE environment variable, or none). Events
+                in NEVER_AGGREGATE are ignored here.
+            flush_interval: Seconds between summary records (default:
+                BACKPACK_AUDIT_FLUSH_INTERVAL, or 60)
         """
         self.file_path = file_path
         self.master_key = os.environ.get("AGENT_MASTER_KEY", "default-key")
+        self.checkpoint_interval = max(1, checkpoint_interval)
+        self._chain_key: Optional[bytes] = None
+        self._write_lock = threading.Lock()
+
+        if aggregate_events is None:
+            aggregate_events = os.environ.get(AGGREGATE_EVENTS_ENV, "").split(",")
+        requested = frozenset(e.strip() for e in aggregate_events if e.strip())
+        refused = requested & NEVER_AGGREGATE
+        if refused:
+            logger.warning("Security events are not aggregated", extra={"events": sorted(refused)})
+        self.aggregate_events: FrozenSet[str] = requested - NEVER_AGGREGATE
+
+        if flush_interval is None:
+            try:
+                flush_interval = float(os.environ.get(FLUSH_INTERVAL_ENV, DEFAULT_FLUSH_INTERVAL))
+            except ValueError:
+                flush_interval = DEFAULT_FLUSH_INTERVAL
+        self.flush_interval = flush_interval
+
+        self._fd: Optional[int] = None
+        self._counters: Dict[Tuple[str, str], Dict[str, Any]] = {}
+        self._counter_lock = threading.Lock()
+        self._last_flush = time.time()
+        self._atexit_registered = False
+
+    @property
+    def state_path(self) -> str:
+        """Path of the sidecar file recording the last verified checkpoint."""
+        return self.file_path + ".verify"
+
+    def _get_chain_key(self) -> bytes:
+        """Derive (once) the HMAC key used to sign checkpoint lines."""
+        if self._chain_key is None:
+            self._chain_key, _ = derive_key(self.master_key, _CHAIN_SALT)
+        return self._chain_key
+
+    def _sign_checkpoint(self, seq: int, prev: str, timestamp: float) -> str:
+        """Return the HMAC of a checkpoint's fields."""
+        payload = json.dumps({"seq": seq, "prev": prev, "time": timestamp}, sort_keys=True)
+        return hmac.new(self._get_chain_key(), payload.encode(), hashlib.sha256).hexdigest()
+
+    def _chain_lines(self, encrypted_entries: List[Dict[str, str]], last_line: bytes) -> List[str]:
+        """
+        Build the lines to append after `last_line`: each entry, plus a signed
+        checkpoint after every entry that completes a checkpoint interval.
+        """
+        prev = _line_hash(last_line) if last_line.strip() else GENESIS_HASH
+        seq = 1
+        if last_line.strip():
+            try:
+                seq = int(json.loads(last_line).get("seq", 0)) + 1
+            except (ValueError, TypeError, AttributeError):
+                # Legacy or corrupted tail: restart numbering, the hash still links it
+                seq = 1
+
+        lines = []
+        for encrypted_data in encrypted_entries:
+            entry_line = json.dumps(dict(encrypted_data, seq=seq, prev=prev))
+            lines.append(entry_line)
+            prev = _line_hash(entry_line.encode())
+            seq += 1
+
+            # Each period holds `checkpoint_interval` entries followed by one checkpoint
+            if (seq - 1) % (self.checkpoint_interval + 1) == self.checkpoint_interval:
+                cp_time = time.time()
+                checkpoint = {
+                    "type": "checkpoint",
+                    "seq": seq,
+                    "prev": prev,
+                    "time": cp_time,
+                    "mac": self._sign_checkpoint(seq, prev, cp_time),
+                }
+                checkpoint_line = json.dumps(checkpoint)
+                lines.append(checkpoint_line)
+                prev = _line_hash(checkpoint_line.encode())
+                seq += 1
+        return lines
+
+    def _aggregation_key(self, event_type: str, details: Dict[str, Any]) -> Tuple[str, str]:
+        """Return the counter key for an aggregated event: its type and the resource it touched."""
+        resource = details.get("key_name") or details.get("path")
+        if resource is None:
+            resource = json.dumps(details, sort_keys=True, default=str)
+        return event_type, str(resource)
 
     def log_event(self, event_type: str, details: Optional[Dict[str, Any]] = None) -> None:
         """
         Log an event to the encrypted audit log.
 
+        Events whose type is in `aggregate_events` are only counted in memory and
+        written as periodic summary records (see flush()).
+
         Args:
             event_type: Identifier for the type of event (e.g., "key_access", "lock_created")
             details: Optional dictionary containing non-sensitive event details
@@ -45,65 +317,544 @@ class AuditLogger:
         if details is None:
             details = {}
 
+        now = time.time()
+        if event_type in self.aggregate_events:
+            key = self._aggregation_key(event_type, details)
+            with self._counter_lock:
+                counter = self._counters.get(key)
+                if counter is None:
+                    if not self._atexit_registered:
+                        atexit.register(self.flush)
+                        self._atexit_registered = True
+                    self._counters[key] = {
+                        "event_type": event_type,
+                        "details": details,
+                        "count": 1,
+                        "first_timestamp": now,
+                        "last_timestamp": now,
+                    }
+                else:
+                    counter["count"] += 1
+                    counter["last_timestamp"] = now
+                due = now - self._last_flush >= self.flush_interval
+            if due:
+                self.flush()
+            return
+
         entry = {
-            "timestamp": time.time(),
-            "iso_time": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
+            "timestamp": now,
+            "iso_time": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime(now)),
             "event_type": event_type,
             "details": details,
         }
+        self._append([entry])
+
+    def flush(self) -> None:
+        """
+        Write one summary record per aggregated (event type, resource) counter.
+
+        Summary records keep the event type and details of the counted events
+        and add an "aggregate" section with the count and the first and last
+        timestamps. The record itself is stamped with the time it is written,
+        so timestamps in the log stay in order for seek_time(). Called
+        periodically by log_event() and at interpreter exit.
+        """
+        with self._counter_lock:
+            counters = list(self._counters.values())
+            self._counters = {}
+            self._last_flush = time.time()
 
+        if not counters:
+            return
+
+        now = time.time()
+        entries = []
+        for counter in counters:
+            entries.append({
+                "timestamp": now,
+                "iso_time": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime(now)),
+                "event_type": counter["event_type"],
+                "details": counter["details"],
+                "aggregate": {
+                    "count": counter["count"],
+                    "first_timestamp": counter["first_timestamp"],
+                    "last_timestamp": counter["last_timestamp"],
+                },
+            })
+        self._append(entries)
+
+    def _append(self, entries: List[Dict[str, Any]]) -> None:
+        """Encrypt entries and append them to the log as chained lines in one write."""
         try:
-            # Serialize and encrypt the entry
-            json_str = json.dumps(entry)
-            encrypted_data = encrypt_data(json_str, self.master_key)
-            
-            # We store the encrypted dict as a single line JSON
-            # encrypt_data returns {'data': '...', 'salt': '...'}
-            log_line = json.dumps(encrypted_data)
-            
-            with open(self.file_path, "a") as f:
-                f.write(log_line + "\n")
-                
+            # Serialize and encrypt each entry
+            encrypted_entries = [encrypt_data(json.dumps(entry), self.master_key) for entry in entries]
+
+            # We store each encrypted dict as a single line JSON
+            # encrypt_data returns {'data': '...', 'salt': '...'}, to which the
+            # chain fields are added
+            with self._write_lock:
+                fd = self._get_fd()
+                if fcntl is not None:
+                    # Serialise the read-tail/append pair with other processes
+                    fcntl.flock(fd, fcntl.LOCK_EX)
+                try:
+                    last_line = _read_last_line(fd, os.fstat(fd).st_size)
+                    lines = self._chain_lines(encrypted_entries, last_line)
+                    os.write(fd, "".join(line + "\n" for line in lines).encode())
+                finally:
+                    if fcntl is not None:
+                        fcntl.flock(fd, fcntl.LOCK_UN)
+
         except Exception as e:
             # We explicitly catch errors here to prevent audit logging failures 
             # from crashing the main application, but we log the error to system logs.
             logger.error(f"Failed to write to audit log: {e}")
 
-    def read_logs(self) -> List[Dict[str, Any]]:
+    def _get_fd(self) -> int:
+        """
+        Return the persistent O_APPEND descriptor for the log, opening it if needed.
+
+        The descriptor is reopened if the file was removed (e.g. by clear() in
+        another process) so writes never go to an unlinked file. Callers must
+        hold the write lock.
+        """
+        if self._fd is not None and os.fstat(self._fd).st_nlink == 0:
+            self._close_fd()
+        if self._fd is None:
+            self._fd = os.open(self.file_path, os.O_RDWR | os.O_APPEND | os.O_CREAT, 0o600)
+        return self._fd
+
+    def _close_fd(self) -> None:
+        """Close the persistent descriptor, if open."""
+        if self._fd is not None:
+            try:
+                os.close(self._fd)
+            except OSError:
+                pass
+            self._fd = None
+
+    def close(self) -> None:
+        """Flush pending summary records and close the log file descriptor."""
+        self.flush()
+        with self._write_lock:
+            self._close_fd()
+
+    def read_logs(self, workers: Optional[int] = None) -> List[Dict[str, Any]]:
         """
         Read and decrypt all entries from the audit log.
 
+        Every entry has its own salt, so each line costs a full key derivation.
+        With more than one worker the file is split into line-aligned byte ranges
+        that are decrypted in parallel worker processes.
+
+        Args:
+            workers: Number of worker processes to use. Defaults to the
+                BACKPACK_AUDIT_WORKERS environment variable, or 1 (in-process).
+                0 uses one worker per CPU.
+
         Returns:
             List of decrypted log entries sorted by timestamp.
         """
         if not os.path.exists(self.file_path):
             return []
 
-        entries = []
+        if workers is None:
+            try:
+                workers = int(os.environ.get(DEFAULT_READ_WORKERS_ENV, "1"))
+            except ValueError:
+                workers = 1
+        if workers <= 0:
+            workers = os.cpu_count() or 1
+
         try:
-            with open(self.file_path, "r") as f:
-                for line_num, line in enumerate(f, 1):
-                    line = line.strip()
-                    if not line:
-                        continue
-                        
-                    try:
-                        encrypted_dict = json.loads(line)
-                        decrypted_json = decrypt_data(encrypted_dict, self.master_key)
-                        entry = json.loads(decrypted_json)
-                        entries.append(entry)
-                    except (json.JSONDecodeError, DecryptionError) as e:
-                        logger.warning(f"Failed to decrypt audit log line {line_num}: {e}")
-                        # We continue reading other lines
-                        continue
-                        
+            ranges = _split_line_ranges(self.file_path, workers)
+            if workers > 1 and len(ranges) > 1:
+                chunks = self._decrypt_ranges_parallel(ranges, workers)
+            else:
+                chunks = [_decrypt_range(self.file_path, start, end, self.master_key) for start, end in ranges]
         except Exception as e:
             logger.error(f"Error reading audit log: {e}")
             return []
 
+        entries = [entry for chunk in chunks for entry in chunk]
+        # Stable sort: entries sharing a timestamp keep their on-disk order
+        entries.sort(key=lambda entry: entry.get("timestamp", 0))
         return entries
 
+    def _decrypt_ranges_parallel(self, ranges: List[Tuple[int, int]], workers: int) -> List[List[Dict[str, Any]]]:
+        """
+        Decrypt byte ranges of the log across a process pool.
+
+        Falls back to in-process decryption if a pool cannot be started
+        (e.g. restricted environments without multiprocessing support).
+        """
+        try:
+            with ProcessPoolExecutor(max_workers=min(workers, len(ranges))) as pool:
+                futures = [
+                    pool.submit(_decrypt_range, self.file_path, start, end, self.master_key) for start, end in ranges
+                ]
+                return [future.result() for future in futures]
+        except (OSError, NotImplementedError, BrokenProcessPool) as e:
+            logger.debug(f"Parallel audit decryption unavailable, reading in-process: {e}")
+            return [_decrypt_range(self.file_path, start, end, self.master_key) for start, end in ranges]
+
+    def iter_logs(self, start: int = 0, follow: bool = False, poll_interval: float = 0.5) -> Iterator[Dict[str, Any]]:
+        """
+        Decrypt entries one at a time, in file order, without loading the whole log.
+
+        Args:
+            start: Byte offset to start reading at (must be the start of a line)
+            follow: Keep waiting for new entries once the end of the log is reached
+            poll_interval: Seconds between checks for new data when following
+
+        Yields:
+            Decrypted log entries.
+        """
+        offset = start
+        while True:
+            if os.path.exists(self.file_path):
+                with open(self.file_path, "rb") as f:
+                    if os.fstat(f.fileno()).st_size < offset:
+                        # Log was cleared or rotated underneath us
+                        offset = 0
+                    for end_offset, entry in _iter_range(f, offset, None, self.master_key, complete_only=follow):
+                        offset = end_offset
+                        yield entry
+                    if follow:
+                        # Resume after the last complete line, including skipped ones
+                        offset = self._complete_end(f, offset)
+            if not follow:
+                return
+            time.sleep(poll_interval)
+
+    @staticmethod
+    def _complete_end(f: Any, offset: int) -> int:
+        """Return the offset just past the last complete line at or after `offset`."""
+        f.seek(offset)
+        for raw in iter(f.readline, b""):
+            if not raw.endswith(b"\n"):
+                break
+            offset += len(raw)
+        return offset
+
+    def tail_offset(self, count: int) -> int:
+        """
+        Find the byte offset where the last `count` entries start.
+
+        Scans backwards from the end of the file in blocks, skipping checkpoint
+        lines, so the cost depends on `count` rather than on the size of the log.
+
+        Args:
+            count: Number of entries to include
+
+        Returns:
+            Byte offset to pass to iter_logs().
+        """
+        if not os.path.exists(self.file_path):
+            return 0
+        if count <= 0:
+            return os.path.getsize(self.file_path)
+
+        with open(self.file_path, "rb") as f:
+            f.seek(0, os.SEEK_END)
+            pos = f.tell()
+            line_end = pos
+            buf = b""
+            found = 0
+            while pos > 0:
+                step = min(4096, pos)
+                pos -= step
+                f.seek(pos)
+                buf = f.read(step) + buf
+                # Walk complete lines from the right end of the buffer
+                while True:
+                    idx = buf.rfind(b"\n", 0, len(buf) - 1)
+                    if idx == -1:
+                        break
+                    line = buf[idx + 1 :]
+                    line_start = line_end - len(line)
+                    buf = buf[: idx + 1]
+                    line_end = line_start
+                    if line.strip() and b'"type": "checkpoint"' not in line:
+                        found += 1
+                        if found == count:
+                            return line_start
+            return 0
+
+    def seek_time(self, since: float) -> int:
+        """
+        Find the byte offset of the first entry logged at or after `since`.
+
+        Entries are appended in time order, so this bisects the file on line
+        boundaries and decrypts only O(log n) entries.
+
+        Args:
+            since: UNIX timestamp
+
+        Returns:
+            Byte offset to pass to iter_logs().
+        """
+        if not os.path.exists(self.file_path):
+            return 0
+
+        with open(self.file_path, "rb") as f:
+            lo, hi = 0, os.fstat(f.fileno()).st_size
+            while lo < hi:
+                mid = (lo + hi) // 2
+                # Align to the first line starting after mid
+                if mid > 0:
+                    f.seek(mid - 1)
+                    f.readline()
+                    line_start = f.tell()
+                else:
+                    line_start = 0
+                probe = next(_iter_range(f, line_start, hi, self.master_key), None)
+                if probe is None:
+                    hi = mid
+                elif probe[1].get("timestamp", 0) < since:
+                    lo = probe[0]
+                else:
+                    hi = mid
+            # `lo` is always a line start with only earlier entries before it
+            return lo
+
+    def verify(self, full: bool = False) -> Dict[str, Any]:
+        """
+        Verify the hash chain and checkpoint signatures of the audit log.
+
+        Verification resumes after the last checkpoint that a previous call has
+        verified (recorded in a sidecar file next to the log), so repeated checks
+        only hash lines appended since then. The sidecar is signed with the
+        chain key and the recorded checkpoint's own signature is checked again
+        on resume; if either does not match, the whole log is verified.
+        Entries are not decrypted.
+
+        Args:
+            full: Ignore the recorded checkpoint and verify from the first line
+
+        Returns:
+            A dictionary with:
+            - 'valid': True if no break in the chain was found
+            - 'checked': Number of lines checked in this call
+            - 'resumed_from': Byte offset verification started at
+            - 'checkpoint': Sequence number of the last verified checkpoint (or None)
+            - 'error': Description of the first problem found (or None)
+            - 'offset': Byte offset of the offending line (or None)
+        """
+        result: Dict[str, Any] = {
+            "valid": True,
+            "checked": 0,
+            "resumed_from": 0,
+            "checkpoint": None,
+            "error": None,
+            "offset": None,
+        }
+
+        if not os.path.exists(self.file_path):
+            return result
+
+        state = None if full else self._load_verify_state()
+        prev_hash: Optional[str] = None
+        expected_seq: Optional[int] = None
+        start = 0
+
+        with open(self.file_path, "rb") as f:
+            if state is not None:
+                f.seek(state["start"])
+                anchor = f.read(state["end"] - state["start"])
+                if len(anchor) != state["end"] - state["start"] or _line_hash(anchor) != state["hash"]:
+                    result.update(valid=False, error="Previously verified checkpoint is missing or modified",
+                                  offset=state["start"])
+                    return result
+                if not self._anchor_is_signed(anchor, state["seq"]):
+                    logger.warning("Recorded audit checkpoint is not signed under the current key; verifying in full")
+                    state = None
+            if state is not None:
+                prev_hash = state["hash"]
+                expected_seq = state["seq"] + 1
+                start = state["end"]
+                result["checkpoint"] = state["seq"]
+
+            result["resumed_from"] = start
+            f.seek(start)
+            offset = start
+            chained = state is not None
+            new_state = None
+
+            for raw in iter(f.readline, b""):
+                line_offset = offset
+                offset += len(raw)
+                if not raw.endswith(b"\n"):
+                    # Incomplete trailing line (a write in progress); check it next time
+                    break
+                if not raw.strip():
+                    continue
+
+                result["checked"] += 1
+                error = None
+                try:
+                    record = json.loads(raw)
+                except (json.JSONDecodeError, UnicodeDecodeError):
+                    record = None
+
+                if not isinstance(record, dict):
+                    error = "Line is not a valid log record"
+                elif "prev" not in record:
+                    if chained:
+                        error = "Unchained line after the start of the hash chain"
+                else:
+                    chained = True
+                    seq = record.get("seq")
+                    if record["prev"] != (prev_hash or GENESIS_HASH):
+                        error = "Hash chain broken (line deleted, reordered or modified)"
+                    elif not isinstance(seq, int) or isinstance(seq, bool):
+                        error = "Invalid sequence number"
+                    elif expected_seq is not None and record.get("seq") != expected_seq:
+                        error = "Unexpected sequence number"
+                    elif record.get("type") == "checkpoint":
+                        mac = self._sign_checkpoint(record.get("seq"), record["prev"], record.get("time"))
+                        if not hmac.compare_digest(mac, str(record.get("mac", ""))):
+                            error = "Invalid checkpoint signature"
+
+                if error is not None:
+                    result.update(valid=False, error=error, offset=line_offset)
+                    break
+
+                prev_hash = _line_hash(raw)
+                if isinstance(record, dict) and "prev" in record:
+                    expected_seq = record["seq"] + 1
+                if isinstance(record, dict) and record.get("type") == "checkpoint":
+                    new_state = {"start": line_offset, "end": offset, "hash": prev_hash, "seq": record["seq"]}
+                    result["checkpoint"] = record["seq"]
+
+        if result["valid"] and new_state is not None:
+            self._save_verify_state(new_state)
+        return result
+
+    def _state_mac(self, state: Dict[str, Any]) -> str:
+        """Return the HMAC of a verify state's fields, under the chain key."""
+        payload = json.dumps({k: state[k] for k in ("start", "end", "hash", "seq")}, sort_keys=True)
+        return hmac.new(self._get_chain_key(), b"verify-state:" + payload.encode(), hashlib.sha256).hexdigest()
+
+    def _anchor_is_signed(self, anchor: bytes, seq: int) -> bool:
+        """Return True if a recorded anchor line is a checkpoint with a valid signature."""
+        try:
+            record = json.loads(anchor)
+        except (json.JSONDecodeError, UnicodeDecodeError):
+            return False
+        if not isinstance(record, dict) or record.get("type") != "checkpoint" or record.get("seq") != seq:
+            return False
+        mac = self._sign_checkpoint(record.get("seq"), record.get("prev"), record.get("time"))
+        return hmac.compare_digest(mac, str(record.get("mac", "")))
+
+    def _load_verify_state(self) -> Optional[Dict[str, Any]]:
+        """
+        Load the last verified checkpoint, or None if there is none.
+
+        The sidecar is signed with the chain key. A state whose signature does
+        not match is ignored, so verification starts from the first line.
+        """
+        try:
+            with open(self.state_path, "r") as f:
+                state = json.load(f)
+            if not all(k in state for k in ("start", "end", "hash", "seq")):
+                return None
+            if not isinstance(state["start"], int) or not isinstance(state["end"], int) or \
+                    not isinstance(state["seq"], int) or state["end"] < state["start"]:
+                return None
+            if not hmac.compare_digest(self._state_mac(state), str(state.get("mac", ""))):
+                logger.warning("Audit verification state is not signed under the current key; verifying in full")
+                return None
+            return cast(Dict[str, Any], state)
+        except (OSError, json.JSONDecodeError, TypeError):
+            pass
+        return None
+
+    def _save_verify_state(self, state: Dict[str, Any]) -> None:
+        """Record the last verified checkpoint next to the log, signed with the chain key."""
+        tmp_path = self.state_path + ".tmp"
+        try:
+            with open(tmp_path, "w") as f:
+                json.dump(dict(state, mac=self._state_mac(state)), f)
+            os.replace(tmp_path, self.state_path)
+        except OSError as e:
+            logger.warning(f"Failed to record audit verification state: {e}")
+
     def clear(self) -> None:
-        """Clear the audit log file."""
-        if os.path.exists(self.file_path):
-            os.remove(self.file_path)
+        """Clear the audit log file, its verification state and pending counters."""
+        with self._counter_lock:
+            self._counters = {}
+        with self._write_lock:
+            self._close_fd()
+            if os.path.exists(self.file_path):
+                os.remove(self.file_path)
+        if os.path.exists(self.state_path):
+            os.remove(self.state_path)
+
+
+_loggers: Dict[Tuple[str, str], AuditLogger] = {}
+_loggers_lock = threading.Lock()
+
+
+def get_audit_logger(file_path: str = "agent_audit.log") -> AuditLogger:
+    """
+    Return the shared AuditLogger for a log file.
+
+    Loggers are keyed by the resolved path and the current AGENT_MASTER_KEY,
+    so every caller in the process that writes to the same file under the
+    same key shares one instance: one open O_APPEND descriptor, one set of
+    aggregation counters and one chain head. Writes are serialised with a
+    thread lock and, where available, an flock() on the descriptor.
+
+    The path and key are resolved on every call, so callers should look the
+    logger up when they write rather than keep it: after a chdir() or a
+    master key change they get the logger for the new file or key.
+
+    Args:
+        file_path: Path to the audit log file (default: "agent_audit.log")
+
+    Returns:
+        The AuditLogger for that file.
+    """
+    master_key = os.environ.get("AGENT_MASTER_KEY", "default-key")
+    key = (os.path.realpath(file_path), hashlib.sha256(master_key.encode()).hexdigest())
+    with _loggers_lock:
+        audit_logger = _loggers.get(key)
+        if audit_logger is None:
+            audit_logger = AuditLogger(key[0])
+            _loggers[key] = audit_logger
+        return audit_logger
+
+
+def close_all_loggers() -> None:
+    """
+    Flush and close every shared audit logger.
+
+    Call this before replacing the process with os.exec*(), where atexit
+    handlers (and so pending aggregated records) would otherwise be lost.
+    """
+    with _loggers_lock:
+        audit_loggers = list(_loggers.values())
+    for audit_logger in audit_loggers:
+        audit_logger.close()
+
+
+def _reset_after_fork() -> None:
+    """
+    Drop inherited descriptors and locks in a forked child.
+
+    flock() locks belong to the open file description, which a forked child
+    shares with its parent, so the child must open its own descriptor.
+    """
+    global _loggers_lock
+    _loggers_lock = threading.Lock()
+    for audit_logger in _loggers.values():
+        audit_logger._write_lock = threading.Lock()
+        audit_logger._counter_lock = threading.Lock()
+        # Pending counts belong to the parent, which will flush them itself
+        audit_logger._counters = {}
+        audit_logger._close_fd()
+
+
+if hasattr(os, "register_at_fork"):
+    os.register_at_fork(after_in_child=_reset_after_fork)
@@ -0,0 +1,914 @@
+"""
+Agent bundles for `backpack export`.
+
+Files are selected from the agent directory with include/exclude patterns,
+compressed in parallel threads and streamed into a standard ZIP archive. The
+archive can be written to a file or to a pipe such as stdout: each member is
+compressed into a spooled temporary file (in memory up to SPOOL_MAX_MEMORY,
+on disk beyond that), so its sizes and CRC are known before its header is
+written and no output seeking is needed. Whole files are never read into
+memory.
+
+Any ZIP reader, including zipfile and `backpack import`, can read the result.
+
+Content-addressed bundles (export_agents) hold several agents. Each unique
+file is stored once, as blobs/<sha256>. manifests/<agent>.json maps each
+agent's relative paths to blob hashes, sizes and modes, and bundle.json
+lists the agents:
+
+    bundle.json
+    manifests/support-bot.json
+    blobs/3a7bd3e2...
+"""
+
+import fnmatch
+import functools
+import hashlib
+import io
+import json
+import logging
+import os
+import stat
+import struct
+import tempfile
+import threading
+import time
+import zipfile
+import zlib
+from collections import deque
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import IO, Any, Callable, Deque, Dict, Iterable, List, Optional, Tuple
+
+from .exceptions import BundleError, ValidationError
+
+logger = logging.getLogger(__name__)
+
+# Files exported when no include pattern or manifest is given
+DEFAULT_FILES = ("agent.lock", "agent.py", "requirements.txt", "README.md")
+
+# Never exported unless an include pattern names them explicitly
+DEFAULT_EXCLUDES = (".git/", "__pycache__/", "*.pyc", ".venv/", "venv/", "node_modules/", ".DS_Store")
+
+COMPRESSION = {
+    "stored": zipfile.ZIP_STORED,
+    "deflate": zipfile.ZIP_DEFLATED,
+    "lzma": zipfile.ZIP_LZMA,
+}
+
+BUNDLE_FORMAT = "backpack-bundle"
+BUNDLE_VERSION = 1
+BUNDLE_INDEX = "bundle.json"
+BLOB_PREFIX = "blobs/"
+MANIFEST_PREFIX = "manifests/"
+
+# Largest single file `backpack import` extracts unless told otherwise
+MAX_MEMBER_SIZE_ENV = "BACKPACK_IMPORT_MAX_SIZE"
+DEFAULT_MAX_MEMBER_SIZE = 100 * 1024 * 1024
+
+CHUNK_SIZE = 1024 * 1024
+SPOOL_MAX_MEMORY = 8 * 1024 * 1024
+
+# Sizes and offsets from this limit on go in ZIP64 extra fields
+_ZIP64_LIMIT = 0xFFFFFFFF
+_ZIP64_MARKER = 0xFFFFFFFF
+_ZIP_FILECOUNT_LIMIT = 0xFFFF
+
+
+class ExportStats:
+    """What an export read and wrote."""
+
+    def __init__(self) -> None:
+        self.files: List[str] = []
+        self.duplicates = 0
+        self.bytes_in = 0
+        self.bytes_out = 0
+        self.elapsed = 0.0
+
+    def to_dict(self) -> Dict[str, Any]:
+        """Return a JSON-serializable summary."""
+        return {
+            "files": len(self.files),
+            "duplicates": self.duplicates,
+            "bytes_in": self.bytes_in,
+            "bytes_out": self.bytes_out,
+            "elapsed": self.elapsed,
+        }
+
+
+def default_workers() -> int:
+    """Return the number of compression threads to use by default."""
+    return min(8, os.cpu_count() or 1)
+
+
+def read_manifest(path: str) -> Tuple[List[str], List[str]]:
+    """
+    Read an export manifest.
+
+    Each non-empty line is an include pattern. Lines starting with "!" are
+    exclude patterns, and "#" starts a comment.
+
+    Returns:
+        (includes, excludes)
+    """
+    includes: List[str] = []
+    excludes: List[str] = []
+    with open(path, "r") as f:
+        for raw in f:
+            line = raw.split("#", 1)[0].strip()
+            if not line:
+                continue
+            if line.startswith("!"):
+                excludes.append(line[1:].strip())
+            else:
+                includes.append(line)
+    return includes, excludes
+
+
+def _matches(path: str, pattern: str) -> bool:
+    """Match a relative POSIX path against a pattern ("dir/" matches a whole directory)."""
+    pattern = pattern.strip()
+    if pattern.startswith("./"):
+        pattern = pattern[2:]
+    if pattern.endswith("/"):
+        return path.startswith(pattern) or f"/{pattern}" in f"/{path}"
+    if fnmatch.fnmatchcase(path, pattern):
+        return True
+    # Patterns without a slash match a file name at any depth, as in .gitignore
+    return "/" not in pattern and fnmatch.fnmatchcase(path.rsplit("/", 1)[-1], pattern)
+
+
+def select_files(
+    root: str,
+    includes: Optional[Iterable[str]] = None,
+    excludes: Optional[Iterable[str]] = None,
+    skip: Iterable[str] = (),
+) -> List[str]:
+    """
+    Choose the files to export from an agent directory.
+
+    Args:
+        root: Agent directory
+        includes: Patterns to include (default: DEFAULT_FILES)
+        excludes: Patterns to leave out, applied after includes. DEFAULT_EXCLUDES
+            are also applied unless an include pattern names the file directly.
+        skip: Absolute paths never to include (e.g. the output file)
+
+    Returns:
+        Sorted relative POSIX paths of regular files. Symlinks are followed
+        only for files an include pattern names exactly (and the defaults).
+    """
+    include_patterns = list(includes) if includes else list(DEFAULT_FILES)
+    exclude_patterns = list(excludes or ())
+    skipped = {os.path.realpath(path) for path in skip}
+
+    def wanted(rel_path: str, full_path: str, named: bool = False) -> bool:
+        if os.path.realpath(full_path) in skipped:
+            return False
+        if any(_matches(rel_path, pattern) for pattern in exclude_patterns):
+            return False
+        return named or not any(_matches(rel_path, p) for p in DEFAULT_EXCLUDES)
+
+    # Files named exactly are looked up directly: symlinks to them are followed,
+    # and DEFAULT_EXCLUDES directories need not be walked to reach them
+    named = set()
+    for pattern in include_patterns:
+        name = pattern.strip()
+        if name.startswith("./"):
+            name = name[2:]
+        if not name or any(c in name for c in "*?[") or name.endswith("/") or name.startswith(("/", "../")):
+            continue
+        full_path = os.path.join(root, *name.split("/"))
+        if os.path.isfile(full_path) and wanted(name, full_path, named=True):
+            named.add(name)
+    if not includes:
+        # The default files sit at the top of the agent directory; no walk needed
+        return sorted(named)
+
+    # Whole directories excluded by a "dir/" pattern are not descended into
+    prune = [p for p in exclude_patterns + list(DEFAULT_EXCLUDES) if p.strip().endswith("/")]
+    selected = set(named)
+    for directory, dirnames, filenames in os.walk(root):
+        rel_dir = os.path.relpath(directory, root).replace(os.sep, "/")
+        prefix = "" if rel_dir == "." else f"{rel_dir}/"
+        dirnames[:] = sorted(d for d in dirnames if not any(_matches(f"{prefix}{d}/", p) for p in prune))
+        for filename in filenames:
+            full_path = os.path.join(directory, filename)
+            rel_path = prefix + filename
+            if rel_path in selected or os.path.islink(full_path) or not os.path.isfile(full_path):
+                continue
+            if not any(_matches(rel_path, pattern) for pattern in include_patterns):
+                continue
+            if wanted(rel_path, full_path):
+                selected.add(rel_path)
+    return sorted(selected)
+
+
+class ImportStats:
+    """What an import wrote and skipped."""
+
+    def __init__(self) -> None:
+        self.agents: List[str] = []
+        self.written: List[str] = []
+        self.skipped: List[str] = []
+        self.bytes_written = 0
+        self.elapsed = 0.0
+
+    def to_dict(self) -> Dict[str, Any]:
+        """Return a JSON-serializable summary."""
+        return {
+            "agents": list(self.agents),
+            "written": len(self.written),
+            "skipped": len(self.skipped),
+            "bytes_written": self.bytes_written,
+            "elapsed": self.elapsed,
+        }
+
+
+def _validate_path(path: str) -> str:
+    """Return a bundle path if it is relative and stays inside its directory."""
+    parts = path.split("/")
+    if not path or path.startswith("/") or "\\" in path or "\x00" in path or \
+            any(part in ("", ".", "..") for part in parts) or ":" in parts[0]:
+        raise BundleError("Unsafe path in bundle", f"Refusing to use {path!r}")
+    return path
+
+
+class _Member:
+    """One compressed member, waiting in a spool to be written."""
+
+    def __init__(self, name: str, method: int, mtime: float, mode: int):
+        self.name = name
+        self.method = method
+        self.mtime = mtime
+        self.mode = mode
+        self.crc = 0
+        self.size = 0
+        self.compressed_size = 0
+        self.sha256 = ""
+        self.spool: Any = None
+
+
+def _compressor(method: int, level: Optional[int]) -> Any:
+    if method == zipfile.ZIP_DEFLATED:
+        return zlib.compressobj(zlib.Z_DEFAULT_COMPRESSION if level is None else level, zlib.DEFLATED, -15)
+    if method == zipfile.ZIP_LZMA:
+        return zipfile.LZMACompressor()
+    return None
+
+
+def _compress(member: _Member, source: IO[bytes], level: Optional[int]) -> None:
+    """Compress a stream into a new spool, computing CRC, SHA-256 and sizes on the way."""
+    spool = tempfile.SpooledTemporaryFile(max_size=SPOOL_MAX_MEMORY)
+    compressor = _compressor(member.method, level)
+    digest = hashlib.sha256()
+    try:
+        while True:
+            chunk = source.read(CHUNK_SIZE)
+            if not chunk:
+                break
+            member.crc = zlib.crc32(chunk, member.crc)
+            digest.update(chunk)
+            member.size += len(chunk)
+            spool.write(compressor.compress(chunk) if compressor else chunk)
+        if compressor:
+            spool.write(compressor.flush())
+        member.compressed_size = spool.tell()
+        spool.seek(0)
+    except BaseException:
+        spool.close()
+        raise
+    member.sha256 = digest.hexdigest()
+    member.spool = spool
+
+
+def _compress_file(root: str, rel_path: str, method: int, level: Optional[int]) -> _Member:
+    """Compress one file under its own name."""
+    full_path = os.path.join(root, *rel_path.split("/"))
+    info = os.stat(full_path)
+    member = _Member(rel_path, method, info.st_mtime, stat.S_IMODE(info.st_mode))
+    with open(full_path, "rb") as source:
+        _compress(member, source, level)
+    return member
+
+
+def _file_digest(path: str) -> str:
+    """Return the SHA-256 of a file, read in chunks."""
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(CHUNK_SIZE), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def _compress_blob(full_path: str, method: int, level: Optional[int], claim: Callable[[str], bool]) -> _Member:
+    """
+    Compress one file as a content-addressed blob.
+
+    The file is hashed first. Only the first file to claim a hash is
+    compressed; for the others a member without a spool is returned.
+    """
+    info = os.stat(full_path)
+    digest = _file_digest(full_path)
+    member = _Member(BLOB_PREFIX + digest, method, info.st_mtime, stat.S_IMODE(info.st_mode))
+    if not claim(digest):
+        member.sha256 = digest
+        member.size = info.st_size
+        return member
+    with open(full_path, "rb") as source:
+        _compress(member, source, level)
+    if member.sha256 != digest:
+        member.spool.close()
+        raise BundleError("File changed during export", full_path)
+    return member
+
+
+def _compress_bytes(name: str, data: bytes, method: int, level: Optional[int]) -> _Member:
+    member = _Member(name, method, time.time(), 0o644)
+    _compress(member, io.BytesIO(data), level)
+    return member
+
+
+def _dos_time(mtime: float) -> Tuple[int, int]:
+    t = time.localtime(max(mtime, 315532800))  # 1980-01-01, the earliest ZIP date
+    return (
+        (t.tm_hour << 11) | (t.tm_min << 5) | (t.tm_sec // 2),
+        ((max(t.tm_year, 1980) - 1980) << 9) | (t.tm_mon << 5) | t.tm_mday,
+    )
+
+
+class ZipStreamWriter:
+    """
+    Minimal ZIP writer for members whose sizes and CRC are known up front.
+
+    Writes sequentially and never seeks, so the output may be a pipe.
+    ZIP64 records are added when sizes, offsets or the member count need them.
+    """
+
+    def __init__(self, stream: IO[bytes]):
+        self.stream = stream
+        self.offset = 0
+        self._central: List[bytes] = []
+
+    def _write(self, data: bytes) -> None:
+        self.stream.write(data)
+        self.offset += len(data)
+
+    def add(self, member: _Member) -> None:
+        """Write a member's local header and data; the spool is closed afterwards."""
+        name = member.name.encode("utf-8")
+        dos_time, dos_date = _dos_time(member.mtime)
+        flags = 0x800  # UTF-8 names
+        version = 20
+        if member.method == zipfile.ZIP_LZMA:
+            flags |= 0x02  # end-of-stream marker present
+            version = 63
+        header_offset = self.offset
+        zip64 = member.size >= _ZIP64_LIMIT or member.compressed_size >= _ZIP64_LIMIT
+        extra = b""
+        if zip64:
+            version = max(version, 45)
+            extra = struct.pack("<HHQQ", 1, 16, member.size, member.compressed_size)
+        sizes = (_ZIP64_MARKER, _ZIP64_MARKER) if zip64 else (member.compressed_size, member.size)
+
+        self._write(struct.pack(
+            "<4sHHHHHIIIHH", b"PK\x03\x04", version, flags, member.method, dos_time, dos_date,
+            member.crc, sizes[0], sizes[1], len(name), len(extra),
+        ) + name + extra)
+        try:
+            while True:
+                chunk = member.spool.read(CHUNK_SIZE)
+                if not chunk:
+                    break
+                self._write(chunk)
+        finally:
+            member.spool.close()
+
+        central_extra = []
+        if zip64:
+            central_extra += [member.size, member.compressed_size]
+        if header_offset >= _ZIP64_LIMIT:
+            central_extra.append(header_offset)
+            version = max(version, 45)
+        extra = struct.pack(f"<HH{len(central_extra)}Q", 1, 8 * len(central_extra), *central_extra) \
+            if central_extra else b""
+        self._central.append(struct.pack(
+            "<4sHHHHHHIIIHHHHHII", b"PK\x01\x02", (3 << 8) | version, version, flags, member.method,
+            dos_time, dos_date, member.crc, sizes[0], sizes[1], len(name), len(extra), 0, 0, 0,
+            ((stat.S_IFREG | member.mode) & 0xFFFF) << 16,
+            _ZIP64_MARKER if header_offset >= _ZIP64_LIMIT else header_offset,
+        ) + name + extra)
+
+    def close(self) -> None:
+        """Write the central directory and end records."""
+        start = self.offset
+        for entry in self._central:
+            self._write(entry)
+        size = self.offset - start
+        count = len(self._central)
+        if count >= _ZIP_FILECOUNT_LIMIT or start >= _ZIP64_LIMIT or size >= _ZIP64_LIMIT:
+            zip64_end = self.offset
+            self._write(struct.pack(
+                "<4sQHHIIQQQQ", b"PK\x06\x06", 44, (3 << 8) | 45, 45, 0, 0, count, count, size, start,
+            ))
+            self._write(struct.pack("<4sIQI", b"PK\x06\x07", 0, zip64_end, 1))
+        self._write(struct.pack(
+            "<4sHHHHIIH", b"PK\x05\x06", 0, 0, min(count, _ZIP_FILECOUNT_LIMIT), min(count, _ZIP_FILECOUNT_LIMIT),
+            _ZIP64_MARKER if size >= _ZIP64_LIMIT else size,
+            _ZIP64_MARKER if start >= _ZIP64_LIMIT else start, 0,
+        ))
+        self.stream.flush()
+
+
+def _check_options(compression: str, level: Optional[int]) -> int:
+    if compression not in COMPRESSION:
+        raise ValidationError("Invalid compression", f"Choose one of: {', '.join(COMPRESSION)}")
+    if level is not None and not 0 <= level <= 9:
+        raise ValidationError("Invalid compression level", "Level must be between 0 and 9")
+    return COMPRESSION[compression]
+
+
+def _write_members(
+    writer: ZipStreamWriter,
+    tasks: Iterable[Callable[[], _Member]],
+    workers: Optional[int],
+    done: Callable[[_Member], None],
+) -> None:
+    """
+    Run compression tasks in a thread pool and write their members in order.
+
+    At most about twice `workers` compressed members wait in their spools at
+    any time. Members without a spool (duplicate blobs) are only passed to
+    `done`.
+    """
+    workers = max(1, workers or default_workers())
+    pending: Deque["Future[_Member]"] = deque()
+
+    def write_next() -> None:
+        member = pending.popleft().result()
+        if member.spool is not None:
+            writer.add(member)
+        done(member)
+
+    with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="backpack-export") as pool:
+        try:
+            for task in tasks:
+                pending.append(pool.submit(task))
+                if len(pending) >= workers * 2:
+                    write_next()
+            while pending:
+                write_next()
+        finally:
+            for future in pending:
+                future.cancel()
+            for future in pending:
+                if not future.cancelled() and future.exception() is None and future.result().spool:
+                    future.result().spool.close()
+
+
+def export_bundle(
+    root: str,
+    files: List[str],
+    output: IO[bytes],
+    compression: str = "deflate",
+    level: Optional[int] = None,
+    workers: Optional[int] = None,
+) -> ExportStats:
+    """
+    Compress files in parallel and stream them into a ZIP archive.
+
+    Members are written in the order given. At most about twice `workers`
+    compressed members wait in their spools at any time.
+
+    Args:
+        root: Agent directory the paths are relative to
+        files: Relative POSIX paths, e.g. from select_files()
+        output: Binary stream to write the archive to; need not be seekable
+        compression: "deflate", "lzma" or "stored"
+        level: Deflate level 0-9 (default: zlib's default)
+        workers: Compression threads (default: default_workers())
+
+    Returns:
+        The export statistics
+
+    Raises:
+        ValidationError: If compression or level is invalid
+    """
+    method = _check_options(compression, level)
+    stats = ExportStats()
+    start = time.monotonic()
+    writer = ZipStreamWriter(output)
+
+    def done(member: _Member) -> None:
+        stats.files.append(member.name)
+        stats.bytes_in += member.size
+
+    tasks = (functools.partial(_compress_file, root, rel_path, method, level) for rel_path in files)
+    _write_members(writer, tasks, workers, done)
+
+    writer.close()
+    stats.bytes_out = writer.offset
+    stats.elapsed = time.monotonic() - start
+    logger.info("Exported bundle", extra={"files": len(stats.files), "bytes_in": stats.bytes_in,
+                                          "bytes_out": stats.bytes_out})
+    return stats
+
+
+def export_agents(
+    agents: Dict[str, Tuple[str, List[str]]],
+    output: IO[bytes],
+    compression: str = "deflate",
+    level: Optional[int] = None,
+    workers: Optional[int] = None,
+) -> ExportStats:
+    """
+    Stream several agents into one content-addressed bundle.
+
+    Every unique file content is compressed and stored once, however many
+    agents contain it.
+
+    Args:
+        agents: Agent name -> (directory, relative POSIX paths). Names become
+            manifest names and, on import, subdirectories.
+        output: Binary stream to write the archive to; need not be seekable
+        compression: "deflate", "lzma" or "stored"
+        level: Deflate level 0-9 (default: zlib's default)
+        workers: Compression threads (default: default_workers())
+
+    Returns:
+        The export statistics; `files` holds "<agent>/<path>" entries
+
+    Raises:
+        ValidationError: If compression or level is invalid
+        BundleError: If an agent name is unsafe or a file changes while it is exported
+    """
+    method = _check_options(compression, level)
+    for name in agents:
+        _validate_path(name)
+    stats = ExportStats()
+    start = time.monotonic()
+    writer = ZipStreamWriter(output)
+    claimed = set()
+    claim_lock = threading.Lock()
+
+    def claim(digest: str) -> bool:
+        with claim_lock:
+            if digest in claimed:
+                return False
+            claimed.add(digest)
+            return True
+
+    tasks = []
+    entries: List[Tuple[str, str]] = []
+    for name, (root, files) in agents.items():
+        for rel_path in files:
+            full_path = os.path.join(root, *rel_path.split("/"))
+            tasks.append(functools.partial(_compress_blob, full_path, method, level, claim))
+            entries.append((name, rel_path))
+
+    manifests: Dict[str, Dict[str, Any]] = {name: {} for name in agents}
+    position = iter(entries)
+
+    def done(member: _Member) -> None:
+        name, rel_path = next(position)
+        manifests[name][rel_path] = {"sha256": member.sha256, "size": member.size, "mode": member.mode}
+        stats.files.append(f"{name}/{rel_path}")
+        stats.bytes_in += member.size
+        if member.spool is None:
+            stats.duplicates += 1
+
+    _write_members(writer, tasks, workers, done)
+
+    for name, files in manifests.items():
+        manifest = {"format": BUNDLE_FORMAT, "version": BUNDLE_VERSION, "agent": name, "files": files}
+        data = json.dumps(manifest, indent=2, sort_keys=True).encode()
+        writer.add(_compress_bytes(f"{MANIFEST_PREFIX}{name}.json", data, method, level))
+    index = {"format": BUNDLE_FORMAT, "version": BUNDLE_VERSION, "agents": list(agents)}
+    writer.add(_compress_bytes(BUNDLE_INDEX, json.dumps(index, indent=2).encode(), method, level))
+
+    writer.close()
+    stats.bytes_out = writer.offset
+    stats.elapsed = time.monotonic() - start
+    logger.info("Exported content-addressed bundle", extra={
+        "agents": len(agents), "files": len(stats.files), "duplicates": stats.duplicates,
+        "bytes_in": stats.bytes_in, "bytes_out": stats.bytes_out,
+    })
+    return stats
+
+
+def is_content_addressed(zf: zipfile.ZipFile) -> bool:
+    """Return True if an open archive is a content-addressed bundle."""
+    try:
+        zf.getinfo(BUNDLE_INDEX)
+    except KeyError:
+        return False
+    return True
+
+
+def _read_json(zf: zipfile.ZipFile, name: str) -> Dict[str, Any]:
+    try:
+        data = json.loads(zf.read(name))
+    except KeyError:
+        raise BundleError("Invalid agent bundle", f"{name} is missing") from None
+    except ValueError as e:
+        raise BundleError("Invalid agent bundle", f"{name} is not valid JSON") from e
+    if not isinstance(data, dict) or data.get("format") != BUNDLE_FORMAT:
+        raise BundleError("Invalid agent bundle", f"{name} is not a backpack bundle manifest")
+    if data.get("version") != BUNDLE_VERSION:
+        raise BundleError("Unsupported bundle version", f"{name} has version {data.get('version')!r}")
+    return data
+
+
+def read_bundle(zf: zipfile.ZipFile) -> Dict[str, Dict[str, Dict[str, Any]]]:
+    """
+    Read and validate the manifests of a content-addressed bundle.
+
+    Returns:
+        Agent name -> relative path -> {"sha256", "size", "mode"}
+
+    Raises:
+        BundleError: If the index or a manifest is missing, invalid or unsafe
+    """
+    agents = _read_json(zf, BUNDLE_INDEX).get("agents")
+    if not isinstance(agents, list) or not agents:
+        raise BundleError("Invalid agent bundle", f"{BUNDLE_INDEX} lists no agents")
+    result = {}
+    for name in agents:
+        manifest = _read_json(zf, f"{MANIFEST_PREFIX}{_validate_path(str(name))}.json")
+        files = manifest.get("files")
+        if not isinstance(files, dict):
+            raise BundleError("Invalid agent bundle", f"Manifest for {name} has no file list")
+        for rel_path, entry in files.items():
+            _validate_path(rel_path)
+            if not isinstance(entry, dict) or not isinstance(entry.get("sha256"), str) or \
+                    len(entry["sha256"]) != 64 or not isinstance(entry.get("size"), int):
+                raise BundleError("Invalid agent bundle", f"Manifest entry for {name}/{rel_path} is invalid")
+        result[name] = files
+    return result
+
+
+def _matches_existing(path: str, entry: Dict[str, Any]) -> bool:
+    """Return True if a file already holds exactly the entry's content."""
+    try:
+        if not os.path.isfile(path) or os.path.islink(path) or os.path.getsize(path) != entry["size"]:
+            return False
+        return _file_digest(path) == entry["sha256"]
+    except OSError:
+        return False
+
+
+def _matches_member(path: str, info: zipfile.ZipInfo) -> bool:
+    """Return True if a file already holds a flat archive member's content (size and CRC-32)."""
+    try:
+        if not os.path.isfile(path) or os.path.islink(path) or os.path.getsize(path) != info.file_size:
+            return False
+        crc = 0
+        with open(path, "rb") as f:
+            for chunk in iter(lambda: f.read(CHUNK_SIZE), b""):
+                crc = zlib.crc32(chunk, crc)
+        return crc == info.CRC
+    except OSError:
+        return False
+
+
+def max_member_size() -> int:
+    """Return BACKPACK_IMPORT_MAX_SIZE, or DEFAULT_MAX_MEMBER_SIZE."""
+    try:
+        value = int(os.environ.get(MAX_MEMBER_SIZE_ENV, 0))
+    except ValueError:
+        value = 0
+    return value if value > 0 else DEFAULT_MAX_MEMBER_SIZE
+
+
+def _destination(target_dir: str, rel_path: str) -> str:
+    """Return where a validated path goes, refusing directories that resolve outside target_dir."""
+    dest = os.path.join(target_dir, *_validate_path(rel_path).split("/"))
+    root = os.path.realpath(target_dir)
+    parent = os.path.realpath(os.path.dirname(dest))
+    if parent != root and not parent.startswith(root.rstrip(os.sep) + os.sep):
+        raise BundleError("Unsafe path in bundle", f"{rel_path!r} resolves outside {target_dir}")
+    return dest
+
+
+def _copy(source: IO[bytes], out: IO[bytes], name: str, limit: int, sha256: Optional[str] = None) -> int:
+    """Copy a stream in chunks, enforcing a size limit and optionally checking its SHA-256."""
+    digest = hashlib.sha256()
+    size = 0
+    for chunk in iter(lambda: source.read(CHUNK_SIZE), b""):
+        size += len(chunk)
+        if size > limit:
+            raise BundleError("Bundle member too large", f"{name} exceeds the limit of {limit} bytes")
+        digest.update(chunk)
+        out.write(chunk)
+    if sha256 is not None and digest.hexdigest() != sha256:
+        raise BundleError("Bundle verification failed", f"{name} does not match its manifest hash")
+    return size
+
+
+def _stage(dest: str, mode: int, write: Callable[[IO[bytes]], int]) -> Tuple[str, int]:
+    """Write a file to a temporary name next to its destination; returns (temporary path, size)."""
+    directory = os.path.dirname(dest) or "."
+    os.makedirs(directory, exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(dir=directory, prefix=".backpack-import-")
+    try:
+        with os.fdopen(fd, "wb") as out:
+            size = write(out)
+        os.chmod(tmp_path, (mode or 0o644) & 0o777)
+    except BaseException:
+        os.unlink(tmp_path)
+        raise
+    return tmp_path, size
+
+
+def _move_into_place(staged: List[Tuple[str, str]]) -> None:
+    """Rename staged files over their destinations in order, removing each from staged."""
+    staged.reverse()
+    while staged:
+        tmp_path, dest = staged[-1]
+        os.replace(tmp_path, dest)
+        staged.pop()
+
+
+def _discard(staged: List[Tuple[str, str]]) -> None:
+    """Remove staged files that were not moved into place."""
+    for tmp_path, _ in staged:
+        try:
+            os.unlink(tmp_path)
+        except FileNotFoundError:
+            pass
+
+
+def _selected(rel_path: str, only: Optional[List[str]]) -> bool:
+    return not only or any(_matches(rel_path, pattern) for pattern in only)
+
+
+def import_bundle(
+    zf: zipfile.ZipFile,
+    target_dir: str,
+    only: Optional[List[str]] = None,
+    max_size: Optional[int] = None,
+) -> ImportStats:
+    """
+    Extract a content-addressed bundle.
+
+    A bundle with one agent is extracted into target_dir, one with several
+    into target_dir/<agent>. Every blob is checked against its manifest hash
+    as it is streamed out. Files that already hold the right content are
+    left alone. A blob is decompressed at most once; later files with the
+    same hash are copied from the first one written or found. Files are
+    staged under temporary names and renamed into place only once all of
+    them have been checked.
+
+    Args:
+        zf: The open bundle
+        target_dir: Directory to extract into
+        only: Patterns of paths (relative to target_dir) to extract; default all
+        max_size: Largest file to extract, in bytes (default: max_member_size())
+
+    Returns:
+        The import statistics; paths are relative to target_dir
+
+    Raises:
+        BundleError: If the bundle is invalid, a blob is missing, too large or
+            does not match its hash, or nothing matches `only`
+    """
+    start = time.monotonic()
+    limit = max_size or max_member_size()
+    agents = read_bundle(zf)
+    stats = ImportStats()
+    present: Dict[str, str] = {}
+    staged: List[Tuple[str, str]] = []
+    try:
+        _extract_bundle(zf, target_dir, only, limit, agents, stats, present, staged)
+        # Nothing is moved into place until every file has been written and checked
+        _move_into_place(staged)
+    finally:
+        _discard(staged)
+
+    if only and not stats.written and not stats.skipped:
+        raise BundleError("Nothing to import", f"No files in the bundle match {', '.join(only)}")
+    stats.elapsed = time.monotonic() - start
+    logger.info("Imported content-addressed bundle", extra={
+        "agents": len(stats.agents), "written": len(stats.written), "skipped": len(stats.skipped),
+    })
+    return stats
+
+
+def _extract_bundle(
+    zf: zipfile.ZipFile,
+    target_dir: str,
+    only: Optional[List[str]],
+    limit: int,
+    agents: Dict[str, Dict[str, Dict[str, Any]]],
+    stats: ImportStats,
+    present: Dict[str, str],
+    staged: List[Tuple[str, str]],
+) -> None:
+    """Stage every selected file of a bundle, appending (temporary path, destination) to staged."""
+    for name, files in agents.items():
+        prefix = "" if len(agents) == 1 else f"{name}/"
+        selected = {p: e for p, e in files.items() if _selected(prefix + p, only)}
+        if selected:
+            stats.agents.append(name)
+        for rel_path, entry in sorted(selected.items()):
+            label = prefix + rel_path
+            dest = _destination(target_dir, label)
+            digest = entry["sha256"]
+            if entry["size"] > limit:
+                raise BundleError("Bundle member too large", f"{label} exceeds the limit of {limit} bytes")
+            if _matches_existing(dest, entry):
+                stats.skipped.append(label)
+                present.setdefault(digest, dest)
+                continue
+
+            source = present.get(digest)
+            if source is not None:
+                def write(out: IO[bytes], source: str = source, label: str = label, digest: str = digest) -> int:
+                    with open(source, "rb") as f:
+                        return _copy(f, out, label, limit, digest)
+            else:
+                try:
+                    zf.getinfo(BLOB_PREFIX + digest)
+                except KeyError:
+                    raise BundleError("Invalid agent bundle", f"Blob for {label} is missing") from None
+
+                def write(out: IO[bytes], label: str = label, digest: str = digest) -> int:
+                    with zf.open(BLOB_PREFIX + digest) as blob:
+                        return _copy(blob, out, label, limit, digest)
+
+            tmp_path, size = _stage(dest, entry.get("mode", 0o644), write)
+            staged.append((tmp_path, dest))
+            stats.bytes_written += size
+            # Later copies read the staged file; dest is not written yet
+            present[digest] = tmp_path
+            stats.written.append(label)
+
+
+def import_archive(
+    zf: zipfile.ZipFile,
+    target_dir: str,
+    only: Optional[List[str]] = None,
+    max_size: Optional[int] = None,
+) -> ImportStats:
+    """
+    Extract an agent zip, member by member.
+
+    Content-addressed bundles are passed to import_bundle(). Flat archives
+    are streamed one member at a time. Every name is validated, symlinks and
+    oversized members are refused, and a file whose size and CRC-32 already
+    match its member is skipped. zipfile checks each member's CRC-32 as it
+    is read. As in import_bundle(), nothing is renamed into place until
+    every member has been read.
+
+    Args:
+        zf: The open archive
+        target_dir: Directory to extract into
+        only: Patterns of member paths to extract; default all
+        max_size: Largest member to extract, in bytes (default: max_member_size())
+
+    Returns:
+        The import statistics; paths are relative to target_dir
+
+    Raises:
+        BundleError: If a member is unsafe, too large, or nothing matches `only`
+        zipfile.BadZipFile: If a member is corrupt
+    """
+    if is_content_addressed(zf):
+        return import_bundle(zf, target_dir, only, max_size)
+
+    start = time.monotonic()
+    limit = max_size or max_member_size()
+    stats = ImportStats()
+    staged: List[Tuple[str, str]] = []
+    try:
+        for info in zf.infolist():
+            if info.is_dir() or not _selected(info.filename, only):
+                continue
+            dest = _destination(target_dir, info.filename)
+            mode = info.external_attr >> 16
+            if stat.S_ISLNK(mode):
+                raise BundleError("Unsafe member in bundle", f"{info.filename} is a symbolic link")
+            if info.file_size > limit:
+                raise BundleError("Bundle member too large", f"{info.filename} exceeds the limit of {limit} bytes")
+            if _matches_member(dest, info):
+                stats.skipped.append(info.filename)
+                continue
+
+            def write(out: IO[bytes], info: zipfile.ZipInfo = info) -> int:
+                with zf.open(info) as member:
+                    return _copy(member, out, info.filename, limit)
+
+            unix_mode = stat.S_IMODE(mode) if info.create_system == 3 else 0
+            tmp_path, size = _stage(dest, unix_mode or 0o644, write)
+            staged.append((tmp_path, dest))
+            stats.bytes_written += size
+            stats.written.append(info.filename)
+        # Nothing is moved into place until every member has been read and checked
+        _move_into_place(staged)
+    finally:
+        _discard(staged)
+
+    if only and not stats.written and not stats.skipped:
+        raise BundleError("Nothing to import", f"No files in the bundle match {', '.join(only)}")
+    stats.elapsed = time.monotonic() - start
+    logger.info("Imported agent archive", extra={"written": len(stats.written), "skipped": len(stats.skipped)})
+    return stats
@@ -8,32 +8,119 @@ Logging is configured here for CLI usage. By default it logs at INFO level,
 and can be controlled via the BACKPACK_LOG_LEVEL environment variable.
 """
 
+import functools
+import importlib
 import json
 import logging
 import os
-import platform
-import shutil
-import subprocess
 import sys
-import zipfile
-from typing import Dict, List
+import time
+from datetime import datetime, timezone
+from typing import TYPE_CHECKING, Any, Callable, Dict, Iterable, List, Tuple, cast
 
 import click
 
 from . import __version__
-from .agent_lock import AgentLock
-from .exceptions import AgentLockNotFoundError, AgentLockReadError, BackpackError, KeyNotFoundError, ValidationError
-from .keychain import (
+from .exceptions import (
+    AgentLockNotFoundError,
+    AgentLockReadError,
+    BackpackError,
+    DecryptionError,
     InvalidKeyNameError,
     KeychainDeletionError,
     KeychainStorageError,
-    delete_key,
-    get_key,
-    list_keys,
-    register_key,
-    store_key,
+    KeyNotFoundError,
+    LauncherError,
+    ScriptExecutionError,
+    ValidationError,
 )
 
+if TYPE_CHECKING:
+    from .agent_client import SOCKET_ENV
+    from .agent_lock import AgentLock, is_placeholder
+    from .agentd import AgentDaemon
+    from .audit import AuditLogger, close_all_loggers, get_audit_logger
+    from .crypto import decrypt_data, encrypt_data
+    from .fleet import discover_agents, load_locks, resolve_credentials, run_agents
+    from .keychain import (
+        _validate_key_name,
+        delete_key,
+        get_key,
+        get_keys,
+        list_keys,
+        register_key,
+        store_key,
+        store_keys,
+    )
+    from .launcher import Launcher, launch
+    from .resolution import ResolutionPlan
+    from .runtime import RuntimeHandoff
+    from .runtime.memory import MemoryWriteBack
+    from .script_runner import run_script
+    from .supervisor import Supervisor
+
+# Modules that pull in cryptography, keyring or the audit logger are imported
+# only when a command needs them, so `backpack --help` and `backpack version`
+# start fast. Commands declare them with @_needs, which binds the names below
+# into this module's globals (they remain patchable as backpack.cli.<name>).
+_LAZY_IMPORTS: Dict[str, Tuple[str, ...]] = {
+    "agent_client": ("SOCKET_ENV",),
+    "agent_lock": ("AgentLock", "is_placeholder"),
+    "agentd": ("AgentDaemon",),
+    "audit": ("AuditLogger", "close_all_loggers", "get_audit_logger"),
+    "crypto": ("decrypt_data", "encrypt_data"),
+    "fleet": ("discover_agents", "load_locks", "resolve_credentials", "run_agents"),
+    "keychain": (
+        "_validate_key_name",
+        "delete_key",
+        "get_key",
+        "get_keys",
+        "list_keys",
+        "register_key",
+        "store_key",
+        "store_keys",
+    ),
+    "launcher": ("Launcher", "launch"),
+    "resolution": ("ResolutionPlan",),
+    "runtime": ("RuntimeHandoff",),
+    "runtime.memory": ("MemoryWriteBack",),
+    "script_runner": ("run_script",),
+    "supervisor": ("Supervisor",),
+}
+_LAZY_NAMES = {name: module for module, names in _LAZY_IMPORTS.items() for name in names}
+
+
+def _bind_lazy(module_name: str) -> None:
+    """Import a lazily loaded module and bind its names, keeping any already bound (e.g. patched)."""
+    namespace = globals()
+    names = _LAZY_IMPORTS[module_name]
+    if all(name in namespace for name in names):
+        return
+    module = importlib.import_module(f".{module_name}", __package__)
+    for name in names:
+        namespace.setdefault(name, getattr(module, name))
+
+
+def _needs(*module_names: str) -> Callable[[Callable[..., Any]], Callable[..., Any]]:
+    """Decorate a command callback so the given lazily loaded modules are bound before it runs."""
+    def decorator(func: Callable[..., Any]) -> Callable[..., Any]:
+        @functools.wraps(func)
+        def wrapper(*args: Any, **kwargs: Any) -> Any:
+            for module_name in module_names:
+                _bind_lazy(module_name)
+            return func(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+def __getattr__(name: str) -> Any:
+    """Resolve lazily loaded names on attribute access (PEP 562)."""
+    module_name = _LAZY_NAMES.get(name)
+    if module_name is None:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    _bind_lazy(module_name)
+    return globals()[name]
+
 
 def _configure_logging() -> logging.Logger:
     """
@@ -111,6 +198,7 @@ def cli():
 
 @cli.command()
 @click.option("--non-interactive", is_flag=True, help="Skip prompts; use defaults (for scripts)")
+@_needs("agent_lock")
 def quickstart(non_interactive):
     """
     Interactive wizard to create your first agent in under 2 minutes.
@@ -207,6 +295,7 @@ if __name__ == "__main__":
 @cli.command()
 @click.option("--credentials", help="Comma-separated list of required credentials (e.g., OPENAI_API_KEY,TWITTER_TOKEN)")
 @click.option("--personality", help="Agent personality prompt")
+@_needs("agent_lock")
 def init(credentials, personality):
     """
     Initialize a new agent.lock file.
@@ -244,6 +333,7 @@ def init(credentials, personality):
 @cli.command()
 @click.option("--new-key", help="New master key (prompted if not provided)")
 @click.option("--key-file", default="agent.lock", help="Path to agent.lock file")
+@_needs("agent_lock")
 def rotate(new_key, key_file):
     """
     Rotate the master encryption key for agent.lock.
@@ -292,29 +382,39 @@ def rotate(new_key, key_file):
         sys.exit(1)
 
 
-@cli.command()
-@click.argument("script_path")
-@click.option("--non-interactive", is_flag=True, help="Skip prompts (auto-approve keys) - enabled automatically if AGENT_MASTER_KEY is set")
-def run(script_path, non_interactive):
-    """
-    Run an agent with JIT variable injection.
+def _resolve_agent_env(agent_data: Dict[str, Any], is_cloud_mode: bool, lock_path: str = None,
+                       script_path: str = None) -> Dict[str, str]:
     """
-    agent_lock = AgentLock()
-    agent_data = agent_lock.read()
-
-    if not agent_data:
-        raise click.ClickException("No agent.lock found. Run 'backpack init' first.")
-
-    # Detect Cloud/Non-interactive mode
-    # We assume non-interactive if the flag is passed OR if AGENT_MASTER_KEY is explicitly set
-    # (implying a managed environment like Vercel/Railway)
-    is_cloud_mode = non_interactive or (os.environ.get("AGENT_MASTER_KEY") is not None)
+    Work out the variables to inject for an agent, prompting for access unless in cloud mode.
 
+    Args:
+        agent_data: Decrypted agent.lock layers
+        is_cloud_mode: Auto-approve keys instead of prompting
+        lock_path: The agent.lock the data came from. If given, the resolution
+            plan saved for it skips vault lookups for keys that were missing
+            and prompts for keys already allowed (backpack.resolution)
+        script_path: The script the variables are for; approvals are kept per script
+
+    Returns:
+        Variables to add to the agent's environment
+    """
     env_vars: Dict[str, str] = {}
     
     # Get required keys directly from the loaded data
     creds_layer = agent_data.get("credentials", {})
     required_keys = list(creds_layer.keys())
+    plan = ResolutionPlan.load(lock_path, creds_layer, script_path) if lock_path else None
+
+    # Keys that are neither in the environment nor stored in agent.lock are
+    # looked up in the vault in one batch, so keyring round trips overlap.
+    # Keys the vault did not have last time (and it has not changed since) are skipped.
+    vault_lookups = [
+        key_name
+        for key_name in required_keys
+        if key_name not in os.environ and is_placeholder(creds_layer.get(key_name))
+        and not (plan and plan.source(key_name) == "missing")
+    ]
+    vault_values = get_keys(vault_lookups) if vault_lookups else {}
 
     for key_name in required_keys:
         value_to_inject = None
@@ -326,19 +426,20 @@ def run(script_path, non_interactive):
         
         # 2. Check Lock File (Encrypted Portability)
         # If the value in agent.lock is NOT a placeholder, it's a real encrypted key
-        elif key_name in creds_layer:
-             val = creds_layer[key_name]
-             if val and not val.startswith("placeholder_"):
-                 value_to_inject = val
-                 source = "agent.lock"
+        elif not is_placeholder(creds_layer.get(key_name)):
+             value_to_inject = creds_layer[key_name]
+             source = "agent.lock"
 
         # 3. Check Local Vault (Keychain)
         if not source and not value_to_inject:
-             stored_key = get_key(key_name)
+             stored_key = vault_values.get(key_name)
              if stored_key:
                  value_to_inject = stored_key
                  source = "vault"
         
+        if plan:
+            plan.record(key_name, source or "missing")
+
         # Decision Logic
         if source == "environment":
              # Already satisfied.
@@ -350,6 +451,9 @@ def run(script_path, non_interactive):
             if is_cloud_mode:
                 # Cloud/Non-interactive: Auto-approve
                 env_vars[key_name] = value_to_inject
+            elif plan and plan.is_approved(key_name, source):
+                click.echo(f"Access to {key_name} ({source}) previously allowed.")
+                env_vars[key_name] = value_to_inject
             else:
                 # Local/Interactive: Prompt user
                 msg = f"This agent requires access to {key_name}"
@@ -360,6 +464,8 @@ def run(script_path, non_interactive):
                 
                 if click.confirm(f"{msg}. Allow access?"):
                     env_vars[key_name] = value_to_inject
+                    if plan:
+                        plan.approve(key_name, source)
                 else:
                     click.echo(f"Access denied for {key_name}. Agent may not function properly.")
         else:
@@ -367,19 +473,150 @@ def run(script_path, non_interactive):
             click.echo(f"Key {key_name} not found in environment, agent.lock, or vault.")
             click.echo(f"  Add it with 'backpack key add {key_name}' or set it as an environment variable.")
 
+    if plan:
+        plan.save()
+
     env_vars["AGENT_SYSTEM_PROMPT"] = agent_data["personality"]["system_prompt"]
     env_vars["AGENT_TONE"] = agent_data["personality"]["tone"]
 
+    return env_vars
+
+
+def _exec_agent(script_path: str, env: Dict[str, str]) -> None:
+    """
+    Replace the CLI process with the agent (POSIX exec).
+
+    Pending audit records are written and descriptors closed first, because
+    atexit handlers do not run across exec.
+    """
+    close_all_loggers()
+    sys.stdout.flush()
+    sys.stderr.flush()
+    try:
+        os.execve(sys.executable, [sys.executable, script_path], env)
+    except OSError as e:
+        handle_error(ScriptExecutionError(script_path, str(e)))
+
+
+def _run_supervised(script_path: str, env: Dict[str, str], workers: int, max_restarts: int) -> int:
+    """Run the agent under a Supervisor and print each worker's final status."""
+    supervisor = Supervisor(script_path, env, workers, max_restarts=max_restarts)
+    returncode = supervisor.run()
+
+    click.echo(f"\n{'WORKER':<8}{'PID':<10}{'RESTARTS':<10}{'EXIT':<8}STATE", err=True)
+    for status in supervisor.status():
+        exit_text = "-" if status["returncode"] is None else str(status["returncode"])
+        click.echo(
+            f"{status['worker']:<8}{status['pid'] or '-':<10}{status['restarts']:<10}{exit_text:<8}{status['state']}",
+            err=True,
+        )
+    return returncode
+
+
+@cli.command()
+@click.argument("script_path")
+@click.option("--non-interactive", is_flag=True, help="Skip prompts (auto-approve keys) - enabled automatically if AGENT_MASTER_KEY is set")
+@click.option("--exec", "exec_mode", is_flag=True,
+              help="Replace the backpack process with the agent instead of running it as a child")
+@click.option("--in-process", "in_process", is_flag=True,
+              help="Run the agent inside the backpack interpreter instead of starting a new one")
+@click.option("--launcher", "use_launcher", is_flag=True,
+              help="Fork the agent from a running 'backpack serve' ($BACKPACK_LAUNCHER_SOCK)")
+@click.option("--workers", type=click.IntRange(min=1), default=None,
+              help="Run N supervised copies of the agent, restarting crashed ones")
+@click.option("--max-restarts", type=click.IntRange(min=0), default=5, show_default=True,
+              help="Restarts allowed per worker with --workers")
+@_needs("launcher")
+def run(script_path, non_interactive, exec_mode, in_process, use_launcher, workers, max_restarts):
+    """
+    Run an agent with JIT variable injection.
+    """
+    if sum((exec_mode, in_process, use_launcher, workers is not None)) > 1:
+        raise click.UsageError("--exec, --in-process, --launcher and --workers cannot be used together")
+
+    if use_launcher:
+        # The launcher has already decrypted the lock and resolved the variables
+        def started(response):
+            click.echo(f"Running {script_path} with {response.get('injected', 0)} injected variables...")
+            sys.stdout.flush()
+
+        try:
+            sys.exit(launch(script_path, on_started=started))
+        except BackpackError as e:
+            handle_error(e)
+
+    # Bound here rather than with @_needs so the launcher client above stays light
+    for module_name in (
+        "agent_lock", "keychain", "audit", "resolution", "runtime", "runtime.memory", "script_runner", "supervisor",
+    ):
+        _bind_lazy(module_name)
+
+    agent_lock = AgentLock()
+    agent_data = agent_lock.read()
+
+    if not agent_data:
+        raise click.ClickException("No agent.lock found. Run 'backpack init' first.")
+
+    # Detect Cloud/Non-interactive mode
+    # We assume non-interactive if the flag is passed OR if AGENT_MASTER_KEY is explicitly set
+    # (implying a managed environment like Vercel/Railway)
+    is_cloud_mode = non_interactive or (os.environ.get("AGENT_MASTER_KEY") is not None)
+
+    env_vars = _resolve_agent_env(agent_data, is_cloud_mode, agent_lock.file_path, script_path)
+
     # Merge injected env vars with current environment
     env = os.environ.copy()
     env.update(env_vars)
 
     click.echo(f"Running {script_path} with {len(env_vars)} injected variables...")
-    
+
+    if workers is not None:
+        sys.exit(_run_supervised(script_path, env, workers, max_restarts))
+
+    # The agent reads the decrypted layers from this pipe (backpack.runtime)
+    # instead of deriving the master key again
+    handoff = RuntimeHandoff(agent_data, os.path.abspath(agent_lock.file_path))
+
+    if exec_mode:
+        # Only the agent stays resident, and signals reach it directly
+        if handoff.write_now():
+            env.update(handoff.env)
+        _exec_agent(script_path, env)
+        return
+
+    if in_process:
+        # Skips a second interpreter start; exit codes match the subprocess path
+        handoff.install()
+        sys.exit(run_script(script_path, env_vars))
+
     # Use subprocess.run() instead of os.system() for better control and security
     # sys.executable ensures we use the same Python interpreter
-    result = subprocess.run([sys.executable, script_path], env=env)
-    
+    import subprocess
+
+    # Memory the agent commits comes back over a second pipe and is merged
+    # into agent.lock here (backpack.runtime.memory)
+    write_back = MemoryWriteBack(agent_lock)
+    env.update(handoff.env)
+    env.update(write_back.env)
+    handoff.start()
+    write_back.start()
+    try:
+        result = subprocess.run(
+            [sys.executable, script_path], env=env, pass_fds=handoff.pass_fds + write_back.pass_fds,
+        )
+    finally:
+        handoff.close()
+        try:
+            write_back.close()
+        except BackpackError as e:
+            click.echo(click.style(f"Warning: agent memory was not saved: {e.message}", fg="yellow"), err=True)
+        if write_back.detached:
+            click.echo(click.style(
+                "Warning: a process started by the agent still holds the memory channel; "
+                "memory it sends from now on is not saved",
+                fg="yellow",
+            ), err=True)
+
     # Exit with the script's return code
     sys.exit(result.returncode)
 
@@ -392,6 +629,7 @@ def key():
 @key.command("add")
 @click.argument("key_name")
 @click.option("--value", prompt=True, hide_input=True, help="Key value")
+@_needs("keychain")
 def add_key(key_name, value):
     """
     Add a key to personal vault.
@@ -416,6 +654,7 @@ def add_key(key_name, value):
 
 
 @key.command("list")
+@_needs("keychain")
 def list_keys_cmd():
     """List keys in personal vault."""
     keys = list_keys()
@@ -429,6 +668,7 @@ def list_keys_cmd():
 
 @key.command("remove")
 @click.argument("key_name")
+@_needs("keychain")
 def remove_key(key_name):
     """Remove a key from personal vault."""
     try:
@@ -440,6 +680,303 @@ def remove_key(key_name):
         handle_error(e)
 
 
+KEY_BUNDLE_FORMAT = "backpack-keys"
+
+# Passphrase for key bundles when not prompting (never taken on the command line)
+BUNDLE_PASSPHRASE_ENV = "BACKPACK_BUNDLE_PASSPHRASE"
+
+
+def _parse_env_file(text: str) -> Dict[str, str]:
+    """
+    Parse .env-style KEY=VALUE lines.
+
+    Supports comments, blank lines, an optional 'export ' prefix, single or
+    double quoted values and trailing ' #' comments on unquoted values.
+    """
+    keys: Dict[str, str] = {}
+    for line_num, line in enumerate(text.splitlines(), 1):
+        line = line.strip()
+        if not line or line.startswith("#"):
+            continue
+        if line.startswith("export "):
+            line = line[len("export "):].lstrip()
+        if "=" not in line:
+            raise ValidationError(f"Invalid .env line {line_num}", "Expected KEY=VALUE")
+
+        name, value = line.split("=", 1)
+        name, value = name.strip(), value.strip()
+        if len(value) >= 2 and value[0] == value[-1] and value[0] in ("'", '"'):
+            value = value[1:-1]
+        elif " #" in value:
+            value = value.split(" #", 1)[0].rstrip()
+        keys[name] = value
+    return keys
+
+
+def _decrypt_key_bundle(bundle: Dict[str, Any], passphrase: str) -> Dict[str, str]:
+    """Decrypt a bundle written by 'backpack key export'."""
+    try:
+        keys = json.loads(decrypt_data(bundle["keys"], passphrase))
+    except DecryptionError as e:
+        raise ValidationError("Failed to decrypt key bundle", "Check the passphrase") from e
+    except (KeyError, TypeError, json.JSONDecodeError) as e:
+        raise ValidationError("Invalid key bundle", str(e)) from e
+    return cast(Dict[str, str], keys)
+
+
+def _load_key_file(path: str, fmt: str) -> Dict[str, str]:
+    """
+    Load key names and values from a .env file, a JSON object or an encrypted bundle.
+
+    With fmt 'auto', files ending in .json are read as JSON (or as a key bundle
+    if they contain one) and everything else as .env.
+    """
+    with open(path, "r") as f:
+        text = f.read()
+
+    if fmt == "auto":
+        fmt = "json" if path.lower().endswith(".json") or text.lstrip().startswith("{") else "env"
+    if fmt == "env":
+        return _parse_env_file(text)
+
+    try:
+        data = json.loads(text)
+    except json.JSONDecodeError as e:
+        raise ValidationError(f"Invalid JSON in {path}", str(e)) from e
+    if not isinstance(data, dict):
+        raise ValidationError(f"Invalid key file {path}", "Expected a JSON object of KEY: VALUE pairs")
+
+    if data.get("format") == KEY_BUNDLE_FORMAT:
+        passphrase = os.environ.get(BUNDLE_PASSPHRASE_ENV) or click.prompt("Bundle passphrase", hide_input=True)
+        data = _decrypt_key_bundle(data, passphrase)
+
+    for name, value in data.items():
+        if not isinstance(value, str):
+            raise ValidationError(f"Invalid value for {name}", f"Expected a string, got {type(value).__name__}")
+    return cast(Dict[str, str], data)
+
+
+@key.command("import")
+@click.argument("input_file", type=click.Path(exists=True, dir_okay=False))
+@click.option("--format", "fmt", type=click.Choice(["auto", "env", "json"]), default="auto", show_default=True,
+              help="Input format (JSON also accepts bundles written by 'backpack key export')")
+@click.option("--overwrite", is_flag=True, help="Replace keys that are already in the vault")
+@_needs("keychain", "crypto")
+def import_keys(input_file, fmt, overwrite):
+    """
+    Add every key from a .env, JSON or exported bundle file to the vault.
+
+    All names are validated before anything is stored, and the keys are
+    written in one batch with a single registry update.
+    """
+    try:
+        keys = _load_key_file(input_file, fmt)
+        for name, value in keys.items():
+            _validate_key_name(name)
+            if not value.strip():
+                raise ValidationError(f"Key value for {name} cannot be empty", "Please provide a non-empty value")
+
+        skipped = []
+        if not overwrite:
+            existing = list_keys()
+            skipped = sorted(name for name in keys if name in existing)
+            keys = {name: value for name, value in keys.items() if name not in existing}
+
+        if keys:
+            store_keys(keys)
+        click.echo(click.style(f"[OK] Imported {len(keys)} key(s) into vault", fg="green"))
+        if skipped:
+            click.echo(f"Skipped {len(skipped)} existing key(s) (use --overwrite to replace): {', '.join(skipped)}")
+    except BackpackError as e:
+        handle_error(e)
+    except Exception as e:
+        handle_error(e)
+
+
+@key.command("export")
+@click.argument("output_file", type=click.Path(dir_okay=False))
+@click.option("--keys", "key_names", help="Comma-separated keys to export (default: all keys in the vault)")
+@_needs("keychain", "crypto", "audit")
+def export_keys(output_file, key_names):
+    """
+    Export vault keys to a passphrase-encrypted bundle.
+
+    The passphrase is prompted for, or read from $BACKPACK_BUNDLE_PASSPHRASE.
+    The bundle can be imported on another machine with 'backpack key import'.
+    """
+    try:
+        names = [n.strip() for n in key_names.split(",") if n.strip()] if key_names else sorted(list_keys())
+        values = get_keys(names)
+        keys = {name: value for name, value in values.items() if value}
+        missing = [name for name in names if name not in keys]
+        if not keys:
+            click.echo(click.style("No keys to export.", fg="yellow"))
+            return
+
+        passphrase = os.environ.get(BUNDLE_PASSPHRASE_ENV)
+        if not passphrase:
+            passphrase = click.prompt("Bundle passphrase", hide_input=True, confirmation_prompt=True)
+        bundle = {
+            "format": KEY_BUNDLE_FORMAT,
+            "version": 1,
+            "keys": encrypt_data(json.dumps(keys), passphrase),
+        }
+
+        fd = os.open(output_file, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+        # The mode given to os.open only applies when the file is created
+        os.fchmod(fd, 0o600)
+        with os.fdopen(fd, "w") as f:
+            json.dump(bundle, f, indent=2)
+        get_audit_logger().log_event("export_keys", {"key_names": sorted(keys), "path": output_file})
+
+        click.echo(click.style(f"[OK] Exported {len(keys)} key(s) to {output_file}", fg="green"))
+        if missing:
+            click.echo(click.style(f"Not found in vault: {', '.join(missing)}", fg="yellow"))
+    except BackpackError as e:
+        handle_error(e)
+    except Exception as e:
+        handle_error(e)
+
+
+@cli.command()
+@click.option("--socket", "socket_path", default=None,
+              help="Socket path (default: $BACKPACK_AGENT_SOCK or ~/.backpack/agent.sock)")
+@click.option("--idle-timeout", type=float, default=None,
+              help="Exit after this many idle seconds (default: $BACKPACK_AGENT_IDLE_TIMEOUT or 900; 0 = never)")
+@_needs("agent_client", "agentd")
+def agentd(socket_path, idle_timeout):
+    """
+    Run the credential agent daemon.
+
+    Holds derived keys and keychain values in memory and serves them to
+    'backpack run' over a Unix socket. Export the BACKPACK_AGENT_SOCK line it
+    prints in the shells that should use it.
+    """
+    try:
+        daemon = AgentDaemon(socket_path=socket_path, idle_timeout=idle_timeout)
+        daemon.bind()
+        click.echo(f"{SOCKET_ENV}={daemon.socket_path}; export {SOCKET_ENV};")
+        sys.stdout.flush()
+        daemon.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    except BackpackError as e:
+        handle_error(e)
+    except Exception as e:
+        handle_error(e)
+
+
+@cli.command()
+@click.option("--socket", "socket_path", default=None,
+              help="Socket path (default: $BACKPACK_LAUNCHER_SOCK or ~/.backpack/launcher.sock)")
+@click.option("--preload", default=None,
+              help="Comma-separated modules to import before forking (default: $BACKPACK_SERVE_PRELOAD)")
+@click.option("--non-interactive", is_flag=True,
+              help="Skip prompts (auto-approve keys) - enabled automatically if AGENT_MASTER_KEY is set")
+@click.option("--idle-timeout", type=float, default=None,
+              help="Exit after this many idle seconds (default: $BACKPACK_LAUNCHER_IDLE_TIMEOUT or 900; 0 = never)")
+@_needs("agent_lock", "keychain", "launcher", "resolution")
+def serve(socket_path, preload, non_interactive, idle_timeout):
+    """
+    Run a pre-forked launcher for high-rate agent runs.
+
+    Decrypts agent.lock, resolves credentials and imports the preload modules
+    once, then forks a warm child for every 'backpack run --launcher'. With
+    --non-interactive the lock is read again when it changes; otherwise runs
+    are refused after a change until the launcher is restarted. Export the
+    BACKPACK_LAUNCHER_SOCK line it prints in the shells that should use it.
+    POSIX only.
+    """
+    from .launcher import SOCKET_ENV as LAUNCHER_SOCKET_ENV
+
+    is_cloud_mode = non_interactive or (os.environ.get("AGENT_MASTER_KEY") is not None)
+    agent_lock = AgentLock()
+    resolved = []
+
+    def resolve_env():
+        # Prompting here would block every run waiting on the launcher
+        if resolved and not is_cloud_mode:
+            raise LauncherError(
+                "agent.lock changed",
+                "Restart 'backpack serve' to approve its credentials again, or use --non-interactive",
+            )
+        resolved.append(True)
+        agent_data = agent_lock.read()
+        if not agent_data:
+            raise click.ClickException("No agent.lock found. Run 'backpack init' first.")
+        return _resolve_agent_env(agent_data, is_cloud_mode, agent_lock.file_path)
+
+    try:
+        modules = None if preload is None else [m.strip() for m in preload.split(",") if m.strip()]
+        launcher = Launcher(resolve_env, socket_path=socket_path, preload=modules,
+                            watch_path=agent_lock.file_path, idle_timeout=idle_timeout)
+        launcher.preload_modules()
+        launcher.refresh_env()
+        launcher.bind()
+        click.echo(f"{LAUNCHER_SOCKET_ENV}={launcher.socket_path}; export {LAUNCHER_SOCKET_ENV};")
+        sys.stdout.flush()
+        launcher.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    except BackpackError as e:
+        handle_error(e)
+
+
+@cli.group()
+def fleet():
+    """Run many agent directories at once."""
+
+
+@fleet.command("run")
+@click.argument("pattern")
+@click.option("--script", default="agent.py", show_default=True, help="Agent script inside each directory")
+@click.option("--concurrency", "-j", type=click.IntRange(min=1), default=None,
+              help="Agents to run at once (default: $BACKPACK_FLEET_CONCURRENCY or CPU count, max 8)")
+@click.option("--non-interactive", is_flag=True,
+              help="Skip the access prompt - enabled automatically if AGENT_MASTER_KEY is set")
+@_needs("fleet")
+def fleet_run(pattern, script, concurrency, non_interactive):
+    """
+    Run every agent whose directory matches PATTERN.
+
+    PATTERN is a glob matching agent directories or their agent.lock files
+    (quote it so the shell does not expand it; ** recurses). Locks are
+    decrypted together, credentials for the whole fleet are looked up in one
+    batch and approved with a single prompt, and agents run concurrently with
+    their output prefixed by directory. Exits non-zero if any agent fails or
+    is skipped.
+    """
+    is_cloud_mode = non_interactive or (os.environ.get("AGENT_MASTER_KEY") is not None)
+
+    def approve(names):
+        return click.confirm(f"This fleet requires access to {', '.join(names)}. Allow access?")
+
+    try:
+        agents = discover_agents(pattern, script)
+        load_locks(agents, concurrency)
+        resolve_credentials(agents, approve=None if is_cloud_mode else approve)
+        click.echo(f"Running {sum(a.status == 'ready' for a in agents)} of {len(agents)} agents...")
+        run_agents(agents, concurrency)
+    except BackpackError as e:
+        handle_error(e)
+
+    summaries = [agent.to_dict() for agent in agents]
+    width = max(len("AGENT"), *(len(s["agent"]) for s in summaries))
+    click.echo(f"\n{'AGENT':<{width}}  {'STATUS':<8}  {'EXIT':<5}  {'TIME':>7}  DETAILS")
+    for summary in summaries:
+        exit_text = "-" if summary["returncode"] is None else str(summary["returncode"])
+        time_text = "-" if summary["duration"] is None else f"{summary['duration']:.1f}s"
+        details = summary["error"] or ""
+        if summary["missing"]:
+            details = (details + "; " if details else "") + "missing " + ", ".join(summary["missing"])
+        click.echo(f"{summary['agent']:<{width}}  {summary['status']:<8}  {exit_text:<5}  {time_text:>7}  {details}")
+
+    failed = [s for s in summaries if s["status"] != "ok"]
+    click.echo(f"\n{len(summaries) - len(failed)} succeeded, {len(failed)} failed or skipped")
+    if failed:
+        sys.exit(1)
+
+
 def _get_templates_dir() -> str:
     """Return path to backpack/templates (works when installed or run from source)."""
     try:
@@ -504,6 +1041,7 @@ def template_list():
 @template.command("use")
 @click.argument("name")
 @click.option("--dir", "target_dir", type=click.Path(), default=".", help="Directory to copy template into (default: current)")
+@_needs("agent_lock")
 def template_use(name, target_dir):
     """Copy a template into the current (or given) directory and create agent.lock."""
     root = _get_templates_dir()
@@ -545,6 +1083,8 @@ def template_use(name, target_dir):
         if os.path.exists(agent_dst) and not click.confirm("agent.py exists. Overwrite?"):
             click.echo("Skipped agent.py.")
         else:
+            import shutil
+
             shutil.copy2(agent_src, agent_dst)
             click.echo(click.style(f"[OK] Created {agent_dst}", fg="green"))
 
@@ -563,6 +1103,7 @@ def config():
 @config.command("personality")
 @click.option("--system-prompt", help="New system prompt")
 @click.option("--tone", help="New tone (e.g., professional, friendly)")
+@_needs("agent_lock")
 def config_personality(system_prompt, tone):
     """
     Update agent personality.
@@ -600,6 +1141,181 @@ def config_personality(system_prompt, tone):
         handle_error(e)
 
 
+_SINCE_UNITS = {"s": 1, "m": 60, "h": 3600, "d": 86400}
+
+
+def _parse_since(value: str) -> float:
+    """
+    Parse a --since value into a UNIX timestamp.
+
+    Accepts a relative age such as '30s', '15m', '2h' or '7d', or an ISO 8601
+    date/time (naive values are treated as UTC, like the log's iso_time).
+    """
+    value = value.strip()
+    unit = value[-1:].lower()
+    if unit in _SINCE_UNITS and value[:-1].replace(".", "", 1).isdigit():
+        return time.time() - float(value[:-1]) * _SINCE_UNITS[unit]
+
+    try:
+        parsed = datetime.fromisoformat(value[:-1] if value.endswith("Z") else value)
+    except ValueError:
+        raise click.BadParameter(
+            f"'{value}' is not a relative age (e.g. 15m, 2h, 7d) or an ISO 8601 date/time",
+            param_hint="--since",
+        ) from None
+    if parsed.tzinfo is None:
+        parsed = parsed.replace(tzinfo=timezone.utc)
+    return parsed.timestamp()
+
+
+def _echo_entry(entry: Dict[str, Any]) -> None:
+    """Print one audit entry as a JSON line."""
+    click.echo(json.dumps(entry))
+
+
+@cli.group()
+@click.option("--file", "log_file", default="agent_audit.log", show_default=True, help="Path to the audit log")
+@click.pass_context
+@_needs("audit")
+def audit(ctx, log_file):
+    """Inspect the encrypted audit log."""
+    ctx.obj = get_audit_logger(log_file)
+
+
+@audit.command("tail")
+@click.option("-n", "--lines", "count", default=10, show_default=True, help="Number of entries to show")
+@click.option("-f", "--follow", is_flag=True, help="Keep printing new entries as they are logged")
+@click.pass_obj
+def audit_tail(audit_logger, count, follow):
+    """Show the most recent audit entries."""
+    start = audit_logger.tail_offset(count)
+    try:
+        for entry in audit_logger.iter_logs(start=start, follow=follow):
+            _echo_entry(entry)
+    except KeyboardInterrupt:
+        pass
+
+
+@audit.command("query")
+@click.option("--since", help="Only entries from this time on (e.g. 15m, 2h, 7d or 2026-01-01T00:00:00)")
+@click.option("--event", "events", multiple=True, help="Only entries of this event type (repeatable)")
+@click.pass_obj
+def audit_query(audit_logger, since, events):
+    """Print audit entries matching the given filters."""
+    for entry in _iter_audit_entries(audit_logger, since, events):
+        _echo_entry(entry)
+
+
+def _iter_audit_entries(audit_logger: "AuditLogger", since: str, events: Iterable[str]) -> Iterable[Dict[str, Any]]:
+    """Stream entries from `since` on (bisecting to it), optionally filtered by event type."""
+    start = 0
+    since_ts = None
+    if since:
+        since_ts = _parse_since(since)
+        start = audit_logger.seek_time(since_ts)
+    wanted = set(events)
+    for entry in audit_logger.iter_logs(start=start):
+        if since_ts is not None and entry.get("timestamp", 0) < since_ts:
+            continue
+        if wanted and entry.get("event_type") not in wanted:
+            continue
+        yield entry
+
+
+@audit.command("stats")
+@click.option("--since", help="Only count entries from this time on")
+@click.option("--json", "json_output", is_flag=True, help="Output in JSON format")
+@click.pass_obj
+def audit_stats(audit_logger, since, json_output):
+    """Show event counts and rates per event type."""
+    stats: Dict[str, Dict[str, Any]] = {}
+    for entry in _iter_audit_entries(audit_logger, since, ()):
+        ts = entry.get("timestamp", 0)
+        # Summary records of aggregated events stand for `count` events
+        aggregate = entry.get("aggregate") or {}
+        first = aggregate.get("first_timestamp", ts)
+        item = stats.setdefault(entry.get("event_type", "unknown"), {"count": 0, "first": first, "last": ts})
+        item["count"] += aggregate.get("count", 1)
+        item["first"] = min(item["first"], first)
+        item["last"] = max(item["last"], ts)
+
+    for item in stats.values():
+        span = item["last"] - item["first"]
+        item["rate_per_min"] = round(item["count"] * 60 / span, 3) if span > 0 else None
+
+    if json_output:
+        click.echo(json.dumps(stats, indent=2, sort_keys=True))
+        return
+    if not stats:
+        click.echo("No audit entries found.")
+        return
+
+    click.echo(f"{'EVENT':<28} {'COUNT':>8} {'RATE/MIN':>10}  LAST")
+    for event_type in sorted(stats):
+        item = stats[event_type]
+        rate = "-" if item["rate_per_min"] is None else f"{item['rate_per_min']:.2f}"
+        last = time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime(item["last"]))
+        click.echo(f"{event_type:<28} {item['count']:>8} {rate:>10}  {last}")
+
+
+@audit.command("export")
+@click.option("--format", "fmt", type=click.Choice(["jsonl", "csv"]), default="jsonl", show_default=True)
+@click.option("--output", "-o", type=click.Path(), help="Output file (default: stdout)")
+@click.option("--workers", type=int, default=1, show_default=True,
+              help="Decrypt with this many processes (0 = one per CPU)")
+@click.pass_obj
+def audit_export(audit_logger, fmt, output, workers):
+    """Export decrypted audit entries as JSON lines or CSV."""
+    # With several workers the log is decrypted in parallel and merged by timestamp;
+    # otherwise entries are streamed one at a time.
+    entries: Iterable[Dict[str, Any]]
+    if workers == 1:
+        entries = audit_logger.iter_logs()
+    else:
+        entries = audit_logger.read_logs(workers=workers)
+
+    stream = click.open_file(output or "-", "w")
+    count = 0
+    with stream:
+        if fmt == "csv":
+            import csv
+
+            writer = csv.writer(stream, lineterminator="\n")
+            writer.writerow(["timestamp", "iso_time", "event_type", "details"])
+            for entry in entries:
+                writer.writerow([
+                    entry.get("timestamp"),
+                    entry.get("iso_time"),
+                    entry.get("event_type"),
+                    json.dumps(entry.get("details", {}), sort_keys=True),
+                ])
+                count += 1
+        else:
+            for entry in entries:
+                stream.write(json.dumps(entry) + "\n")
+                count += 1
+
+    if output:
+        click.echo(click.style(f"[OK] Exported {count} entries to {output}", fg="green"))
+
+
+@audit.command("verify")
+@click.option("--full", is_flag=True, help="Verify from the start instead of the last verified checkpoint")
+@click.pass_obj
+def audit_verify(audit_logger, full):
+    """Check the audit log's hash chain and checkpoint signatures."""
+    result = audit_logger.verify(full=full)
+    if result["valid"]:
+        click.echo(click.style(
+            f"[OK] Audit log intact ({result['checked']} lines checked from byte {result['resumed_from']})",
+            fg="green",
+        ))
+        return
+    click.echo(click.style(f"Audit log verification failed: {result['error']}", fg="red"))
+    click.echo(f"  At byte offset {result['offset']}")
+    sys.exit(1)
+
+
 @cli.command()
 @click.option("--fast", is_flag=True, help="Skip pauses (for scripting)")
 def demo(fast):
@@ -632,45 +1348,134 @@ def demo(fast):
     click.echo("")
 
 
+def _agent_names(pattern: str, directories: List[str]) -> List[str]:
+    """
+    Name agents by their path below the glob's first wildcard component.
+
+    "../fleet/*" gives "alpha" rather than "../fleet/alpha", which bundles
+    reject. A pattern without wildcards names its one agent by basename.
+    """
+    parts = pattern.replace(os.sep, "/").split("/")
+    base_parts: List[str] = []
+    for part in parts:
+        if any(c in part for c in "*?["):
+            break
+        base_parts.append(part)
+    if len(base_parts) == len(parts):
+        return [os.path.basename(os.path.abspath(d)) or "agent" for d in directories]
+    base = "/".join(base_parts) or ("/" if pattern.startswith("/") else ".")
+    return [os.path.relpath(d, base).replace(os.sep, "/") for d in directories]
+
+
 @cli.command()
 @click.argument("output_file", required=False)
-def export(output_file):
-    """Export the current agent to a zip file."""
+@click.option("--include", "includes", multiple=True, help="Pattern of files to export (repeatable)")
+@click.option("--exclude", "excludes", multiple=True, help="Pattern of files to leave out (repeatable)")
+@click.option("--manifest", type=click.Path(exists=True, dir_okay=False),
+              help="File of include patterns, one per line ('!' excludes)")
+@click.option("--compression", type=click.Choice(["deflate", "lzma", "stored"]), default="deflate",
+              show_default=True, help="Compression method")
+@click.option("--level", type=click.IntRange(0, 9), help="Deflate compression level")
+@click.option("-j", "--jobs", type=click.IntRange(min=1), help="Compression threads (default: CPU count, max 8)")
+@click.option("--agents", "agents_pattern", help="Export every agent directory matching a glob into one bundle")
+@click.option("--dedup", is_flag=True, help="Write a content-addressed bundle (implied by --agents)")
+def export(output_file, includes, excludes, manifest, compression, level, jobs, agents_pattern, dedup):
+    """Export the current agent to a zip file.
+
+    Without --include or --manifest, exports agent.lock, agent.py,
+    requirements.txt and README.md. Use '-' as OUTPUT_FILE to write to stdout.
+
+    With --agents or --dedup the zip is a content-addressed bundle: each
+    unique file is stored once, with a manifest per agent.
+    """
+    from .bundle import export_agents, export_bundle, read_manifest, select_files
+
+    to_stdout = output_file == "-"
     if not output_file:
         output_file = "backpack_agent.zip"
-    
-    if not output_file.endswith(".zip"):
+
+    if not to_stdout and not output_file.endswith(".zip"):
         output_file += ".zip"
 
-    files_to_export = ["agent.lock", "agent.py", "requirements.txt", "README.md"]
-    found_files = []
-    
+    includes, excludes = list(includes), list(excludes)
+    if manifest:
+        manifest_includes, manifest_excludes = read_manifest(manifest)
+        includes += manifest_includes
+        excludes += manifest_excludes
+
+    skip = [] if to_stdout else [output_file]
     try:
-        with zipfile.ZipFile(output_file, "w") as zf:
-            for f in files_to_export:
-                if os.path.exists(f):
-                    zf.write(f)
-                    found_files.append(f)
-        
-        if found_files:
-            click.echo(click.style(f"[OK] Exported {len(found_files)} files to {output_file}", fg="green"))
-            for f in found_files:
-                click.echo(f"  - {f}")
+        if agents_pattern:
+            _bind_lazy("fleet")
+            directories = [agent.directory for agent in discover_agents(agents_pattern)]
+            names = _agent_names(agents_pattern, directories)
         else:
-            click.echo(click.style("No agent files found to export.", fg="yellow"))
-            # Clean up empty zip
-            if os.path.exists(output_file):
-                os.remove(output_file)
+            directories = [os.path.abspath(".")]
+            names = [os.path.basename(directories[0]) or "agent"]
+        agents = {
+            name: (directory, select_files(directory, includes, excludes, skip=skip))
+            for name, directory in zip(names, directories)
+        }
+    except BackpackError as e:
+        click.echo(click.style(f"Export failed: {e.message}", fg="red"), err=to_stdout)
+        sys.exit(1)
+    agents = {name: agent for name, agent in agents.items() if agent[1]}
+    if not agents:
+        click.echo(click.style("No agent files found to export.", fg="yellow"), err=to_stdout)
+        return
+
+    def write(out):
+        if agents_pattern or dedup:
+            return export_agents(agents, out, compression, level, jobs)
+        return export_bundle(".", agents[names[0]][1], out, compression, level, jobs)
+
+    try:
+        if to_stdout:
+            stats = write(click.get_binary_stream("stdout"))
+        else:
+            try:
+                with open(output_file, "wb") as out:
+                    stats = write(out)
+            except BaseException:
+                # Don't leave a truncated archive behind
+                if os.path.exists(output_file):
+                    os.remove(output_file)
+                raise
+
+        destination = "stdout" if to_stdout else output_file
+        click.echo(click.style(f"[OK] Exported {len(stats.files)} files to {destination}", fg="green"), err=to_stdout)
+        for f in stats.files:
+            click.echo(f"  - {f}", err=to_stdout)
+        if agents_pattern or dedup:
+            click.echo(f"  {len(agents)} agents, {stats.duplicates} duplicate files stored once", err=to_stdout)
+        ratio = stats.bytes_out / stats.bytes_in if stats.bytes_in else 1.0
+        click.echo(
+            f"  {stats.bytes_in} bytes in, {stats.bytes_out} bytes out ({ratio:.0%}, {compression}) "
+            f"in {stats.elapsed:.2f}s",
+            err=to_stdout,
+        )
     except Exception as e:
-        click.echo(click.style(f"Export failed: {e}", fg="red"))
+        click.echo(click.style(f"Export failed: {e}", fg="red"), err=to_stdout)
         sys.exit(1)
 
 
 @cli.command("import")
 @click.argument("input_file")
 @click.option("--dir", "target_dir", default=".", help="Target directory")
-def import_agent(input_file, target_dir):
-    """Import an agent from a zip file."""
+@click.option("--only", "only", multiple=True, help="Pattern of files to extract, e.g. agent.lock (repeatable)")
+@click.option("--max-size", type=click.IntRange(min=1),
+              help="Largest file to extract, in bytes (default: $BACKPACK_IMPORT_MAX_SIZE or 100 MiB)")
+def import_agent(input_file, target_dir, only, max_size):
+    """Import an agent from a zip file.
+
+    Members are streamed out one at a time: paths are validated, sizes are
+    capped, and content-addressed bundles are checked against their manifest
+    hashes. Files that already hold the right content are skipped.
+    """
+    import zipfile
+
+    from .bundle import import_archive
+
     if not os.path.exists(input_file):
         click.echo(click.style(f"File {input_file} not found.", fg="red"))
         sys.exit(1)
@@ -678,13 +1483,22 @@ def import_agent(input_file, target_dir):
     try:
         os.makedirs(target_dir, exist_ok=True)
         with zipfile.ZipFile(input_file, "r") as zf:
-            zf.extractall(target_dir)
-            click.echo(click.style(f"[OK] Imported agent to {target_dir}", fg="green"))
-            click.echo("Files:")
-            for name in zf.namelist():
-                click.echo(f"  - {name}")
-    except zipfile.BadZipFile:
+            stats = import_archive(zf, target_dir, list(only), max_size)
+        what = f"{len(stats.agents)} agents" if len(stats.agents) > 1 else "agent"
+        click.echo(click.style(f"[OK] Imported {what} to {target_dir}", fg="green"))
+        click.echo("Files:")
+        for name in stats.written:
+            click.echo(f"  - {name}")
+        if stats.skipped:
+            click.echo(f"Skipped {len(stats.skipped)} unchanged files")
+    except zipfile.BadZipFile as e:
         click.echo(click.style("Invalid zip file.", fg="red"))
+        click.echo(click.style(f"  {e}", fg="yellow"))
+        sys.exit(1)
+    except BackpackError as e:
+        click.echo(click.style(f"Import failed: {e.message}", fg="red"))
+        if e.details:
+            click.echo(click.style(f"  {e.details}", fg="yellow"))
         sys.exit(1)
     except Exception as e:
         click.echo(click.style(f"Import failed: {e}", fg="red"))
@@ -692,6 +1506,7 @@ def import_agent(input_file, target_dir):
 
 
 @cli.command()
+@_needs("agent_lock")
 def tutorial():
     """Interactive tutorial to learn Backpack."""
     click.echo(click.style("\n🎓 Backpack Interactive Tutorial", fg="cyan", bold=True))
@@ -748,9 +1563,57 @@ def tutorial():
     click.echo("Run 'backpack quickstart' to build your real agent.")
 
 
+def _status_from_metadata(agent_lock: Any, metadata: Dict[str, Any], json_output: bool) -> None:
+    """
+    Print status from the lock's plaintext metadata header (no key derivation).
+
+    The header's MAC can only be checked with a derived key, so everything
+    printed here is marked as unverified.
+    """
+    size = os.stat(agent_lock.file_path).st_size
+    layers = metadata["layers"]
+    if json_output:
+        click.echo(json.dumps({
+            "file_path": agent_lock.file_path,
+            "size": size,
+            "verified": False,
+            "note": "header not verified; run without --header",
+            "metadata": metadata,
+        }, indent=2))
+        return
+
+    click.echo(click.style(f"Agent Status ({agent_lock.file_path})", fg="cyan", bold=True))
+    click.echo(click.style("  From the plaintext header, not verified; run without --header to check it.", fg="yellow"))
+    click.echo(f"  Size: {size} bytes")
+    click.echo(f"  Format: {metadata.get('format')} ({metadata.get('cipher')}, {metadata.get('kdf')}, "
+               f"{metadata.get('codec')})")
+    updated = metadata.get("updated_at")
+    if isinstance(updated, (int, float)):
+        updated_text = datetime.fromtimestamp(updated, timezone.utc).strftime("%Y-%m-%d %H:%M:%S UTC")
+        click.echo(f"  Generation: {metadata.get('generation')} (updated {updated_text})")
+
+    def layer(name: str, label: str, unit: str) -> None:
+        info = layers.get(name)
+        if not isinstance(info, dict):
+            info = {}
+        items, layer_size = info.get("items"), info.get("size")
+        items = items if isinstance(items, int) else "?"
+        layer_size = layer_size if isinstance(layer_size, int) else "?"
+        click.echo(f"    - {label}: {items} {unit} ({layer_size} bytes encrypted)")
+
+    click.echo("\n  Layers:")
+    layer("credentials", "Credentials", "keys defined")
+    layer("personality", "Personality", "items")
+    layer("memory", "Memory", "items")
+    click.echo("\n  Run 'backpack status' to list credential names.")
+
+
 @cli.command()
 @click.option("--json", "json_output", is_flag=True, help="Output in JSON format")
-def status(json_output):
+@click.option("--header", "header_only", is_flag=True,
+              help="Show the unverified plaintext header only, without deriving a key")
+@_needs("agent_lock")
+def status(json_output, header_only):
     """Show current agent status."""
     agent_lock = AgentLock()
     if not os.path.exists(agent_lock.file_path):
@@ -760,6 +1623,12 @@ def status(json_output):
             click.echo(click.style("No agent.lock found in current directory.", fg="yellow"))
         return
 
+    # With --header, locks with a metadata header are described without deriving any key
+    metadata = agent_lock.read_metadata() if header_only else None
+    if metadata is not None:
+        _status_from_metadata(agent_lock, metadata, json_output)
+        return
+
     try:
         data = agent_lock.read()
         if not data:
@@ -812,6 +1681,8 @@ def status(json_output):
 @cli.command()
 def info():
     """Show system information."""
+    import platform
+
     click.echo(click.style("Backpack Information", fg="cyan", bold=True))
     click.echo(f"  Version: {__version__}")
     click.echo(f"  Python: {platform.python_version()} ({sys.executable})")
@@ -10,8 +10,11 @@ types and high-level status are logged.
 """
 
 import base64
+import hashlib
 import logging
 import os
+import threading
+from collections import OrderedDict
 from typing import Optional, Tuple
 
 from cryptography.fernet import Fernet, InvalidToken
@@ -79,13 +82,68 @@ def derive_key(password: str, salt: Optional[bytes] = None) -> Tuple[bytes, byte
         raise KeyDerivationError("Failed to derive encryption key", str(e)) from e
 
 
-def encrypt_data(data: str, password: str) -> dict:
+class DerivedKeyCache:
+    """
+    Thread-safe, bounded cache of PBKDF2-derived keys for a batch of decryptions.
+
+    Keys are cached per (password, salt), so layers that share a salt (for
+    example agent.lock files copied from one template) pay for the key
+    derivation once. Holds key material in memory: scope instances to a
+    single batch operation rather than keeping them for the process lifetime.
+    """
+
+    def __init__(self, max_size: int = 256):
+        """
+        Initialize an empty cache.
+
+        Args:
+            max_size: Number of derived keys to keep (least recently used are dropped)
+        """
+        self.max_size = max_size
+        self.derivations = 0
+        self._keys: "OrderedDict[Tuple[bytes, bytes], bytes]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def derive(self, password: str, salt: bytes) -> bytes:
+        """
+        Return the Fernet key for password and salt, deriving it on first use.
+
+        Raises:
+            InvalidPasswordError: If password is empty or None
+            KeyDerivationError: If key derivation fails
+        """
+        if not password:
+            raise InvalidPasswordError("Password cannot be empty or None")
+        cache_key = (hashlib.sha256(password.encode()).digest(), salt)
+        with self._lock:
+            key = self._keys.get(cache_key)
+            if key is not None:
+                self._keys.move_to_end(cache_key)
+                return key
+        key, _ = derive_key(password, salt)
+        with self._lock:
+            self.derivations += 1
+            self._keys[cache_key] = key
+            while len(self._keys) > self.max_size:
+                self._keys.popitem(last=False)
+        return key
+
+    def cached(self, password: str, salt: bytes) -> Optional[bytes]:
+        """Return the key for password and salt if it is cached, without deriving it."""
+        if not password:
+            return None
+        with self._lock:
+            return self._keys.get((hashlib.sha256(password.encode()).digest(), salt))
+
+
+def encrypt_data(data: str, password: str, key_cache: Optional[DerivedKeyCache] = None) -> dict:
     """
     Encrypt a string using PBKDF2 key derivation and Fernet encryption.
 
     Args:
         data: The plaintext string to encrypt
         password: The password to use for key derivation
+        key_cache: Optional cache that keeps the key derived for the new salt
 
     Returns:
         A dictionary containing:
@@ -103,7 +161,11 @@ def encrypt_data(data: str, password: str) -> dict:
         raise ValidationError("Data must be a string", f"Got type: {type(data).__name__}")
 
     try:
-        key, salt = derive_key(password)
+        if key_cache is not None:
+            salt = os.urandom(16)
+            key = key_cache.derive(password, salt)
+        else:
+            key, salt = derive_key(password)
         f = Fernet(key)
         encrypted = f.encrypt(data.encode())
         logger.debug("Encrypted data string", extra={"cipher_len": len(encrypted)})
@@ -117,7 +179,7 @@ def encrypt_data(data: str, password: str) -> dict:
         raise EncryptionError("Failed to encrypt data", str(e)) from e
 
 
-def decrypt_data(encrypted_dict: dict, password: str) -> str:
+def decrypt_data(encrypted_dict: dict, password: str, key_cache: Optional[DerivedKeyCache] = None) -> str:
     """
     Decrypt data that was encrypted with encrypt_data().
 
@@ -126,6 +188,7 @@ def decrypt_data(encrypted_dict: dict, password: str) -> str:
             - 'data': Base64-encoded encrypted data
             - 'salt': Base64-encoded salt used for key derivation
         password: The password used for encryption
+        key_cache: Optional cache of derived keys shared across decryptions
 
     Returns:
         The decrypted plaintext string
@@ -148,7 +211,10 @@ def decrypt_data(encrypted_dict: dict, password: str) -> str:
 
     try:
         salt = base64.b64decode(encrypted_dict["salt"])
-        key, _ = derive_key(password, salt)
+        if key_cache is not None:
+            key = key_cache.derive(password, salt)
+        else:
+            key, _ = derive_key(password, salt)
         f = Fernet(key)
         encrypted_data = base64.b64decode(encrypted_dict["data"])
         decrypted = f.decrypt(encrypted_data)
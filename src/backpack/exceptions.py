@@ -210,3 +210,43 @@ class ScriptExecutionError(BackpackError):
         )
         self.script_path = script_path
 
+
+
+class AgentDaemonError(BackpackError):
+    """Exception raised when the credential agent daemon is unavailable or fails."""
+
+    def __init__(self, message: str = "Credential agent unavailable", details: Optional[str] = None):
+        super().__init__(
+            message or "Unable to reach the credential agent daemon.",
+            details or "Check that 'backpack agentd' is running and BACKPACK_AGENT_SOCK points at its socket",
+        )
+
+
+class LauncherError(BackpackError):
+    """Exception raised when the pre-forked agent launcher is unavailable or fails."""
+
+    def __init__(self, message: str = "Agent launcher unavailable", details: Optional[str] = None):
+        super().__init__(
+            message or "Unable to reach the agent launcher.",
+            details or "Check that 'backpack serve' is running and BACKPACK_LAUNCHER_SOCK points at its socket",
+        )
+
+
+class RuntimeChannelError(BackpackError):
+    """Exception raised when the runtime channel between backpack run and an agent fails."""
+
+    def __init__(self, message: str = "Runtime channel unavailable", details: Optional[str] = None):
+        super().__init__(
+            message or "Unable to use the backpack runtime channel.",
+            details or "Start the agent with 'backpack run' or read agent.lock directly",
+        )
+
+
+class BundleError(BackpackError):
+    """Exception raised when an agent bundle is invalid or cannot be imported."""
+
+    def __init__(self, message: str = "Invalid agent bundle", details: Optional[str] = None):
+        super().__init__(
+            message or "Unable to read the agent bundle.",
+            details or "Re-create the bundle with 'backpack export'",
+        )
@@ -0,0 +1,247 @@
+"""
+Parallel fleet runner (`backpack fleet run <glob>`).
+
+Runs many agent directories, each with its own agent.lock, in one command:
+
+1. All locks are decrypted concurrently, sharing one derived-key cache.
+2. Credentials for the whole fleet are resolved with a single batched
+   keychain lookup (backpack.keychain.get_keys).
+3. Agents run concurrently up to a limit. Their combined stdout and stderr
+   is streamed line by line, each line prefixed with the agent's name.
+
+The caller prints the summary (see FleetAgent.to_dict()).
+
+Logging in this module NEVER records secret values.
+"""
+
+import glob
+import logging
+import os
+import subprocess
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import IO, Any, Callable, Dict, List, Optional
+
+from .agent_lock import AgentLock, is_placeholder
+from .crypto import DerivedKeyCache
+from .exceptions import BackpackError, ValidationError
+from .keychain import get_keys
+
+logger = logging.getLogger(__name__)
+
+CONCURRENCY_ENV = "BACKPACK_FLEET_CONCURRENCY"
+DEFAULT_SCRIPT = "agent.py"
+LOCK_NAME = "agent.lock"
+
+
+def default_concurrency() -> int:
+    """Return BACKPACK_FLEET_CONCURRENCY, or the CPU count capped at 8."""
+    try:
+        value = int(os.environ.get(CONCURRENCY_ENV, 0))
+    except ValueError:
+        value = 0
+    return value if value > 0 else min(8, os.cpu_count() or 1)
+
+
+class FleetAgent:
+    """One agent directory in a fleet run."""
+
+    def __init__(self, directory: str, script: str = DEFAULT_SCRIPT):
+        self.directory = directory
+        self.name = os.path.relpath(directory)
+        self.lock_path = os.path.join(directory, LOCK_NAME)
+        self.script = script
+        self.script_path = os.path.join(directory, script)
+        self.data: Optional[Dict[str, Any]] = None
+        self.env_vars: Dict[str, str] = {}
+        self.missing: List[str] = []
+        self.status = "pending"  # pending, ready, skipped, ok, failed, error
+        self.error: Optional[str] = None
+        self.returncode: Optional[int] = None
+        self.duration: Optional[float] = None
+
+    def to_dict(self) -> Dict[str, Any]:
+        """Return a JSON-serializable summary of this agent's run."""
+        return {
+            "agent": self.name,
+            "status": self.status,
+            "returncode": self.returncode,
+            "duration": self.duration,
+            "error": self.error,
+            "missing": list(self.missing),
+        }
+
+
+def discover_agents(pattern: str, script: str = DEFAULT_SCRIPT) -> List[FleetAgent]:
+    """
+    Find agent directories matching a glob pattern.
+
+    The pattern may match directories containing an agent.lock or the
+    agent.lock files themselves. "**" matches recursively.
+
+    Args:
+        pattern: Glob pattern, e.g. "agents/*" or "services/**/agent.lock"
+        script: Agent script name inside each directory
+
+    Returns:
+        Agents sorted by directory
+
+    Raises:
+        ValidationError: If nothing matches
+    """
+    directories = set()
+    for match in glob.glob(pattern, recursive=True):
+        if os.path.basename(match) == LOCK_NAME and os.path.isfile(match):
+            directories.add(os.path.abspath(os.path.dirname(match)))
+        elif os.path.isfile(os.path.join(match, LOCK_NAME)):
+            directories.add(os.path.abspath(match))
+    if not directories:
+        raise ValidationError("No agents found", f"No directory matching {pattern!r} contains an {LOCK_NAME}")
+    return [FleetAgent(directory, script) for directory in sorted(directories)]
+
+
+def load_locks(agents: List[FleetAgent], max_workers: Optional[int] = None) -> DerivedKeyCache:
+    """
+    Decrypt every agent's lock concurrently with one shared derived-key cache.
+
+    Agents whose lock cannot be read are marked "skipped".
+
+    Args:
+        agents: Agents from discover_agents()
+        max_workers: Threads to use (default: default_concurrency())
+
+    Returns:
+        The key cache used, for inspection
+    """
+    key_cache = DerivedKeyCache()
+
+    def load(agent: FleetAgent) -> None:
+        try:
+            agent.data = AgentLock(agent.lock_path, key_cache=key_cache).read()
+        except BackpackError as e:
+            agent.error = e.message
+        if not agent.data:
+            agent.status = "skipped"
+            agent.error = agent.error or "agent.lock could not be read or decrypted"
+        elif not os.path.isfile(agent.script_path):
+            agent.status = "skipped"
+            agent.error = f"{agent.script} not found"
+        else:
+            agent.status = "ready"
+
+    with ThreadPoolExecutor(max_workers=max_workers or default_concurrency()) as pool:
+        list(pool.map(load, agents))
+    return key_cache
+
+
+def resolve_credentials(
+    agents: List[FleetAgent],
+    approve: Optional[Callable[[List[str]], bool]] = None,
+) -> List[str]:
+    """
+    Work out every ready agent's variables with one batched keychain lookup.
+
+    Keys already in the environment are left alone. Values come from the
+    agent's lock or the vault, in that order.
+
+    Args:
+        agents: Agents after load_locks()
+        approve: Called once with the names of all keys about to be injected.
+            If it returns False, no credentials are injected. None approves all.
+
+    Returns:
+        The key names looked up in the vault
+    """
+    ready = [agent for agent in agents if agent.status == "ready"]
+    lookups = sorted({
+        key_name
+        for agent in ready
+        for key_name, value in agent.data["credentials"].items()  # type: ignore[index]
+        if key_name not in os.environ and is_placeholder(value)
+    })
+    vault_values = get_keys(lookups) if lookups else {}
+
+    candidates: Dict[str, Dict[str, str]] = {}
+    for agent in ready:
+        found: Dict[str, str] = {}
+        for key_name, value in agent.data["credentials"].items():  # type: ignore[index]
+            if key_name in os.environ:
+                continue
+            if not is_placeholder(value):
+                found[key_name] = value
+            elif vault_values.get(key_name):
+                found[key_name] = vault_values[key_name]  # type: ignore[assignment]
+            else:
+                agent.missing.append(key_name)
+        candidates[agent.name] = found
+
+    names = sorted({key_name for found in candidates.values() for key_name in found})
+    approved = approve(names) if (approve is not None and names) else True
+
+    for agent in ready:
+        env_vars = dict(candidates[agent.name]) if approved else {}
+        personality = agent.data["personality"]  # type: ignore[index]
+        env_vars["AGENT_SYSTEM_PROMPT"] = personality["system_prompt"]
+        env_vars["AGENT_TONE"] = personality["tone"]
+        agent.env_vars = env_vars
+    return lookups
+
+
+def run_agents(
+    agents: List[FleetAgent],
+    concurrency: Optional[int] = None,
+    output: Optional[IO[str]] = None,
+) -> None:
+    """
+    Run every ready agent, at most `concurrency` at a time.
+
+    Each agent runs as `python <script>` in its own directory. Its stdout and
+    stderr are merged and written to output line by line as "[name] line".
+
+    Args:
+        agents: Agents after resolve_credentials()
+        concurrency: Agents to run at once (default: default_concurrency())
+        output: Stream for prefixed output (default: sys.stdout)
+    """
+    stream = output or sys.stdout
+    write_lock = threading.Lock()
+    width = max((len(agent.name) for agent in agents), default=0)
+
+    def emit(agent: FleetAgent, line: str) -> None:
+        with write_lock:
+            stream.write(f"[{agent.name:<{width}}] {line}\n")
+            stream.flush()
+
+    def run_one(agent: FleetAgent) -> None:
+        env = os.environ.copy()
+        env.update(agent.env_vars)
+        start = time.monotonic()
+        try:
+            process = subprocess.Popen(
+                # Relative to cwd, so a script in a subdirectory keeps its path
+                [sys.executable, agent.script],
+                cwd=agent.directory,
+                env=env,
+                stdin=subprocess.DEVNULL,
+                stdout=subprocess.PIPE,
+                stderr=subprocess.STDOUT,
+            )
+        except OSError as e:
+            agent.status = "error"
+            agent.error = str(e)
+            return
+        assert process.stdout is not None
+        for raw in process.stdout:
+            emit(agent, raw.decode("utf-8", errors="replace").rstrip("\r\n"))
+        agent.returncode = process.wait()
+        agent.duration = time.monotonic() - start
+        agent.status = "ok" if agent.returncode == 0 else "failed"
+        logger.info("Fleet agent finished", extra={"agent": agent.name, "returncode": agent.returncode})
+
+    ready = [agent for agent in agents if agent.status == "ready"]
+    if not ready:
+        return
+    with ThreadPoolExecutor(max_workers=max(1, concurrency or default_concurrency())) as pool:
+        list(pool.map(run_one, ready))
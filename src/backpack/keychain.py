@@ -2,7 +2,8 @@
 OS keychain integration for secure credential storage.
 
 This module provides functions for storing, retrieving, and managing
-API keys and other credentials using the platform's native keyring service.
+API keys and other credentials using the platform's native keyring service,
+or an encrypted vault file (backpack.vault) when BACKPACK_KEYCHAIN_BACKEND=file.
 
 Logging in this module NEVER records secret key values. Only key names and
 high-level operation results are logged.
@@ -10,23 +11,205 @@ high-level operation results are logged.
 
 import json
 import logging
-from typing import Dict, Optional, cast
+import os
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+from urllib.parse import quote, unquote
 
 import keyring
 import keyring.errors
 
-from .audit import AuditLogger
+from . import agent_client
+from .audit import AuditLogger, get_audit_logger
 from .exceptions import (
+    AgentDaemonError,
     InvalidKeyNameError,
     KeychainAccessError,
     KeychainDeletionError,
     KeychainStorageError,
     ValidationError,
 )
+from .memory_keyring import MemoryKeyring
+from .vault import FileVault, default_vault_key, default_vault_path
 
 SERVICE_NAME = "backpack-agent"
 logger = logging.getLogger(__name__)
-audit_logger = AuditLogger()
+
+# Maximum number of concurrent keyring calls made by get_keys()/store_keys().
+BATCH_WORKERS_ENV = "BACKPACK_KEYCHAIN_WORKERS"
+DEFAULT_BATCH_WORKERS = 8
+
+# Lifetime (seconds) and maximum number of entries of the in-process key cache.
+# A TTL of 0 disables caching.
+CACHE_TTL_ENV = "BACKPACK_KEY_CACHE_TTL"
+CACHE_SIZE_ENV = "BACKPACK_KEY_CACHE_SIZE"
+DEFAULT_CACHE_TTL = 300.0
+DEFAULT_CACHE_SIZE = 128
+
+# Credential store used by this module: "keyring" (the OS keyring, default),
+# "file" (an encrypted vault file, see backpack.vault) or "memory" (a
+# process-local store for tests and benchmarks, see backpack.memory_keyring).
+BACKEND_ENV = "BACKPACK_KEYCHAIN_BACKEND"
+DEFAULT_BACKEND = "keyring"
+
+# Per-user state directory; the key registry lives in its "registry" subdirectory.
+HOME_ENV = "BACKPACK_HOME"
+DEFAULT_HOME = os.path.join("~", ".backpack")
+_MIGRATED_MARKER = ".migrated"
+
+# Rewritten with a random token whenever keys are stored or deleted, so other
+# processes can tell that the vault changed (see vault_state())
+_STATE_FILE = "vault.state"
+
+
+class _KeyCache:
+    """
+    In-process, memory-only cache of keychain values.
+
+    Entries expire after `ttl` seconds and the least recently used entry is
+    evicted beyond `maxsize`. Values are held in bytearrays that are zeroed
+    when an entry is evicted, expires or is invalidated. This is best effort:
+    the str objects handed to callers cannot be wiped.
+    """
+
+    def __init__(self, ttl: float, maxsize: int):
+        self.ttl = ttl
+        self.maxsize = maxsize
+        self._entries: "OrderedDict[str, Tuple[bytearray, float]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    @property
+    def enabled(self) -> bool:
+        return self.ttl > 0 and self.maxsize > 0
+
+    def get(self, key_name: str) -> Optional[str]:
+        """Return the cached value, or None if missing or expired."""
+        if not self.enabled:
+            return None
+        with self._lock:
+            item = self._entries.get(key_name)
+            if item is None:
+                return None
+            buf, expires = item
+            if time.monotonic() >= expires:
+                self._evict(key_name)
+                return None
+            self._entries.move_to_end(key_name)
+            return buf.decode("utf-8")
+
+    def put(self, key_name: str, value: str) -> None:
+        """Cache a value, evicting the least recently used entries beyond maxsize."""
+        if not self.enabled:
+            return
+        with self._lock:
+            self._evict(key_name)
+            self._entries[key_name] = (bytearray(value.encode("utf-8")), time.monotonic() + self.ttl)
+            while len(self._entries) > self.maxsize:
+                self._evict(next(iter(self._entries)))
+
+    def invalidate(self, key_name: Optional[str] = None) -> None:
+        """Drop one entry, or every entry if key_name is None."""
+        with self._lock:
+            names = list(self._entries) if key_name is None else [key_name]
+            for name in names:
+                self._evict(name)
+
+    def _evict(self, key_name: str) -> None:
+        """Remove an entry and zero its value. Callers must hold the lock."""
+        item = self._entries.pop(key_name, None)
+        if item is not None:
+            buf = item[0]
+            buf[:] = b"\0" * len(buf)
+
+
+def _cache_setting(env_var: str, default: float) -> float:
+    """Read a numeric cache setting from the environment."""
+    try:
+        return float(os.environ.get(env_var, default))
+    except ValueError:
+        return default
+
+
+_cache = _KeyCache(
+    ttl=_cache_setting(CACHE_TTL_ENV, DEFAULT_CACHE_TTL),
+    maxsize=int(_cache_setting(CACHE_SIZE_ENV, DEFAULT_CACHE_SIZE)),
+)
+
+
+def invalidate_cache(key_name: Optional[str] = None) -> None:
+    """
+    Drop cached key values.
+
+    store_key(), store_keys() and delete_key() invalidate the entries they
+    change, here and in the credential agent daemon if one is configured;
+    call this after changing the keychain outside of this module.
+
+    Args:
+        key_name: Key to drop, or None to clear the whole cache
+    """
+    _cache.invalidate(key_name)
+
+
+_backend_override: Optional[Any] = None
+_vaults: Dict[Tuple[str, str], Any] = {}
+_memory_keyring: Optional[MemoryKeyring] = None
+_vaults_lock = threading.Lock()
+
+
+def set_backend(backend: Optional[Any]) -> None:
+    """
+    Override the credential store used by this module.
+
+    Args:
+        backend: "keyring", "file", "memory", an object implementing the keyring
+            get_password/set_password/delete_password API, or None to fall
+            back to BACKPACK_KEYCHAIN_BACKEND
+    """
+    global _backend_override
+    _backend_override = backend
+    _cache.invalidate()
+
+
+def _backend() -> Any:
+    """
+    Return the configured credential store.
+
+    The keyring module itself is returned for the default backend so calls
+    always go through its current get_password/set_password/delete_password.
+
+    Raises:
+        ValidationError: If the configured backend name is unknown
+        KeychainAccessError: If the file backend is selected without a vault master key
+    """
+    backend = _backend_override
+    if backend is None:
+        backend = os.environ.get(BACKEND_ENV, DEFAULT_BACKEND).strip().lower() or DEFAULT_BACKEND
+    if not isinstance(backend, str):
+        return backend
+    if backend == "keyring":
+        return keyring
+    if backend == "memory":
+        global _memory_keyring
+        with _vaults_lock:
+            if _memory_keyring is None:
+                _memory_keyring = MemoryKeyring()
+        return _memory_keyring
+    if backend == "file":
+        config = (default_vault_path(), default_vault_key())
+        with _vaults_lock:
+            vault = _vaults.get(config)
+            if vault is None:
+                vault = _vaults[config] = FileVault(*config)
+        return vault
+    raise ValidationError(f"Unknown keychain backend '{backend}' (expected 'keyring', 'file' or 'memory')")
+
+
+def _audit() -> AuditLogger:
+    """Return the audit logger for the current directory and master key."""
+    return get_audit_logger()
 
 
 def _validate_key_name(key_name: str) -> None:
@@ -51,6 +234,23 @@ def _validate_key_name(key_name: str) -> None:
         raise InvalidKeyNameError(key_name, "Key names starting with '_' are reserved for internal use")
 
 
+def _validate_key_value(key_value: str) -> None:
+    """
+    Validate a key value before storing it.
+
+    Args:
+        key_value: The value to validate
+
+    Raises:
+        ValidationError: If the value is not a string
+    """
+    if key_value is None:
+        raise ValidationError("Key value cannot be None", "Provide a valid string value to store")
+
+    if not isinstance(key_value, str):
+        raise ValidationError("Key value must be a string", f"Got type: {type(key_value).__name__}")
+
+
 def store_key(key_name: str, key_value: str) -> None:
     """
     Store a key-value pair in the OS keychain.
@@ -64,17 +264,15 @@ def store_key(key_name: str, key_value: str) -> None:
         KeychainStorageError: If storing the key fails
     """
     _validate_key_name(key_name)
-
-    if key_value is None:
-        raise ValidationError("Key value cannot be None", "Provide a valid string value to store")
-
-    if not isinstance(key_value, str):
-        raise ValidationError("Key value must be a string", f"Got type: {type(key_value).__name__}")
+    _validate_key_value(key_value)
 
     try:
-        keyring.set_password(SERVICE_NAME, key_name, key_value)
+        _cache.invalidate(key_name)
+        _backend().set_password(SERVICE_NAME, key_name, key_value)
+        _mark_changed()
+        _invalidate_agent([key_name])
         logger.info("Stored key in keychain", extra={"service": SERVICE_NAME, "key_name": key_name})
-        audit_logger.log_event("store_key", {"service": SERVICE_NAME, "key_name": key_name})
+        _audit().log_event("store_key", {"service": SERVICE_NAME, "key_name": key_name})
     except keyring.errors.KeyringError as e:
         raise KeychainStorageError(key_name, f"Keyring error: {str(e)}") from e
     except Exception as e:
@@ -85,6 +283,12 @@ def get_key(key_name: str) -> Optional[str]:
     """
     Retrieve a key value from the OS keychain.
 
+    Values found in the keychain are kept in an in-process cache for
+    BACKPACK_KEY_CACHE_TTL seconds (default 300). Cache hits skip the keyring
+    and are not audited again; the lookup that filled the cache was. When
+    BACKPACK_AGENT_SOCK is set, misses are asked of the credential agent
+    daemon first (which audits them), falling back to the keyring.
+
     Args:
         key_name: The name/identifier of the key to retrieve
 
@@ -97,27 +301,298 @@ def get_key(key_name: str) -> Optional[str]:
     """
     _validate_key_name(key_name)
 
+    cached = _cache.get(key_name)
+    if cached is not None:
+        return cached
+
+    served = _agent_keys([key_name])
+    if served is not None:
+        value = served.get(key_name)
+    else:
+        value = _fetch_key(key_name)
+        if value:
+            _audit().log_event("get_key", {"service": SERVICE_NAME, "key_name": key_name})
+    if value:
+        _cache.put(key_name, value)
+    return value
+
+
+def _agent_keys(key_names: List[str]) -> Optional[Dict[str, Optional[str]]]:
+    """
+    Look keys up through the credential agent daemon, if one is configured.
+
+    The daemon audits the lookups it serves. Returns None when no daemon is
+    configured or it cannot answer, so the caller reads the keyring itself.
+    """
+    if not agent_client.agent_socket():
+        return None
+    try:
+        return agent_client.get_keys(key_names)
+    except AgentDaemonError as e:
+        logger.debug("Credential agent unavailable; using keychain directly", extra={"error": str(e)})
+        return None
+
+
+def _invalidate_agent(key_names: Optional[List[str]] = None) -> None:
+    """
+    Tell the credential agent daemon, if one is configured, to drop cached values.
+
+    The daemon answers get_keys from its own cache, so without this it would
+    keep serving stored-over or deleted keys until they expire.
+    """
+    if not agent_client.agent_socket():
+        return
+    try:
+        agent_client.invalidate(key_names)
+    except AgentDaemonError as e:
+        logger.debug("Could not invalidate credential agent cache", extra={"error": str(e)})
+
+
+def _fetch_key(key_name: str) -> Optional[str]:
+    """
+    Read a key from the OS keyring, bypassing the cache and the audit log.
+
+    Raises:
+        KeychainAccessError: If accessing the keychain fails
+    """
     try:
-        value = keyring.get_password(SERVICE_NAME, key_name)
+        value = _backend().get_password(SERVICE_NAME, key_name)
         logger.debug(
             "Retrieved key from keychain",
             extra={"service": SERVICE_NAME, "key_name": key_name, "found": bool(value)},
         )
-        if value:
-            audit_logger.log_event("get_key", {"service": SERVICE_NAME, "key_name": key_name})
         return value
     except keyring.errors.KeyringError as e:
         raise KeychainAccessError(f"Failed to retrieve key '{key_name}' from keychain", str(e)) from e
+    except KeychainAccessError:
+        raise
     except Exception as e:
         raise KeychainAccessError(f"Unexpected error retrieving key '{key_name}'", str(e)) from e
 
 
+def _max_workers(count: int) -> int:
+    """Return the thread pool size for a batch of `count` keyring calls."""
+    try:
+        limit = int(os.environ.get(BATCH_WORKERS_ENV, DEFAULT_BATCH_WORKERS))
+    except ValueError:
+        limit = DEFAULT_BATCH_WORKERS
+    return max(1, min(limit, count))
+
+
+def get_keys(key_names: Iterable[str]) -> Dict[str, Optional[str]]:
+    """
+    Retrieve several keys from the OS keychain at once.
+
+    Cached keys are answered from memory; the rest are sent to the credential
+    agent daemon in one request when BACKPACK_AGENT_SOCK is set, or looked up
+    concurrently on a thread pool, so the keyring round trips overlap. The lookup is
+    audited as a single "get_keys" event.
+
+    Args:
+        key_names: Names of the keys to retrieve
+
+    Returns:
+        A dictionary mapping every requested name to its value, or None if not found
+
+    Raises:
+        InvalidKeyNameError: If any key name is invalid (nothing is looked up)
+        KeychainAccessError: If accessing the keychain fails
+    """
+    names = list(dict.fromkeys(key_names))
+    for key_name in names:
+        _validate_key_name(key_name)
+
+    result: Dict[str, Optional[str]] = {}
+    missing = []
+    for key_name in names:
+        cached = _cache.get(key_name)
+        if cached is not None:
+            result[key_name] = cached
+        else:
+            missing.append(key_name)
+
+    served = _agent_keys(missing) if missing else None
+    if served is not None:
+        for key_name in missing:
+            value = result[key_name] = served.get(key_name)
+            if value:
+                _cache.put(key_name, value)
+    elif missing:
+        with ThreadPoolExecutor(max_workers=_max_workers(len(missing))) as pool:
+            values = list(pool.map(_fetch_key, missing))
+        found = []
+        for key_name, value in zip(missing, values):
+            result[key_name] = value
+            if value:
+                _cache.put(key_name, value)
+                found.append(key_name)
+        if found:
+            _audit().log_event("get_keys", {"service": SERVICE_NAME, "key_names": found})
+
+    return {key_name: result[key_name] for key_name in names}
+
+
+def store_keys(keys: Dict[str, str], register: bool = True) -> None:
+    """
+    Store several key-value pairs in the OS keychain at once.
+
+    All names and values are validated before anything is written. The
+    keyring writes run concurrently on a thread pool (the vault file backend
+    writes the whole batch in one rewrite), the registry is updated once for
+    the whole batch, and the batch is audited as a single "store_keys" event.
+
+    Args:
+        keys: Dictionary mapping key names to secret values
+        register: Also add the stored names to the key registry
+
+    Raises:
+        InvalidKeyNameError: If any key name is invalid (nothing is stored)
+        ValidationError: If any value is invalid (nothing is stored)
+        KeychainStorageError: If storing a key fails. Keys stored successfully
+            are still registered and audited.
+    """
+    for key_name, key_value in keys.items():
+        _validate_key_name(key_name)
+        _validate_key_value(key_value)
+    if not keys:
+        return
+
+    def _store(item: Tuple[str, str]) -> Optional[Exception]:
+        key_name, key_value = item
+        try:
+            _cache.invalidate(key_name)
+            _backend().set_password(SERVICE_NAME, key_name, key_value)
+            return None
+        except Exception as e:
+            return e
+
+    items = list(keys.items())
+    backend = _backend()
+    if hasattr(backend, "set_passwords"):
+        # The vault file is rewritten once for the whole batch
+        _cache.invalidate()
+        try:
+            backend.set_passwords(SERVICE_NAME, dict(items))
+            errors: List[Optional[Exception]] = [None] * len(items)
+        except Exception as e:
+            errors = [e] * len(items)
+    else:
+        with ThreadPoolExecutor(max_workers=_max_workers(len(items))) as pool:
+            errors = list(pool.map(_store, items))
+
+    stored = [key_name for (key_name, _), error in zip(items, errors) if error is None]
+    if stored:
+        _mark_changed()
+        _invalidate_agent(stored)
+        logger.info("Stored keys in keychain", extra={"service": SERVICE_NAME, "count": len(stored)})
+        _audit().log_event("store_keys", {"service": SERVICE_NAME, "key_names": stored})
+        if register:
+            _update_registry(add=stored)
+
+    for (key_name, _), error in zip(items, errors):
+        if isinstance(error, keyring.errors.KeyringError):
+            raise KeychainStorageError(key_name, f"Keyring error: {str(error)}") from error
+        if error is not None:
+            raise KeychainStorageError(key_name, f"Unexpected error: {str(error)}") from error
+
+
+def _home_dir() -> str:
+    return os.path.expanduser(os.environ.get(HOME_ENV) or DEFAULT_HOME)
+
+
+def _mark_changed() -> None:
+    """Record that the vault changed (best effort)."""
+    try:
+        os.makedirs(_home_dir(), mode=0o700, exist_ok=True)
+        with open(os.path.join(_home_dir(), _STATE_FILE), "w") as f:
+            f.write(os.urandom(8).hex())
+    except OSError:
+        pass
+
+
+def vault_state() -> str:
+    """
+    Return a token that changes whenever keys are stored or deleted through this module.
+
+    Reading it costs one small file read and no keyring access. Changes made
+    to the OS keyring by other programs are not seen.
+    """
+    try:
+        with open(os.path.join(_home_dir(), _STATE_FILE)) as f:
+            token = f.read().strip()
+    except OSError:
+        token = ""
+    return f"{os.environ.get(BACKEND_ENV) or DEFAULT_BACKEND}:{token}"
+
+
+def _registry_dir() -> str:
+    """
+    Return the key registry directory, migrating a legacy registry on first use.
+
+    Raises:
+        KeychainStorageError: If the directory cannot be created
+    """
+    path = os.path.join(_home_dir(), "registry", SERVICE_NAME)
+    if not os.path.exists(os.path.join(path, _MIGRATED_MARKER)):
+        try:
+            os.makedirs(path, mode=0o700, exist_ok=True)
+        except OSError as e:
+            raise KeychainStorageError("_registry", f"Cannot create registry directory: {str(e)}") from e
+        _migrate_registry(path)
+    return path
+
+
+def _marker_path(directory: str, key_name: str) -> str:
+    # Key names may contain path separators and dots, so they are percent-encoded
+    return os.path.join(directory, quote(key_name, safe="").replace(".", "%2E"))
+
+
+def _migrate_registry(directory: str) -> None:
+    """
+    Copy names from the legacy "_registry" JSON entry to marker files.
+
+    The legacy entry is only read. It lives in the OS keyring, which other
+    BACKPACK_HOMEs and older backpack installs share, and they still need it.
+    """
+    try:
+        legacy = get_key("_registry")
+    except KeychainAccessError:
+        return  # try again next time
+    names: List[str] = []
+    if legacy:
+        try:
+            names = [name for name in json.loads(legacy) if isinstance(name, str)]
+        except (json.JSONDecodeError, TypeError):
+            pass
+    for key_name in names:
+        _add_marker(directory, key_name)
+    with open(os.path.join(directory, _MIGRATED_MARKER), "a"):
+        pass
+    if names:
+        logger.info("Imported legacy key registry into marker files", extra={"count": len(names)})
+
+
+def _add_marker(directory: str, key_name: str) -> None:
+    fd = os.open(_marker_path(directory, key_name), os.O_WRONLY | os.O_CREAT, 0o600)
+    os.close(fd)
+
+
+def _backend_names() -> Optional[List[str]]:
+    """Return the stored names if the backend can enumerate them (e.g. the vault file)."""
+    backend = _backend()
+    if hasattr(backend, "names"):
+        return [name for name in backend.names(SERVICE_NAME) if name != "_registry"]
+    return None
+
+
 def list_keys() -> Dict[str, bool]:
     """
     List all keys registered in the keychain.
 
-    Note: The OS keyring doesn't provide native list functionality,
-    so we maintain a registry of keys.
+    Note: The OS keyring doesn't provide native list functionality, so each
+    registered key has an empty marker file under $BACKPACK_HOME/registry
+    (default ~/.backpack). Backends that can enumerate their entries, such as
+    the vault file, are listed directly.
 
     Returns:
         A dictionary mapping key names to True (indicating they exist)
@@ -126,14 +601,12 @@ def list_keys() -> Dict[str, bool]:
         KeychainAccessError: If accessing the keychain fails
     """
     try:
-        registry = get_key("_registry")
-        if registry:
-            try:
-                return cast(Dict[str, bool], json.loads(registry))
-            except json.JSONDecodeError:
-                return {}
-        return {}
-    except KeychainAccessError:
+        names = _backend_names()
+        if names is None:
+            directory = _registry_dir()
+            names = [unquote(entry) for entry in os.listdir(directory) if entry != _MIGRATED_MARKER]
+        return {key_name: True for key_name in sorted(names)}
+    except (KeychainAccessError, KeychainStorageError, OSError):
         return {}
 
 
@@ -152,12 +625,27 @@ def register_key(key_name: str) -> None:
         KeychainStorageError: If storing the registry fails
     """
     _validate_key_name(key_name)
+    _update_registry(add=[key_name])
+
+
+def _update_registry(add: List[str]) -> None:
+    """
+    Add key names to the registry.
+
+    Each name is an independent marker file, so concurrent registrations
+    cannot overwrite each other and the cost does not grow with the number
+    of registered keys.
 
+    Raises:
+        KeychainStorageError: If updating the registry fails unexpectedly
+    """
     try:
-        registry = list_keys()
-        registry[key_name] = True
-        keyring.set_password(SERVICE_NAME, "_registry", json.dumps(registry))
-    except (KeychainAccessError, KeychainStorageError):
+        if _backend_names() is not None:
+            return  # the backend lists what it stores
+        directory = _registry_dir()
+        for key_name in add:
+            _add_marker(directory, key_name)
+    except (KeychainAccessError, KeychainStorageError, OSError):
         # Registry failures are non-critical (key itself is already stored)
         pass
     except Exception as e:
@@ -180,9 +668,12 @@ def delete_key(key_name: str) -> None:
     # Deletion is intentionally idempotent:
     # - If the secret doesn't exist in the keychain, we still remove it from the registry.
     # - Tests expect delete_key() to not raise for missing keys.
+    _cache.invalidate(key_name)
     try:
-        keyring.delete_password(SERVICE_NAME, key_name)
-        audit_logger.log_event("delete_key", {"service": SERVICE_NAME, "key_name": key_name})
+        _backend().delete_password(SERVICE_NAME, key_name)
+        _mark_changed()
+        _invalidate_agent([key_name])
+        _audit().log_event("delete_key", {"service": SERVICE_NAME, "key_name": key_name})
     except keyring.errors.PasswordDeleteError:
         pass
     except keyring.errors.KeyringError as e:
@@ -192,8 +683,7 @@ def delete_key(key_name: str) -> None:
 
     # Update registry
     try:
-        registry = list_keys()
-        registry.pop(key_name, None)
-        keyring.set_password(SERVICE_NAME, "_registry", json.dumps(registry))
+        if _backend_names() is None:
+            os.remove(_marker_path(_registry_dir(), key_name))
     except Exception:
         pass
@@ -0,0 +1,606 @@
+"""
+Pre-forked agent launcher (`backpack serve`).
+
+A zygote process that pays the startup costs of `backpack run` once:
+interpreter start, imports of backpack and of configured agent modules,
+agent.lock decryption and keychain lookups. It then accepts run requests on a
+Unix socket and forks a warm child per run, so per-run latency is close to
+the cost of fork().
+
+The protocol is one JSON object per line, as in backpack.agent_client:
+
+    client: {"op": "run", "script": "agent.py", "args": [], "cwd": "...", "env": {...}}
+            (sent with the client's stdin, stdout and stderr attached via SCM_RIGHTS)
+    server: {"ok": true, "pid": 1234, "injected": 3}
+    client: {"op": "signal", "signum": 15}      (forwarded to the child)
+    server: {"ok": true, "exit": 0}
+
+Each child runs with the client's environment plus the injected variables, in
+the client's working directory and on the client's stdio. The exit value uses
+subprocess conventions: the exit status, or -N if the child was killed by
+signal N. The launcher is single-threaded so that forking is safe.
+
+The launcher exits, dropping the credentials it resolved, after
+BACKPACK_LAUNCHER_IDLE_TIMEOUT seconds (default 900) without run requests
+once no agent it started is still running.
+
+POSIX only. Logging in this module NEVER records secret values.
+"""
+
+import array
+import importlib
+import json
+import logging
+import os
+import selectors
+import signal
+import socket
+import stat
+import sys
+import threading
+import time
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple
+
+from .agent_client import peer_uid, read_message
+from .exceptions import LauncherError
+
+logger = logging.getLogger(__name__)
+
+SOCKET_ENV = "BACKPACK_LAUNCHER_SOCK"
+PRELOAD_ENV = "BACKPACK_SERVE_PRELOAD"
+DEFAULT_SOCKET_PATH = os.path.join("~", ".backpack", "launcher.sock")
+IDLE_TIMEOUT_ENV = "BACKPACK_LAUNCHER_IDLE_TIMEOUT"
+DEFAULT_IDLE_TIMEOUT = 900.0
+
+# Signals the client forwards to the agent it started.
+FORWARDED_SIGNALS = ("SIGINT", "SIGTERM", "SIGHUP", "SIGQUIT", "SIGUSR1", "SIGUSR2")
+
+_STDIO_FDS = 3
+_RECV_SIZE = 65536
+
+
+def default_socket_path() -> str:
+    """Return the socket path from BACKPACK_LAUNCHER_SOCK, or ~/.backpack/launcher.sock."""
+    return os.path.expanduser(os.environ.get(SOCKET_ENV) or DEFAULT_SOCKET_PATH)
+
+
+def default_preload() -> List[str]:
+    """Return the modules named in BACKPACK_SERVE_PRELOAD (comma-separated)."""
+    return [name.strip() for name in os.environ.get(PRELOAD_ENV, "").split(",") if name.strip()]
+
+
+def _send_with_fds(sock: socket.socket, data: bytes, fds: List[int]) -> None:
+    """Send data with open file descriptors attached."""
+    sent = sock.sendmsg([data], [(socket.SOL_SOCKET, socket.SCM_RIGHTS, array.array("i", fds))])
+    # sendmsg() may send part of the data; the descriptors travel with the first byte
+    if sent < len(data):
+        sock.sendall(data[sent:])
+
+
+def _recv_with_fds(sock: socket.socket, max_fds: int) -> Tuple[bytes, List[int]]:
+    """Receive data and any file descriptors attached to it."""
+    fds = array.array("i")
+    data, ancdata, _, _ = sock.recvmsg(_RECV_SIZE, socket.CMSG_SPACE(max_fds * fds.itemsize))
+    for level, kind, cdata in ancdata:
+        if level == socket.SOL_SOCKET and kind == socket.SCM_RIGHTS:
+            fds.frombytes(cdata[: len(cdata) - (len(cdata) % fds.itemsize)])
+    return data, list(fds)
+
+
+def _returncode(status: int) -> int:
+    """Convert a waitpid() status to a subprocess-style return code."""
+    if os.WIFSIGNALED(status):
+        return -os.WTERMSIG(status)
+    return os.WEXITSTATUS(status)
+
+
+def _child_signals() -> List[int]:
+    """Signals whose handlers are reset to the default in a forked agent."""
+    names = ("SIGCHLD",) + FORWARDED_SIGNALS
+    return [getattr(signal, name) for name in names if hasattr(signal, name)]
+
+
+def _rebind_stdio() -> None:
+    """Point sys.stdin/stdout/stderr at descriptors 0-2 if they wrap something else."""
+    for fd, name, mode in ((0, "stdin", "r"), (1, "stdout", "w"), (2, "stderr", "w")):
+        stream = getattr(sys, name)
+        try:
+            if stream is not None and stream.fileno() == fd:
+                continue
+        except (AttributeError, OSError, ValueError):
+            pass
+        setattr(sys, name, open(fd, mode, buffering=1 if mode == "w" else -1, closefd=False))
+
+
+class _Client:
+    """State of one client connection."""
+
+    def __init__(self, sock: socket.socket):
+        self.sock = sock
+        self.buffer = bytearray()
+        self.fds: List[int] = []
+        self.pid: Optional[int] = None
+
+    def send(self, response: Dict[str, Any]) -> None:
+        try:
+            self.sock.sendall(json.dumps(response).encode() + b"\n")
+        except OSError:
+            pass
+
+    def close_fds(self) -> None:
+        for fd in self.fds:
+            try:
+                os.close(fd)
+            except OSError:
+                pass
+        self.fds = []
+
+
+class Launcher:
+    """
+    Zygote that forks a pre-warmed child for every agent run.
+    """
+
+    def __init__(
+        self,
+        resolve_env: Callable[[], Dict[str, str]],
+        socket_path: Optional[str] = None,
+        preload: Optional[Iterable[str]] = None,
+        watch_path: Optional[str] = None,
+        idle_timeout: Optional[float] = None,
+    ):
+        """
+        Initialize the launcher.
+
+        Args:
+            resolve_env: Returns the variables to inject (decrypts the lock and
+                looks up keys). Called at startup and whenever watch_path changes.
+            socket_path: Socket to listen on (default: BACKPACK_LAUNCHER_SOCK or ~/.backpack/launcher.sock)
+            preload: Modules to import before forking (default: BACKPACK_SERVE_PRELOAD)
+            watch_path: File whose modification re-runs resolve_env, e.g. agent.lock
+            idle_timeout: Seconds without run requests before the launcher exits
+                (default: BACKPACK_LAUNCHER_IDLE_TIMEOUT or 900; 0 disables)
+        """
+        self.socket_path = os.path.abspath(socket_path or default_socket_path())
+        self.preload = list(default_preload() if preload is None else preload)
+        self.watch_path = watch_path
+        self._resolve_env = resolve_env
+        if idle_timeout is None:
+            try:
+                idle_timeout = float(os.environ.get(IDLE_TIMEOUT_ENV, DEFAULT_IDLE_TIMEOUT))
+            except ValueError:
+                idle_timeout = DEFAULT_IDLE_TIMEOUT
+        self.idle_timeout = idle_timeout
+        self._last_activity = time.monotonic()
+        self._env: Dict[str, str] = {}
+        self._env_stamp: Optional[Tuple[int, int, int]] = None
+        self._resolved = False
+        self._listener: Optional[socket.socket] = None
+        self._selector: Optional[selectors.BaseSelector] = None
+        self._children: Dict[int, Optional[_Client]] = {}  # pid -> client waiting for its exit
+        self._wake_fds: Tuple[int, ...] = ()
+        self._stopped = False
+
+    def preload_modules(self) -> None:
+        """
+        Import the preload modules so every child inherits them.
+
+        Raises:
+            LauncherError: If a module cannot be imported
+        """
+        for name in self.preload:
+            try:
+                importlib.import_module(name)
+            except ImportError as e:
+                raise LauncherError("Cannot preload module", f"{name}: {e}") from e
+        logger.debug("Preloaded modules", extra={"count": len(self.preload)})
+
+    def refresh_env(self) -> Dict[str, str]:
+        """Return the variables to inject, resolving them again if the watched file changed."""
+        stamp = None
+        if self.watch_path:
+            try:
+                st = os.stat(self.watch_path)
+                stamp = (st.st_ino, st.st_size, st.st_mtime_ns)
+            except OSError:
+                stamp = None
+        if not self._resolved or stamp != self._env_stamp:
+            self._env = dict(self._resolve_env())
+            self._env_stamp = stamp
+            self._resolved = True
+            logger.info("Launcher environment resolved", extra={"variables": len(self._env)})
+        return self._env
+
+    def bind(self) -> None:
+        """
+        Create the listening socket, readable and writable by the owner only.
+
+        Raises:
+            LauncherError: If another launcher is already listening on the socket
+        """
+        os.makedirs(os.path.dirname(self.socket_path), mode=0o700, exist_ok=True)
+
+        if os.path.exists(self.socket_path):
+            if not stat.S_ISSOCK(os.lstat(self.socket_path).st_mode):
+                raise LauncherError("Cannot create launcher socket", f"{self.socket_path} exists and is not a socket")
+            with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as probe:
+                try:
+                    probe.connect(self.socket_path)
+                except OSError:
+                    os.remove(self.socket_path)  # stale socket from a launcher that died
+                else:
+                    raise LauncherError("Agent launcher already running", self.socket_path)
+
+        listener = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        old_umask = os.umask(0o177)
+        try:
+            listener.bind(self.socket_path)
+        finally:
+            os.umask(old_umask)
+        os.chmod(self.socket_path, 0o600)
+        listener.listen(64)
+        self._listener = listener
+        logger.info("Agent launcher listening", extra={"path": self.socket_path})
+
+    def serve_forever(self) -> None:
+        """
+        Serve run requests until shutdown() is called, SIGTERM is received or
+        the idle timeout expires.
+
+        Must run on the main thread of a process with no other threads, since
+        children are forked from it.
+        """
+        self.preload_modules()
+        self.refresh_env()
+        if self._listener is None:
+            self.bind()
+        assert self._listener is not None
+
+        selector = selectors.DefaultSelector()
+        self._selector = selector
+        selector.register(self._listener, selectors.EVENT_READ)
+
+        # SIGCHLD wakes the selector through a self-pipe so exits are reported at once
+        wake_r, wake_w = os.pipe()
+        self._wake_fds = (wake_r, wake_w)
+        os.set_blocking(wake_r, False)
+        os.set_blocking(wake_w, False)
+        selector.register(wake_r, selectors.EVENT_READ)
+        on_main = threading.current_thread() is threading.main_thread()
+        if on_main:
+            old_wakeup = signal.set_wakeup_fd(wake_w)
+            old_chld = signal.signal(signal.SIGCHLD, lambda signum, frame: None)
+            old_term = signal.signal(signal.SIGTERM, lambda signum, frame: self.shutdown())
+
+        try:
+            while not self._stopped:
+                timeout = None if on_main else 0.2
+                # Running agents keep the launcher up; their exits wake the selector
+                if self.idle_timeout > 0 and not self._children:
+                    idle_left = self.idle_timeout - (time.monotonic() - self._last_activity)
+                    if idle_left <= 0:
+                        logger.info("Agent launcher idle timeout reached")
+                        break
+                    timeout = idle_left if timeout is None else min(timeout, idle_left)
+                for key, _ in selector.select(timeout=timeout):
+                    if key.fileobj is self._listener:
+                        self._accept()
+                    elif key.fileobj == wake_r:
+                        try:
+                            os.read(wake_r, 4096)
+                        except BlockingIOError:
+                            pass
+                    else:
+                        self._on_readable(key.data)
+                self._reap()
+        finally:
+            if on_main:
+                signal.set_wakeup_fd(old_wakeup)
+                signal.signal(signal.SIGCHLD, old_chld)
+                signal.signal(signal.SIGTERM, old_term)
+            self._close_sockets()
+            os.close(wake_r)
+            os.close(wake_w)
+            self._wake_fds = ()
+            self._env = {}
+            self._resolved = False
+            try:
+                os.remove(self.socket_path)
+            except FileNotFoundError:
+                pass
+            logger.info("Agent launcher stopped", extra={"path": self.socket_path})
+
+    def shutdown(self) -> None:
+        """Stop serve_forever() after the current iteration. Running agents are left alone."""
+        self._stopped = True
+
+    def _close_sockets(self) -> None:
+        assert self._selector is not None
+        for key in list(self._selector.get_map().values()):
+            if isinstance(key.data, _Client):
+                key.data.close_fds()
+                key.data.sock.close()
+        self._selector.close()
+        if self._listener is not None:
+            self._listener.close()
+            self._listener = None
+
+    def _accept(self) -> None:
+        assert self._listener is not None and self._selector is not None
+        try:
+            sock, _ = self._listener.accept()
+        except OSError:
+            return
+        uid = peer_uid(sock)
+        if uid is not None and uid != os.getuid():
+            logger.warning("Rejected launcher connection from another user", extra={"uid": uid})
+            sock.close()
+            return
+        client = _Client(sock)
+        self._selector.register(sock, selectors.EVENT_READ, client)
+
+    def _drop(self, client: _Client) -> None:
+        assert self._selector is not None
+        self._selector.unregister(client.sock)
+        client.close_fds()
+        client.sock.close()
+
+    def _on_readable(self, client: _Client) -> None:
+        try:
+            data, fds = _recv_with_fds(client.sock, _STDIO_FDS)
+        except OSError:
+            data, fds = b"", []
+        client.fds.extend(fds)
+
+        if not data:
+            # Client went away; an agent it started should not outlive it unnoticed
+            if client.pid is not None:
+                self._kill(client.pid, signal.SIGTERM)
+                self._children[client.pid] = None
+            self._drop(client)
+            return
+
+        client.buffer.extend(data)
+        while b"\n" in client.buffer:
+            end = client.buffer.index(b"\n")
+            line = bytes(client.buffer[:end])
+            del client.buffer[: end + 1]
+            try:
+                message = json.loads(line)
+                if not isinstance(message, dict):
+                    raise ValueError("Message must be a JSON object")
+            except ValueError as e:
+                client.send({"ok": False, "error": "invalid_request", "message": str(e)})
+                self._drop(client)
+                return
+            if not self._handle(client, message):
+                self._drop(client)
+                return
+
+    def _handle(self, client: _Client, message: Dict[str, Any]) -> bool:
+        """Handle one request. Returns False if the connection should be closed."""
+        op = message.get("op")
+        if op == "ping":
+            client.send({"ok": True, "result": "pong"})
+            return True
+        if op == "signal":
+            signum = message.get("signum")
+            if client.pid is None or not isinstance(signum, int):
+                client.send({"ok": False, "error": "invalid_request", "message": "No running agent or bad signal"})
+                return True
+            self._kill(client.pid, signum)
+            return True
+        if op == "run":
+            if client.pid is not None:
+                client.send({"ok": False, "error": "invalid_request", "message": "Agent already started"})
+                return True
+            return self._spawn(client, message)
+        client.send({"ok": False, "error": "unknown_op", "message": f"Unknown operation: {op}"})
+        return True
+
+    def _spawn(self, client: _Client, message: Dict[str, Any]) -> bool:
+        script = message.get("script")
+        args = message.get("args", [])
+        cwd = message.get("cwd")
+        env = message.get("env")
+        if (
+            not isinstance(script, str)
+            or not isinstance(cwd, str)
+            or not isinstance(args, list)
+            or not all(isinstance(a, str) for a in args)
+            or not isinstance(env, dict)
+            or len(client.fds) != _STDIO_FDS
+        ):
+            client.send({"ok": False, "error": "invalid_request", "message": "Malformed run request"})
+            return False
+
+        self._last_activity = time.monotonic()
+        try:
+            env_vars = self.refresh_env()
+        except Exception as e:
+            logger.error("Launcher failed to resolve environment", extra={"type": type(e).__name__})
+            client.send({"ok": False, "error": "resolve_failed", "message": str(e)})
+            return False
+
+        sys.stdout.flush()
+        sys.stderr.flush()
+        # Signals forwarded right after the fork must not reach the launcher's handlers in the child
+        blocked = signal.pthread_sigmask(signal.SIG_BLOCK, _child_signals())
+        pid = os.fork()
+        if pid == 0:
+            self._run_child(client, script, args, cwd, env, env_vars, blocked)  # never returns
+        signal.pthread_sigmask(signal.SIG_SETMASK, blocked)
+
+        client.close_fds()
+        client.pid = pid
+        self._children[pid] = client
+        client.send({"ok": True, "pid": pid, "injected": len(env_vars)})
+        logger.debug("Launched agent", extra={"pid": pid})
+        return True
+
+    def _run_child(
+        self,
+        client: _Client,
+        script: str,
+        args: List[str],
+        cwd: str,
+        env: Dict[str, str],
+        env_vars: Dict[str, str],
+        sigmask: Iterable[int],
+    ) -> None:
+        """Become the agent in a forked child, then exit with its status."""
+        code = 1
+        try:
+            stdio = client.fds
+            client.fds = []
+            self._close_sockets()
+            if self._wake_fds:
+                signal.set_wakeup_fd(-1)
+                for fd in self._wake_fds:
+                    os.close(fd)
+            for target, fd in enumerate(stdio):
+                os.dup2(fd, target)
+            for fd in set(stdio):
+                if fd >= _STDIO_FDS:
+                    os.close(fd)
+            _rebind_stdio()
+            for signum in _child_signals():
+                signal.signal(signum, signal.SIG_DFL)
+            signal.signal(signal.SIGINT, signal.default_int_handler)
+            signal.pthread_sigmask(signal.SIG_SETMASK, sigmask)
+            os.chdir(cwd)
+            os.environ.clear()
+            os.environ.update({str(k): str(v) for k, v in env.items()})
+
+            from .script_runner import run_script
+
+            code = run_script(script, env_vars, args)
+        except BaseException:
+            import traceback
+
+            traceback.print_exc()
+        finally:
+            try:
+                sys.stdout.flush()
+                sys.stderr.flush()
+            finally:
+                if code < 0:
+                    # Die from the same signal, as the interpreter would
+                    signal.signal(-code, signal.SIG_DFL)
+                    os.kill(os.getpid(), -code)
+                os._exit(code & 0xFF)
+
+    def _kill(self, pid: int, signum: int) -> None:
+        try:
+            os.kill(pid, signum)
+        except (OSError, ValueError):
+            pass
+
+    def _reap(self) -> None:
+        while self._children:
+            try:
+                pid, status = os.waitpid(-1, os.WNOHANG)
+            except ChildProcessError:
+                return
+            if pid == 0:
+                return
+            client = self._children.pop(pid, None)
+            if client is not None:
+                client.send({"ok": True, "exit": _returncode(status)})
+                self._drop(client)
+
+
+def launch(script_path: str, args: Iterable[str] = (), socket_path: Optional[str] = None,
+           on_started: Optional[Callable[[Dict[str, Any]], None]] = None) -> int:
+    """
+    Run an agent through a running launcher and wait for it to exit.
+
+    The agent gets this process's working directory, environment and stdio.
+    SIGINT, SIGTERM, SIGHUP, SIGQUIT, SIGUSR1 and SIGUSR2 received while it
+    runs are forwarded to it (when called from the main thread).
+
+    Args:
+        script_path: Path to the agent script
+        args: Command-line arguments for the script
+        socket_path: Launcher socket (default: BACKPACK_LAUNCHER_SOCK or ~/.backpack/launcher.sock)
+        on_started: Called with the launcher's response once the agent is running
+
+    Returns:
+        The agent's exit status, or -N if it was killed by signal N
+
+    Raises:
+        LauncherError: If the launcher cannot be reached or refuses the run
+    """
+    path = os.path.abspath(socket_path or default_socket_path())
+    request = {
+        "op": "run",
+        "script": script_path,
+        "args": list(args),
+        "cwd": os.getcwd(),
+        "env": dict(os.environ),
+    }
+
+    with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as sock:
+        buffer = bytearray()
+        try:
+            sock.connect(path)
+            _send_with_fds(sock, json.dumps(request).encode() + b"\n", list(range(_STDIO_FDS)))
+            response = read_message(sock, buffer)
+        except (OSError, ValueError) as e:
+            raise LauncherError("Agent launcher unavailable", str(e)) from e
+        if response is None:
+            raise LauncherError("Agent launcher closed the connection")
+        if not response.get("ok"):
+            raise LauncherError("Agent launcher refused the run", response.get("message"))
+        if on_started is not None:
+            on_started(response)
+
+        def forward(signum: int, frame: Any) -> None:
+            try:
+                sock.sendall(json.dumps({"op": "signal", "signum": signum}).encode() + b"\n")
+            except OSError:
+                pass
+
+        previous = {}
+        if threading.current_thread() is threading.main_thread():
+            for name in FORWARDED_SIGNALS:
+                signum = getattr(signal, name, None)
+                if signum is not None:
+                    previous[signum] = signal.signal(signum, forward)
+        try:
+            while True:
+                try:
+                    message = read_message(sock, buffer)
+                except (OSError, ValueError) as e:
+                    raise LauncherError("Lost connection to the agent launcher", str(e)) from e
+                if message is None:
+                    raise LauncherError("Agent launcher closed the connection")
+                if "exit" in message:
+                    return int(message["exit"])
+        finally:
+            for signum, handler in previous.items():
+                signal.signal(signum, handler)
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    """
+    Minimal launcher client: `python -m backpack.launcher script.py [args...]`.
+
+    Avoids importing click and the rest of the CLI, for callers that start
+    agents at a high rate.
+    """
+    argv = sys.argv[1:] if argv is None else argv
+    if not argv:
+        print("usage: python -m backpack.launcher SCRIPT [ARGS...]", file=sys.stderr)
+        return 2
+    try:
+        return launch(argv[0], argv[1:])
+    except LauncherError as e:
+        print(f"Error: {e.message}", file=sys.stderr)
+        if e.details:
+            print(f"  {e.details}", file=sys.stderr)
+        return 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
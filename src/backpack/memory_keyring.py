@@ -0,0 +1,81 @@
+"""
+In-memory keyring backend for tests and benchmarks.
+
+MemoryKeyring keeps entries in a process-local dictionary and can add an
+artificial delay to every call to imitate a slow OS keyring (D-Bus Secret
+Service, macOS Keychain prompts). Select it for backpack.keychain with
+BACKPACK_KEYCHAIN_BACKEND=memory or keychain.set_backend(MemoryKeyring(...)).
+
+It deliberately does not subclass keyring.backend.KeyringBackend: keyring
+would then consider it when picking a default backend, and could silently
+store real credentials in memory on hosts without a keyring service.
+
+Nothing is persisted. Do not use it to store real credentials.
+"""
+
+import os
+import threading
+import time
+from typing import Dict, Optional, Tuple
+
+import keyring.errors
+
+LATENCY_ENV = "BACKPACK_MEMORY_KEYRING_LATENCY"
+
+
+class MemoryKeyring:
+    """
+    Thread-safe in-memory keyring with optional per-call latency.
+
+    Like the OS keyring it cannot enumerate its entries, so backpack.keychain
+    keeps its key registry on disk exactly as it does for the real keyring.
+    """
+
+    def __init__(self, latency: Optional[float] = None):
+        """
+        Initialize an empty keyring.
+
+        Args:
+            latency: Seconds to sleep in every get/set/delete call
+                (default: BACKPACK_MEMORY_KEYRING_LATENCY or 0)
+        """
+        if latency is None:
+            try:
+                latency = float(os.environ.get(LATENCY_ENV, 0))
+            except ValueError:
+                latency = 0.0
+        self.latency = max(0.0, latency)
+        self.calls = 0
+        self._entries: Dict[Tuple[str, str], str] = {}
+        self._lock = threading.Lock()
+
+    def _delay(self) -> None:
+        with self._lock:
+            self.calls += 1
+        if self.latency:
+            time.sleep(self.latency)
+
+    def get_password(self, service: str, username: str) -> Optional[str]:
+        """Return the stored value, or None if there is no such entry."""
+        self._delay()
+        with self._lock:
+            return self._entries.get((service, username))
+
+    def set_password(self, service: str, username: str, password: str) -> None:
+        """Store a value."""
+        self._delay()
+        with self._lock:
+            self._entries[(service, username)] = password
+
+    def delete_password(self, service: str, username: str) -> None:
+        """Delete an entry."""
+        self._delay()
+        with self._lock:
+            if self._entries.pop((service, username), None) is None:
+                raise keyring.errors.PasswordDeleteError(f"No such entry: {service}/{username}")
+
+    def clear(self) -> None:
+        """Drop every entry and reset the call counter."""
+        with self._lock:
+            self._entries.clear()
+            self.calls = 0
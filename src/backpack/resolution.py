@@ -0,0 +1,187 @@
+"""
+Cached credential resolution plans for `backpack run`.
+
+For every key an agent needs, `backpack run` checks the environment, then
+agent.lock, then the vault, and asks before injecting it. A plan remembers,
+per user and per (lock, script) pair, which source satisfied each key and
+which keys the user allowed. Later runs of the same agent then skip vault lookups for keys
+that were not in the vault, and do not ask again for keys already allowed
+from the same source.
+
+Plans live in $BACKPACK_HOME/plans (default ~/.backpack/plans), one file per
+lock and script. They hold key names and sources only, never values. A plan
+is checked against three fingerprints:
+
+- the credentials layer: key names and whether each value is a placeholder.
+  If it changes, the whole plan, approvals included, is discarded.
+- the script's contents. If they change, approvals are discarded.
+- the vault state (backpack.keychain.vault_state()). If it changes, the
+  recorded sources and the approvals of vault keys are discarded.
+
+Set BACKPACK_RESOLUTION_CACHE=0 to disable plans.
+"""
+
+import hashlib
+import json
+import logging
+import os
+import tempfile
+from typing import Any, Dict, Optional
+
+from .agent_lock import is_placeholder
+from .keychain import DEFAULT_HOME, HOME_ENV, vault_state
+
+logger = logging.getLogger(__name__)
+
+CACHE_ENV = "BACKPACK_RESOLUTION_CACHE"
+PLAN_VERSION = 2
+
+# Sources a key can be resolved from
+SOURCES = ("environment", "agent.lock", "vault", "missing")
+
+
+def enabled() -> bool:
+    """Return False if BACKPACK_RESOLUTION_CACHE disables plans."""
+    return os.environ.get(CACHE_ENV, "1").strip().lower() not in ("0", "false", "no", "off")
+
+
+def credentials_fingerprint(credentials: Dict[str, Any]) -> str:
+    """
+    Hash the shape of a credentials layer.
+
+    Embedded values are reduced to "not a placeholder", so no digest of a
+    secret is written to disk.
+    """
+    shape = sorted((key_name, is_placeholder(value)) for key_name, value in credentials.items())
+    return hashlib.sha256(json.dumps(shape).encode()).hexdigest()
+
+
+def script_fingerprint(script_path: Optional[str]) -> str:
+    """Hash a script's contents ("" if there is no script or it cannot be read)."""
+    if script_path is None:
+        return ""
+    digest = hashlib.sha256()
+    try:
+        with open(script_path, "rb") as f:
+            for chunk in iter(lambda: f.read(65536), b""):
+                digest.update(chunk)
+    except OSError:
+        return ""
+    return digest.hexdigest()
+
+
+def plan_path(lock_path: str, script_path: Optional[str] = None) -> str:
+    """Return the plan file for a lock and the script it is run with."""
+    target = os.path.realpath(lock_path)
+    if script_path is not None:
+        target += "\0" + os.path.realpath(script_path)
+    plan_id = hashlib.sha256(target.encode()).hexdigest()
+    return os.path.join(os.path.expanduser(os.environ.get(HOME_ENV) or DEFAULT_HOME), "plans", f"{plan_id}.json")
+
+
+class ResolutionPlan:
+    """Sources and approvals remembered for one agent.lock."""
+
+    def __init__(self, path: Optional[str], credentials: str, vault: str, script: str = ""):
+        """
+        Start an empty plan.
+
+        Args:
+            path: Plan file, or None for a plan that is never saved
+            credentials: credentials_fingerprint() of the lock
+            vault: Vault state the sources are valid for
+            script: script_fingerprint() of the script the approvals are for
+        """
+        self.path = path
+        self.credentials = credentials
+        self.vault = vault
+        self.script = script
+        self.sources: Dict[str, str] = {}
+        self.approved: Dict[str, str] = {}
+        self._dirty = False
+
+    @classmethod
+    def load(cls, lock_path: str, credentials: Dict[str, Any], script_path: Optional[str] = None) -> "ResolutionPlan":
+        """
+        Return the plan saved for a lock and script, keeping only what is still valid.
+
+        Args:
+            lock_path: The agent.lock the credentials came from
+            credentials: Its decrypted credentials layer
+            script_path: The script the credentials are injected into, if known
+
+        Returns:
+            The plan; empty if none was saved, it is stale, or plans are disabled
+        """
+        fingerprint = credentials_fingerprint(credentials)
+        if not enabled():
+            return cls(None, fingerprint, "")
+        plan = cls(plan_path(lock_path, script_path), fingerprint, vault_state(), script_fingerprint(script_path))
+        try:
+            with open(plan.path) as f:  # type: ignore[arg-type]
+                saved = json.load(f)
+        except (OSError, ValueError):
+            return plan
+        if not isinstance(saved, dict) or saved.get("version") != PLAN_VERSION:
+            return plan
+        if saved.get("credentials") != plan.credentials:
+            logger.debug("Credentials layer changed; discarding resolution plan", extra={"path": lock_path})
+            return plan
+        if saved.get("script") == plan.script:
+            plan.approved = {k: v for k, v in (saved.get("approved") or {}).items() if v in SOURCES}
+        else:
+            logger.debug("Script changed; discarding approvals", extra={"path": lock_path})
+        if saved.get("vault") == plan.vault:
+            plan.sources = {k: v for k, v in (saved.get("sources") or {}).items() if v in SOURCES}
+        else:
+            # A key stored since the approval may be a different secret
+            plan.approved = {k: v for k, v in plan.approved.items() if v != "vault"}
+        return plan
+
+    def source(self, key_name: str) -> Optional[str]:
+        """Return where the key was found last time, if the vault has not changed since."""
+        return self.sources.get(key_name)
+
+    def record(self, key_name: str, source: str) -> None:
+        """Remember where a key was found."""
+        if self.sources.get(key_name) != source:
+            self.sources[key_name] = source
+            self._dirty = True
+
+    def is_approved(self, key_name: str, source: str) -> bool:
+        """Return True if the user already allowed this key from this source."""
+        return self.approved.get(key_name) == source
+
+    def approve(self, key_name: str, source: str) -> None:
+        """Remember that the user allowed a key from a source."""
+        if self.approved.get(key_name) != source:
+            self.approved[key_name] = source
+            self._dirty = True
+
+    def save(self) -> None:
+        """Write the plan if it changed (best effort; failures are only logged)."""
+        if self.path is None or not self._dirty:
+            return
+        directory = os.path.dirname(self.path)
+        data = {
+            "version": PLAN_VERSION,
+            "credentials": self.credentials,
+            "vault": self.vault,
+            "script": self.script,
+            "sources": self.sources,
+            "approved": self.approved,
+        }
+        try:
+            os.makedirs(directory, mode=0o700, exist_ok=True)
+            fd, tmp_path = tempfile.mkstemp(dir=directory, prefix=".plan-")
+            try:
+                with os.fdopen(fd, "w") as f:
+                    json.dump(data, f)
+                os.replace(tmp_path, self.path)
+            except BaseException:
+                os.unlink(tmp_path)
+                raise
+        except OSError as e:
+            logger.warning("Could not save resolution plan", extra={"error": str(e)})
+            return
+        self._dirty = False
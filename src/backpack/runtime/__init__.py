@@ -0,0 +1,287 @@
+"""
+Runtime channel between `backpack run` and the agent it starts.
+
+`backpack run` has already decrypted agent.lock by the time the agent starts.
+Instead of making the agent build its own AgentLock and run the key
+derivation again, the parent writes the decrypted personality and memory
+layers to a pipe the child inherits, and puts only the descriptor number in
+BACKPACK_RUNTIME_FD. The plaintext never touches disk or the environment.
+
+Agent side:
+
+    from backpack import runtime
+
+    state = runtime.load()          # {"personality": ..., "memory": ..., "lock_path": ...}
+    prompt = runtime.personality()["system_prompt"]
+
+Outside `backpack run` (no channel), load() falls back to decrypting
+agent.lock in the working directory.
+
+The parent side is RuntimeHandoff. Credentials are not sent over the channel;
+they are still injected as environment variables.
+
+Memory changes go back to the parent through backpack.runtime.memory.
+"""
+
+import json
+import logging
+import os
+import threading
+from typing import Any, Dict, Optional, Tuple
+
+from ..exceptions import RuntimeChannelError
+
+logger = logging.getLogger(__name__)
+
+RUNTIME_FD_ENV = "BACKPACK_RUNTIME_FD"
+PROTOCOL_VERSION = 1
+
+# Largest handoff accepted by the child.
+MAX_PAYLOAD_SIZE = 64 * 1024 * 1024
+
+_state: Optional[Dict[str, Any]] = None
+_state_lock = threading.Lock()
+
+
+def available() -> bool:
+    """Return True if this process was started with a runtime channel."""
+    return _state is not None or bool(os.environ.get(RUNTIME_FD_ENV))
+
+
+def _read_channel(fd: int) -> Dict[str, Any]:
+    chunks = []
+    size = 0
+    try:
+        with os.fdopen(fd, "rb") as channel:
+            while True:
+                chunk = channel.read(65536)
+                if not chunk:
+                    break
+                size += len(chunk)
+                if size > MAX_PAYLOAD_SIZE:
+                    raise RuntimeChannelError("Runtime handoff too large", f"More than {MAX_PAYLOAD_SIZE} bytes")
+                chunks.append(chunk)
+    except OSError as e:
+        raise RuntimeChannelError("Cannot read runtime channel", str(e)) from e
+
+    try:
+        state = json.loads(b"".join(chunks))
+    except ValueError as e:
+        raise RuntimeChannelError("Invalid runtime handoff", str(e)) from e
+    if not isinstance(state, dict) or state.get("version") != PROTOCOL_VERSION:
+        raise RuntimeChannelError("Unsupported runtime handoff", f"Expected protocol version {PROTOCOL_VERSION}")
+    return state
+
+
+def load(fallback_lock: Optional[str] = "agent.lock") -> Optional[Dict[str, Any]]:
+    """
+    Return the agent's decrypted personality and memory.
+
+    The channel is read once per process; later calls return the same state.
+    BACKPACK_RUNTIME_FD is removed from the environment after reading so
+    processes the agent starts do not try to reuse the descriptor.
+
+    Args:
+        fallback_lock: agent.lock to decrypt when there is no runtime channel,
+            or None to return None instead
+
+    Returns:
+        {"personality": dict, "memory": dict, "lock_path": str or None},
+        or None if there is no channel and no readable fallback lock
+
+    Raises:
+        RuntimeChannelError: If the channel exists but cannot be read
+    """
+    global _state
+    with _state_lock:
+        if _state is not None:
+            return _state
+
+        fd_text = os.environ.get(RUNTIME_FD_ENV)
+        if fd_text:
+            try:
+                fd = int(fd_text)
+            except ValueError:
+                raise RuntimeChannelError("Invalid runtime channel", f"{RUNTIME_FD_ENV}={fd_text!r}") from None
+            state = _read_channel(fd)
+            os.environ.pop(RUNTIME_FD_ENV, None)
+            _state = {
+                "personality": state.get("personality") or {},
+                "memory": state.get("memory") or {},
+                "lock_path": state.get("lock_path"),
+            }
+            logger.debug("Loaded agent state from runtime channel")
+            return _state
+
+    if fallback_lock is None:
+        return None
+
+    # Not started by `backpack run`: decrypt the lock ourselves
+    from ..agent_lock import AgentLock
+
+    agent_data = AgentLock(fallback_lock).read()
+    if agent_data is None:
+        return None
+    with _state_lock:
+        if _state is None:
+            _state = {
+                "personality": agent_data.get("personality") or {},
+                "memory": agent_data.get("memory") or {},
+                "lock_path": os.path.abspath(fallback_lock),
+            }
+        return _state
+
+
+def personality() -> Dict[str, Any]:
+    """Return the personality layer ({} if no state is available)."""
+    state = load()
+    return dict(state["personality"]) if state else {}
+
+
+def initial_memory() -> Dict[str, Any]:
+    """Return a copy of the memory layer as it was when the agent started ({} if unavailable)."""
+    state = load()
+    return json.loads(json.dumps(state["memory"])) if state else {}
+
+
+def _reset() -> None:
+    """Forget loaded state (for tests)."""
+    global _state
+    with _state_lock:
+        _state = None
+
+
+class RuntimeHandoff:
+    """
+    Parent side of the runtime channel: a pipe carrying the decrypted layers.
+
+    Usage with a child process:
+
+        handoff = RuntimeHandoff(agent_data, lock_path)
+        env.update(handoff.env)
+        handoff.start()
+        subprocess.run(cmd, env=env, pass_fds=handoff.pass_fds)
+        handoff.close()
+    """
+
+    def __init__(self, agent_data: Dict[str, Any], lock_path: Optional[str] = None):
+        """
+        Prepare the channel.
+
+        Args:
+            agent_data: Decrypted agent.lock layers (credentials are not sent)
+            lock_path: Absolute path of the agent.lock the data came from
+        """
+        self.payload = json.dumps({
+            "version": PROTOCOL_VERSION,
+            "lock_path": lock_path,
+            "personality": agent_data.get("personality") or {},
+            "memory": agent_data.get("memory") or {},
+        }).encode()
+        read_fd, write_fd = os.pipe()
+        self._read_fd: Optional[int] = read_fd
+        self._write_fd: Optional[int] = write_fd
+        self._writer: Optional[threading.Thread] = None
+
+    @property
+    def env(self) -> Dict[str, str]:
+        """Variables telling the child where to read its state."""
+        return {RUNTIME_FD_ENV: str(self._read_fd)}
+
+    @property
+    def pass_fds(self) -> Tuple[int, ...]:
+        """Descriptors the child must inherit."""
+        return (self._read_fd,)
+
+    def start(self) -> None:
+        """
+        Write the payload from a background thread.
+
+        The write end is closed when the payload is written, or when the child
+        goes away without reading it.
+        """
+        self._writer = threading.Thread(target=self._write_all, name="backpack-runtime-handoff", daemon=True)
+        self._writer.start()
+
+    def write_now(self) -> bool:
+        """
+        Write the whole payload into the pipe buffer without blocking, for exec().
+
+        Makes the read end inheritable across exec. On Linux the pipe buffer
+        is enlarged when needed.
+
+        Returns:
+            False if the payload does not fit; the channel is then closed and
+            should not be offered to the child
+        """
+        capacity = self._pipe_capacity(len(self.payload))
+        if capacity is not None and len(self.payload) > capacity:
+            self.close()
+            return False
+        os.set_blocking(self._write_fd, False)
+        try:
+            self._write_all()
+        except BlockingIOError:
+            self.close()
+            return False
+        os.set_inheritable(self._read_fd, True)
+        return True
+
+    def install(self) -> None:
+        """
+        Hand the state to an agent running in this interpreter (--in-process).
+
+        load() then returns it directly, and the pipe is closed unused.
+        """
+        global _state
+        state = json.loads(self.payload)
+        with _state_lock:
+            _state = {key: state[key] for key in ("personality", "memory", "lock_path")}
+        self.close()
+
+    def close(self) -> None:
+        """Close the parent's descriptors. Call once the child has started (or exited)."""
+        read_fd, self._read_fd = self._read_fd, None
+        if read_fd is not None:
+            os.close(read_fd)
+        if self._writer is not None:
+            # The writer owns the write end; with the read end gone it fails
+            # with EPIPE if the child left data unread
+            self._writer.join()
+            return
+        write_fd, self._write_fd = self._write_fd, None
+        if write_fd is not None:
+            os.close(write_fd)
+
+    def _write_all(self) -> None:
+        fd = self._write_fd
+        if fd is None:
+            return
+        view = memoryview(self.payload)
+        try:
+            while view:
+                written = os.write(fd, view)
+                view = view[written:]
+        except BrokenPipeError:
+            logger.debug("Agent exited without reading its runtime state")
+        finally:
+            self._write_fd = None
+            os.close(fd)
+
+    def _pipe_capacity(self, wanted: int) -> Optional[int]:
+        """Return the pipe buffer size, growing it to `wanted` where the OS allows."""
+        try:
+            import fcntl
+        except ImportError:
+            return None
+        get_size = getattr(fcntl, "F_GETPIPE_SZ", None)
+        set_size = getattr(fcntl, "F_SETPIPE_SZ", None)
+        if get_size is None or set_size is None:
+            return None
+        size = fcntl.fcntl(self._write_fd, get_size)
+        if wanted > size:
+            try:
+                size = fcntl.fcntl(self._write_fd, set_size, wanted)
+            except OSError:
+                pass
+        return size
@@ -0,0 +1,318 @@
+"""
+Memory write-back from the agent to `backpack run`.
+
+The agent records changes with set() and delete() and sends them with
+commit(). Under `backpack run` they go as deltas over a pipe (its descriptor
+is in BACKPACK_MEMORY_FD) to the parent, which already holds the master key.
+The parent merges the deltas and writes agent.lock once per checkpoint, and
+once more at exit if anything arrived after the last checkpoint. The agent
+never re-encrypts the lock itself.
+
+    from backpack.runtime import memory
+
+    memory.set("run_count", memory.get("run_count", 0) + 1)
+    memory.commit()
+
+Changes not yet committed are sent when the agent exits. Without a channel
+(the agent was run directly, or with --exec or --in-process), commit() merges
+the changes into agent.lock itself.
+
+The parent side is MemoryWriteBack.
+"""
+
+import atexit
+import json
+import logging
+import os
+import threading
+from typing import TYPE_CHECKING, Any, Dict, List, Optional, Tuple
+
+from ..exceptions import BackpackError, RuntimeChannelError, ValidationError
+from . import load
+
+if TYPE_CHECKING:
+    from ..agent_lock import AgentLock
+
+logger = logging.getLogger(__name__)
+
+MEMORY_FD_ENV = "BACKPACK_MEMORY_FD"
+
+# Seconds the parent waits for the pipe to drain after the agent has exited
+DRAIN_TIMEOUT = 5.0
+
+_DELETED = object()
+
+_lock = threading.RLock()
+_view: Optional[Dict[str, Any]] = None
+_pending: Dict[str, Any] = {}
+_channel_fd: Optional[int] = None
+_channel_opened = False
+_atexit_registered = False
+
+
+def _current() -> Dict[str, Any]:
+    global _view, _atexit_registered
+    if _view is None:
+        state = load()
+        _view = json.loads(json.dumps(state["memory"])) if state else {}
+    if not _atexit_registered:
+        atexit.register(_flush_at_exit)
+        _atexit_registered = True
+    return _view
+
+
+def get(key: str, default: Any = None) -> Any:
+    """Return a memory value, including changes not yet committed."""
+    with _lock:
+        return _current().get(key, default)
+
+
+def set(key: str, value: Any) -> None:
+    """
+    Set a memory value. It is saved by the next commit() or at exit.
+
+    Raises:
+        ValidationError: If value cannot be stored as JSON
+    """
+    try:
+        value = json.loads(json.dumps(value))
+    except (TypeError, ValueError) as e:
+        raise ValidationError("Memory values must be JSON-serializable", f"{key}: {e}") from e
+    with _lock:
+        _current()[key] = value
+        _pending[key] = value
+
+
+def delete(key: str) -> None:
+    """Remove a memory value. It is removed by the next commit() or at exit."""
+    with _lock:
+        _current().pop(key, None)
+        _pending[key] = _DELETED
+
+
+def commit() -> None:
+    """
+    Save the changes made since the last commit.
+
+    Raises:
+        RuntimeChannelError: If the parent is no longer reading the channel
+        AgentLockWriteError: If there is no channel and agent.lock cannot be written
+    """
+    _flush(checkpoint=True)
+
+
+def _split(changes: Dict[str, Any]) -> Tuple[Dict[str, Any], List[str]]:
+    updates = {key: value for key, value in changes.items() if value is not _DELETED}
+    removed = [key for key, value in changes.items() if value is _DELETED]
+    return updates, removed
+
+
+def _open_channel() -> Optional[int]:
+    global _channel_fd, _channel_opened
+    if not _channel_opened:
+        _channel_opened = True
+        fd_text = os.environ.pop(MEMORY_FD_ENV, None)
+        if fd_text:
+            try:
+                _channel_fd = int(fd_text)
+                # Processes the agent starts must not hold the parent's pipe open
+                os.set_inheritable(_channel_fd, False)
+            except (ValueError, OSError) as e:
+                raise RuntimeChannelError("Invalid memory channel", f"{MEMORY_FD_ENV}={fd_text!r}") from e
+    return _channel_fd
+
+
+def _flush(checkpoint: bool) -> None:
+    with _lock:
+        fd = _open_channel()
+        if not _pending:
+            return
+        updates, removed = _split(_pending)
+
+        if fd is None:
+            state = load()
+            from ..agent_lock import AgentLock
+
+            AgentLock((state or {}).get("lock_path") or "agent.lock").merge_memory(updates, removed)
+            _pending.clear()
+            return
+
+        message = json.dumps({"set": updates, "delete": removed, "checkpoint": checkpoint}).encode() + b"\n"
+        view = memoryview(message)
+        try:
+            while view:
+                view = view[os.write(fd, view):]
+        except OSError as e:
+            raise RuntimeChannelError("Memory channel closed", str(e)) from e
+        _pending.clear()
+
+
+def _flush_at_exit() -> None:
+    try:
+        _flush(checkpoint=False)
+    except Exception as e:
+        logger.warning("Unsaved agent memory changes were lost", extra={"error": str(e)})
+
+
+def _reset() -> None:
+    """Forget local state (for tests)."""
+    global _view, _channel_fd, _channel_opened
+    with _lock:
+        _view = None
+        _pending.clear()
+        _channel_fd = None
+        _channel_opened = False
+
+
+class MemoryWriteBack:
+    """
+    Parent side of the memory channel: merges the agent's deltas into agent.lock.
+
+    Usage with a child process:
+
+        write_back = MemoryWriteBack(agent_lock)
+        env.update(write_back.env)
+        write_back.start()
+        subprocess.run(cmd, env=env, pass_fds=write_back.pass_fds)
+        write_back.close()
+    """
+
+    def __init__(self, agent_lock: "AgentLock"):
+        """
+        Prepare the channel.
+
+        Args:
+            agent_lock: The lock the agent's memory is saved to
+        """
+        self.agent_lock = agent_lock
+        self.saves = 0
+        read_fd, write_fd = os.pipe()
+        self._read_fd: Optional[int] = read_fd
+        self._write_fd: Optional[int] = write_fd
+        self._changes: Dict[str, Any] = {}
+        self._changes_lock = threading.Lock()
+        # Keeps a save of older changes from landing after one of newer changes
+        self._save_lock = threading.Lock()
+        self._reader: Optional[threading.Thread] = None
+        self._reader_done = False
+        self._detached = False
+        self._error: Optional[Exception] = None
+
+    @property
+    def env(self) -> Dict[str, str]:
+        """Variables telling the child where to send its changes."""
+        return {MEMORY_FD_ENV: str(self._write_fd)}
+
+    @property
+    def pass_fds(self) -> Tuple[int, ...]:
+        """Descriptors the child must inherit."""
+        return (self._write_fd,)
+
+    @property
+    def detached(self) -> bool:
+        """True if close() returned while another process still held the channel open."""
+        return self._detached
+
+    def start(self) -> None:
+        """Receive deltas from a background thread, saving at each checkpoint."""
+        self._reader = threading.Thread(target=self._read_loop, name="backpack-memory-write-back", daemon=True)
+        self._reader.start()
+
+    def close(self) -> None:
+        """
+        Finish after the child has exited: drain the pipe and save what is left.
+
+        If the pipe is still open after DRAIN_TIMEOUT (a process the agent
+        started holds it), the changes received so far are saved and close()
+        returns. Changes sent after that are saved by the reader thread when
+        the pipe closes, so they are lost if this process exits first.
+
+        Raises:
+            BackpackError: If saving failed (AgentLockWriteError, AgentLockNotFoundError, ...)
+        """
+        write_fd, self._write_fd = self._write_fd, None
+        if write_fd is not None:
+            os.close(write_fd)
+        if self._reader is not None:
+            # Reaches EOF once every copy of the write end is closed
+            self._reader.join(DRAIN_TIMEOUT)
+            with self._changes_lock:
+                self._detached = not self._reader_done
+            if self._detached:
+                logger.warning(
+                    "Agent memory channel still open after exit; saving changes received so far, "
+                    "later ones are saved only if this process is still running when it closes"
+                )
+        else:
+            read_fd, self._read_fd = self._read_fd, None
+            if read_fd is not None:
+                os.close(read_fd)
+        self._save()
+        if self._error is not None:
+            raise self._error
+
+    def apply(self, message: Dict[str, Any]) -> bool:
+        """
+        Merge one delta from the agent.
+
+        Returns:
+            True if the agent asked for a checkpoint
+        """
+        with self._changes_lock:
+            for key in message.get("delete") or ():
+                self._changes[key] = _DELETED
+            self._changes.update(message.get("set") or {})
+        return bool(message.get("checkpoint"))
+
+    def _read_loop(self) -> None:
+        buffer = b""
+        while True:
+            try:
+                chunk = os.read(self._read_fd, 65536)  # type: ignore[arg-type]
+            except OSError as e:
+                logger.warning("Agent memory channel failed", extra={"error": str(e)})
+                break
+            if not chunk:
+                break
+            buffer += chunk
+            *lines, buffer = buffer.split(b"\n")
+            checkpoint = False
+            for line in lines:
+                try:
+                    checkpoint = self.apply(json.loads(line)) or checkpoint
+                except (ValueError, AttributeError, TypeError):
+                    logger.warning("Ignoring malformed agent memory update")
+            # Checkpoints that arrive together are saved once
+            if checkpoint:
+                self._save()
+        read_fd, self._read_fd = self._read_fd, None
+        if read_fd is not None:
+            os.close(read_fd)
+        with self._changes_lock:
+            self._reader_done = True
+            detached = self._detached
+        if detached:
+            self._save()
+
+    def _save(self) -> None:
+        with self._save_lock:
+            self._save_changes()
+
+    def _save_changes(self) -> None:
+        with self._changes_lock:
+            changes, self._changes = self._changes, {}
+        if not changes:
+            return
+        updates, removed = _split(changes)
+        try:
+            self.agent_lock.merge_memory(updates, removed)
+        except BackpackError as e:
+            # Keep the changes for the next checkpoint; newer values win
+            with self._changes_lock:
+                self._changes = {**changes, **self._changes}
+            self._error = e
+            logger.error("Failed to save agent memory", extra={"path": self.agent_lock.file_path})
+            return
+        self._error = None
+        self.saves += 1
+        logger.debug("Saved agent memory", extra={"path": self.agent_lock.file_path, "keys": len(changes)})
@@ -0,0 +1,83 @@
+"""
+Run agent scripts inside the current interpreter.
+
+Used by `backpack run --in-process` and by the children of the pre-forked
+launcher (`backpack serve`). Exit statuses match those `python <script>` would
+return as a separate process, so callers can treat both paths the same way.
+"""
+
+import os
+import runpy
+import signal
+import sys
+import traceback
+from typing import Any, Dict, Iterable
+
+
+def exit_status(code: Any) -> int:
+    """
+    Translate a SystemExit code the way the interpreter does on exit.
+
+    Args:
+        code: The SystemExit code (None, an int or any other object)
+
+    Returns:
+        The process exit status
+    """
+    if code is None:
+        return 0
+    if isinstance(code, int):
+        return code
+    print(code, file=sys.stderr)
+    return 1
+
+
+def run_script(script_path: str, env_vars: Dict[str, str], args: Iterable[str] = ()) -> int:
+    """
+    Run a script as __main__ with injected environment variables.
+
+    The environment, sys.argv and sys.path are set up as for
+    `python script_path args...` and restored afterwards. Uncaught exceptions
+    are printed and mapped to the exit status the interpreter would use;
+    KeyboardInterrupt maps to -SIGINT, as subprocess reports a child killed by
+    that signal.
+
+    Args:
+        script_path: Path to the agent script
+        env_vars: Variables to add to os.environ while the script runs
+        args: Command-line arguments for the script
+
+    Returns:
+        The script's exit status
+    """
+    saved_environ = dict(os.environ)
+    saved_argv = sys.argv[:]
+    saved_path = sys.path[:]
+    os.environ.update(env_vars)
+    sys.argv = [script_path] + list(args)
+    sys.path.insert(0, os.path.dirname(os.path.abspath(script_path)))
+    try:
+        runpy.run_path(script_path, run_name="__main__")
+        return 0
+    except SystemExit as e:
+        return exit_status(e.code)
+    except BaseException as e:
+        # Drop our own frames so the traceback starts in the agent
+        tb = e.__traceback__
+        while tb is not None and tb.tb_frame.f_code.co_filename != script_path:
+            tb = tb.tb_next
+        if tb is None and isinstance(e, OSError):
+            # The script could not be read; matches the interpreter's message
+            print(f"{sys.executable}: can't open file {script_path!r}: [Errno {e.errno}] {e.strerror}", file=sys.stderr)
+            return 2
+        traceback.print_exception(type(e), e, tb or e.__traceback__)
+        if isinstance(e, KeyboardInterrupt):
+            return -signal.SIGINT
+        return 1
+    finally:
+        sys.stdout.flush()
+        sys.stderr.flush()
+        os.environ.clear()
+        os.environ.update(saved_environ)
+        sys.argv = saved_argv
+        sys.path[:] = saved_path
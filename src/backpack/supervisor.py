@@ -0,0 +1,231 @@
+"""
+Multi-worker supervisor for `backpack run --workers N`.
+
+Credentials are resolved once by the caller; the supervisor starts N copies
+of the agent with the same injected environment, restarts workers that crash
+(with exponential backoff), forwards signals and reports how each worker
+ended.
+
+Each worker runs in its own session, so a terminal Ctrl-C reaches only the
+supervisor, which forwards it exactly once. Workers get BACKPACK_WORKER_ID
+(0..N-1) and BACKPACK_WORKERS in their environment and /dev/null as stdin.
+
+Logging in this module NEVER records secret values.
+"""
+
+import logging
+import signal
+import subprocess
+import sys
+import threading
+import time
+from typing import Any, Dict, List, Optional
+
+from .exceptions import ValidationError
+
+logger = logging.getLogger(__name__)
+
+WORKER_ID_ENV = "BACKPACK_WORKER_ID"
+WORKERS_ENV = "BACKPACK_WORKERS"
+
+DEFAULT_MAX_RESTARTS = 5
+DEFAULT_BACKOFF = 0.5
+DEFAULT_MAX_BACKOFF = 30.0
+
+# A worker that ran at least this long before crashing restarts its backoff
+# from the initial delay.
+STABLE_SECONDS = 10.0
+
+# Signals forwarded to every worker; the first four also stop restarts.
+STOP_SIGNALS = ("SIGINT", "SIGTERM", "SIGHUP", "SIGQUIT")
+FORWARDED_SIGNALS = STOP_SIGNALS + ("SIGUSR1", "SIGUSR2")
+
+_POLL_INTERVAL = 0.05
+
+
+class Worker:
+    """State of one supervised worker."""
+
+    def __init__(self, worker_id: int):
+        self.worker_id = worker_id
+        self.process: Optional["subprocess.Popen[Any]"] = None
+        self.pid: Optional[int] = None
+        self.state = "pending"  # pending, running, backoff, exited, failed, stopped
+        self.restarts = 0
+        self.returncode: Optional[int] = None
+        self.started_at = 0.0
+        self.next_start = 0.0
+        self._failures = 0  # consecutive quick crashes, for backoff
+
+    def to_dict(self) -> Dict[str, Any]:
+        """Return a JSON-serializable status summary."""
+        return {
+            "worker": self.worker_id,
+            "pid": self.pid,
+            "state": self.state,
+            "restarts": self.restarts,
+            "returncode": self.returncode,
+        }
+
+
+class Supervisor:
+    """
+    Run N copies of an agent script and keep them running.
+    """
+
+    def __init__(
+        self,
+        script_path: str,
+        env: Dict[str, str],
+        workers: int,
+        max_restarts: int = DEFAULT_MAX_RESTARTS,
+        backoff: float = DEFAULT_BACKOFF,
+        max_backoff: float = DEFAULT_MAX_BACKOFF,
+    ):
+        """
+        Initialize the supervisor.
+
+        Args:
+            script_path: Agent script to run in every worker
+            env: Complete environment for the workers (injected variables included)
+            workers: Number of workers
+            max_restarts: Restarts allowed per worker before it is given up on
+            backoff: Delay before the first restart of a crashed worker, in seconds
+            max_backoff: Upper bound for the doubling restart delay, in seconds
+
+        Raises:
+            ValidationError: If workers < 1 or max_restarts < 0
+        """
+        if workers < 1:
+            raise ValidationError("Invalid worker count", "--workers must be at least 1")
+        if max_restarts < 0:
+            raise ValidationError("Invalid restart limit", "--max-restarts cannot be negative")
+        self.script_path = script_path
+        self.env = env
+        self.workers = [Worker(i) for i in range(workers)]
+        self.max_restarts = max_restarts
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+        self._stopping = False
+        self._first_failure: Optional[int] = None  # return code of the first worker to end unsuccessfully
+
+    def run(self) -> int:
+        """
+        Start the workers and supervise them until all have finished.
+
+        Workers that exit with 0 are done. Workers that fail are restarted
+        until they exceed max_restarts. After a stop signal no worker is
+        restarted and the supervisor waits for the rest to exit.
+
+        Returns:
+            0 if every worker finished with 0, else the return code of the
+            worker that was the first, in time, to end without success
+            (negative if killed by a signal)
+        """
+        previous = self._install_signal_handlers()
+        try:
+            for worker in self.workers:
+                self._start(worker)
+            while not all(w.state in ("exited", "failed", "stopped") for w in self.workers):
+                now = time.monotonic()
+                for worker in self.workers:
+                    if worker.state == "running":
+                        assert worker.process is not None
+                        returncode = worker.process.poll()
+                        if returncode is not None:
+                            self._on_exit(worker, returncode, now)
+                    elif worker.state == "backoff":
+                        if self._stopping:
+                            self._finish(worker, "stopped")
+                        elif now >= worker.next_start:
+                            worker.restarts += 1
+                            self._start(worker)
+                time.sleep(_POLL_INTERVAL)
+        finally:
+            for signum, handler in previous.items():
+                signal.signal(signum, handler)
+
+        return self._first_failure or 0
+
+    def stop(self, signum: int = signal.SIGTERM) -> None:
+        """Stop restarting workers and send signum to the running ones."""
+        self._stopping = True
+        self._forward(signum)
+
+    def status(self) -> List[Dict[str, Any]]:
+        """Return the status of every worker."""
+        return [worker.to_dict() for worker in self.workers]
+
+    def _start(self, worker: Worker) -> None:
+        env = dict(self.env)
+        env[WORKER_ID_ENV] = str(worker.worker_id)
+        env[WORKERS_ENV] = str(len(self.workers))
+        try:
+            worker.process = subprocess.Popen(
+                [sys.executable, self.script_path],
+                env=env,
+                stdin=subprocess.DEVNULL,
+                start_new_session=True,
+            )
+        except OSError as e:
+            logger.error("Failed to start worker", extra={"worker": worker.worker_id, "error": str(e)})
+            worker.process = None
+            self._on_exit(worker, 127, time.monotonic())
+            return
+        worker.pid = worker.process.pid
+        worker.state = "running"
+        worker.started_at = time.monotonic()
+        logger.info("Worker started", extra={"worker": worker.worker_id, "pid": worker.pid})
+
+    def _on_exit(self, worker: Worker, returncode: int, now: float) -> None:
+        worker.returncode = returncode
+        if returncode == 0:
+            worker.state = "exited"
+            return
+        if self._stopping:
+            self._finish(worker, "stopped")
+            return
+        if worker.restarts >= self.max_restarts:
+            self._finish(worker, "failed")
+            logger.error("Worker failed too often; giving up",
+                         extra={"worker": worker.worker_id, "returncode": returncode, "restarts": worker.restarts})
+            return
+
+        if worker.started_at and now - worker.started_at >= STABLE_SECONDS:
+            worker._failures = 0
+        delay = min(self.backoff * (2 ** worker._failures), self.max_backoff)
+        worker._failures += 1
+        worker.state = "backoff"
+        worker.next_start = now + delay
+        logger.warning("Worker crashed; restarting",
+                       extra={"worker": worker.worker_id, "returncode": returncode, "delay": delay})
+
+    def _finish(self, worker: Worker, state: str) -> None:
+        """End a worker whose last run failed, remembering the first such return code."""
+        worker.state = state
+        if self._first_failure is None:
+            self._first_failure = worker.returncode
+
+    def _forward(self, signum: int) -> None:
+        for worker in self.workers:
+            if worker.state == "running" and worker.process is not None:
+                try:
+                    worker.process.send_signal(signum)
+                except OSError:
+                    pass
+
+    def _handle_signal(self, signum: int, frame: Any) -> None:
+        if signal.Signals(signum).name in STOP_SIGNALS:
+            self.stop(signum)
+        else:
+            self._forward(signum)
+
+    def _install_signal_handlers(self) -> Dict[int, Any]:
+        previous: Dict[int, Any] = {}
+        if threading.current_thread() is not threading.main_thread():
+            return previous
+        for name in FORWARDED_SIGNALS:
+            signum = getattr(signal, name, None)
+            if signum is not None:
+                previous[signum] = signal.signal(signum, self._handle_signal)
+        return previous
@@ -0,0 +1,305 @@
+"""
+Encrypted file-backed credential vault.
+
+This module provides the FileVault class, a drop-in replacement for the OS
+keyring on machines without a usable keyring service (e.g. headless Linux
+servers without Secret Service). Select it with BACKPACK_KEYCHAIN_BACKEND=file.
+
+All entries live in a single file encrypted under one master key:
+
+    BPVAULT1\\n
+    {"version": 1, "salt": "...", "index": {"<service>/<name>": [offset, length]}}\\n
+    <Fernet token><Fernet token>...
+
+The master key is derived once per process. The index is kept in memory and
+values are read through an mmap of the file, so a lookup decrypts only the
+requested entry. Writes copy unchanged tokens as-is into a temporary file that
+atomically replaces the vault.
+
+Logging in this module NEVER records secret values, only key names and paths.
+"""
+
+import base64
+import json
+import logging
+import mmap
+import os
+import tempfile
+import threading
+from typing import Dict, List, Optional, Tuple
+
+import keyring.errors
+from cryptography.fernet import Fernet, InvalidToken
+
+from .crypto import derive_key
+from .exceptions import KeychainAccessError
+
+try:
+    import fcntl
+except ImportError:  # pragma: no cover - Windows
+    fcntl = None  # type: ignore
+
+logger = logging.getLogger(__name__)
+
+MAGIC = b"BPVAULT1\n"
+FORMAT_VERSION = 1
+
+VAULT_PATH_ENV = "BACKPACK_VAULT_PATH"
+VAULT_KEY_ENV = "BACKPACK_VAULT_KEY"
+DEFAULT_VAULT_PATH = os.path.join("~", ".backpack", "vault.bin")
+
+
+def default_vault_path() -> str:
+    """Return the vault path from BACKPACK_VAULT_PATH, or ~/.backpack/vault.bin."""
+    return os.path.expanduser(os.environ.get(VAULT_PATH_ENV, DEFAULT_VAULT_PATH))
+
+
+def default_vault_key() -> str:
+    """
+    Return the vault master key from BACKPACK_VAULT_KEY or AGENT_MASTER_KEY.
+
+    Raises:
+        KeychainAccessError: If neither variable is set
+    """
+    key = os.environ.get(VAULT_KEY_ENV) or os.environ.get("AGENT_MASTER_KEY")
+    if not key:
+        raise KeychainAccessError(
+            "No master key for the vault file",
+            f"Set {VAULT_KEY_ENV} (or AGENT_MASTER_KEY) to use the file keychain backend",
+        )
+    return key
+
+
+class FileVault:
+    """
+    Single-file encrypted credential store with a keyring-compatible API.
+
+    Implements get_password/set_password/delete_password so backpack.keychain
+    can use it in place of the keyring module.
+    """
+
+    def __init__(self, path: Optional[str] = None, master_key: Optional[str] = None):
+        """
+        Initialize a FileVault.
+
+        Args:
+            path: Path to the vault file (default: BACKPACK_VAULT_PATH or ~/.backpack/vault.bin)
+            master_key: Master key (default: BACKPACK_VAULT_KEY, then AGENT_MASTER_KEY)
+
+        Raises:
+            KeychainAccessError: If no master key is given or set in the environment
+        """
+        self.path = path or default_vault_path()
+        self.master_key = master_key or default_vault_key()
+        self._lock = threading.RLock()
+        self._fernet: Optional[Fernet] = None
+        self._salt: Optional[bytes] = None
+        self._index: Dict[str, Tuple[int, int]] = {}
+        self._check: Optional[bytes] = None
+        self._data_start = 0
+        self._map: Optional[mmap.mmap] = None
+        self._stamp: Optional[Tuple[int, int, int]] = None
+
+    @staticmethod
+    def _entry_id(service: str, username: str) -> str:
+        return f"{service}/{username}"
+
+    def _file_stamp(self) -> Optional[Tuple[int, int, int]]:
+        """Identify the current vault file version (inode, size, mtime)."""
+        try:
+            st = os.stat(self.path)
+        except FileNotFoundError:
+            return None
+        return st.st_ino, st.st_size, st.st_mtime_ns
+
+    def _get_fernet(self) -> Fernet:
+        """Derive the vault key (once) from the master key and the vault's salt."""
+        if self._fernet is None:
+            if self._salt is None:
+                self._salt = os.urandom(16)
+            key, _ = derive_key(self.master_key, self._salt)
+            self._fernet = Fernet(key)
+        return self._fernet
+
+    def _load(self) -> None:
+        """(Re)load the index if the vault file changed since it was last read."""
+        stamp = self._file_stamp()
+        if stamp == self._stamp and (stamp is None or self._map is not None):
+            return
+
+        self._close_map()
+        self._index = {}
+        self._check = None
+        self._stamp = stamp
+        if stamp is None:
+            return
+
+        with open(self.path, "rb") as f:
+            if os.fstat(f.fileno()).st_size == 0:
+                return
+            vmap = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+        try:
+            if vmap[: len(MAGIC)] != MAGIC:
+                raise keyring.errors.KeyringError(f"Not a backpack vault file: {self.path}")
+            header_end = vmap.find(b"\n", len(MAGIC))
+            if header_end == -1:
+                raise keyring.errors.KeyringError(f"Corrupted vault header: {self.path}")
+            header = json.loads(vmap[len(MAGIC) : header_end])
+            if header.get("version") != FORMAT_VERSION:
+                raise keyring.errors.KeyringError(f"Unsupported vault version: {header.get('version')}")
+            salt = base64.b64decode(header["salt"])
+            index = {name: (int(pos[0]), int(pos[1])) for name, pos in header.get("index", {}).items()}
+            check = header["check"].encode()
+        except (KeyError, TypeError, ValueError, UnicodeDecodeError) as e:
+            vmap.close()
+            raise keyring.errors.KeyringError(f"Corrupted vault header: {self.path}") from e
+        except keyring.errors.KeyringError:
+            vmap.close()
+            raise
+
+        if salt != self._salt:
+            self._salt = salt
+            self._fernet = None
+        self._index = index
+        self._check = check
+        self._data_start = header_end + 1
+        self._map = vmap
+
+    def _close_map(self) -> None:
+        if self._map is not None:
+            self._map.close()
+            self._map = None
+
+    def _read_token(self, entry_id: str) -> Optional[bytes]:
+        """Return the raw token for an entry from the mapped file."""
+        pos = self._index.get(entry_id)
+        if pos is None or self._map is None:
+            return None
+        start = self._data_start + pos[0]
+        return bytes(self._map[start : start + pos[1]])
+
+    def _decrypt(self, entry_id: str, token: bytes) -> str:
+        try:
+            payload = json.loads(self._get_fernet().decrypt(token))
+        except (InvalidToken, ValueError) as e:
+            raise keyring.errors.KeyringError("Failed to decrypt vault entry (wrong master key?)") from e
+        # The entry id is encrypted with the value so index entries cannot be swapped
+        if payload.get("id") != entry_id:
+            raise keyring.errors.KeyringError("Vault index does not match entry contents")
+        return str(payload["value"])
+
+    def get_password(self, service: str, username: str) -> Optional[str]:
+        """Return the stored value, or None if there is no such entry."""
+        entry_id = self._entry_id(service, username)
+        with self._lock:
+            self._load()
+            token = self._read_token(entry_id)
+            if token is None:
+                return None
+            return self._decrypt(entry_id, token)
+
+    def set_password(self, service: str, username: str, password: str) -> None:
+        """Store a value, atomically rewriting the vault file."""
+        entry_id = self._entry_id(service, username)
+        with self._lock:
+            self._rewrite({entry_id: password})
+
+    def set_passwords(self, service: str, values: Dict[str, str]) -> None:
+        """Store several values with a single rewrite of the vault file."""
+        with self._lock:
+            self._rewrite({self._entry_id(service, name): value for name, value in values.items()})
+
+    def delete_password(self, service: str, username: str) -> None:
+        """Delete an entry, atomically rewriting the vault file."""
+        entry_id = self._entry_id(service, username)
+        with self._lock:
+            self._rewrite({entry_id: None}, must_exist=entry_id)
+
+    def names(self, service: str) -> List[str]:
+        """Return the names stored for a service (read from the index, nothing is decrypted)."""
+        prefix = f"{service}/"
+        with self._lock:
+            self._load()
+            return sorted(name[len(prefix):] for name in self._index if name.startswith(prefix))
+
+    def _rewrite(self, changes: Dict[str, Optional[str]], must_exist: Optional[str] = None) -> None:
+        """
+        Apply changes (None deletes) and atomically replace the vault file.
+
+        Holds an exclusive lock on a sidecar lock file so concurrent writers
+        in other processes cannot lose each other's updates.
+        """
+        directory = os.path.dirname(os.path.abspath(self.path))
+        os.makedirs(directory, mode=0o700, exist_ok=True)
+
+        lock_fd = os.open(self.path + ".lock", os.O_RDWR | os.O_CREAT, 0o600)
+        try:
+            if fcntl is not None:
+                fcntl.flock(lock_fd, fcntl.LOCK_EX)
+            # Pick up writes made by other processes before applying ours
+            self._load()
+            if must_exist is not None and must_exist not in self._index:
+                raise keyring.errors.PasswordDeleteError(f"No such vault entry: {must_exist}")
+
+            fernet = self._get_fernet()
+            if self._check is not None:
+                # Refuse to mix entries encrypted under different master keys
+                try:
+                    fernet.decrypt(self._check)
+                except InvalidToken as e:
+                    raise keyring.errors.KeyringError("Wrong master key for vault file") from e
+            else:
+                self._check = fernet.encrypt(MAGIC)
+
+            tokens: Dict[str, bytes] = {}
+            for entry_id in self._index:
+                if entry_id not in changes:
+                    token = self._read_token(entry_id)
+                    if token is not None:
+                        tokens[entry_id] = token
+            for entry_id, value in changes.items():
+                if value is not None:
+                    tokens[entry_id] = fernet.encrypt(json.dumps({"id": entry_id, "value": value}).encode())
+
+            index = {}
+            offset = 0
+            for entry_id, token in tokens.items():
+                index[entry_id] = [offset, len(token)]
+                offset += len(token)
+            header = json.dumps({
+                "version": FORMAT_VERSION,
+                "salt": base64.b64encode(self._salt or b"").decode(),
+                "check": self._check.decode(),
+                "index": index,
+            })
+
+            fd, tmp_path = tempfile.mkstemp(prefix=".vault-", dir=directory)
+            try:
+                with os.fdopen(fd, "wb") as f:
+                    f.write(MAGIC)
+                    f.write(header.encode() + b"\n")
+                    for token in tokens.values():
+                        f.write(token)
+                    f.flush()
+                    os.fsync(f.fileno())
+                os.chmod(tmp_path, 0o600)
+                os.replace(tmp_path, self.path)
+            except BaseException:
+                if os.path.exists(tmp_path):
+                    os.remove(tmp_path)
+                raise
+
+            self._stamp = None
+            self._load()
+            logger.debug("Rewrote vault file", extra={"path": self.path, "entries": len(tokens)})
+        finally:
+            if fcntl is not None:
+                fcntl.flock(lock_fd, fcntl.LOCK_UN)
+            os.close(lock_fd)
+
+    def close(self) -> None:
+        """Release the memory map of the vault file."""
+        with self._lock:
+            self._close_map()
+            self._stamp = None
@@ -64,6 +64,24 @@ def sample_memory():
     }
 
 
+@pytest.fixture(autouse=True)
+def clear_key_cache():
+    """Start and end every test with an empty in-process key cache."""
+    from backpack.keychain import invalidate_cache
+
+    invalidate_cache()
+    yield
+    invalidate_cache()
+
+
+@pytest.fixture(autouse=True)
+def backpack_home(tmp_path, monkeypatch):
+    """Keep per-user state such as the key registry out of the real home directory."""
+    home = tmp_path / "backpack-home"
+    monkeypatch.setenv("BACKPACK_HOME", str(home))
+    return str(home)
+
+
 @pytest.fixture
 def mock_keyring(monkeypatch):
     """Mock keyring for testing without OS keychain."""
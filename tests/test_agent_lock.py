@@ -4,18 +4,20 @@ Tests for agent_lock module - agent lock file management.
 
 import json
 import os
+import threading
 from unittest.mock import patch
 
 import pytest
 
 from backpack.agent_lock import AgentLock
+from backpack.crypto import DerivedKeyCache, decrypt_data
 
 
 @pytest.fixture(autouse=True)
 def mock_audit_logger():
     """Mock the audit logger to prevent file writes and verify calls."""
-    with patch("backpack.agent_lock.AuditLogger") as mock_cls:
-        yield mock_cls.return_value
+    with patch("backpack.agent_lock.get_audit_logger") as mock_get:
+        yield mock_get.return_value
 
 
 class TestAgentLockInit:
@@ -220,6 +222,55 @@ class TestAgentLockUpdateMemory:
         assert updated["personality"] == original["personality"]
         assert updated["memory"] == new_memory
 
+    def test_merge_memory_keeps_other_writers_keys(self, test_agent_lock_path, test_master_key,
+                                                   sample_credentials, sample_personality):
+        """Test that merge_memory applies changes to the memory on disk."""
+        agent_lock = AgentLock(test_agent_lock_path)
+        agent_lock.master_key = test_master_key
+        agent_lock.create(sample_credentials, sample_personality, {"a": 1, "b": 2})
+
+        # Another writer saves a key after this process read the lock
+        other = AgentLock(test_agent_lock_path, master_key=test_master_key)
+        other.update_memory({"a": 1, "b": 2, "c": 3})
+
+        written = agent_lock.merge_memory({"a": 10}, removed=["b"])
+
+        assert written == {"a": 10, "c": 3}
+        assert agent_lock.read()["memory"] == {"a": 10, "c": 3}
+        assert agent_lock.read()["personality"] == sample_personality
+
+    def test_concurrent_merges_keep_every_update(self, test_agent_lock_path, test_master_key,
+                                                 sample_credentials, sample_personality):
+        """Test that merge_memory holds the file lock from the read to the write."""
+        AgentLock(test_agent_lock_path, master_key=test_master_key).create(sample_credentials, sample_personality, {})
+
+        def writer(n):
+            AgentLock(test_agent_lock_path, master_key=test_master_key).merge_memory({f"key{n}": n})
+
+        threads = [threading.Thread(target=writer, args=(n,)) for n in range(4)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        agent_lock = AgentLock(test_agent_lock_path, master_key=test_master_key)
+        assert agent_lock.read()["memory"] == {f"key{n}": n for n in range(4)}
+        assert agent_lock.read_metadata()["generation"] == 5
+
+    def test_write_replaces_file_atomically(self, test_agent_lock_path, test_master_key,
+                                            sample_credentials, sample_personality):
+        """Test that writes go through a temporary file and keep the file mode."""
+        agent_lock = AgentLock(test_agent_lock_path, master_key=test_master_key)
+        agent_lock.create(sample_credentials, sample_personality, {})
+        os.chmod(test_agent_lock_path, 0o600)
+        inode = os.stat(test_agent_lock_path).st_ino
+
+        agent_lock.update_memory({"a": 1})
+
+        assert os.stat(test_agent_lock_path).st_ino != inode
+        assert os.stat(test_agent_lock_path).st_mode & 0o777 == 0o600
+        assert sorted(os.listdir(os.path.dirname(test_agent_lock_path))) == ["agent.lock", "agent.lock.lock"]
+
 
 class TestAgentLockGetRequiredKeys:
     """Tests for getting required keys."""
@@ -261,6 +312,87 @@ class TestAgentLockGetRequiredKeys:
         assert required_keys == []
 
 
+class TestAgentLockMetadata:
+    """Tests for the plaintext metadata header."""
+
+    def test_create_writes_metadata(self, test_agent_lock_path, test_master_key,
+                                    sample_credentials, sample_personality, sample_memory):
+        """Test that the header describes every layer without any plaintext."""
+        agent_lock = AgentLock(test_agent_lock_path, master_key=test_master_key)
+        agent_lock.create(sample_credentials, sample_personality, sample_memory)
+
+        with patch("backpack.crypto.derive_key") as mock_derive:
+            metadata = agent_lock.read_metadata()
+        mock_derive.assert_not_called()
+
+        assert metadata["format"] == 1
+        assert (metadata["cipher"], metadata["kdf"], metadata["codec"]) == ("fernet", "pbkdf2-sha256", "json")
+        assert metadata["generation"] == 1
+        assert metadata["layers"]["credentials"]["items"] == len(sample_credentials)
+        assert metadata["layers"]["memory"]["items"] == len(sample_memory)
+        with open(test_agent_lock_path) as f:
+            data = json.load(f)
+        assert metadata["layers"]["personality"]["size"] == len(data["layers"]["personality"]["data"])
+        assert sample_personality["system_prompt"] not in json.dumps(metadata)
+
+    def test_generation_increments(self, test_agent_lock_path, test_master_key,
+                                   sample_credentials, sample_personality):
+        """Test that every write bumps the generation."""
+        agent_lock = AgentLock(test_agent_lock_path, master_key=test_master_key)
+        agent_lock.create(sample_credentials, sample_personality)
+        agent_lock.update_memory({"a": 1})
+        agent_lock.merge_memory({"b": 2})
+
+        assert agent_lock.read_metadata()["generation"] == 3
+        assert agent_lock.read_metadata()["layers"]["memory"]["items"] == 2
+
+    def test_read_verifies_metadata(self, test_agent_lock_path, test_master_key,
+                                    sample_credentials, sample_personality):
+        """Test that read() checks the MAC and reuses the key it derived."""
+        agent_lock = AgentLock(test_agent_lock_path, master_key=test_master_key)
+        agent_lock.create(sample_credentials, sample_personality)
+        with open(test_agent_lock_path) as f:
+            data = json.load(f)
+        key_cache = DerivedKeyCache()
+
+        assert agent_lock._verify_metadata(data, key_cache) is False  # no key derived yet
+        for layer in data["layers"].values():
+            decrypt_data(layer, test_master_key, key_cache)
+        assert agent_lock._verify_metadata(data, key_cache) is True
+        assert key_cache.derivations == 3
+
+        data["metadata"]["layers"]["memory"]["items"] = 99
+        assert agent_lock._verify_metadata(data, key_cache) is False
+
+    def test_tampered_metadata_still_reads(self, test_agent_lock_path, test_master_key,
+                                           sample_credentials, sample_personality, caplog):
+        """Test that an edited header is reported but the layers are still returned."""
+        agent_lock = AgentLock(test_agent_lock_path, master_key=test_master_key)
+        agent_lock.create(sample_credentials, sample_personality)
+        with open(test_agent_lock_path) as f:
+            data = json.load(f)
+        data["metadata"]["generation"] = 42
+        with open(test_agent_lock_path, "w") as f:
+            json.dump(data, f)
+
+        assert agent_lock.read()["personality"] == sample_personality
+        assert "metadata does not match" in caplog.text
+
+    def test_legacy_lock_has_no_metadata(self, test_agent_lock_path, test_master_key,
+                                         sample_credentials, sample_personality):
+        """Test that locks written before headers existed still read."""
+        agent_lock = AgentLock(test_agent_lock_path, master_key=test_master_key)
+        agent_lock.create(sample_credentials, sample_personality)
+        with open(test_agent_lock_path) as f:
+            data = json.load(f)
+        del data["metadata"]
+        with open(test_agent_lock_path, "w") as f:
+            json.dump(data, f)
+
+        assert agent_lock.read_metadata() is None
+        assert agent_lock.read()["credentials"] == sample_credentials
+
+
 class TestAgentLockIntegration:
     """Integration tests for AgentLock operations."""
     
@@ -14,8 +14,9 @@ from backpack.exceptions import (
 
 
 class TestAgentLockCoverage:
-    def setup_method(self):
-        self.lock = AgentLock("test_agent.lock")
+    @pytest.fixture(autouse=True)
+    def _lock(self, tmp_path):
+        self.lock = AgentLock(str(tmp_path / "test_agent.lock"))
 
     def test_create_validation_error_credentials(self):
         with pytest.raises(ValidationError, match="Credentials must be a dictionary"):
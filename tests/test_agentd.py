@@ -0,0 +1,180 @@
+"""
+Tests for the credential agent daemon (agentd.py) and its client.
+"""
+
+import os
+import stat
+import threading
+from unittest.mock import patch
+
+import pytest
+
+from backpack import agent_client
+from backpack.agent_lock import AgentLock
+from backpack.agentd import AgentDaemon
+from backpack.crypto import derive_key
+from backpack.exceptions import AgentDaemonError, AgentLockWriteError, DecryptionError
+from backpack.keychain import delete_key, get_key, get_keys, invalidate_cache, store_key, store_keys
+
+
+@pytest.fixture
+def socket_path(temp_dir):
+    return os.path.join(temp_dir, "agent.sock")
+
+
+@pytest.fixture
+def agent(socket_path, monkeypatch):
+    """Run a daemon on a background thread and point clients at it."""
+    daemon = AgentDaemon(socket_path=socket_path, master_key="agent-master", idle_timeout=0)
+    daemon.bind()
+    thread = threading.Thread(target=daemon.serve_forever, daemon=True)
+    thread.start()
+    monkeypatch.setenv("BACKPACK_AGENT_SOCK", socket_path)
+    yield daemon
+    daemon.shutdown()
+    thread.join(5)
+
+
+@pytest.fixture
+def lock_path(temp_dir, monkeypatch):
+    monkeypatch.setenv("AGENT_MASTER_KEY", "agent-master")
+    path = os.path.join(temp_dir, "agent.lock")
+    with patch("backpack.agent_lock.get_audit_logger"):
+        AgentLock(path).create({"OPENAI_API_KEY": "placeholder_openai"}, {"tone": "calm"}, {"runs": 1})
+    return path
+
+
+class TestAgentDaemon:
+    """Tests for the daemon process side."""
+
+    def test_socket_is_private(self, agent, socket_path):
+        """Test the socket is only accessible by its owner."""
+        assert stat.S_ISSOCK(os.stat(socket_path).st_mode)
+        assert os.stat(socket_path).st_mode & 0o777 == 0o600
+        assert agent_client.request("ping") == "pong"
+
+    def test_refuses_second_daemon(self, agent, socket_path):
+        """Test a second daemon cannot take over a live socket."""
+        with pytest.raises(AgentDaemonError):
+            AgentDaemon(socket_path=socket_path).bind()
+
+    def test_replaces_stale_socket(self, socket_path):
+        """Test a socket left behind by a dead daemon is reused."""
+        first = AgentDaemon(socket_path=socket_path, idle_timeout=0)
+        first.bind()
+        first._server.server_close()
+        assert os.path.exists(socket_path)
+
+        second = AgentDaemon(socket_path=socket_path, idle_timeout=0)
+        second.bind()
+        second._server.server_close()
+
+    def test_idle_timeout(self, socket_path):
+        """Test the daemon exits and removes its socket when idle."""
+        daemon = AgentDaemon(socket_path=socket_path, idle_timeout=0.2)
+        thread = threading.Thread(target=daemon.serve_forever, daemon=True)
+        thread.start()
+        thread.join(5)
+        assert not thread.is_alive()
+        assert not os.path.exists(socket_path)
+
+    def test_unknown_op(self, agent):
+        """Test unknown operations are reported as errors."""
+        with pytest.raises(AgentDaemonError):
+            agent_client.request("format_disk")
+
+    def test_decrypt_derives_each_salt_once(self, agent, lock_path):
+        """Test repeated lock reads reuse the daemon's derived keys."""
+        with patch("backpack.agentd.derive_key", wraps=derive_key) as kdf:
+            for _ in range(3):
+                data = AgentLock(lock_path).read()
+                assert data["personality"] == {"tone": "calm"}
+        assert kdf.call_count == 3  # one per layer, not per read
+
+    def test_decrypt_wrong_key(self, agent):
+        """Test data the daemon cannot decrypt raises DecryptionError."""
+        from backpack.crypto import encrypt_data
+
+        with pytest.raises(DecryptionError):
+            agent_client.decrypt([encrypt_data("secret", "some-other-key")])
+
+
+class TestAgentClients:
+    """Tests for keychain and AgentLock using the daemon."""
+
+    def test_get_key_through_agent(self, agent, mock_keyring):
+        """Test get_key() asks the daemon and keeps the value."""
+        store_key("OPENAI_API_KEY", "sk-test")
+        invalidate_cache()
+
+        with patch("backpack.agent_client.get_keys", wraps=agent_client.get_keys) as client:
+            assert get_key("OPENAI_API_KEY") == "sk-test"
+            assert get_key("OPENAI_API_KEY") == "sk-test"
+        client.assert_called_once_with(["OPENAI_API_KEY"])
+
+    def test_get_keys_single_request(self, agent, mock_keyring):
+        """Test get_keys() sends one request for all missing keys."""
+        store_key("A_KEY", "a")
+        store_key("B_KEY", "b")
+        invalidate_cache()
+
+        with patch("backpack.agent_client.request", wraps=agent_client.request) as req:
+            assert get_keys(["A_KEY", "B_KEY", "C_KEY"]) == {"A_KEY": "a", "B_KEY": "b", "C_KEY": None}
+        assert req.call_count == 1
+
+    def test_deleted_key_is_not_served(self, agent, mock_keyring):
+        """Test the daemon drops its cached value when a client deletes or replaces a key."""
+        store_key("OPENAI_API_KEY", "sk-old")
+        assert agent_client.get_keys(["OPENAI_API_KEY"]) == {"OPENAI_API_KEY": "sk-old"}
+
+        with patch("backpack.agent_client.invalidate", wraps=agent_client.invalidate) as invalidate:
+            store_keys({"OPENAI_API_KEY": "sk-new"})
+            assert agent_client.get_keys(["OPENAI_API_KEY"]) == {"OPENAI_API_KEY": "sk-new"}
+            delete_key("OPENAI_API_KEY")
+            assert agent_client.get_keys(["OPENAI_API_KEY"]) == {"OPENAI_API_KEY": None}
+        assert [c.args[0] for c in invalidate.call_args_list] == [["OPENAI_API_KEY"], ["OPENAI_API_KEY"]]
+
+    def test_invalidate_op(self, agent, mock_keyring):
+        """Test the invalidate op drops daemon-side cache entries even without a local change."""
+        store_key("OPENAI_API_KEY", "sk-old")
+        agent_client.get_keys(["OPENAI_API_KEY"])
+        mock_keyring[("backpack-agent", "OPENAI_API_KEY")] = "sk-rotated"
+
+        agent_client.invalidate(["OPENAI_API_KEY"])
+
+        assert agent_client.get_keys(["OPENAI_API_KEY"]) == {"OPENAI_API_KEY": "sk-rotated"}
+
+    def test_falls_back_without_daemon(self, socket_path, mock_keyring, monkeypatch):
+        """Test lookups still work when the daemon is not running."""
+        monkeypatch.setenv("BACKPACK_AGENT_SOCK", socket_path)
+        store_key("OPENAI_API_KEY", "sk-test")
+        invalidate_cache()
+        assert get_key("OPENAI_API_KEY") == "sk-test"
+
+    def test_lock_falls_back_on_key_mismatch(self, agent, temp_dir, monkeypatch):
+        """Test a lock the daemon cannot decrypt is decrypted locally."""
+        monkeypatch.setenv("AGENT_MASTER_KEY", "local-key")
+        path = os.path.join(temp_dir, "other.lock")
+        with patch("backpack.agent_lock.get_audit_logger"):
+            AgentLock(path).create({}, {"tone": "dry"})
+            assert AgentLock(path).read()["personality"] == {"tone": "dry"}
+
+    def test_explicit_master_key_skips_daemon(self, agent, lock_path):
+        """Test a lock opened with an explicit key never goes to the daemon."""
+        with patch("backpack.agent_client.decrypt", side_effect=AssertionError("daemon used")):
+            assert AgentLock(lock_path, master_key="agent-master").read()["memory"] == {"runs": 1}
+
+    def test_write_refuses_key_the_agent_did_not_confirm(self, agent, lock_path, monkeypatch):
+        """Test a lock the daemon decrypted is not re-encrypted under the default key."""
+        monkeypatch.delenv("AGENT_MASTER_KEY")
+        with patch("backpack.agent_lock.get_audit_logger"):
+            with pytest.raises(AgentLockWriteError):
+                AgentLock(lock_path).merge_memory({"n": 2})
+            assert AgentLock(lock_path, master_key="agent-master").read()["memory"] == {"runs": 1}
+            assert AgentLock(lock_path, master_key="default-key").read() is None
+
+    def test_write_after_agent_read_with_matching_key(self, agent, lock_path):
+        """Test a lock the daemon decrypted is written when the local key opens it."""
+        with patch("backpack.agent_lock.get_audit_logger"):
+            AgentLock(lock_path).merge_memory({"n": 2})
+            assert AgentLock(lock_path, master_key="agent-master").read()["memory"] == {"runs": 1, "n": 2}
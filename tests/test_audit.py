@@ -1,12 +1,14 @@
 
 import json
+import multiprocessing
 import os
+import threading
 import time
 from unittest.mock import patch
 
 import pytest
 
-from backpack.audit import AuditLogger
+from backpack.audit import AuditLogger, _line_hash, _split_line_ranges, close_all_loggers, get_audit_logger
 
 
 class TestAuditLogger:
@@ -86,3 +88,442 @@ class TestAuditLogger:
             # Should not raise
             audit_logger.log_event("test", {})
 
+
+    def test_read_logs_parallel_matches_sequential(self, audit_logger):
+        for i in range(6):
+            audit_logger.log_event(f"event{i}", {"id": i})
+
+        sequential = audit_logger.read_logs(workers=1)
+        parallel = audit_logger.read_logs(workers=3)
+
+        assert len(sequential) == 6
+        assert parallel == sequential
+        assert [e["details"]["id"] for e in parallel] == list(range(6))
+
+    def test_read_logs_parallel_skips_corrupted_lines(self, audit_logger):
+        audit_logger.log_event("valid_1", {})
+        with open(audit_logger.file_path, "a") as f:
+            f.write("garbage_data\n")
+        audit_logger.log_event("valid_2", {})
+
+        logs = audit_logger.read_logs(workers=2)
+        assert [e["event_type"] for e in logs] == ["valid_1", "valid_2"]
+
+    def test_read_logs_workers_from_env(self, audit_logger, monkeypatch):
+        audit_logger.log_event("event1", {})
+        monkeypatch.setenv("BACKPACK_AUDIT_WORKERS", "not-a-number")
+
+        assert len(audit_logger.read_logs()) == 1
+
+    def test_split_line_ranges_are_line_aligned(self, tmp_path):
+        path = tmp_path / "lines.log"
+        lines = [f"line-{i}-{'x' * i}\n" for i in range(20)]
+        path.write_text("".join(lines))
+
+        ranges = _split_line_ranges(str(path), 4)
+
+        assert ranges[0][0] == 0
+        assert ranges[-1][1] == path.stat().st_size
+        data = path.read_bytes()
+        rebuilt = []
+        for start, end in ranges:
+            chunk = data[start:end]
+            assert chunk.endswith(b"\n")
+            rebuilt.extend(chunk.decode().splitlines(keepends=True))
+        assert rebuilt == lines
+
+
+class TestAuditChain:
+    @pytest.fixture
+    def audit_logger(self, tmp_path):
+        return AuditLogger(file_path=str(tmp_path / "chain_audit.log"), checkpoint_interval=2)
+
+    def _lines(self, audit_logger):
+        with open(audit_logger.file_path, "r") as f:
+            return [json.loads(line) for line in f]
+
+    def test_entries_are_chained(self, audit_logger):
+        audit_logger.log_event("event1", {})
+        audit_logger.log_event("event2", {})
+
+        lines = self._lines(audit_logger)
+        assert lines[0]["prev"] == "0" * 64
+        assert lines[0]["seq"] == 1
+        assert lines[1]["seq"] == 2
+        assert lines[1]["prev"] != lines[0]["prev"]
+        # Second entry completes an interval, so a checkpoint follows it
+        assert lines[2]["type"] == "checkpoint"
+        assert lines[2]["seq"] == 3
+
+    def test_checkpoints_are_skipped_by_read_logs(self, audit_logger):
+        for i in range(3):
+            audit_logger.log_event(f"event{i}", {})
+
+        logs = audit_logger.read_logs()
+        assert [e["event_type"] for e in logs] == ["event0", "event1", "event2"]
+
+    def test_verify_intact_log(self, audit_logger):
+        for i in range(3):
+            audit_logger.log_event(f"event{i}", {})
+
+        result = audit_logger.verify()
+        assert result["valid"] is True
+        assert result["checked"] == 4
+        assert result["checkpoint"] == 3
+
+    def test_verify_detects_deleted_line(self, audit_logger):
+        for i in range(3):
+            audit_logger.log_event(f"event{i}", {})
+
+        with open(audit_logger.file_path, "r") as f:
+            lines = f.readlines()
+        del lines[1]
+        with open(audit_logger.file_path, "w") as f:
+            f.writelines(lines)
+
+        result = audit_logger.verify()
+        assert result["valid"] is False
+        assert "chain" in result["error"]
+
+    def test_verify_detects_reordered_lines(self, audit_logger):
+        audit_logger.log_event("event1", {})
+        audit_logger.log_event("event2", {})
+
+        with open(audit_logger.file_path, "r") as f:
+            lines = f.readlines()
+        lines[0], lines[1] = lines[1], lines[0]
+        with open(audit_logger.file_path, "w") as f:
+            f.writelines(lines)
+
+        assert audit_logger.verify()["valid"] is False
+
+    def test_verify_detects_forged_checkpoint(self, audit_logger):
+        audit_logger.log_event("event1", {})
+        audit_logger.log_event("event2", {})
+
+        lines = self._lines(audit_logger)
+        lines[2]["mac"] = "0" * 64
+        with open(audit_logger.file_path, "w") as f:
+            f.writelines(json.dumps(line) + "\n" for line in lines)
+
+        result = audit_logger.verify()
+        assert result["valid"] is False
+        assert result["error"] == "Invalid checkpoint signature"
+
+    @pytest.mark.parametrize("seq", ["7", None, True, 1.0])
+    def test_verify_rejects_invalid_sequence_number(self, audit_logger, seq):
+        with open(audit_logger.file_path, "w") as f:
+            f.write(json.dumps({"prev": "0" * 64, "seq": seq}) + "\n")
+
+        result = audit_logger.verify()
+        assert result["valid"] is False
+        assert result["error"] == "Invalid sequence number"
+        assert result["offset"] == 0
+
+    def test_verify_resumes_from_checkpoint(self, audit_logger):
+        audit_logger.log_event("event1", {})
+        audit_logger.log_event("event2", {})
+        first = audit_logger.verify()
+        assert first["valid"] is True
+        assert first["resumed_from"] == 0
+
+        audit_logger.log_event("event3", {})
+        second = audit_logger.verify()
+        assert second["valid"] is True
+        assert second["resumed_from"] > 0
+        assert second["checked"] == 1
+
+        # A full check still walks the whole log
+        assert audit_logger.verify(full=True)["checked"] == 4
+
+    def test_verify_detects_modified_verified_checkpoint(self, audit_logger):
+        audit_logger.log_event("event1", {})
+        audit_logger.log_event("event2", {})
+        audit_logger.verify()
+
+        with open(audit_logger.file_path, "r") as f:
+            lines = f.readlines()
+        with open(audit_logger.file_path, "w") as f:
+            f.writelines(lines[:2])
+
+        result = audit_logger.verify()
+        assert result["valid"] is False
+
+    def test_verify_ignores_forged_state(self, audit_logger):
+        for i in range(4):
+            audit_logger.log_event(f"event{i}", {})
+        lines = self._lines(audit_logger)
+        lines[0]["data"] = "tampered"
+        raw = [json.dumps(line).encode() + b"\n" for line in lines]
+        with open(audit_logger.file_path, "wb") as f:
+            f.writelines(raw)
+        # Point the sidecar past the tampered line without the chain key
+        start = sum(len(line) for line in raw[:-1])
+        state = {"start": start, "end": start + len(raw[-1]), "hash": _line_hash(raw[-1]), "seq": lines[-1]["seq"]}
+        with open(audit_logger.state_path, "w") as f:
+            json.dump(dict(state, mac="0" * 64), f)
+
+        result = audit_logger.verify()
+
+        assert result["valid"] is False
+        assert result["resumed_from"] == 0
+
+    def test_verify_state_is_signed(self, audit_logger):
+        audit_logger.log_event("event1", {})
+        audit_logger.log_event("event2", {})
+        audit_logger.verify()
+
+        with open(audit_logger.state_path) as f:
+            state = json.load(f)
+        assert state["mac"] == audit_logger._state_mac(state)
+
+    def test_verify_accepts_legacy_prefix(self, audit_logger):
+        from backpack.crypto import encrypt_data
+
+        legacy = encrypt_data(json.dumps({"timestamp": 0, "event_type": "old", "details": {}}), audit_logger.master_key)
+        with open(audit_logger.file_path, "w") as f:
+            f.write(json.dumps(legacy) + "\n")
+        audit_logger.log_event("new", {})
+
+        assert audit_logger.verify()["valid"] is True
+        assert [e["event_type"] for e in audit_logger.read_logs()] == ["old", "new"]
+
+    def test_clear_removes_verify_state(self, audit_logger):
+        audit_logger.log_event("event1", {})
+        audit_logger.log_event("event2", {})
+        audit_logger.verify()
+        assert os.path.exists(audit_logger.state_path)
+
+        audit_logger.clear()
+        assert not os.path.exists(audit_logger.state_path)
+        assert audit_logger.verify()["valid"] is True
+
+
+class TestAuditStreaming:
+    @pytest.fixture
+    def audit_logger(self, tmp_path):
+        audit_logger = AuditLogger(file_path=str(tmp_path / "stream_audit.log"), checkpoint_interval=2)
+        for i in range(5):
+            audit_logger.log_event(f"event{i}", {"id": i})
+        return audit_logger
+
+    def test_iter_logs_matches_read_logs(self, audit_logger):
+        assert list(audit_logger.iter_logs()) == audit_logger.read_logs()
+
+    def test_tail_offset_skips_checkpoints(self, audit_logger):
+        tail = list(audit_logger.iter_logs(start=audit_logger.tail_offset(3)))
+        assert [e["details"]["id"] for e in tail] == [2, 3, 4]
+
+        everything = list(audit_logger.iter_logs(start=audit_logger.tail_offset(100)))
+        assert len(everything) == 5
+
+    def test_seek_time(self, audit_logger):
+        logs = audit_logger.read_logs()
+
+        offset = audit_logger.seek_time(logs[3]["timestamp"])
+        found = list(audit_logger.iter_logs(start=offset))
+        assert [e["details"]["id"] for e in found] == [3, 4]
+
+        assert audit_logger.seek_time(0) == 0
+        assert list(audit_logger.iter_logs(start=audit_logger.seek_time(time.time() + 60))) == []
+
+
+class TestAuditAggregation:
+    @pytest.fixture
+    def audit_logger(self, tmp_path):
+        return AuditLogger(
+            file_path=str(tmp_path / "aggregate_audit.log"),
+            aggregate_events=["get_key", "lock_read"],
+            flush_interval=3600,
+        )
+
+    def test_aggregated_events_are_counted_not_written(self, audit_logger):
+        for _ in range(50):
+            audit_logger.log_event("get_key", {"key_name": "OPENAI_API_KEY"})
+
+        assert not os.path.exists(audit_logger.file_path)
+
+    def test_flush_writes_one_summary_per_key(self, audit_logger):
+        for _ in range(5):
+            audit_logger.log_event("get_key", {"key_name": "A"})
+        for _ in range(3):
+            audit_logger.log_event("get_key", {"key_name": "B"})
+        audit_logger.log_event("lock_read", {"path": "agent.lock"})
+
+        audit_logger.flush()
+
+        logs = audit_logger.read_logs()
+        summaries = {(e["event_type"], e["details"].get("key_name")): e["aggregate"] for e in logs}
+        assert summaries[("get_key", "A")]["count"] == 5
+        assert summaries[("get_key", "B")]["count"] == 3
+        assert summaries[("lock_read", None)]["count"] == 1
+        a = summaries[("get_key", "A")]
+        assert a["first_timestamp"] <= a["last_timestamp"]
+
+        # Counters are reset after a flush
+        audit_logger.flush()
+        assert len(audit_logger.read_logs()) == 3
+
+    def test_sensitive_events_stay_individual(self, audit_logger):
+        audit_logger.log_event("get_key", {"key_name": "A"})
+        audit_logger.log_event("store_key", {"key_name": "A"})
+
+        logs = audit_logger.read_logs()
+        assert [e["event_type"] for e in logs] == ["store_key"]
+        assert "aggregate" not in logs[0]
+
+    def test_summaries_keep_log_order(self, audit_logger):
+        audit_logger.log_event("get_key", {"key_name": "A"})
+        audit_logger.log_event("lock_created", {"path": "agent.lock"})
+
+        audit_logger.flush()
+
+        logs = audit_logger.read_logs()
+        assert [e["event_type"] for e in logs] == ["lock_created", "get_key"]
+        assert logs[0]["timestamp"] <= logs[1]["timestamp"]
+        assert logs[1]["aggregate"]["last_timestamp"] <= logs[0]["timestamp"]
+
+    def test_security_events_are_never_aggregated(self, tmp_path):
+        audit_logger = AuditLogger(
+            file_path=str(tmp_path / "deny_audit.log"),
+            aggregate_events=["get_key", "store_key", "delete_key"],
+            flush_interval=3600,
+        )
+        audit_logger.log_event("delete_key", {"key_name": "A"})
+
+        assert audit_logger.aggregate_events == {"get_key"}
+        assert [e["event_type"] for e in audit_logger.read_logs()] == ["delete_key"]
+
+    def test_flush_when_interval_elapsed(self, tmp_path):
+        audit_logger = AuditLogger(
+            file_path=str(tmp_path / "interval_audit.log"), aggregate_events=["get_key"], flush_interval=0
+        )
+        audit_logger.log_event("get_key", {"key_name": "A"})
+
+        logs = audit_logger.read_logs()
+        assert logs[0]["aggregate"]["count"] == 1
+
+    def test_aggregate_events_from_env(self, tmp_path, monkeypatch):
+        monkeypatch.setenv("BACKPACK_AUDIT_AGGREGATE", "get_key, lock_read")
+        monkeypatch.setenv("BACKPACK_AUDIT_FLUSH_INTERVAL", "15")
+
+        audit_logger = AuditLogger(file_path=str(tmp_path / "env_audit.log"))
+
+        assert audit_logger.aggregate_events == {"get_key", "lock_read"}
+        assert audit_logger.flush_interval == 15
+
+    def test_summaries_keep_chain_valid(self, audit_logger):
+        audit_logger.log_event("store_key", {"key_name": "A"})
+        audit_logger.log_event("get_key", {"key_name": "A"})
+        audit_logger.log_event("get_key", {"key_name": "B"})
+        audit_logger.flush()
+
+        assert audit_logger.verify()["valid"] is True
+
+
+def _write_events(path, count):
+    audit_logger = get_audit_logger(path)
+    for i in range(count):
+        audit_logger.log_event("worker_event", {"pid": os.getpid(), "i": i})
+
+
+class TestSharedAuditLogger:
+
+    def test_same_instance_per_resolved_path(self, tmp_path):
+        path = str(tmp_path / "shared.log")
+        other_spelling = os.path.join(str(tmp_path), ".", "shared.log")
+
+        assert get_audit_logger(path) is get_audit_logger(other_spelling)
+        assert get_audit_logger(path) is not get_audit_logger(str(tmp_path / "other.log"))
+
+    def test_master_key_change_gets_new_logger(self, tmp_path, monkeypatch):
+        path = str(tmp_path / "keyed.log")
+        monkeypatch.setenv("AGENT_MASTER_KEY", "first-key")
+        first = get_audit_logger(path)
+
+        monkeypatch.setenv("AGENT_MASTER_KEY", "second-key")
+        second = get_audit_logger(path)
+
+        assert first is not second
+        assert second.master_key == "second-key"
+
+    def test_callers_follow_chdir(self, tmp_path, monkeypatch, mock_keyring):
+        from backpack.keychain import store_key
+
+        first, second = tmp_path / "first", tmp_path / "second"
+        first.mkdir()
+        second.mkdir()
+        monkeypatch.chdir(first)
+        store_key("FIRST_KEY", "v")
+        monkeypatch.chdir(second)
+        store_key("SECOND_KEY", "v")
+        close_all_loggers()
+
+        assert [e["event_type"] for e in AuditLogger(str(first / "agent_audit.log")).read_logs()] == ["store_key"]
+        assert [e["event_type"] for e in AuditLogger(str(second / "agent_audit.log")).read_logs()] == ["store_key"]
+
+    def test_descriptor_is_opened_once(self, tmp_path):
+        audit_logger = get_audit_logger(str(tmp_path / "fd.log"))
+
+        with patch("backpack.audit.os.open", wraps=os.open) as mock_open:
+            audit_logger.log_event("event1", {})
+            audit_logger.log_event("event2", {})
+
+        assert mock_open.call_count == 1
+        assert len(audit_logger.read_logs()) == 2
+        assert os.stat(audit_logger.file_path).st_mode & 0o777 == 0o600
+
+    def test_clear_reopens_descriptor(self, tmp_path):
+        audit_logger = get_audit_logger(str(tmp_path / "clear.log"))
+        audit_logger.log_event("event1", {})
+
+        audit_logger.clear()
+        audit_logger.log_event("event2", {})
+
+        assert [e["event_type"] for e in audit_logger.read_logs()] == ["event2"]
+
+    def test_file_removed_externally(self, tmp_path):
+        audit_logger = get_audit_logger(str(tmp_path / "removed.log"))
+        audit_logger.log_event("event1", {})
+
+        os.remove(audit_logger.file_path)
+        audit_logger.log_event("event2", {})
+
+        assert [e["event_type"] for e in audit_logger.read_logs()] == ["event2"]
+
+    def test_close_all_loggers_flushes_pending_summaries(self, tmp_path, monkeypatch):
+        monkeypatch.setenv("BACKPACK_AUDIT_AGGREGATE", "get_key")
+        audit_logger = get_audit_logger(str(tmp_path / "exec.log"))
+        audit_logger.log_event("get_key", {"key_name": "A"})
+        audit_logger.log_event("get_key", {"key_name": "A"})
+        assert not os.path.exists(audit_logger.file_path)
+
+        close_all_loggers()
+
+        logs = audit_logger.read_logs()
+        assert [e["aggregate"]["count"] for e in logs] == [2]
+
+    def test_concurrent_processes_keep_chain_valid(self, tmp_path):
+        path = str(tmp_path / "multi.log")
+        ctx = multiprocessing.get_context("spawn")
+        procs = [ctx.Process(target=_write_events, args=(path, 4)) for _ in range(3)]
+        for proc in procs:
+            proc.start()
+        for proc in procs:
+            proc.join(60)
+
+        audit_logger = get_audit_logger(path)
+        assert len(audit_logger.read_logs()) == 12
+        assert audit_logger.verify()["valid"] is True
+
+    def test_concurrent_threads_keep_chain_valid(self, tmp_path):
+        path = str(tmp_path / "threads.log")
+        threads = [threading.Thread(target=_write_events, args=(path, 3)) for _ in range(4)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        audit_logger = get_audit_logger(path)
+        assert len(audit_logger.read_logs()) == 12
+        assert audit_logger.verify()["valid"] is True
@@ -0,0 +1,488 @@
+"""
+Tests for agent bundles (backpack.bundle), `backpack export` and `backpack import`.
+"""
+
+import hashlib
+import io
+import os
+import stat
+import zipfile
+from unittest.mock import patch
+
+import pytest
+from click.testing import CliRunner
+
+from backpack.bundle import (
+    BLOB_PREFIX,
+    MAX_MEMBER_SIZE_ENV,
+    ZipStreamWriter,
+    export_agents,
+    export_bundle,
+    import_archive,
+    import_bundle,
+    read_bundle,
+    read_manifest,
+    select_files,
+)
+from backpack.cli import cli
+from backpack.exceptions import BundleError, ValidationError
+
+
+def _write(root, rel_path, content):
+    path = os.path.join(root, *rel_path.split("/"))
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, "w") as f:
+        f.write(content)
+
+
+class _Pipe(io.RawIOBase):
+    """Write-only, non-seekable stream, like stdout connected to a pipe."""
+
+    def __init__(self):
+        self.data = bytearray()
+
+    def writable(self):
+        return True
+
+    def write(self, b):
+        self.data += b
+        return len(b)
+
+
+@pytest.fixture
+def agent_dir(temp_dir):
+    _write(temp_dir, "agent.py", "print('hi')\n" * 200)
+    _write(temp_dir, "agent.lock", "{}")
+    _write(temp_dir, ".env", "SECRET=1")
+    _write(temp_dir, "prompts/system.txt", "You are helpful.\n" * 50)
+    _write(temp_dir, "prompts/draft.tmp", "x")
+    _write(temp_dir, "__pycache__/agent.cpython-311.pyc", "bytecode")
+    return temp_dir
+
+
+class TestSelectFiles:
+
+    def test_defaults_to_legacy_files(self, agent_dir):
+        assert select_files(agent_dir) == ["agent.lock", "agent.py"]
+
+    def test_include_and_exclude(self, agent_dir):
+        files = select_files(agent_dir, ["*"], ["*.tmp"])
+
+        assert files == [".env", "agent.lock", "agent.py", "prompts/system.txt"]
+
+    def test_directory_patterns(self, agent_dir):
+        assert select_files(agent_dir, ["prompts/"]) == ["prompts/draft.tmp", "prompts/system.txt"]
+        assert select_files(agent_dir, ["*"], ["prompts/", ".env"]) == ["agent.lock", "agent.py"]
+
+    def test_skips_output_file_and_symlinks(self, agent_dir):
+        os.symlink(os.path.join(agent_dir, "agent.py"), os.path.join(agent_dir, "link.py"))
+        output = os.path.join(agent_dir, "out.zip")
+        _write(agent_dir, "out.zip", "")
+
+        files = select_files(agent_dir, ["*.py", "*.zip"], skip=[output])
+
+        assert files == ["agent.py"]
+
+    def test_follows_symlinks_for_named_files(self, agent_dir, temp_dir):
+        shared = os.path.join(os.path.dirname(temp_dir), "shared_readme.md")
+        with open(shared, "w") as f:
+            f.write("shared")
+        os.symlink(shared, os.path.join(agent_dir, "README.md"))
+
+        assert select_files(agent_dir) == ["README.md", "agent.lock", "agent.py"]
+        assert select_files(agent_dir, ["*.md"]) == []
+        assert select_files(agent_dir, ["README.md", "__pycache__/agent.cpython-311.pyc"]) == [
+            "README.md", "__pycache__/agent.cpython-311.pyc",
+        ]
+
+    def test_defaults_and_excluded_directories_are_not_walked(self, agent_dir):
+        visited = []
+        real_walk = os.walk
+
+        def walk(root):
+            for entry in real_walk(root):
+                visited.append(os.path.relpath(entry[0], agent_dir))
+                yield entry
+
+        with patch("backpack.bundle.os.walk", side_effect=walk):
+            assert select_files(agent_dir) == ["agent.lock", "agent.py"]
+            assert visited == []
+            select_files(agent_dir, ["*"], ["prompts/"])
+
+        assert visited == ["."]
+
+    def test_read_manifest(self, temp_dir):
+        manifest = os.path.join(temp_dir, "export.txt")
+        _write(temp_dir, "export.txt", "# agent files\nagent.*\nprompts/\n\n!*.tmp  # drafts\n")
+
+        assert read_manifest(manifest) == (["agent.*", "prompts/"], ["*.tmp"])
+
+
+class TestExportBundle:
+
+    @pytest.mark.parametrize("compression", ["deflate", "lzma", "stored"])
+    def test_roundtrip(self, agent_dir, compression):
+        files = select_files(agent_dir, ["*"])
+        out = io.BytesIO()
+
+        stats = export_bundle(agent_dir, files, out, compression=compression, workers=2)
+
+        with zipfile.ZipFile(out) as zf:
+            assert zf.testzip() is None
+            assert zf.namelist() == files
+            assert zf.read("prompts/system.txt") == b"You are helpful.\n" * 50
+        assert stats.files == files
+        assert stats.bytes_out == len(out.getvalue())
+        assert stats.bytes_in == sum(os.path.getsize(os.path.join(agent_dir, f)) for f in files)
+        if compression != "stored":
+            assert stats.bytes_out < stats.bytes_in
+
+    def test_streams_to_unseekable_output(self, agent_dir):
+        pipe = _Pipe()
+
+        export_bundle(agent_dir, ["agent.py"], pipe)
+
+        with zipfile.ZipFile(io.BytesIO(bytes(pipe.data))) as zf:
+            assert zf.read("agent.py") == b"print('hi')\n" * 200
+
+    def test_keeps_order_with_many_workers(self, temp_dir):
+        names = [f"f{n:03}.txt" for n in range(50)]
+        for name in names:
+            _write(temp_dir, name, name * 100)
+        out = io.BytesIO()
+
+        export_bundle(temp_dir, names, out, workers=4)
+
+        with zipfile.ZipFile(out) as zf:
+            assert zf.namelist() == names
+
+    def test_preserves_mode(self, agent_dir):
+        os.chmod(os.path.join(agent_dir, "agent.lock"), 0o600)
+        out = io.BytesIO()
+
+        export_bundle(agent_dir, ["agent.lock"], out)
+
+        with zipfile.ZipFile(out) as zf:
+            assert (zf.getinfo("agent.lock").external_attr >> 16) & 0o777 == 0o600
+
+    def test_empty_bundle_is_valid(self):
+        out = io.BytesIO()
+        ZipStreamWriter(out).close()
+
+        with zipfile.ZipFile(out) as zf:
+            assert zf.namelist() == []
+
+    def test_invalid_options(self, agent_dir):
+        with pytest.raises(ValidationError):
+            export_bundle(agent_dir, ["agent.py"], io.BytesIO(), compression="bzip2")
+        with pytest.raises(ValidationError):
+            export_bundle(agent_dir, ["agent.py"], io.BytesIO(), level=10)
+
+
+class TestExportCLI:
+
+    def test_include_exclude_and_stats(self, agent_dir, monkeypatch):
+        monkeypatch.chdir(agent_dir)
+
+        result = CliRunner().invoke(
+            cli, ["export", "out", "--include", "*", "--exclude", "*.tmp", "--exclude", ".env",
+                  "--compression", "lzma", "-j", "2"],
+        )
+
+        assert result.exit_code == 0, result.output
+        assert "Exported 3 files to out.zip" in result.output
+        assert "bytes in" in result.output
+        with zipfile.ZipFile("out.zip") as zf:
+            assert zf.namelist() == ["agent.lock", "agent.py", "prompts/system.txt"]
+            assert zf.getinfo("agent.py").compress_type == zipfile.ZIP_LZMA
+
+    def test_manifest(self, agent_dir, monkeypatch):
+        monkeypatch.chdir(agent_dir)
+        _write(agent_dir, "export.txt", "agent.py\nprompts/\n!*.tmp\n")
+
+        result = CliRunner().invoke(cli, ["export", "--manifest", "export.txt"])
+
+        assert result.exit_code == 0, result.output
+        with zipfile.ZipFile("backpack_agent.zip") as zf:
+            assert zf.namelist() == ["agent.py", "prompts/system.txt"]
+
+    def test_export_to_stdout(self, agent_dir, monkeypatch):
+        monkeypatch.chdir(agent_dir)
+
+        result = CliRunner().invoke(cli, ["export", "-"])
+
+        assert result.exit_code == 0
+        with zipfile.ZipFile(io.BytesIO(result.stdout_bytes)) as zf:
+            assert zf.namelist() == ["agent.lock", "agent.py"]
+        assert "Exported 2 files to stdout" in result.stderr
+        assert not os.path.exists("-.zip")
+
+
+@pytest.fixture
+def fleet_dir(temp_dir):
+    for name in ("alpha", "beta"):
+        _write(temp_dir, f"agents/{name}/agent.py", "print('shared template')\n" * 100)
+        _write(temp_dir, f"agents/{name}/requirements.txt", "requests\n")
+        _write(temp_dir, f"agents/{name}/agent.lock", f"{{\"agent\": \"{name}\"}}")
+    return temp_dir
+
+
+def _export_fleet(fleet_dir):
+    agents = {
+        name: (os.path.join(fleet_dir, "agents", name), select_files(os.path.join(fleet_dir, "agents", name)))
+        for name in ("alpha", "beta")
+    }
+    out = io.BytesIO()
+    return export_agents(agents, out, workers=2), out
+
+
+class TestContentAddressedBundle:
+
+    def test_stores_each_unique_file_once(self, fleet_dir):
+        stats, out = _export_fleet(fleet_dir)
+
+        with zipfile.ZipFile(out) as zf:
+            blobs = [n for n in zf.namelist() if n.startswith(BLOB_PREFIX)]
+            agents = read_bundle(zf)
+        assert len(blobs) == 4  # shared agent.py and requirements.txt, two locks
+        assert stats.duplicates == 2
+        assert len(stats.files) == 6
+        assert sorted(agents) == ["alpha", "beta"]
+        assert agents["alpha"]["agent.py"]["sha256"] == agents["beta"]["agent.py"]["sha256"]
+
+    def test_import_multiple_agents(self, fleet_dir, temp_dir):
+        _, out = _export_fleet(fleet_dir)
+        target = os.path.join(temp_dir, "restored")
+
+        with zipfile.ZipFile(out) as zf:
+            stats = import_bundle(zf, target)
+
+        assert stats.agents == ["alpha", "beta"]
+        assert len(stats.written) == 6
+        with open(os.path.join(target, "beta", "agent.lock")) as f:
+            assert f.read() == '{"agent": "beta"}'
+
+    def test_import_skips_files_already_present(self, fleet_dir, temp_dir):
+        _, out = _export_fleet(fleet_dir)
+        target = os.path.join(temp_dir, "restored")
+        with zipfile.ZipFile(out) as zf:
+            import_bundle(zf, target)
+        _write(target, "alpha/requirements.txt", "changed\n")
+
+        with zipfile.ZipFile(out) as zf:
+            stats = import_bundle(zf, target)
+
+        assert stats.written == ["alpha/requirements.txt"]
+        assert len(stats.skipped) == 5
+        with open(os.path.join(target, "alpha", "requirements.txt")) as f:
+            assert f.read() == "requests\n"
+
+    def test_duplicate_blobs_are_decompressed_once(self, fleet_dir, temp_dir):
+        _, out = _export_fleet(fleet_dir)
+        opened = []
+
+        with zipfile.ZipFile(out) as zf:
+            real_open = zf.open
+            zf.open = lambda name, *a, **kw: opened.append(name) or real_open(name, *a, **kw)
+            import_bundle(zf, os.path.join(temp_dir, "restored"))
+
+        assert len([name for name in opened if name.startswith(BLOB_PREFIX)]) == 4
+
+    def test_rejects_unsafe_paths(self, temp_dir):
+        out = io.BytesIO()
+        with zipfile.ZipFile(out, "w") as zf:
+            zf.writestr("bundle.json", '{"format": "backpack-bundle", "version": 1, "agents": ["a"]}')
+            zf.writestr("manifests/a.json", '{"format": "backpack-bundle", "version": 1, "agent": "a", '
+                        '"files": {"../evil.py": {"sha256": "' + "0" * 64 + '", "size": 1}}}')
+
+        with zipfile.ZipFile(out) as zf, pytest.raises(BundleError):
+            import_bundle(zf, temp_dir)
+
+        assert not os.path.exists(os.path.join(os.path.dirname(temp_dir), "evil.py"))
+
+
+class TestContentAddressedCLI:
+
+    def test_export_and_import_agents(self, fleet_dir, monkeypatch):
+        monkeypatch.chdir(fleet_dir)
+        runner = CliRunner()
+
+        exported = runner.invoke(cli, ["export", "fleet.zip", "--agents", "agents/*"])
+        imported = runner.invoke(cli, ["import", "fleet.zip", "--dir", "restored"])
+        again = runner.invoke(cli, ["import", "fleet.zip", "--dir", "restored"])
+
+        assert exported.exit_code == 0, exported.output
+        assert "2 agents, 2 duplicate files stored once" in exported.output
+        assert imported.exit_code == 0, imported.output
+        assert "Imported 2 agents to restored" in imported.output
+        assert os.path.exists(os.path.join("restored", "alpha", "agent.py"))
+        assert "Skipped 6 unchanged files" in again.output
+
+    def test_export_agents_outside_cwd(self, fleet_dir, monkeypatch):
+        elsewhere = os.path.join(fleet_dir, "elsewhere")
+        os.makedirs(elsewhere)
+        monkeypatch.chdir(elsewhere)
+        runner = CliRunner()
+
+        exported = runner.invoke(cli, ["export", "fleet.zip", "--agents", os.path.join("..", "agents", "*")])
+
+        assert exported.exit_code == 0, exported.output
+        with zipfile.ZipFile("fleet.zip") as zf:
+            assert sorted(read_bundle(zf)) == ["alpha", "beta"]
+
+    def test_dedup_single_agent(self, agent_dir, temp_dir, monkeypatch):
+        monkeypatch.chdir(agent_dir)
+        runner = CliRunner()
+
+        runner.invoke(cli, ["export", "--dedup"])
+        result = runner.invoke(cli, ["import", "backpack_agent.zip", "--dir", os.path.join(temp_dir, "copy")])
+
+        assert result.exit_code == 0, result.output
+        assert "Imported agent to" in result.output
+        assert os.path.exists(os.path.join(temp_dir, "copy", "agent.lock"))
+
+
+def _flat_zip(members):
+    out = io.BytesIO()
+    with zipfile.ZipFile(out, "w") as zf:
+        for name, data in members.items():
+            zf.writestr(name, data)
+    return out
+
+
+class TestImportArchive:
+
+    def test_streams_members_with_modes(self, agent_dir, temp_dir):
+        os.chmod(os.path.join(agent_dir, "agent.lock"), 0o600)
+        out = io.BytesIO()
+        export_bundle(agent_dir, ["agent.lock", "agent.py"], out)
+        target = os.path.join(temp_dir, "restored")
+
+        with zipfile.ZipFile(out) as zf:
+            stats = import_archive(zf, target)
+
+        assert stats.written == ["agent.lock", "agent.py"]
+        assert stat.S_IMODE(os.stat(os.path.join(target, "agent.lock")).st_mode) == 0o600
+
+    @pytest.mark.parametrize("name", ["../evil.py", "/tmp/evil.py", "a/../../evil.py", "C:/evil.py"])
+    def test_rejects_unsafe_names(self, temp_dir, name):
+        target = os.path.join(temp_dir, "restored")
+
+        with zipfile.ZipFile(_flat_zip({name: "x"})) as zf, pytest.raises(BundleError):
+            import_archive(zf, target)
+
+        assert not os.path.exists(os.path.join(temp_dir, "evil.py"))
+
+    def test_rejects_symlinked_directory(self, temp_dir):
+        target = os.path.join(temp_dir, "restored")
+        os.makedirs(target)
+        os.symlink(temp_dir, os.path.join(target, "escape"))
+
+        with zipfile.ZipFile(_flat_zip({"escape/evil.py": "x"})) as zf, pytest.raises(BundleError):
+            import_archive(zf, target)
+
+        assert not os.path.exists(os.path.join(temp_dir, "evil.py"))
+
+    def test_rejects_oversized_members(self, temp_dir):
+        with zipfile.ZipFile(_flat_zip({"big.bin": "x" * 100})) as zf, pytest.raises(BundleError):
+            import_archive(zf, temp_dir, max_size=10)
+
+        assert not os.path.exists(os.path.join(temp_dir, "big.bin"))
+
+    def test_max_size_from_environment(self, temp_dir, monkeypatch):
+        monkeypatch.setenv(MAX_MEMBER_SIZE_ENV, "10")
+
+        with zipfile.ZipFile(_flat_zip({"big.bin": "x" * 100})) as zf, pytest.raises(BundleError):
+            import_archive(zf, temp_dir)
+
+    def test_only(self, temp_dir):
+        archive = _flat_zip({"agent.lock": "lock", "agent.py": "code", "prompts/a.txt": "a"})
+
+        with zipfile.ZipFile(archive) as zf:
+            stats = import_archive(zf, temp_dir, only=["agent.lock", "prompts/"])
+        with zipfile.ZipFile(archive) as zf, pytest.raises(BundleError):
+            import_archive(zf, temp_dir, only=["missing.txt"])
+
+        assert stats.written == ["agent.lock", "prompts/a.txt"]
+        assert not os.path.exists(os.path.join(temp_dir, "agent.py"))
+
+    def test_skips_identical_files(self, temp_dir):
+        archive = _flat_zip({"agent.lock": "lock", "agent.py": "code"})
+        _write(temp_dir, "agent.lock", "lock")
+        _write(temp_dir, "agent.py", "old code")
+
+        with zipfile.ZipFile(archive) as zf:
+            stats = import_archive(zf, temp_dir)
+
+        assert stats.skipped == ["agent.lock"]
+        assert stats.written == ["agent.py"]
+
+    def test_bundle_hash_mismatch_is_refused(self, temp_dir):
+        wrong = "0" * 64
+        archive = _flat_zip({
+            "bundle.json": '{"format": "backpack-bundle", "version": 1, "agents": ["a"]}',
+            "manifests/a.json": '{"format": "backpack-bundle", "version": 1, "agent": "a", '
+                                '"files": {"agent.py": {"sha256": "' + wrong + '", "size": 4}}}',
+            f"blobs/{wrong}": "code",
+        })
+
+        with zipfile.ZipFile(archive) as zf, pytest.raises(BundleError, match="verification"):
+            import_archive(zf, temp_dir)
+
+        assert os.listdir(temp_dir) == []
+
+    def test_failed_check_leaves_earlier_files_alone(self, temp_dir):
+        good = hashlib.sha256(b"code").hexdigest()
+        wrong = "0" * 64
+        _write(temp_dir, "agent.py", "old")
+        archive = _flat_zip({
+            "bundle.json": '{"format": "backpack-bundle", "version": 1, "agents": ["a"]}',
+            "manifests/a.json": '{"format": "backpack-bundle", "version": 1, "agent": "a", "files": {'
+                                '"agent.py": {"sha256": "' + good + '", "size": 4}, '
+                                '"zz.py": {"sha256": "' + wrong + '", "size": 4}}}',
+            f"blobs/{good}": "code",
+            f"blobs/{wrong}": "code",
+        })
+
+        with zipfile.ZipFile(archive) as zf, pytest.raises(BundleError, match="verification"):
+            import_archive(zf, temp_dir)
+
+        assert os.listdir(temp_dir) == ["agent.py"]
+        assert open(os.path.join(temp_dir, "agent.py")).read() == "old"
+
+    def test_bundle_only(self, fleet_dir, temp_dir):
+        _, out = _export_fleet(fleet_dir)
+        target = os.path.join(temp_dir, "restored")
+
+        with zipfile.ZipFile(out) as zf:
+            stats = import_archive(zf, target, only=["agent.lock"])
+
+        assert stats.written == ["alpha/agent.lock", "beta/agent.lock"]
+        assert not os.path.exists(os.path.join(target, "alpha", "agent.py"))
+
+
+class TestImportCLI:
+
+    def test_only_and_skip(self, agent_dir, temp_dir, monkeypatch):
+        monkeypatch.chdir(agent_dir)
+        runner = CliRunner()
+        runner.invoke(cli, ["export"])
+        target = os.path.join(temp_dir, "restored")
+
+        first = runner.invoke(cli, ["import", "backpack_agent.zip", "--dir", target, "--only", "agent.lock"])
+        assert first.exit_code == 0, first.output
+        assert os.listdir(target) == ["agent.lock"]
+
+        second = runner.invoke(cli, ["import", "backpack_agent.zip", "--dir", target])
+        assert "Skipped 1 unchanged files" in second.output
+        assert "  - agent.py" in second.output
+
+    def test_oversized_member_fails(self, agent_dir, monkeypatch):
+        monkeypatch.chdir(agent_dir)
+        runner = CliRunner()
+        runner.invoke(cli, ["export"])
+
+        result = runner.invoke(cli, ["import", "backpack_agent.zip", "--dir", "restored", "--max-size", "10"])
+
+        assert result.exit_code == 1
+        assert "Bundle member too large" in result.output
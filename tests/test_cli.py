@@ -3,12 +3,14 @@ Tests for CLI module - command-line interface functionality.
 """
 
 import os
+import sys
+from unittest.mock import patch
 
 from click.testing import CliRunner
 
 from backpack.agent_lock import AgentLock
 from backpack.cli import cli
-from backpack.keychain import register_key, store_key
+from backpack.keychain import get_keys, register_key, store_key
 
 
 class TestCLIInit:
@@ -176,6 +178,146 @@ sys.exit(0 if os.environ.get('TEST_KEY') == 'test-value' else 1)
             os.chdir(original_dir)
 
 
+    def test_run_looks_up_vault_keys_in_one_batch(self, mock_keyring, temp_dir, clean_env):
+        """Test that vault keys are resolved with a single batched lookup."""
+        runner = CliRunner()
+        original_dir = os.getcwd()
+
+        try:
+            os.chdir(temp_dir)
+            store_key("KEY_A", "value-a")
+            store_key("KEY_B", "value-b")
+            runner.invoke(cli, ['init', '--credentials', 'KEY_A,KEY_B,KEY_C'])
+            with open("agent_script.py", "w") as f:
+                f.write("pass")
+
+            with patch("backpack.cli.get_keys", wraps=get_keys) as mock_get_keys, \
+                 patch("subprocess.run") as mock_run:
+                mock_run.return_value.returncode = 0
+                result = runner.invoke(cli, ['run', 'agent_script.py', '--non-interactive'])
+
+            assert result.exit_code == 0
+            mock_get_keys.assert_called_once_with(["KEY_A", "KEY_B", "KEY_C"])
+            env = mock_run.call_args[1]["env"]
+            assert env["KEY_A"] == "value-a"
+            assert env["KEY_B"] == "value-b"
+            assert "KEY_C" not in env
+        finally:
+            os.chdir(original_dir)
+
+    def test_run_exec_replaces_process(self, mock_keyring, temp_dir, clean_env):
+        """Test that --exec execs into the agent after flushing audit logs."""
+        runner = CliRunner()
+        original_dir = os.getcwd()
+        calls = []
+
+        try:
+            os.chdir(temp_dir)
+            store_key("KEY_A", "value-a")
+            runner.invoke(cli, ['init', '--credentials', 'KEY_A'])
+            with open("agent_script.py", "w") as f:
+                f.write("pass")
+
+            with patch("backpack.cli.close_all_loggers", side_effect=lambda: calls.append("close")), \
+                 patch("os.execve", side_effect=lambda *a: calls.append("exec")) as mock_execve, \
+                 patch("subprocess.run") as mock_run:
+                result = runner.invoke(cli, ['run', 'agent_script.py', '--non-interactive', '--exec'])
+
+            assert result.exit_code == 0
+            assert calls == ["close", "exec"]
+            mock_run.assert_not_called()
+            executable, argv, env = mock_execve.call_args[0]
+            assert executable == sys.executable
+            assert argv == [sys.executable, "agent_script.py"]
+            assert env["KEY_A"] == "value-a"
+        finally:
+            os.chdir(original_dir)
+
+    def test_run_exec_failure(self, mock_keyring, temp_dir, clean_env):
+        """Test that a failed exec is reported as a script execution error."""
+        runner = CliRunner()
+        original_dir = os.getcwd()
+
+        try:
+            os.chdir(temp_dir)
+            runner.invoke(cli, ['init'])
+
+            with patch("os.execve", side_effect=OSError("Exec format error")):
+                result = runner.invoke(cli, ['run', 'agent_script.py', '--non-interactive', '--exec'])
+
+            assert result.exit_code == 1
+            assert "Failed to execute agent script" in result.output
+        finally:
+            os.chdir(original_dir)
+
+    def test_run_in_process(self, mock_keyring, temp_dir, clean_env):
+        """Test that --in-process runs the agent as __main__ with injected variables."""
+        runner = CliRunner()
+        original_dir = os.getcwd()
+        original_argv = sys.argv[:]
+
+        try:
+            os.chdir(temp_dir)
+            store_key("KEY_A", "value-a")
+            runner.invoke(cli, ['init', '--credentials', 'KEY_A'])
+            with open("agent_script.py", "w") as f:
+                f.write(
+                    "import os, sys\n"
+                    "if __name__ == '__main__':\n"
+                    "    print(os.environ['KEY_A'], sys.argv)\n"
+                    "    sys.exit(3)\n"
+                )
+
+            with patch("subprocess.run") as mock_run:
+                result = runner.invoke(cli, ['run', 'agent_script.py', '--non-interactive', '--in-process'])
+
+            assert result.exit_code == 3
+            assert "value-a ['agent_script.py']" in result.output
+            mock_run.assert_not_called()
+            assert "KEY_A" not in os.environ
+            assert sys.argv == original_argv
+        finally:
+            os.chdir(original_dir)
+
+    def test_run_in_process_exit_codes(self, mock_keyring, temp_dir, clean_env):
+        """Test that in-process exits map to the child interpreter's exit codes."""
+        runner = CliRunner()
+        original_dir = os.getcwd()
+        cases = [
+            ("pass", 0, None),
+            ("raise SystemExit('stopped')", 1, "stopped"),
+            ("raise RuntimeError('boom')", 1, "RuntimeError: boom"),
+        ]
+
+        try:
+            os.chdir(temp_dir)
+            runner.invoke(cli, ['init'])
+            for code, exit_code, message in cases:
+                with open("agent_script.py", "w") as f:
+                    f.write(code + "\n")
+
+                result = runner.invoke(cli, ['run', 'agent_script.py', '--non-interactive', '--in-process'])
+
+                assert result.exit_code == exit_code, code
+                if message:
+                    assert message in result.output
+
+            result = runner.invoke(cli, ['run', 'missing.py', '--non-interactive', '--in-process'])
+            assert result.exit_code == 2
+            assert "can't open file" in result.output
+        finally:
+            os.chdir(original_dir)
+
+    def test_run_exec_and_in_process_conflict(self, mock_keyring):
+        """Test that --exec and --in-process are mutually exclusive."""
+        runner = CliRunner()
+
+        result = runner.invoke(cli, ['run', 'agent_script.py', '--exec', '--in-process'])
+
+        assert result.exit_code == 2
+        assert "cannot be used together" in result.output
+
+
 class TestCLIKey:
     """Tests for key management commands."""
     
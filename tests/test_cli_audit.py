@@ -0,0 +1,125 @@
+"""
+Tests for the `backpack audit` command group.
+"""
+
+import csv
+import json
+import time
+
+import pytest
+from click.testing import CliRunner
+
+from backpack.audit import AuditLogger
+from backpack.cli import _parse_since, cli
+
+
+@pytest.fixture
+def log_file(tmp_path):
+    path = str(tmp_path / "audit.log")
+    audit_logger = AuditLogger(path)
+    audit_logger.log_event("lock_read", {"path": "agent.lock"})
+    audit_logger.log_event("get_key", {"key_name": "A"})
+    audit_logger.log_event("get_key", {"key_name": "B"})
+    return path
+
+
+class TestAuditCommands:
+
+    def test_tail(self, log_file):
+        result = CliRunner().invoke(cli, ["audit", "--file", log_file, "tail", "-n", "2"])
+
+        assert result.exit_code == 0
+        entries = [json.loads(line) for line in result.output.splitlines()]
+        assert [e["details"]["key_name"] for e in entries] == ["A", "B"]
+
+    def test_query_by_event(self, log_file):
+        result = CliRunner().invoke(cli, ["audit", "--file", log_file, "query", "--event", "lock_read"])
+
+        assert result.exit_code == 0
+        entries = [json.loads(line) for line in result.output.splitlines()]
+        assert [e["event_type"] for e in entries] == ["lock_read"]
+
+    def test_query_since_future_is_empty(self, log_file):
+        result = CliRunner().invoke(cli, ["audit", "--file", log_file, "query", "--since", "2999-01-01"])
+
+        assert result.exit_code == 0
+        assert result.output == ""
+
+    def test_query_invalid_since(self, log_file):
+        result = CliRunner().invoke(cli, ["audit", "--file", log_file, "query", "--since", "yesterday"])
+
+        assert result.exit_code != 0
+        assert "--since" in result.output
+
+    def test_stats(self, log_file):
+        result = CliRunner().invoke(cli, ["audit", "--file", log_file, "stats", "--json"])
+
+        assert result.exit_code == 0
+        stats = json.loads(result.output)
+        assert stats["get_key"]["count"] == 2
+        assert stats["lock_read"]["count"] == 1
+
+    def test_stats_table(self, log_file):
+        result = CliRunner().invoke(cli, ["audit", "--file", log_file, "stats"])
+
+        assert result.exit_code == 0
+        assert "get_key" in result.output
+        assert "EVENT" in result.output
+
+    def test_export_jsonl(self, log_file):
+        result = CliRunner().invoke(cli, ["audit", "--file", log_file, "export"])
+
+        assert result.exit_code == 0
+        assert len(result.output.splitlines()) == 3
+
+    def test_export_csv_parallel(self, log_file, tmp_path):
+        out = str(tmp_path / "audit.csv")
+        result = CliRunner().invoke(
+            cli, ["audit", "--file", log_file, "export", "--format", "csv", "--workers", "2", "-o", out]
+        )
+
+        assert result.exit_code == 0
+        assert "Exported 3 entries" in result.output
+        with open(out, newline="") as f:
+            rows = list(csv.DictReader(f))
+        assert [r["event_type"] for r in rows] == ["lock_read", "get_key", "get_key"]
+        assert json.loads(rows[1]["details"]) == {"key_name": "A"}
+
+    def test_verify(self, log_file):
+        result = CliRunner().invoke(cli, ["audit", "--file", log_file, "verify"])
+
+        assert result.exit_code == 0
+        assert "Audit log intact" in result.output
+
+    def test_verify_tampered(self, log_file):
+        with open(log_file) as f:
+            lines = f.readlines()
+        with open(log_file, "w") as f:
+            f.writelines(lines[1:])
+
+        result = CliRunner().invoke(cli, ["audit", "--file", log_file, "verify"])
+
+        assert result.exit_code == 1
+        assert "verification failed" in result.output
+
+
+class TestParseSince:
+
+    def test_relative(self):
+        assert abs(_parse_since("2h") - (time.time() - 7200)) < 5
+
+    def test_iso_utc(self):
+        assert _parse_since("1970-01-02T00:00:00Z") == 86400
+        assert _parse_since("1970-01-02") == 86400
+
+
+def test_stats_counts_aggregated_events(tmp_path):
+    path = str(tmp_path / "audit.log")
+    audit_logger = AuditLogger(path, aggregate_events=["get_key"], flush_interval=3600)
+    for _ in range(4):
+        audit_logger.log_event("get_key", {"key_name": "A"})
+    audit_logger.flush()
+
+    result = CliRunner().invoke(cli, ["audit", "--file", path, "stats", "--json"])
+
+    assert json.loads(result.output)["get_key"]["count"] == 4
@@ -0,0 +1,163 @@
+"""
+Tests for bulk `backpack key import` / `backpack key export`.
+"""
+
+import json
+import os
+import shutil
+from unittest.mock import patch
+
+import keyring
+from click.testing import CliRunner
+
+from backpack.cli import _parse_env_file, cli
+from backpack.keychain import SERVICE_NAME, invalidate_cache, list_keys, register_key, store_key
+
+ENV_TEXT = """
+# Team credentials
+OPENAI_API_KEY=sk-test-123
+export TWITTER_TOKEN="tw token"
+ANTHROPIC_API_KEY='anthropic value'  
+GITHUB_TOKEN=ghp_abc # personal token
+"""
+
+
+class TestParseEnvFile:
+
+    def test_parse(self):
+        assert _parse_env_file(ENV_TEXT) == {
+            "OPENAI_API_KEY": "sk-test-123",
+            "TWITTER_TOKEN": "tw token",
+            "ANTHROPIC_API_KEY": "anthropic value",
+            "GITHUB_TOKEN": "ghp_abc",
+        }
+
+    def test_invalid_line(self, mock_keyring, tmp_path):
+        env_file = tmp_path / ".env"
+        env_file.write_text("GOOD=value\nnot a pair\n")
+
+        result = CliRunner().invoke(cli, ["key", "import", str(env_file)])
+
+        assert result.exit_code == 1
+        assert "Invalid .env line 2" in result.output
+
+
+class TestKeyImport:
+
+    def test_import_env(self, mock_keyring, tmp_path):
+        env_file = tmp_path / ".env"
+        env_file.write_text(ENV_TEXT)
+
+        with patch("keyring.set_password", wraps=keyring.set_password) as mock_set:
+            result = CliRunner().invoke(cli, ["key", "import", str(env_file)])
+
+        assert result.exit_code == 0, result.output
+        assert "Imported 4 key(s)" in result.output
+        assert mock_keyring[(SERVICE_NAME, "TWITTER_TOKEN")] == "tw token"
+        assert set(list_keys()) == {"OPENAI_API_KEY", "TWITTER_TOKEN", "ANTHROPIC_API_KEY", "GITHUB_TOKEN"}
+        assert not [c for c in mock_set.call_args_list if c.args[1] == "_registry"]
+
+    def test_import_json(self, mock_keyring, tmp_path):
+        json_file = tmp_path / "keys.json"
+        json_file.write_text(json.dumps({"KEY1": "value1", "KEY2": "value2"}))
+
+        result = CliRunner().invoke(cli, ["key", "import", str(json_file)])
+
+        assert result.exit_code == 0, result.output
+        assert mock_keyring[(SERVICE_NAME, "KEY2")] == "value2"
+
+    def test_import_rejects_invalid_name_before_storing(self, mock_keyring, tmp_path):
+        env_file = tmp_path / ".env"
+        env_file.write_text("GOOD=value\n_RESERVED=value\n")
+
+        result = CliRunner().invoke(cli, ["key", "import", str(env_file)])
+
+        assert result.exit_code == 1
+        assert "Invalid key name: _RESERVED" in result.output
+        assert (SERVICE_NAME, "GOOD") not in mock_keyring
+
+    def test_import_skips_existing_unless_overwrite(self, mock_keyring, tmp_path):
+        store_key("KEY1", "old")
+        register_key("KEY1")
+        env_file = tmp_path / ".env"
+        env_file.write_text("KEY1=new\nKEY2=value\n")
+
+        result = CliRunner().invoke(cli, ["key", "import", str(env_file)])
+        assert "Imported 1 key(s)" in result.output
+        assert "Skipped 1 existing key(s)" in result.output
+        assert mock_keyring[(SERVICE_NAME, "KEY1")] == "old"
+
+        result = CliRunner().invoke(cli, ["key", "import", str(env_file), "--overwrite"])
+        assert "Imported 2 key(s)" in result.output
+        assert mock_keyring[(SERVICE_NAME, "KEY1")] == "new"
+
+
+class TestKeyExport:
+
+    def test_export_and_import_bundle(self, mock_keyring, tmp_path, backpack_home):
+        env_file = tmp_path / ".env"
+        env_file.write_text("KEY1=value1\nKEY2=value2\n")
+        runner = CliRunner()
+        runner.invoke(cli, ["key", "import", str(env_file)])
+
+        bundle_path = str(tmp_path / "keys.bundle.json")
+        with open(bundle_path, "w"):
+            pass
+        os.chmod(bundle_path, 0o644)
+        result = runner.invoke(cli, ["key", "export", bundle_path], env={"BACKPACK_BUNDLE_PASSPHRASE": "s3cret"})
+
+        assert result.exit_code == 0, result.output
+        assert "Exported 2 key(s)" in result.output
+        assert os.stat(bundle_path).st_mode & 0o777 == 0o600
+        with open(bundle_path) as f:
+            text = f.read()
+        assert "value1" not in text
+
+        # Simulate a fresh machine
+        mock_keyring.clear()
+        shutil.rmtree(backpack_home)
+        invalidate_cache()
+        result = runner.invoke(cli, ["key", "import", bundle_path], input="s3cret\n")
+
+        assert result.exit_code == 0, result.output
+        assert mock_keyring[(SERVICE_NAME, "KEY1")] == "value1"
+        assert mock_keyring[(SERVICE_NAME, "KEY2")] == "value2"
+
+    def test_import_bundle_wrong_passphrase(self, mock_keyring, tmp_path):
+        store_key("KEY1", "value1")
+        bundle_path = str(tmp_path / "keys.json")
+        runner = CliRunner()
+        runner.invoke(cli, ["key", "export", bundle_path, "--keys", "KEY1"], input="right\nright\n")
+
+        result = runner.invoke(cli, ["key", "import", bundle_path], input="wrong\n")
+
+        assert result.exit_code == 1
+        assert "Failed to decrypt key bundle" in result.output
+
+    def test_passphrase_is_not_a_command_line_option(self, mock_keyring, tmp_path):
+        store_key("KEY1", "value1")
+
+        result = CliRunner().invoke(cli, ["key", "export", str(tmp_path / "out.json"), "--passphrase", "x"])
+
+        assert result.exit_code == 2
+        assert not os.path.exists(str(tmp_path / "out.json"))
+
+    def test_import_passphrase_from_environment(self, mock_keyring, tmp_path, monkeypatch):
+        store_key("KEY1", "value1")
+        bundle_path = str(tmp_path / "keys.json")
+        monkeypatch.setenv("BACKPACK_BUNDLE_PASSPHRASE", "env-secret")
+        runner = CliRunner()
+        runner.invoke(cli, ["key", "export", bundle_path, "--keys", "KEY1"])
+        mock_keyring.clear()
+        invalidate_cache()
+
+        result = runner.invoke(cli, ["key", "import", bundle_path])
+
+        assert result.exit_code == 0, result.output
+        assert mock_keyring[(SERVICE_NAME, "KEY1")] == "value1"
+
+    def test_export_nothing(self, mock_keyring, tmp_path):
+        result = CliRunner().invoke(cli, ["key", "export", str(tmp_path / "out.json")])
+
+        assert "No keys to export" in result.output
+        assert not os.path.exists(str(tmp_path / "out.json"))
@@ -1,3 +1,4 @@
+import json
 import os
 import zipfile
 from unittest.mock import patch
@@ -42,6 +43,57 @@ class TestCLINewCommands:
             assert "Personality: 2 items" in result.output 
             assert "Memory: 1 items" in result.output
 
+    def test_status_does_not_derive_keys(self):
+        runner = CliRunner()
+        with runner.isolated_filesystem():
+            AgentLock().create({"OPENAI_API_KEY": "placeholder"}, {"system_prompt": "x", "tone": "y"}, {})
+
+            with patch("backpack.crypto.derive_key") as mock_derive:
+                result = runner.invoke(cli, ["status", "--header"])
+                json_result = runner.invoke(cli, ["status", "--header", "--json"])
+
+            mock_derive.assert_not_called()
+            assert "Generation: 1" in result.output
+            assert "OPENAI_API_KEY" not in result.output
+            assert '"generation": 1' in json_result.output
+
+    def test_status_header_is_marked_unverified(self):
+        runner = CliRunner()
+        with runner.isolated_filesystem():
+            lock = AgentLock()
+            lock.create({"OPENAI_API_KEY": "placeholder"}, {"system_prompt": "x", "tone": "y"}, {})
+            with open(lock.file_path) as f:
+                data = json.load(f)
+            data["metadata"]["layers"]["memory"] = "not a dict"
+            data["metadata"]["layers"]["personality"]["items"] = "many"
+            with open(lock.file_path, "w") as f:
+                json.dump(data, f)
+
+            result = runner.invoke(cli, ["status", "--header"])
+            json_result = runner.invoke(cli, ["status", "--header", "--json"])
+
+            assert result.exit_code == 0
+            assert "not verified" in result.output
+            assert "Personality: ? items" in result.output
+            assert "Memory: ? items (? bytes encrypted)" in result.output
+            assert json.loads(json_result.output)["verified"] is False
+
+    def test_status_lists_keys_by_default(self):
+        runner = CliRunner()
+        with runner.isolated_filesystem():
+            AgentLock().create({"OPENAI_API_KEY": "placeholder"}, {"system_prompt": "x", "tone": "y"}, {})
+
+            result = runner.invoke(cli, ["status"])
+            json_result = runner.invoke(cli, ["status", "--json"])
+
+            assert "Credentials: 1 keys defined" in result.output
+            assert "OPENAI_API_KEY" in result.output
+            assert json.loads(json_result.output)["layers"] == {
+                "credentials": ["OPENAI_API_KEY"],
+                "personality": {"system_prompt": "x", "tone": "y"},
+                "memory": {},
+            }
+
     def test_info(self):
         runner = CliRunner()
         result = runner.invoke(cli, ["info"])
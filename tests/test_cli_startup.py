@@ -0,0 +1,67 @@
+"""
+Import-time regression tests for CLI startup.
+
+`backpack version` and `backpack --help` must not import cryptography, keyring
+or the audit logger, and must stay within a fixed import-time budget.
+"""
+
+import os
+import subprocess
+import sys
+
+import pytest
+
+SRC = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "src")
+
+# Cumulative import time allowed for backpack.cli, in microseconds. Generous
+# enough for slow CI machines; test_startup_skips_heavy_imports checks exactly
+# which modules load.
+IMPORT_BUDGET_US = int(os.environ.get("BACKPACK_IMPORT_BUDGET_US", 250_000))
+
+HEAVY_MODULES = {
+    "cryptography",
+    "keyring",
+    "backpack.agent_lock",
+    "backpack.audit",
+    "backpack.crypto",
+    "backpack.keychain",
+    "concurrent.futures.process",
+    "zipfile",
+}
+
+
+def _importtime(args):
+    """Run the CLI with -X importtime and return {module: cumulative microseconds}."""
+    code = f"import sys; from backpack.cli import cli; sys.argv = ['backpack'] + {args!r}; cli()"
+    env = dict(os.environ, PYTHONPATH=SRC)
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", code],
+        capture_output=True,
+        text=True,
+        env=env,
+    )
+    assert result.returncode == 0, result.stderr
+    modules = {}
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "|" not in line:
+            continue
+        _, cumulative, name = line.split("|")
+        if cumulative.strip().isdigit():
+            modules[name.strip()] = int(cumulative)
+    return modules
+
+
+@pytest.mark.parametrize("args", [["version"], ["--help"]])
+def test_startup_skips_heavy_imports(args):
+    modules = _importtime(args)
+
+    assert "backpack.cli" in modules
+    assert not HEAVY_MODULES & set(modules)
+
+
+@pytest.mark.parametrize("args", [["version"], ["--help"]])
+def test_startup_import_budget(args):
+    _importtime(args)  # warm the bytecode cache
+    modules = _importtime(args)
+
+    assert modules["backpack.cli"] < IMPORT_BUDGET_US
@@ -6,7 +6,7 @@ import base64
 
 import pytest
 
-from backpack.crypto import decrypt_data, derive_key, encrypt_data
+from backpack.crypto import DerivedKeyCache, decrypt_data, derive_key, encrypt_data
 from backpack.exceptions import (
     DecryptionError,
     InvalidPasswordError,
@@ -239,6 +239,31 @@ class TestDecryptData:
             decrypted = decrypt_data(encrypted, password)
             assert decrypted == original_data, f"Failed for: {original_data[:50]}"
 
+    def test_decrypt_data_with_key_cache(self):
+        """Test that a shared key cache derives each (password, salt) once."""
+        encrypted = encrypt_data("secret", "test-password")
+        cache = DerivedKeyCache()
+
+        assert decrypt_data(encrypted, "test-password", cache) == "secret"
+        assert decrypt_data(encrypted, "test-password", cache) == "secret"
+        assert cache.derivations == 1
+
+        with pytest.raises(DecryptionError):
+            decrypt_data(encrypted, "wrong-password", cache)
+        assert cache.derivations == 2
+
+    def test_encrypt_with_key_cache_keeps_key(self):
+        """Test that encrypting through a cache makes the new key available without deriving again."""
+        cache = DerivedKeyCache()
+
+        encrypted = encrypt_data("secret", "test-password", cache)
+        salt = base64.b64decode(encrypted["salt"])
+
+        assert cache.cached("test-password", salt) is not None
+        assert cache.cached("other-password", salt) is None
+        assert decrypt_data(encrypted, "test-password", cache) == "secret"
+        assert cache.derivations == 1
+
 
 class TestCryptoValidation:
     """Tests for input validation in crypto functions."""
@@ -0,0 +1,141 @@
+"""
+Tests for the parallel fleet runner (backpack fleet run).
+"""
+
+import os
+import shutil
+from unittest.mock import patch
+
+import pytest
+from click.testing import CliRunner
+
+from backpack.agent_lock import AgentLock
+from backpack.cli import cli
+from backpack.exceptions import ValidationError
+from backpack.fleet import discover_agents, load_locks, resolve_credentials, run_agents
+from backpack.keychain import get_keys, store_key
+
+PERSONALITY = {"system_prompt": "You are a test agent.", "tone": "calm"}
+
+
+def _agent(root, name, credentials, script=None):
+    directory = os.path.join(root, "agents", name)
+    os.makedirs(directory)
+    AgentLock(os.path.join(directory, "agent.lock")).create(credentials, PERSONALITY, {})
+    if script is not None:
+        with open(os.path.join(directory, "agent.py"), "w") as f:
+            f.write(script)
+    return directory
+
+
+@pytest.fixture
+def fleet_dir(temp_dir, mock_keyring, clean_env, monkeypatch):
+    monkeypatch.chdir(temp_dir)
+    store_key("SHARED_KEY", "shared-value")
+    store_key("ALPHA_KEY", "alpha-value")
+    _agent(temp_dir, "alpha", {"SHARED_KEY": "placeholder_shared", "ALPHA_KEY": "placeholder_alpha"},
+           "import os\nprint(os.environ['SHARED_KEY'], os.environ['ALPHA_KEY'])\n")
+    _agent(temp_dir, "beta", {"SHARED_KEY": "placeholder_shared", "LOCK_KEY": "from-lock"},
+           "import os, sys\nprint(os.environ['LOCK_KEY'])\nprint('beta failed', file=sys.stderr)\nsys.exit(3)\n")
+    _agent(temp_dir, "gamma", {"MISSING_KEY": "placeholder_missing"})  # no script
+    return temp_dir
+
+
+class TestFleet:
+
+    def test_discover_by_directory_or_lock(self, fleet_dir):
+        by_dir = [a.name for a in discover_agents("agents/*")]
+        by_lock = [a.name for a in discover_agents("**/agent.lock")]
+
+        expected = [os.path.join("agents", n) for n in ("alpha", "beta", "gamma")]
+        assert by_dir == by_lock == expected
+        with pytest.raises(ValidationError):
+            discover_agents("nothing/*")
+
+    def test_credentials_resolved_in_one_batch(self, fleet_dir):
+        agents = discover_agents("agents/*")
+        load_locks(agents)
+
+        with patch("backpack.fleet.get_keys", wraps=get_keys) as mock_get_keys:
+            resolve_credentials(agents)
+
+        mock_get_keys.assert_called_once_with(["ALPHA_KEY", "SHARED_KEY"])
+        alpha, beta, gamma = agents
+        assert alpha.env_vars["ALPHA_KEY"] == "alpha-value"
+        assert beta.env_vars["SHARED_KEY"] == "shared-value"
+        assert beta.env_vars["LOCK_KEY"] == "from-lock"
+        assert gamma.status == "skipped"
+
+    def test_denied_access_injects_no_credentials(self, fleet_dir):
+        agents = discover_agents("agents/*")
+        load_locks(agents)
+        prompts = []
+
+        resolve_credentials(agents, approve=lambda names: prompts.append(names) or False)
+
+        assert prompts == [["ALPHA_KEY", "LOCK_KEY", "SHARED_KEY"]]
+        assert agents[0].env_vars == {"AGENT_SYSTEM_PROMPT": "You are a test agent.", "AGENT_TONE": "calm"}
+
+    def test_copied_locks_share_key_derivations(self, fleet_dir):
+        source = os.path.join(fleet_dir, "agents", "alpha")
+        shutil.copytree(source, os.path.join(fleet_dir, "agents", "alpha-copy"))
+        agents = discover_agents("agents/alpha*")
+
+        key_cache = load_locks(agents)
+
+        assert [a.status for a in agents] == ["ready", "ready"]
+        assert key_cache.derivations == 3  # one per layer, not per lock
+
+    def test_output_is_prefixed(self, fleet_dir, tmp_path):
+        agents = discover_agents("agents/*")
+        load_locks(agents)
+        resolve_credentials(agents)
+        out = tmp_path / "out.txt"
+
+        with open(out, "w") as stream:
+            run_agents(agents, concurrency=2, output=stream)
+
+        lines = out.read_text().splitlines()
+        alpha, beta = os.path.join("agents", "alpha"), os.path.join("agents", "beta")
+        assert f"[{alpha}] shared-value alpha-value" in lines
+        assert f"[{beta} ] from-lock" in lines
+        assert f"[{beta} ] beta failed" in lines
+        assert [(a.status, a.returncode) for a in agents] == [("ok", 0), ("failed", 3), ("skipped", None)]
+
+
+    def test_script_in_subdirectory(self, fleet_dir, tmp_path):
+        directory = _agent(fleet_dir, "delta", {"SHARED_KEY": "placeholder_shared"})
+        os.makedirs(os.path.join(directory, "bin"))
+        with open(os.path.join(directory, "bin", "main.py"), "w") as f:
+            f.write("import os\nprint('delta', os.path.basename(os.getcwd()), os.environ['SHARED_KEY'])\n")
+        agents = discover_agents("agents/delta", script=os.path.join("bin", "main.py"))
+        load_locks(agents)
+        resolve_credentials(agents)
+        out = tmp_path / "out.txt"
+
+        with open(out, "w") as stream:
+            run_agents(agents, output=stream)
+
+        assert agents[0].status == "ok"
+        assert out.read_text().splitlines() == [f"[{os.path.join('agents', 'delta')}] delta delta shared-value"]
+
+
+class TestFleetCLI:
+
+    def test_fleet_run_summary(self, fleet_dir):
+        result = CliRunner().invoke(cli, ["fleet", "run", "agents/*", "--non-interactive", "-j", "2"])
+
+        assert result.exit_code == 1
+        assert "shared-value alpha-value" in result.output
+        assert "AGENT" in result.output and "STATUS" in result.output
+        assert "missing MISSING_KEY" not in result.output  # gamma was skipped before resolution
+        assert "agent.py not found" in result.output
+        assert "1 succeeded, 2 failed or skipped" in result.output
+
+    def test_fleet_run_no_match(self, temp_dir, monkeypatch):
+        monkeypatch.chdir(temp_dir)
+
+        result = CliRunner().invoke(cli, ["fleet", "run", "nothing/*"])
+
+        assert result.exit_code == 1
+        assert "No agents found" in result.output
@@ -3,18 +3,39 @@ Tests for keychain module - OS keychain integration.
 """
 
 import json
+import os
+import threading
+import time
 from unittest.mock import patch
 
+import keyring
 import pytest
 
-from backpack.keychain import SERVICE_NAME, delete_key, get_key, list_keys, register_key, store_key
+from backpack.exceptions import (
+    InvalidKeyNameError,
+    KeychainAccessError,
+    KeychainStorageError,
+    ValidationError,
+)
+from backpack.keychain import (
+    SERVICE_NAME,
+    _KeyCache,
+    delete_key,
+    get_key,
+    get_keys,
+    invalidate_cache,
+    list_keys,
+    register_key,
+    store_key,
+    store_keys,
+)
 
 
 @pytest.fixture(autouse=True)
 def mock_audit_logger():
     """Mock the audit logger to prevent file writes and verify calls."""
-    with patch("backpack.keychain.audit_logger") as mock:
-        yield mock
+    with patch("backpack.keychain._audit") as mock_audit:
+        yield mock_audit.return_value
 
 
 class TestStoreKey:
@@ -228,3 +249,207 @@ class TestKeychainIntegration:
         assert SERVICE_NAME == "backpack-agent"
         assert isinstance(SERVICE_NAME, str)
         assert len(SERVICE_NAME) > 0
+
+
+class TestKeyCache:
+    """Tests for the in-process key cache."""
+
+    def test_get_key_is_cached(self, mock_keyring, mock_audit_logger):
+        """Repeated lookups hit the keyring and the audit log only once."""
+        mock_keyring[(SERVICE_NAME, "CACHED_KEY")] = "value"
+
+        with patch("keyring.get_password", wraps=keyring.get_password) as mock_get:
+            assert get_key("CACHED_KEY") == "value"
+            assert get_key("CACHED_KEY") == "value"
+
+        assert mock_get.call_count == 1
+        assert mock_audit_logger.log_event.call_count == 1
+
+    def test_misses_are_not_cached(self, mock_keyring):
+        """A key added after a failed lookup is found on the next lookup."""
+        assert get_key("LATE_KEY") is None
+        mock_keyring[(SERVICE_NAME, "LATE_KEY")] = "value"
+
+        assert get_key("LATE_KEY") == "value"
+
+    def test_store_key_invalidates(self, mock_keyring):
+        store_key("ROTATED_KEY", "old")
+        assert get_key("ROTATED_KEY") == "old"
+
+        store_key("ROTATED_KEY", "new")
+        assert get_key("ROTATED_KEY") == "new"
+
+    def test_delete_key_invalidates(self, mock_keyring):
+        store_key("GONE_KEY", "value")
+        register_key("GONE_KEY")
+        assert get_key("GONE_KEY") == "value"
+
+        delete_key("GONE_KEY")
+
+        assert get_key("GONE_KEY") is None
+        assert "GONE_KEY" not in list_keys()
+
+    def test_invalidate_cache(self, mock_keyring):
+        mock_keyring[(SERVICE_NAME, "EXTERNAL_KEY")] = "old"
+        assert get_key("EXTERNAL_KEY") == "old"
+
+        mock_keyring[(SERVICE_NAME, "EXTERNAL_KEY")] = "new"
+        assert get_key("EXTERNAL_KEY") == "old"
+
+        invalidate_cache("EXTERNAL_KEY")
+        assert get_key("EXTERNAL_KEY") == "new"
+
+    def test_entries_expire(self):
+        cache = _KeyCache(ttl=10, maxsize=4)
+        cache.put("KEY", "value")
+
+        with patch("backpack.keychain.time.monotonic", return_value=time.monotonic() + 11):
+            assert cache.get("KEY") is None
+
+    def test_size_bound_evicts_least_recently_used(self):
+        cache = _KeyCache(ttl=60, maxsize=2)
+        cache.put("A", "a")
+        cache.put("B", "b")
+        cache.get("A")
+        cache.put("C", "c")
+
+        assert cache.get("A") == "a"
+        assert cache.get("B") is None
+        assert cache.get("C") == "c"
+
+    def test_evicted_values_are_wiped(self):
+        cache = _KeyCache(ttl=60, maxsize=4)
+        cache.put("SECRET", "s3cr3t")
+        buf = cache._entries["SECRET"][0]
+
+        cache.invalidate("SECRET")
+
+        assert buf == bytearray(len("s3cr3t"))
+
+    def test_zero_ttl_disables_cache(self):
+        cache = _KeyCache(ttl=0, maxsize=4)
+        cache.put("KEY", "value")
+
+        assert cache.get("KEY") is None
+
+
+class TestBatchKeys:
+    """Tests for get_keys() and store_keys()."""
+
+    def test_get_keys(self, mock_keyring, mock_audit_logger):
+        mock_keyring[(SERVICE_NAME, "KEY1")] = "value1"
+        mock_keyring[(SERVICE_NAME, "KEY2")] = "value2"
+
+        result = get_keys(["KEY1", "KEY2", "MISSING"])
+
+        assert result == {"KEY1": "value1", "KEY2": "value2", "MISSING": None}
+        mock_audit_logger.log_event.assert_called_once_with(
+            "get_keys", {"service": SERVICE_NAME, "key_names": ["KEY1", "KEY2"]}
+        )
+
+    def test_get_keys_uses_cache(self, mock_keyring):
+        mock_keyring[(SERVICE_NAME, "KEY1")] = "value1"
+        get_key("KEY1")
+
+        with patch("keyring.get_password", wraps=keyring.get_password) as mock_get:
+            assert get_keys(["KEY1", "KEY2"]) == {"KEY1": "value1", "KEY2": None}
+
+        mock_get.assert_called_once_with(SERVICE_NAME, "KEY2")
+
+    def test_get_keys_invalid_name(self, mock_keyring):
+        with patch("keyring.get_password") as mock_get:
+            with pytest.raises(InvalidKeyNameError):
+                get_keys(["GOOD", "_bad"])
+        mock_get.assert_not_called()
+
+    def test_get_keys_access_error(self, mock_keyring):
+        with patch("keyring.get_password", side_effect=keyring.errors.KeyringError("locked")):
+            with pytest.raises(KeychainAccessError):
+                get_keys(["KEY1"])
+
+    def test_store_keys(self, mock_keyring, mock_audit_logger):
+        store_keys({"KEY1": "value1", "KEY2": "value2"})
+
+        assert mock_keyring[(SERVICE_NAME, "KEY1")] == "value1"
+        assert mock_keyring[(SERVICE_NAME, "KEY2")] == "value2"
+        mock_audit_logger.log_event.assert_called_once_with(
+            "store_keys", {"service": SERVICE_NAME, "key_names": ["KEY1", "KEY2"]}
+        )
+        assert list_keys() == {"KEY1": True, "KEY2": True}
+
+    def test_store_keys_updates_registry_once(self, mock_keyring):
+        register_key("EXISTING")
+
+        with patch("keyring.set_password", wraps=keyring.set_password) as mock_set:
+            store_keys({f"KEY{i}": f"value{i}" for i in range(5)})
+
+        assert not [c for c in mock_set.call_args_list if c.args[1] == "_registry"]
+        assert len(list_keys()) == 6
+
+    def test_store_keys_validates_before_writing(self, mock_keyring):
+        with pytest.raises(ValidationError):
+            store_keys({"KEY1": "value1", "KEY2": None})
+
+        assert (SERVICE_NAME, "KEY1") not in mock_keyring
+
+    def test_store_keys_partial_failure(self, mock_keyring):
+        original = keyring.set_password
+
+        def flaky_set(service, name, value):
+            if name == "BAD":
+                raise keyring.errors.KeyringError("denied")
+            original(service, name, value)
+
+        with patch("keyring.set_password", side_effect=flaky_set):
+            with pytest.raises(KeychainStorageError) as exc_info:
+                store_keys({"GOOD": "value", "BAD": "value"})
+
+        assert exc_info.value.key_name == "BAD"
+        assert "GOOD" in list_keys()
+        assert "BAD" not in list_keys()
+
+
+class TestKeyRegistry:
+    """Tests for the marker-file key registry."""
+
+    def test_migrates_legacy_registry(self, mock_keyring, backpack_home):
+        mock_keyring[(SERVICE_NAME, "_registry")] = json.dumps({"OLD1": True, "OLD2": True})
+
+        legacy = mock_keyring[(SERVICE_NAME, "_registry")]
+
+        assert list_keys() == {"OLD1": True, "OLD2": True}
+        # Other BACKPACK_HOMEs and older installs share the keyring entry
+        assert mock_keyring[(SERVICE_NAME, "_registry")] == legacy
+
+        register_key("NEW")
+        assert list_keys() == {"NEW": True, "OLD1": True, "OLD2": True}
+
+    def test_concurrent_registration(self, mock_keyring):
+        names = [f"KEY_{i}" for i in range(50)]
+        threads = [threading.Thread(target=register_key, args=(name,)) for name in names]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        assert set(list_keys()) == set(names)
+
+    def test_names_are_encoded(self, mock_keyring, backpack_home):
+        names = ["path/like", "..", "dotted.name", "spaced name"]
+        for name in names:
+            register_key(name)
+
+        assert set(list_keys()) == set(names)
+        registry = os.path.join(backpack_home, "registry", SERVICE_NAME)
+        assert all("/" not in entry and not entry.startswith("..") for entry in os.listdir(registry))
+
+        delete_key("..")
+        assert ".." not in list_keys()
+
+    def test_registration_does_not_touch_keyring(self, mock_keyring):
+        register_key("KEY1")
+        with patch("keyring.get_password") as mock_get, patch("keyring.set_password") as mock_set:
+            register_key("KEY2")
+            assert list_keys() == {"KEY1": True, "KEY2": True}
+        mock_get.assert_not_called()
+        mock_set.assert_not_called()
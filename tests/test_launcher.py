@@ -0,0 +1,224 @@
+"""
+Tests for the pre-forked agent launcher (backpack serve).
+"""
+
+import json
+import multiprocessing
+import os
+import signal
+import socket
+import subprocess
+import sys
+import time
+from unittest.mock import patch
+
+import pytest
+from click.testing import CliRunner
+
+from backpack.agent_client import read_message
+from backpack.cli import cli
+from backpack.exceptions import LauncherError
+from backpack.launcher import Launcher, _send_with_fds, launch
+
+pytestmark = pytest.mark.skipif(not hasattr(os, "fork"), reason="launcher requires fork()")
+
+
+def _serve(socket_path, value_path):
+    def resolve_env():
+        with open(value_path) as f:
+            return {"INJECTED": f.read()}
+
+    Launcher(resolve_env, socket_path=socket_path, preload=["json"], watch_path=value_path).serve_forever()
+
+
+@pytest.fixture
+def launcher(tmp_path):
+    """Run a launcher in a forked process; yields (socket path, watched file)."""
+    socket_path = str(tmp_path / "launcher.sock")
+    value_path = str(tmp_path / "value.txt")
+    with open(value_path, "w") as f:
+        f.write("first")
+
+    proc = multiprocessing.get_context("fork").Process(target=_serve, args=(socket_path, value_path))
+    proc.start()
+    deadline = time.monotonic() + 10
+    while not os.path.exists(socket_path):
+        assert time.monotonic() < deadline, "launcher did not start"
+        time.sleep(0.01)
+    yield socket_path, value_path
+    proc.terminate()
+    proc.join(10)
+
+
+def _write_script(tmp_path, body):
+    path = tmp_path / "agent_script.py"
+    path.write_text(body)
+    return str(path)
+
+
+def _run_raw(socket_path, script, cwd, stdio, signum=None):
+    """Start a run over the raw protocol with explicit stdio; return the final message."""
+    with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as sock:
+        sock.connect(socket_path)
+        request = {"op": "run", "script": script, "args": [], "cwd": str(cwd), "env": dict(os.environ)}
+        _send_with_fds(sock, json.dumps(request).encode() + b"\n", [f.fileno() for f in stdio])
+        buffer = bytearray()
+        started = read_message(sock, buffer)
+        assert started["ok"] and started["pid"] > 0
+        if signum is not None:
+            sock.sendall(json.dumps({"op": "signal", "signum": signum}).encode() + b"\n")
+        return read_message(sock, buffer)
+
+
+class TestLauncher:
+
+    def test_runs_agent_with_injected_env(self, launcher, tmp_path, monkeypatch):
+        socket_path, _ = launcher
+        out = tmp_path / "out.json"
+        script = _write_script(tmp_path, (
+            "import json, os, sys\n"
+            f"json.dump({{'value': os.environ['INJECTED'], 'own': os.environ['CLIENT_VAR'], "
+            f"'argv': sys.argv, 'cwd': os.getcwd(), 'name': __name__}}, open({str(out)!r}, 'w'))\n"
+        ))
+        monkeypatch.setenv("CLIENT_VAR", "from-client")
+        monkeypatch.chdir(tmp_path)
+
+        assert launch(script, ["--flag"], socket_path=socket_path) == 0
+
+        result = json.loads(out.read_text())
+        assert result == {
+            "value": "first",
+            "own": "from-client",
+            "argv": [script, "--flag"],
+            "cwd": str(tmp_path),
+            "name": "__main__",
+        }
+
+    def test_uses_client_stdio(self, launcher, tmp_path):
+        socket_path, _ = launcher
+        script = _write_script(tmp_path, "import sys\nprint(input().upper())\nprint('oops', file=sys.stderr)\n")
+        (tmp_path / "in.txt").write_text("hello from client\n")
+
+        with open(tmp_path / "in.txt") as stdin, open(tmp_path / "out.txt", "w") as stdout, \
+                open(tmp_path / "err.txt", "w") as stderr:
+            assert _run_raw(socket_path, script, tmp_path, [stdin, stdout, stderr]) == {"ok": True, "exit": 0}
+
+        assert (tmp_path / "out.txt").read_text() == "HELLO FROM CLIENT\n"
+        assert (tmp_path / "err.txt").read_text() == "oops\n"
+
+    def test_exit_codes(self, launcher, tmp_path):
+        socket_path, _ = launcher
+
+        script = _write_script(tmp_path, "import sys\nsys.exit(7)\n")
+        assert launch(script, socket_path=socket_path) == 7
+
+        script = _write_script(tmp_path, "raise RuntimeError('boom')\n")
+        assert launch(script, socket_path=socket_path) == 1
+
+    def test_forwards_signals(self, launcher, tmp_path):
+        socket_path, _ = launcher
+        script = _write_script(tmp_path, "import time\ntime.sleep(30)\n")
+
+        with open(os.devnull, "r+") as devnull:
+            result = _run_raw(socket_path, script, tmp_path, [devnull] * 3, signum=signal.SIGTERM)
+
+        assert result == {"ok": True, "exit": -signal.SIGTERM}
+
+    def test_reresolves_when_watched_file_changes(self, launcher, tmp_path):
+        socket_path, value_path = launcher
+        out = tmp_path / "out.txt"
+        script = _write_script(tmp_path, f"import os\nopen({str(out)!r}, 'w').write(os.environ['INJECTED'])\n")
+
+        assert launch(script, socket_path=socket_path) == 0
+        assert out.read_text() == "first"
+
+        with open(value_path, "w") as f:
+            f.write("second-value")
+        assert launch(script, socket_path=socket_path) == 0
+        assert out.read_text() == "second-value"
+
+    def test_socket_is_private_and_single(self, launcher):
+        socket_path, _ = launcher
+
+        assert os.stat(socket_path).st_mode & 0o777 == 0o600
+        with pytest.raises(LauncherError, match="already running"):
+            Launcher(dict, socket_path=socket_path).bind()
+
+    def test_unavailable(self, tmp_path):
+        with pytest.raises(LauncherError):
+            launch("agent.py", socket_path=str(tmp_path / "missing.sock"))
+
+    def test_bad_preload(self, tmp_path):
+        launcher = Launcher(dict, socket_path=str(tmp_path / "l.sock"), preload=["no_such_module_xyz"])
+
+        with pytest.raises(LauncherError, match="preload"):
+            launcher.preload_modules()
+
+    def test_exits_when_idle(self, tmp_path):
+        socket_path = str(tmp_path / "idle.sock")
+        launcher = Launcher(lambda: {"INJECTED": "secret"}, socket_path=socket_path, preload=[], idle_timeout=0.2)
+
+        start = time.monotonic()
+        launcher.serve_forever()
+
+        assert time.monotonic() - start < 5
+        assert not os.path.exists(socket_path)
+        assert launcher._env == {}
+
+
+class TestLauncherCLI:
+
+    def test_run_via_launcher(self):
+        runner = CliRunner()
+
+        with patch("backpack.cli.launch", return_value=4) as mock_launch:
+            result = runner.invoke(cli, ["run", "agent.py", "--launcher"])
+
+        assert result.exit_code == 4
+        assert mock_launch.call_args[0] == ("agent.py",)
+
+    def test_run_via_launcher_unavailable(self, tmp_path, monkeypatch):
+        monkeypatch.setenv("BACKPACK_LAUNCHER_SOCK", str(tmp_path / "missing.sock"))
+        runner = CliRunner()
+
+        result = runner.invoke(cli, ["run", "agent.py", "--launcher"])
+
+        assert result.exit_code == 1
+        assert "Agent launcher unavailable" in result.output
+
+    @pytest.mark.parametrize("non_interactive", [False, True])
+    def test_serve_reloads_lock_only_non_interactive(self, temp_dir, clean_env, monkeypatch, non_interactive):
+        from backpack.agent_lock import AgentLock
+
+        monkeypatch.chdir(temp_dir)
+        AgentLock().create({}, {"system_prompt": "p", "tone": "t"}, {})
+        runner = CliRunner()
+
+        with patch("backpack.cli.Launcher") as mock_launcher:
+            args = ["serve", "--idle-timeout", "60"] + (["--non-interactive"] if non_interactive else [])
+            result = runner.invoke(cli, args)
+        resolve_env = mock_launcher.call_args[0][0]
+
+        assert result.exit_code == 0, result.output
+        assert mock_launcher.call_args[1]["idle_timeout"] == 60
+        assert resolve_env()["AGENT_TONE"] == "t"
+        if non_interactive:
+            assert resolve_env()["AGENT_TONE"] == "t"
+        else:
+            with pytest.raises(LauncherError, match="agent.lock changed"):
+                resolve_env()
+
+    def test_launcher_skips_heavy_imports(self, tmp_path):
+        """The launcher client must not pay for cryptography or keyring imports."""
+        code = (
+            "import sys\n"
+            "from backpack.launcher import main\n"
+            "main(['agent.py'])\n"
+            "heavy = [m for m in ('cryptography', 'keyring', 'click') if m in sys.modules]\n"
+            "print(heavy)\n"
+        )
+        src = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "src")
+        env = dict(os.environ, PYTHONPATH=src, BACKPACK_LAUNCHER_SOCK=str(tmp_path / "missing.sock"))
+        result = subprocess.run([sys.executable, "-c", code], capture_output=True, text=True, env=env)
+
+        assert result.stdout.strip() == "[]", result.stderr
@@ -0,0 +1,69 @@
+"""
+Tests for the in-memory keyring backend (memory_keyring.py).
+"""
+
+import time
+
+import keyring.errors
+import pytest
+
+from backpack import keychain
+from backpack.keychain import get_key, list_keys, register_key, set_backend, store_key
+from backpack.memory_keyring import MemoryKeyring
+
+
+class TestMemoryKeyring:
+    """Tests for MemoryKeyring."""
+
+    def test_roundtrip(self):
+        backend = MemoryKeyring()
+        backend.set_password("svc", "A", "alpha")
+
+        assert backend.get_password("svc", "A") == "alpha"
+        assert backend.get_password("svc", "B") is None
+        backend.delete_password("svc", "A")
+        assert backend.get_password("svc", "A") is None
+
+    def test_delete_missing_raises(self):
+        with pytest.raises(keyring.errors.PasswordDeleteError):
+            MemoryKeyring().delete_password("svc", "A")
+
+    def test_latency_and_call_count(self):
+        backend = MemoryKeyring(latency=0.02)
+
+        start = time.monotonic()
+        backend.set_password("svc", "A", "alpha")
+        backend.get_password("svc", "A")
+        assert time.monotonic() - start >= 0.04
+        assert backend.calls == 2
+
+    def test_latency_from_env(self, monkeypatch):
+        monkeypatch.setenv("BACKPACK_MEMORY_KEYRING_LATENCY", "0.5")
+        assert MemoryKeyring().latency == 0.5
+
+
+class TestKeychainMemoryBackend:
+    """Tests for selecting the in-memory backend."""
+
+    @pytest.fixture(autouse=True)
+    def reset_backend(self):
+        yield
+        set_backend(None)
+
+    def test_env_selects_shared_instance(self, monkeypatch):
+        monkeypatch.setenv("BACKPACK_KEYCHAIN_BACKEND", "memory")
+        assert isinstance(keychain._backend(), MemoryKeyring)
+        assert keychain._backend() is keychain._backend()
+
+    def test_keychain_api(self):
+        backend = MemoryKeyring()
+        set_backend(backend)
+
+        store_key("OPENAI_API_KEY", "sk-test")
+        register_key("OPENAI_API_KEY")
+
+        assert get_key("OPENAI_API_KEY") == "sk-test"
+        assert list_keys() == {"OPENAI_API_KEY": True}
+        calls = backend.calls
+        assert get_key("OPENAI_API_KEY") == "sk-test"
+        assert backend.calls == calls  # served from the key cache
@@ -0,0 +1,155 @@
+"""
+Tests for cached credential resolution plans (backpack.resolution).
+"""
+
+import os
+import stat
+from unittest.mock import patch
+
+from click.testing import CliRunner
+
+from backpack.cli import cli
+from backpack.keychain import get_keys, store_key, vault_state
+from backpack.resolution import CACHE_ENV, ResolutionPlan, credentials_fingerprint, plan_path
+
+CREDENTIALS = {"KEY_A": "placeholder_for_KEY_A", "KEY_B": "embedded-secret"}
+
+
+class TestResolutionPlan:
+
+    def test_roundtrip_without_values(self, temp_dir, mock_keyring):
+        lock_path = os.path.join(temp_dir, "agent.lock")
+        plan = ResolutionPlan.load(lock_path, CREDENTIALS)
+        plan.record("KEY_A", "vault")
+        plan.record("KEY_B", "agent.lock")
+        plan.approve("KEY_A", "vault")
+        plan.save()
+
+        loaded = ResolutionPlan.load(lock_path, CREDENTIALS)
+
+        assert loaded.source("KEY_B") == "agent.lock"
+        assert loaded.is_approved("KEY_A", "vault")
+        assert not loaded.is_approved("KEY_A", "agent.lock")
+        contents = open(plan_path(lock_path)).read()
+        assert "embedded-secret" not in contents
+        assert stat.S_IMODE(os.stat(plan_path(lock_path)).st_mode) == 0o600
+
+    def test_fingerprint_ignores_embedded_values(self):
+        changed = dict(CREDENTIALS, KEY_B="other-secret")
+
+        assert credentials_fingerprint(changed) == credentials_fingerprint(CREDENTIALS)
+        assert credentials_fingerprint(dict(CREDENTIALS, KEY_C="placeholder_for_KEY_C")) != \
+            credentials_fingerprint(CREDENTIALS)
+
+    def test_credentials_change_discards_plan(self, temp_dir, mock_keyring):
+        lock_path = os.path.join(temp_dir, "agent.lock")
+        plan = ResolutionPlan.load(lock_path, CREDENTIALS)
+        plan.approve("KEY_A", "vault")
+        plan.save()
+
+        loaded = ResolutionPlan.load(lock_path, dict(CREDENTIALS, KEY_C="placeholder_for_KEY_C"))
+
+        assert not loaded.is_approved("KEY_A", "vault")
+
+    def test_vault_change_drops_vault_approvals(self, temp_dir, mock_keyring):
+        lock_path = os.path.join(temp_dir, "agent.lock")
+        plan = ResolutionPlan.load(lock_path, CREDENTIALS)
+        plan.record("KEY_A", "missing")
+        plan.approve("KEY_A", "vault")
+        plan.approve("KEY_B", "agent.lock")
+        plan.save()
+        before = vault_state()
+
+        store_key("KEY_A", "value-a")
+        loaded = ResolutionPlan.load(lock_path, CREDENTIALS)
+
+        assert vault_state() != before
+        assert loaded.source("KEY_A") is None
+        assert not loaded.is_approved("KEY_A", "vault")
+        assert loaded.is_approved("KEY_B", "agent.lock")
+
+    def test_approvals_are_per_script(self, temp_dir, mock_keyring):
+        lock_path = os.path.join(temp_dir, "agent.lock")
+        script, other = os.path.join(temp_dir, "agent.py"), os.path.join(temp_dir, "other.py")
+        for path in (script, other):
+            with open(path, "w") as f:
+                f.write("pass\n")
+        plan = ResolutionPlan.load(lock_path, CREDENTIALS, script)
+        plan.approve("KEY_B", "agent.lock")
+        plan.save()
+
+        assert ResolutionPlan.load(lock_path, CREDENTIALS, script).is_approved("KEY_B", "agent.lock")
+        assert not ResolutionPlan.load(lock_path, CREDENTIALS, other).is_approved("KEY_B", "agent.lock")
+
+        with open(script, "a") as f:
+            f.write("print('changed')\n")
+        loaded = ResolutionPlan.load(lock_path, CREDENTIALS, script)
+
+        assert not loaded.is_approved("KEY_B", "agent.lock")
+
+    def test_disabled(self, temp_dir, mock_keyring, monkeypatch):
+        monkeypatch.setenv(CACHE_ENV, "0")
+        lock_path = os.path.join(temp_dir, "agent.lock")
+        plan = ResolutionPlan.load(lock_path, CREDENTIALS)
+        plan.approve("KEY_A", "vault")
+        plan.save()
+
+        assert not os.path.exists(plan_path(lock_path))
+
+
+class TestRunWithPlanCLI:
+
+    def _init(self, runner, temp_dir, monkeypatch, credentials):
+        monkeypatch.chdir(temp_dir)
+        runner.invoke(cli, ['init', '--credentials', credentials])
+        with open("agent_script.py", "w") as f:
+            f.write("pass")
+
+    def test_allowed_keys_are_not_prompted_again(self, mock_keyring, temp_dir, clean_env, monkeypatch):
+        runner = CliRunner()
+        store_key("KEY_A", "value-a")
+        self._init(runner, temp_dir, monkeypatch, "KEY_A")
+
+        with patch("subprocess.run") as mock_run:
+            mock_run.return_value.returncode = 0
+            first = runner.invoke(cli, ['run', 'agent_script.py'], input="y\n")
+            second = runner.invoke(cli, ['run', 'agent_script.py'])
+
+        assert first.exit_code == 0
+        assert "Allow access?" in first.output
+        assert second.exit_code == 0
+        assert "Allow access?" not in second.output
+        assert "previously allowed" in second.output
+        assert mock_run.call_args[1]["env"]["KEY_A"] == "value-a"
+
+    def test_denied_keys_are_asked_again(self, mock_keyring, temp_dir, clean_env, monkeypatch):
+        runner = CliRunner()
+        store_key("KEY_A", "value-a")
+        self._init(runner, temp_dir, monkeypatch, "KEY_A")
+
+        with patch("subprocess.run") as mock_run:
+            mock_run.return_value.returncode = 0
+            runner.invoke(cli, ['run', 'agent_script.py'], input="n\n")
+            second = runner.invoke(cli, ['run', 'agent_script.py'], input="y\n")
+
+        assert "Allow access?" in second.output
+
+    def test_missing_keys_skip_vault_until_it_changes(self, mock_keyring, temp_dir, clean_env, monkeypatch):
+        runner = CliRunner()
+        self._init(runner, temp_dir, monkeypatch, "KEY_A,KEY_B")
+        store_key("KEY_A", "value-a")
+
+        with patch("backpack.cli.get_keys", wraps=get_keys) as mock_get_keys, \
+             patch("subprocess.run") as mock_run:
+            mock_run.return_value.returncode = 0
+            runner.invoke(cli, ['run', 'agent_script.py', '--non-interactive'])
+            runner.invoke(cli, ['run', 'agent_script.py', '--non-interactive'])
+            store_key("KEY_B", "value-b")
+            runner.invoke(cli, ['run', 'agent_script.py', '--non-interactive'])
+
+        assert [c.args[0] for c in mock_get_keys.call_args_list] == [
+            ["KEY_A", "KEY_B"],
+            ["KEY_A"],
+            ["KEY_A", "KEY_B"],
+        ]
+        assert mock_run.call_args[1]["env"]["KEY_B"] == "value-b"
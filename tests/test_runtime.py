@@ -0,0 +1,204 @@
+"""
+Tests for the runtime channel (backpack.runtime) between `backpack run` and the agent.
+"""
+
+import json
+import os
+import subprocess
+import sys
+import time
+from unittest.mock import patch
+
+import pytest
+from click.testing import CliRunner
+
+from backpack import runtime
+from backpack.agent_lock import AgentLock
+from backpack.cli import cli
+from backpack.exceptions import RuntimeChannelError
+from backpack.keychain import store_key
+from backpack.runtime import RUNTIME_FD_ENV, RuntimeHandoff
+
+AGENT_DATA = {
+    "credentials": {"KEY_A": "placeholder_for_KEY_A"},
+    "personality": {"system_prompt": "Be brief.", "tone": "dry"},
+    "memory": {"run_count": 3},
+}
+
+SRC = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "src")
+
+READER = (
+    "import json, os, sys\n"
+    "from backpack import runtime\n"
+    "state = runtime.load(fallback_lock=None)\n"
+    "json.dump({'state': state, 'fd_env': os.environ.get('BACKPACK_RUNTIME_FD')}, open(sys.argv[1], 'w'))\n"
+)
+
+
+@pytest.fixture(autouse=True)
+def reset_runtime(monkeypatch):
+    monkeypatch.delenv(RUNTIME_FD_ENV, raising=False)
+    runtime._reset()
+    yield
+    runtime._reset()
+
+
+def _channel(monkeypatch, payload):
+    """Put a filled pipe behind RUNTIME_FD_ENV, as the parent would."""
+    read_fd, write_fd = os.pipe()
+    os.write(write_fd, payload)
+    os.close(write_fd)
+    monkeypatch.setenv(RUNTIME_FD_ENV, str(read_fd))
+
+
+def _run_child(handoff, code, *args):
+    env = dict(os.environ, PYTHONPATH=SRC, **handoff.env)
+    handoff.start()
+    try:
+        return subprocess.run([sys.executable, "-c", code, *args], env=env, pass_fds=handoff.pass_fds, timeout=30)
+    finally:
+        handoff.close()
+
+
+class TestRuntimeHandoff:
+
+    def test_child_reads_state(self, tmp_path):
+        out = tmp_path / "out.json"
+
+        result = _run_child(RuntimeHandoff(AGENT_DATA, "/x/agent.lock"), READER, str(out))
+
+        assert result.returncode == 0
+        seen = json.loads(out.read_text())
+        assert seen["state"] == {
+            "personality": AGENT_DATA["personality"],
+            "memory": AGENT_DATA["memory"],
+            "lock_path": "/x/agent.lock",
+        }
+        assert seen["fd_env"] is None
+
+    def test_credentials_not_sent(self):
+        assert b"KEY_A" not in RuntimeHandoff(AGENT_DATA).payload
+
+    def test_large_state(self, tmp_path):
+        out = tmp_path / "out.json"
+        data = dict(AGENT_DATA, memory={"blob": "x" * (2 * 1024 * 1024)})
+
+        result = _run_child(RuntimeHandoff(data), READER, str(out))
+
+        assert result.returncode == 0
+        assert len(json.loads(out.read_text())["state"]["memory"]["blob"]) == 2 * 1024 * 1024
+
+    def test_child_that_never_reads_does_not_hang(self):
+        data = dict(AGENT_DATA, memory={"blob": "x" * (2 * 1024 * 1024)})
+        start = time.monotonic()
+
+        result = _run_child(RuntimeHandoff(data), "pass")
+
+        assert result.returncode == 0
+        assert time.monotonic() - start < 20
+
+    def test_write_now_fills_pipe_before_exec(self, tmp_path):
+        out = tmp_path / "out.json"
+        handoff = RuntimeHandoff(AGENT_DATA)
+
+        assert handoff.write_now() is True
+        env = dict(os.environ, PYTHONPATH=SRC, **handoff.env)
+        subprocess.run([sys.executable, "-c", READER, str(out)], env=env, close_fds=False, timeout=30)
+        handoff.close()
+
+        assert json.loads(out.read_text())["state"]["memory"] == {"run_count": 3}
+
+
+class TestLoad:
+
+    def test_read_once_and_env_cleared(self, monkeypatch):
+        _channel(monkeypatch, RuntimeHandoff(AGENT_DATA).payload)
+
+        assert runtime.available()
+        assert runtime.personality() == AGENT_DATA["personality"]
+        assert RUNTIME_FD_ENV not in os.environ
+        assert runtime.initial_memory() == {"run_count": 3}
+
+    def test_initial_memory_is_a_copy(self, monkeypatch):
+        _channel(monkeypatch, RuntimeHandoff(AGENT_DATA).payload)
+
+        runtime.initial_memory()["run_count"] = 99
+
+        assert runtime.initial_memory() == {"run_count": 3}
+
+    def test_install_for_in_process_agents(self):
+        RuntimeHandoff(AGENT_DATA, "/x/agent.lock").install()
+
+        assert runtime.load(fallback_lock=None)["lock_path"] == "/x/agent.lock"
+        assert runtime.initial_memory() == {"run_count": 3}
+
+    def test_falls_back_to_lock(self, temp_dir, monkeypatch):
+        monkeypatch.setenv("AGENT_MASTER_KEY", "fallback-key")
+        lock_path = os.path.join(temp_dir, "agent.lock")
+        AgentLock(lock_path).create(AGENT_DATA["credentials"], AGENT_DATA["personality"], AGENT_DATA["memory"])
+
+        state = runtime.load(lock_path)
+
+        assert state["memory"] == {"run_count": 3}
+        assert state["lock_path"] == os.path.abspath(lock_path)
+
+    def test_no_channel_and_no_fallback(self):
+        assert not runtime.available()
+        assert runtime.load(fallback_lock=None) is None
+
+    def test_invalid_descriptor(self, monkeypatch):
+        monkeypatch.setenv(RUNTIME_FD_ENV, "not-a-number")
+
+        with pytest.raises(RuntimeChannelError):
+            runtime.load()
+
+    def test_unsupported_version(self, monkeypatch):
+        _channel(monkeypatch, json.dumps({"version": 999}).encode())
+
+        with pytest.raises(RuntimeChannelError):
+            runtime.load()
+
+
+class TestRunHandoffCLI:
+
+    def _init(self, runner, temp_dir, monkeypatch):
+        monkeypatch.chdir(temp_dir)
+        monkeypatch.setenv("PYTHONPATH", SRC)
+        store_key("KEY_A", "value-a")
+        runner.invoke(cli, ['init', '--credentials', 'KEY_A', '--personality', 'Be brief.'])
+        with open("agent_script.py", "w") as f:
+            f.write(READER.replace("sys.argv[1]", "'out.json'"))
+
+    def test_run_passes_channel(self, mock_keyring, temp_dir, clean_env, monkeypatch):
+        runner = CliRunner()
+        self._init(runner, temp_dir, monkeypatch)
+
+        with patch("subprocess.run") as mock_run:
+            mock_run.return_value.returncode = 0
+            result = runner.invoke(cli, ['run', 'agent_script.py', '--non-interactive'])
+
+        assert result.exit_code == 0
+        kwargs = mock_run.call_args[1]
+        assert int(kwargs["env"][RUNTIME_FD_ENV]) in kwargs["pass_fds"]
+        assert kwargs["env"]["KEY_A"] == "value-a"
+
+    def test_agent_reads_state_without_lock(self, mock_keyring, temp_dir, clean_env, monkeypatch):
+        runner = CliRunner()
+        self._init(runner, temp_dir, monkeypatch)
+
+        result = runner.invoke(cli, ['run', 'agent_script.py', '--non-interactive'])
+
+        assert result.exit_code == 0, result.output
+        state = json.load(open("out.json"))["state"]
+        assert state["personality"]["system_prompt"] == "Be brief."
+        assert state["lock_path"] == os.path.abspath("agent.lock")
+
+    def test_in_process_reads_state(self, mock_keyring, temp_dir, clean_env, monkeypatch):
+        runner = CliRunner()
+        self._init(runner, temp_dir, monkeypatch)
+
+        result = runner.invoke(cli, ['run', 'agent_script.py', '--non-interactive', '--in-process'])
+
+        assert result.exit_code == 0, result.output
+        assert json.load(open("out.json"))["state"]["personality"]["system_prompt"] == "Be brief."
+        assert RUNTIME_FD_ENV not in os.environ
@@ -0,0 +1,190 @@
+"""
+Tests for memory write-back (backpack.runtime.memory) from the agent to `backpack run`.
+"""
+
+import json
+import os
+import signal
+import subprocess
+import sys
+
+import pytest
+from click.testing import CliRunner
+
+from backpack import runtime
+from backpack.agent_lock import AgentLock
+from backpack.cli import cli
+from backpack.exceptions import AgentLockNotFoundError, ValidationError
+from backpack.runtime import RUNTIME_FD_ENV, memory
+from backpack.runtime.memory import MEMORY_FD_ENV, MemoryWriteBack
+
+SRC = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "src")
+
+AGENT = (
+    "from backpack.runtime import memory\n"
+    "memory.set('run_count', memory.get('run_count', 0) + 1)\n"
+    "memory.delete('scratch')\n"
+    "memory.commit()\n"
+    "memory.set('last', 'uncommitted')\n"
+)
+
+
+@pytest.fixture(autouse=True)
+def reset_runtime(monkeypatch):
+    monkeypatch.delenv(RUNTIME_FD_ENV, raising=False)
+    monkeypatch.delenv(MEMORY_FD_ENV, raising=False)
+    runtime._reset()
+    memory._reset()
+    yield
+    runtime._reset()
+    memory._reset()
+
+
+@pytest.fixture
+def lock(temp_dir, clean_env, monkeypatch):
+    monkeypatch.setenv("AGENT_MASTER_KEY", "memory-test-key")
+    agent_lock = AgentLock(os.path.join(temp_dir, "agent.lock"))
+    agent_lock.create({}, {"system_prompt": "p", "tone": "t"}, {"run_count": 1, "scratch": True, "kept": "yes"})
+    return agent_lock
+
+
+class TestMemoryWriteBack:
+
+    def test_child_deltas_are_saved(self, lock):
+        write_back = MemoryWriteBack(lock)
+        env = dict(os.environ, PYTHONPATH=SRC, **write_back.env)
+        write_back.start()
+        result = subprocess.run(
+            [sys.executable, "-c", AGENT], env=env, pass_fds=write_back.pass_fds, cwd=os.path.dirname(lock.file_path),
+        )
+        write_back.close()
+
+        assert result.returncode == 0
+        assert lock.read()["memory"] == {"run_count": 2, "kept": "yes", "last": "uncommitted"}
+        # One save at the checkpoint, one at exit for the uncommitted change
+        assert write_back.saves == 2
+
+    def test_checkpoints_arriving_together_are_saved_once(self, lock):
+        write_back = MemoryWriteBack(lock)
+        lines = [{"set": {"n": n}, "delete": [], "checkpoint": True} for n in range(3)]
+        os.write(write_back.pass_fds[0], b"".join(json.dumps(line).encode() + b"\n" for line in lines))
+
+        write_back.start()
+        write_back.close()
+
+        assert write_back.saves == 1
+        assert lock.read()["memory"]["n"] == 2
+
+    def test_no_changes_no_write(self, lock):
+        mtime = os.stat(lock.file_path).st_mtime_ns
+        write_back = MemoryWriteBack(lock)
+
+        write_back.start()
+        write_back.close()
+
+        assert write_back.saves == 0
+        assert os.stat(lock.file_path).st_mtime_ns == mtime
+
+    def test_merges_onto_current_lock(self, lock):
+        write_back = MemoryWriteBack(lock)
+        write_back.apply({"set": {"mine": 1}, "delete": [], "checkpoint": False})
+        lock.merge_memory({"other_writer": 2})
+
+        write_back.close()
+
+        assert lock.read()["memory"]["other_writer"] == 2
+        assert lock.read()["memory"]["mine"] == 1
+
+    def test_close_saves_while_a_reader_is_still_draining(self, lock, monkeypatch):
+        monkeypatch.setattr(memory, "DRAIN_TIMEOUT", 0.05)
+        write_back = MemoryWriteBack(lock)
+        # A process started by the agent still holds the write end
+        held_fd = os.dup(write_back.pass_fds[0])
+        write_back.start()
+        os.write(held_fd, json.dumps({"set": {"early": 1}, "delete": [], "checkpoint": False}).encode() + b"\n")
+
+        write_back.close()
+        assert write_back.detached
+        assert lock.read()["memory"]["early"] == 1
+
+        os.write(held_fd, json.dumps({"set": {"late": 1}, "delete": [], "checkpoint": False}).encode() + b"\n")
+        os.close(held_fd)
+        write_back._reader.join(5)
+        assert lock.read()["memory"]["late"] == 1
+        assert write_back.saves == 2
+
+    def test_close_saves_while_a_grandchild_holds_the_channel(self, lock, monkeypatch):
+        monkeypatch.setattr(memory, "DRAIN_TIMEOUT", 0.5)
+        write_back = MemoryWriteBack(lock)
+        write_back.start()
+        fd = write_back.pass_fds[0]
+        child = (
+            "import json, os, subprocess, sys\n"
+            f"os.write({fd}, json.dumps({{'set': {{'late': 1}}}}).encode() + b'\\n')\n"
+            "grandchild = subprocess.Popen([sys.executable, '-c', 'import time; time.sleep(30)'],\n"
+            f"                              pass_fds=({fd},), stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)\n"
+            "print(grandchild.pid)\n"
+        )
+        result = subprocess.run([sys.executable, "-c", child], pass_fds=write_back.pass_fds,
+                                capture_output=True, text=True, check=True)
+        grandchild = int(result.stdout)
+        try:
+            write_back.close()
+            assert write_back.detached
+            assert lock.read()["memory"]["late"] == 1
+        finally:
+            os.kill(grandchild, signal.SIGKILL)
+
+    def test_save_failure_is_raised(self, lock):
+        write_back = MemoryWriteBack(lock)
+        write_back.apply({"set": {"a": 1}})
+        os.remove(lock.file_path)
+
+        with pytest.raises(AgentLockNotFoundError):
+            write_back.close()
+
+
+class TestAgentMemory:
+
+    def test_commit_without_channel_writes_lock(self, lock, monkeypatch):
+        monkeypatch.chdir(os.path.dirname(lock.file_path))
+
+        memory.set("run_count", memory.get("run_count") + 1)
+        memory.commit()
+
+        assert lock.read()["memory"]["run_count"] == 2
+
+    def test_get_sees_uncommitted_changes(self, lock, monkeypatch):
+        monkeypatch.chdir(os.path.dirname(lock.file_path))
+
+        memory.set("a", [1, 2])
+        memory.delete("kept")
+
+        assert memory.get("a") == [1, 2]
+        assert memory.get("kept", "gone") == "gone"
+        assert lock.read()["memory"]["kept"] == "yes"
+
+    def test_rejects_unserializable_values(self, lock, monkeypatch):
+        monkeypatch.chdir(os.path.dirname(lock.file_path))
+
+        with pytest.raises(ValidationError):
+            memory.set("bad", object())
+
+
+class TestRunMemoryCLI:
+
+    def test_run_saves_agent_memory(self, mock_keyring, temp_dir, clean_env, monkeypatch):
+        runner = CliRunner()
+        monkeypatch.chdir(temp_dir)
+        monkeypatch.setenv("PYTHONPATH", SRC)
+        runner.invoke(cli, ['init'])
+        with open("agent_script.py", "w") as f:
+            f.write(AGENT)
+
+        for _ in range(2):
+            result = runner.invoke(cli, ['run', 'agent_script.py', '--non-interactive'])
+            assert result.exit_code == 0, result.output
+
+        saved = AgentLock().read()["memory"]
+        assert saved["run_count"] == 2
+        assert saved["last"] == "uncommitted"
@@ -0,0 +1,156 @@
+"""
+Tests for the multi-worker supervisor (backpack run --workers).
+"""
+
+import os
+import signal
+import threading
+import time
+from unittest.mock import patch
+
+import pytest
+from click.testing import CliRunner
+
+from backpack.cli import cli
+from backpack.exceptions import ValidationError
+from backpack.keychain import get_keys, store_key
+from backpack.supervisor import Supervisor
+
+
+def _script(tmp_path, body):
+    path = tmp_path / "worker.py"
+    path.write_text(body)
+    return str(path)
+
+
+class TestSupervisor:
+
+    def test_workers_share_env_and_get_ids(self, tmp_path):
+        script = _script(tmp_path, (
+            "import os\n"
+            "name = os.path.join(os.environ['OUT_DIR'], 'out-' + os.environ['BACKPACK_WORKER_ID'])\n"
+            "open(name, 'w').write(os.environ['SECRET'] + '/' + os.environ['BACKPACK_WORKERS'])\n"
+        ))
+        env = dict(os.environ, SECRET="s3cret", OUT_DIR=str(tmp_path))
+
+        supervisor = Supervisor(script, env, workers=3)
+
+        assert supervisor.run() == 0
+        assert sorted(p.name for p in tmp_path.glob("out-*")) == ["out-0", "out-1", "out-2"]
+        assert (tmp_path / "out-1").read_text() == "s3cret/3"
+        assert all(s["state"] == "exited" and s["restarts"] == 0 for s in supervisor.status())
+
+    def test_restarts_crashed_worker(self, tmp_path):
+        # Crashes on the first two starts, then succeeds
+        script = _script(tmp_path, (
+            "import os, sys\n"
+            "marker = os.path.join(os.environ['OUT_DIR'], 'starts')\n"
+            "with open(marker, 'a') as f: f.write('x')\n"
+            "sys.exit(0 if len(open(marker).read()) >= 3 else 3)\n"
+        ))
+        env = dict(os.environ, OUT_DIR=str(tmp_path))
+
+        supervisor = Supervisor(script, env, workers=1, backoff=0.01)
+
+        assert supervisor.run() == 0
+        assert supervisor.status()[0]["restarts"] == 2
+        assert supervisor.status()[0]["state"] == "exited"
+
+    def test_gives_up_after_max_restarts(self, tmp_path):
+        script = _script(tmp_path, "import sys\nsys.exit(4)\n")
+
+        supervisor = Supervisor(script, dict(os.environ), workers=2, max_restarts=1, backoff=0.01)
+
+        assert supervisor.run() == 4
+        assert [(s["state"], s["restarts"], s["returncode"]) for s in supervisor.status()] == [("failed", 1, 4)] * 2
+
+    def test_returns_earliest_failure(self, tmp_path):
+        script = _script(tmp_path, (
+            "import os, sys, time\n"
+            "if os.environ['BACKPACK_WORKER_ID'] == '0':\n"
+            "    time.sleep(0.5)\n"
+            "    sys.exit(5)\n"
+            "sys.exit(7)\n"
+        ))
+
+        supervisor = Supervisor(script, dict(os.environ), workers=2, max_restarts=0)
+
+        assert supervisor.run() == 7
+        assert [s["returncode"] for s in supervisor.status()] == [5, 7]
+
+    def test_backoff_doubles(self, tmp_path):
+        script = _script(tmp_path, "import sys\nsys.exit(1)\n")
+        supervisor = Supervisor(script, dict(os.environ), workers=1, max_restarts=3, backoff=1.0, max_backoff=3.0)
+        worker = supervisor.workers[0]
+        delays = []
+
+        for _ in range(3):
+            worker.started_at = 100.0
+            supervisor._on_exit(worker, 1, now=100.0)
+            delays.append(worker.next_start - 100.0)
+            worker.restarts += 1
+
+        assert delays == [1.0, 2.0, 3.0]
+
+    def test_stop_forwards_signal_without_restart(self, tmp_path):
+        script = _script(tmp_path, (
+            "import os, signal, sys, time\n"
+            "signal.signal(signal.SIGTERM, lambda *a: sys.exit(9))\n"
+            "open(os.path.join(os.environ['OUT_DIR'], 'ready-' + os.environ['BACKPACK_WORKER_ID']), 'w').close()\n"
+            "time.sleep(30)\n"
+        ))
+        supervisor = Supervisor(script, dict(os.environ, OUT_DIR=str(tmp_path)), workers=2, backoff=0.01)
+
+        def stop_when_ready():
+            deadline = time.monotonic() + 10
+            while len(list(tmp_path.glob("ready-*"))) < 2 and time.monotonic() < deadline:
+                time.sleep(0.01)
+            supervisor.stop(signal.SIGTERM)
+
+        threading.Thread(target=stop_when_ready).start()
+
+        assert supervisor.run() == 9
+        assert [(s["state"], s["restarts"]) for s in supervisor.status()] == [("stopped", 0)] * 2
+
+    def test_worker_sessions_are_separate(self, tmp_path):
+        """Terminal signals reach the supervisor only, which forwards them once."""
+        script = _script(tmp_path, "import os\nopen(os.environ['OUT'], 'w').write(str(os.getsid(0)))\n")
+        out = tmp_path / "sid"
+
+        assert Supervisor(script, dict(os.environ, OUT=str(out)), workers=1).run() == 0
+        assert int(out.read_text()) != os.getsid(0)
+
+    def test_invalid_arguments(self, tmp_path):
+        with pytest.raises(ValidationError):
+            Supervisor("agent.py", {}, workers=0)
+        with pytest.raises(ValidationError):
+            Supervisor("agent.py", {}, workers=1, max_restarts=-1)
+
+
+class TestRunWorkersCLI:
+
+    def test_run_workers_resolves_once(self, mock_keyring, temp_dir, clean_env, monkeypatch):
+        runner = CliRunner()
+        monkeypatch.chdir(temp_dir)
+        store_key("KEY_A", "value-a")
+        runner.invoke(cli, ['init', '--credentials', 'KEY_A'])
+        with open("agent_script.py", "w") as f:
+            f.write(
+                "import os\n"
+                "open('out-' + os.environ['BACKPACK_WORKER_ID'], 'w').write(os.environ['KEY_A'])\n"
+            )
+
+        with patch("backpack.cli.get_keys", wraps=get_keys) as mock_get_keys:
+            result = runner.invoke(cli, ['run', 'agent_script.py', '--non-interactive', '--workers', '2'])
+
+        assert result.exit_code == 0, result.output
+        mock_get_keys.assert_called_once_with(["KEY_A"])
+        assert open("out-0").read() == "value-a"
+        assert open("out-1").read() == "value-a"
+        assert "RESTARTS" in result.output
+
+    def test_workers_rejects_other_modes(self):
+        result = CliRunner().invoke(cli, ['run', 'agent_script.py', '--workers', '2', '--exec'])
+
+        assert result.exit_code == 2
+        assert "cannot be used together" in result.output
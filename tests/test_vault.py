@@ -0,0 +1,172 @@
+"""
+Tests for the encrypted file-backed vault (vault.py).
+"""
+
+import os
+from unittest.mock import patch
+
+import keyring.errors
+import pytest
+
+from backpack import keychain
+from backpack.crypto import derive_key
+from backpack.exceptions import KeychainAccessError, ValidationError
+from backpack.keychain import (
+    get_key,
+    get_keys,
+    list_keys,
+    register_key,
+    set_backend,
+    store_key,
+    store_keys,
+)
+from backpack.vault import MAGIC, FileVault
+
+
+@pytest.fixture
+def vault_path(temp_dir):
+    return os.path.join(temp_dir, "vault.bin")
+
+
+class TestFileVault:
+    """Tests for FileVault."""
+
+    def test_roundtrip(self, vault_path):
+        """Test storing and reading back values."""
+        vault = FileVault(vault_path, "master")
+        vault.set_password("svc", "A", "alpha")
+        vault.set_password("svc", "B", "beta")
+
+        assert vault.get_password("svc", "A") == "alpha"
+        assert vault.get_password("svc", "B") == "beta"
+        assert vault.get_password("svc", "C") is None
+        assert vault.get_password("other", "A") is None
+        assert vault.names("svc") == ["A", "B"]
+
+    def test_file_is_encrypted_and_private(self, vault_path):
+        """Test the vault file holds no plaintext and is mode 0600."""
+        vault = FileVault(vault_path, "master")
+        vault.set_password("svc", "A", "super-secret-value")
+
+        with open(vault_path, "rb") as f:
+            content = f.read()
+        assert content.startswith(MAGIC)
+        assert b"super-secret-value" not in content
+        assert os.stat(vault_path).st_mode & 0o777 == 0o600
+
+    def test_overwrite_and_delete(self, vault_path):
+        """Test overwriting an entry and deleting entries."""
+        vault = FileVault(vault_path, "master")
+        vault.set_password("svc", "A", "one")
+        vault.set_password("svc", "B", "two")
+        vault.set_password("svc", "A", "three")
+        vault.delete_password("svc", "B")
+
+        assert vault.get_password("svc", "A") == "three"
+        assert vault.get_password("svc", "B") is None
+
+        with pytest.raises(keyring.errors.PasswordDeleteError):
+            vault.delete_password("svc", "B")
+
+    def test_derives_key_once(self, vault_path):
+        """Test reads and writes only run the KDF once per vault instance."""
+        FileVault(vault_path, "master").set_password("svc", "A", "alpha")
+
+        vault = FileVault(vault_path, "master")
+        with patch("backpack.vault.derive_key", wraps=derive_key) as kdf:
+            for _ in range(5):
+                assert vault.get_password("svc", "A") == "alpha"
+            vault.set_password("svc", "B", "beta")
+            assert vault.get_password("svc", "B") == "beta"
+        assert kdf.call_count == 1
+
+    def test_sees_writes_from_other_instances(self, vault_path):
+        """Test an open vault picks up changes written by another process."""
+        reader = FileVault(vault_path, "master")
+        writer = FileVault(vault_path, "master")
+        writer.set_password("svc", "A", "alpha")
+        assert reader.get_password("svc", "A") == "alpha"
+
+        writer.set_password("svc", "A", "changed")
+        reader.set_password("svc", "B", "beta")
+        assert reader.get_password("svc", "A") == "changed"
+        assert writer.get_password("svc", "B") == "beta"
+
+    def test_wrong_master_key(self, vault_path):
+        """Test a wrong master key cannot read or write the vault."""
+        FileVault(vault_path, "master").set_password("svc", "A", "alpha")
+
+        wrong = FileVault(vault_path, "not-the-key")
+        with pytest.raises(keyring.errors.KeyringError):
+            wrong.get_password("svc", "A")
+        with pytest.raises(keyring.errors.KeyringError):
+            wrong.set_password("svc", "B", "beta")
+
+    def test_swapped_index_is_detected(self, vault_path):
+        """Test entries cannot be swapped by editing the plaintext index."""
+        vault = FileVault(vault_path, "master")
+        vault.set_password("svc", "A", "alpha")
+        vault.set_password("svc", "B", "beta")
+        vault._index["svc/A"], vault._index["svc/B"] = vault._index["svc/B"], vault._index["svc/A"]
+
+        with pytest.raises(keyring.errors.KeyringError):
+            vault.get_password("svc", "A")
+
+    def test_not_a_vault(self, vault_path):
+        """Test a foreign file is rejected."""
+        with open(vault_path, "wb") as f:
+            f.write(b"hello world\n")
+
+        with pytest.raises(keyring.errors.KeyringError):
+            FileVault(vault_path, "master").get_password("svc", "A")
+
+
+class TestKeychainFileBackend:
+    """Tests for selecting the vault as the keychain backend."""
+
+    @pytest.fixture(autouse=True)
+    def file_backend(self, monkeypatch, vault_path):
+        monkeypatch.setenv("BACKPACK_KEYCHAIN_BACKEND", "file")
+        monkeypatch.setenv("BACKPACK_VAULT_PATH", vault_path)
+        monkeypatch.setenv("BACKPACK_VAULT_KEY", "vault-master")
+        yield
+        set_backend(None)
+
+    def test_store_and_get(self, vault_path):
+        """Test keychain functions use the vault file instead of keyring."""
+        with patch("keyring.set_password") as mock_set:
+            store_key("OPENAI_API_KEY", "sk-test")
+            register_key("OPENAI_API_KEY")
+        mock_set.assert_not_called()
+
+        assert os.path.exists(vault_path)
+        assert get_key("OPENAI_API_KEY") == "sk-test"
+        assert list_keys() == {"OPENAI_API_KEY": True}
+
+    def test_store_keys_rewrites_once(self):
+        """Test a batch store rewrites the vault file once."""
+        with patch.object(FileVault, "_rewrite", autospec=True, side_effect=FileVault._rewrite) as rewrite:
+            store_keys({"A_KEY": "a", "B_KEY": "b", "C_KEY": "c"}, register=False)
+        assert rewrite.call_count == 1
+        assert get_keys(["A_KEY", "B_KEY", "C_KEY"]) == {"A_KEY": "a", "B_KEY": "b", "C_KEY": "c"}
+
+    def test_set_backend_overrides_env(self, mock_keyring):
+        """Test set_backend() takes precedence over the environment."""
+        set_backend("keyring")
+        store_key("OPENAI_API_KEY", "sk-test")
+        assert mock_keyring[("backpack-agent", "OPENAI_API_KEY")] == "sk-test"
+
+    def test_requires_master_key(self, monkeypatch):
+        """Test the file backend refuses to run without an explicit master key."""
+        monkeypatch.delenv("BACKPACK_VAULT_KEY")
+        monkeypatch.delenv("AGENT_MASTER_KEY", raising=False)
+        with pytest.raises(KeychainAccessError, match="master key"):
+            get_key("OPENAI_API_KEY")
+
+    def test_unknown_backend(self, monkeypatch):
+        """Test an unknown backend name is reported."""
+        monkeypatch.setenv("BACKPACK_KEYCHAIN_BACKEND", "carrier-pigeon")
+        with pytest.raises(KeychainAccessError):
+            get_key("OPENAI_API_KEY")
+        with pytest.raises(ValidationError):
+            keychain._backend()